@@ -0,0 +1,14 @@
+-- ============================================================================
+-- FEMCL: Таблицы состояния миграции в схеме mcl
+-- ============================================================================
+-- Дата создания: 2026-10-19
+-- Назначение: Мастер-скрипт, создает таблицы состояния, которые ведут
+--             классы миграции. Классы не создают эти таблицы сами:
+--             скрипт выполняется один раз при подготовке схемы mcl
+-- ============================================================================
+
+\i 01_create_migration_trace_spans.sql
+\i 02_create_table_sync_state.sql
+\i 03_create_table_fingerprints.sql
+\i 04_create_source_snapshots.sql
+\i 05_create_table_partitioning.sql
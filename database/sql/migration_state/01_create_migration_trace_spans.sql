@@ -0,0 +1,45 @@
+-- ============================================================================
+-- FEMCL: Создание таблицы mcl.migration_trace_spans
+-- ============================================================================
+-- Дата создания: 2026-10-19
+-- Назначение: Спаны трассировки фаз миграции таблиц (MigrationTracer)
+--             Источник распределения времени по фазам в monitoring_reporter
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS mcl.migration_trace_spans (
+    id                      SERIAL PRIMARY KEY,
+    
+    -- ИДЕНТИФИКАЦИЯ СПАНА
+    run_id                  VARCHAR(64) NOT NULL,   -- Запуск миграции
+    trace_id                VARCHAR(32) NOT NULL,   -- Трасса таблицы (OTLP)
+    span_id                 VARCHAR(16) NOT NULL,
+    parent_span_id          VARCHAR(16),
+    
+    -- ФАЗА
+    table_name              VARCHAR(255) NOT NULL,
+    span_name               VARCHAR(100) NOT NULL,  -- metadata.load, data.migrate, ...
+    start_time              TIMESTAMP NOT NULL,
+    end_time                TIMESTAMP NOT NULL,
+    duration_ms             DECIMAL(15,3) NOT NULL,
+    rows_count              BIGINT,
+    bytes_count             BIGINT,
+    status                  VARCHAR(20) NOT NULL DEFAULT 'ok',
+    attributes              JSONB,
+    
+    created_at              TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_migration_trace_spans_table_name
+ON mcl.migration_trace_spans(table_name);
+
+CREATE INDEX IF NOT EXISTS idx_migration_trace_spans_run_id
+ON mcl.migration_trace_spans(run_id);
+
+COMMENT ON TABLE mcl.migration_trace_spans IS 
+'Спаны трассировки фаз миграции таблиц (MigrationTracer.save_to_database)';
+
+COMMENT ON COLUMN mcl.migration_trace_spans.span_name IS 
+'Фаза миграции: table.migrate (корневой спан), metadata.load, table.ddl, data.migrate, data.fetch, index.build, ...';
+
+COMMENT ON COLUMN mcl.migration_trace_spans.attributes IS 
+'Атрибуты спана (число колонок, перцентили пакетов, параметры ограничения источника)';
@@ -0,0 +1,34 @@
+-- ============================================================================
+-- FEMCL: Создание таблицы mcl.table_sync_state
+-- ============================================================================
+-- Дата создания: 2026-10-19
+-- Назначение: Водяные знаки догоняющей синхронизации таблиц (DeltaSync)
+--             по change tracking или rowversion источника
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS mcl.table_sync_state (
+    id                      SERIAL PRIMARY KEY,
+    task_id                 INTEGER NOT NULL,
+    table_name              VARCHAR(255) NOT NULL,
+    
+    -- ВОДЯНОЙ ЗНАК
+    sync_mode               VARCHAR(20) NOT NULL,   -- change_tracking / rowversion
+    watermark               BIGINT NOT NULL,
+    
+    -- СТАТИСТИКА РАУНДОВ
+    rows_upserted           BIGINT NOT NULL DEFAULT 0,
+    rows_deleted            BIGINT NOT NULL DEFAULT 0,
+    sync_count              INTEGER NOT NULL DEFAULT 0,
+    last_sync_at            TIMESTAMP,
+    
+    created_at              TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at              TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE (task_id, table_name)
+);
+
+COMMENT ON TABLE mcl.table_sync_state IS 
+'Водяные знаки догоняющей синхронизации (migration.delta_sync): фиксируются до первичной загрузки, сдвигаются каждым раундом';
+
+COMMENT ON COLUMN mcl.table_sync_state.watermark IS 
+'CHANGE_TRACKING_CURRENT_VERSION() или MIN_ACTIVE_ROWVERSION() - 1 источника на момент фиксации';
@@ -0,0 +1,34 @@
+-- ============================================================================
+-- FEMCL: Создание таблицы mcl.table_fingerprints
+-- ============================================================================
+-- Дата создания: 2026-10-19
+-- Назначение: Отпечатки таблиц источника (SourceFingerprint) для пропуска
+--             неизмененных таблиц при повторном запуске (migration.skip_unchanged)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS mcl.table_fingerprints (
+    id                      SERIAL PRIMARY KEY,
+    task_id                 INTEGER NOT NULL,
+    table_name              VARCHAR(255) NOT NULL,
+    
+    -- ОТПЕЧАТОК ИСТОЧНИКА
+    row_count               BIGINT NOT NULL,
+    max_rowversion          BIGINT,                 -- MAX(rowversion), если колонка есть
+    checksum_agg            INTEGER,                -- CHECKSUM_AGG(BINARY_CHECKSUM(*)) иначе
+    metadata_hash           VARCHAR(32),            -- хэш метаданных mcl (колонки, типы, правила)
+    
+    -- ПРОВЕРКА ЦЕЛЕВОЙ ТАБЛИЦЫ
+    target_row_count        BIGINT,
+    verified_at             TIMESTAMP,
+    
+    created_at              TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at              TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE (task_id, table_name)
+);
+
+-- Таблица, созданная предыдущей версией скрипта
+ALTER TABLE mcl.table_fingerprints ADD COLUMN IF NOT EXISTS metadata_hash VARCHAR(32);
+
+COMMENT ON TABLE mcl.table_fingerprints IS 
+'Отпечатки источника после проверенной миграции: таблица пропускается, пока отпечаток, хэш метаданных и число строк целевой таблицы не изменились';
@@ -0,0 +1,23 @@
+-- ============================================================================
+-- FEMCL: Создание таблицы mcl.source_snapshots
+-- ============================================================================
+-- Дата создания: 2026-10-19
+-- Назначение: Снимки базы источника на запуск миграции
+--             (migration.consistent_read.mode: database, SourceSnapshot)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS mcl.source_snapshots (
+    run_id                  VARCHAR(64) PRIMARY KEY,    -- --create-snapshot / --snapshot-run
+    source_database         VARCHAR(255) NOT NULL,
+    snapshot_database       VARCHAR(255) NOT NULL,      -- <база>_femcl_<run_id>
+    
+    -- ВОДЯНЫЕ ЗНАКИ РАБОЧЕЙ БАЗЫ ПЕРЕД СОЗДАНИЕМ СНИМКА
+    change_tracking_version BIGINT,
+    rowversion_watermark    BIGINT NOT NULL,
+    
+    created_at              TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    dropped_at              TIMESTAMP                   -- NULL - снимок действует
+);
+
+COMMENT ON TABLE mcl.source_snapshots IS 
+'Снимки базы источника (CREATE DATABASE ... AS SNAPSHOT OF): все таблицы запуска читаются из одного снимка';
@@ -0,0 +1,29 @@
+-- ============================================================================
+-- FEMCL: Создание таблицы mcl.table_partitioning
+-- ============================================================================
+-- Дата создания: 2026-10-19
+-- Назначение: Спецификации декларативного секционирования целевых таблиц
+--             (PartitionSpec, PartitionedLoad, PartitionedIndexBuild)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS mcl.table_partitioning (
+    id                 SERIAL PRIMARY KEY,
+    task_id            INTEGER NOT NULL,
+    table_name         VARCHAR(255) NOT NULL,
+    
+    -- СПЕЦИФИКАЦИЯ СЕКЦИЙ
+    partition_column   VARCHAR(255) NOT NULL,          -- дата или целочисленный идентификатор, NOT NULL
+    strategy           VARCHAR(16) NOT NULL DEFAULT 'range',
+    range_start        TEXT NOT NULL,                  -- включительно
+    range_end          TEXT NOT NULL,                  -- не включительно
+    partition_interval TEXT NOT NULL,                  -- '1 month', '1 year', '7 days' или число
+    include_default    BOOLEAN NOT NULL DEFAULT true,  -- секция DEFAULT для строк вне диапазона
+    
+    is_enabled         BOOLEAN NOT NULL DEFAULT true,
+    created_at         TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE (task_id, table_name)
+);
+
+COMMENT ON TABLE mcl.table_partitioning IS 
+'Секционирование целевых таблиц по диапазонам: PARTITION BY RANGE, загрузка и индексы по секциям';
@@ -36,6 +36,7 @@ from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeEl
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from config.config_loader import ConfigLoader
+from src.code.infrastructure.classes.source_reader import PyodbcSourceReader
 
 load_dotenv()
 console = Console()
@@ -82,6 +83,10 @@ class UniversalTableMigrator:
                     return cursor.fetchone()
                 return cursor.fetchall()
     
+    def _connect_mssql(self):
+        """Новое подключение к MS SQL Server"""
+        return pyodbc.connect(self.mssql_conn_str)
+    
     def _execute_mssql_query(self, query, params=None, fetch_one=False):
         """Выполнение запроса к MS SQL Server"""
         with pyodbc.connect(self.mssql_conn_str) as conn:
@@ -255,8 +260,7 @@ class UniversalTableMigrator:
                 self.log_action("Перенос данных", "FAILED", "Не найдены исходные имена колонок")
                 return False
             
-            # Формируем запросы
-            select_query = f"SELECT {', '.join(source_columns)} FROM ags.{table_name}"
+            # Формируем запрос вставки (чтение - через SourceReader)
             insert_query = f"INSERT INTO ags.{table_name} ({', '.join(target_columns)}) VALUES ({', '.join(['%s'] * len(target_columns))})"
             
             with Progress(
@@ -270,10 +274,7 @@ class UniversalTableMigrator:
                 
                 task = progress.add_task("Перенос данных...", total=None)
                 
-                with pyodbc.connect(self.mssql_conn_str) as mssql_conn:
-                    mssql_cursor = mssql_conn.cursor()
-                    mssql_cursor.execute(select_query)
-                    
+                with PyodbcSourceReader(connection_factory=self._connect_mssql) as source_reader:
                     with psycopg2.connect(self.pg_conn_str) as pg_conn:
                         pg_cursor = pg_conn.cursor()
                         
@@ -281,12 +282,11 @@ class UniversalTableMigrator:
                         pg_cursor.execute(f"ALTER TABLE ags.{table_name} DISABLE TRIGGER ALL;")
                         
                         row_count = 0
-                        for row in mssql_cursor.fetchall():
-                            pg_cursor.execute(insert_query, row)
-                            row_count += 1
-                            
-                            if row_count % 1000 == 0:
-                                progress.update(task, description=f"Перенесено {row_count} строк...")
+                        for batch in source_reader.read_batches(table_name, columns=source_columns,
+                                                                batch_size=1000):
+                            pg_cursor.executemany(insert_query, batch.rows)
+                            row_count += len(batch)
+                            progress.update(task, description=f"Перенесено {row_count} строк...")
                         
                         pg_conn.commit()
                         pg_cursor.execute(f"ALTER TABLE ags.{table_name} ENABLE TRIGGER ALL;")
@@ -305,8 +305,8 @@ class UniversalTableMigrator:
         """Валидация миграции"""
         try:
             # Сравниваем количество строк
-            mssql_count_query = f"SELECT COUNT(*) FROM ags.{table_name}"
-            mssql_count = self._execute_mssql_query(mssql_count_query, fetch_one=True)[0]
+            with PyodbcSourceReader(connection_factory=self._connect_mssql) as source_reader:
+                mssql_count = source_reader.count_rows(table_name)
             
             pg_count_query = f"SELECT COUNT(*) FROM ags.{table_name}"
             pg_count = self._execute_pg_query(pg_count_query, fetch_one=True)[0]
@@ -2,16 +2,19 @@
 """
 Проверка доступных таблиц в MS SQL Server
 """
+from pathlib import Path
 import pyodbc
 import yaml
 from rich.console import Console
 from rich.table import Table
 
+CONFIG_PATH = Path(__file__).resolve().parent.parent.parent / 'config' / 'config.yaml'
+
 console = Console()
 
 def get_mssql_connection():
     """Подключение к MS SQL Server"""
-    with open('/home/alex/projects/sql/femcl/config/config.yaml', 'r', encoding='utf-8') as file:
+    with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
         config = yaml.safe_load(file)
     
     mssql_config = config['database']['mssql']
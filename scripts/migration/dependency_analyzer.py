@@ -17,21 +17,16 @@ from rich.table import Table
 from rich.tree import Tree
 
 # Добавляем путь к модулям проекта
-sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src" / "code"))
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src" / "code"))
 
 from infrastructure.classes import ConnectionManager
+from infrastructure.classes.migration_logging import setup_logging
 
 console = Console()
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/home/alex/projects/sql/femcl/logs/dependency_analysis.log', mode='a'),
-        logging.StreamHandler()
-    ]
-)
+# Журнал: очередь и фоновый поток записи (setup_logging вызывается точкой входа)
+LOG_FILE = PROJECT_ROOT / 'logs' / 'dependency_analysis.jsonl'
 logger = logging.getLogger(__name__)
 
 class DependencyAnalyzer:
@@ -143,7 +138,8 @@ class DependencyAnalyzer:
         Returns:
             dict: Информация о зависимостях таблицы
         """
-        console.print(f"[blue]🔍 Анализ зависимостей для таблицы {table_name}[/blue]")
+        # Вызывается для каждой таблицы: шаги - в журнал (очередь), не в консоль
+        logger.debug(f"Анализ зависимостей для таблицы {table_name}")
         
         # Получаем внешние ключи для таблицы
         fk_query = """
@@ -211,11 +207,12 @@ class DependencyAnalyzer:
             'dependency_level': len(referenced_tables) + len(dependent_table_names)
         }
         
-        console.print(f"   📊 Найдено зависимостей: {result['total_dependencies']}")
-        console.print(f"   🔗 Критических: {result['critical_count']}")
-        console.print(f"   📈 Уровень зависимости: {result['dependency_level']}")
-        
-        logger.info(f"Анализ зависимостей для {table_name}: {result}")
+        logger.info(
+            f"Зависимости {table_name}: {result['total_dependencies']}, критических: {result['critical_count']}, "
+            f"уровень: {result['dependency_level']}",
+            extra={'table_name': table_name, 'referenced_tables': result['referenced_tables'],
+                   'dependent_tables': dependent_table_names, 'critical_count': result['critical_count']}
+        )
         return result
     
     def check_referenced_tables_ready(self, table_name: str) -> Dict:
@@ -228,7 +225,7 @@ class DependencyAnalyzer:
         Returns:
             dict: Статус готовности ссылочных таблиц
         """
-        console.print(f"[blue]🔍 Проверка готовности ссылочных таблиц для {table_name}[/blue]")
+        logger.debug(f"Проверка готовности ссылочных таблиц для {table_name}")
         
         # Получаем зависимости таблицы
         dependencies = self.analyze_table_dependencies(table_name)
@@ -290,10 +287,12 @@ class DependencyAnalyzer:
             'total_referenced': len(referenced_tables)
         }
         
-        console.print(f"   ✅ Готовых таблиц: {len(ready_tables)}/{len(referenced_tables)}")
-        console.print(f"   📊 Процент готовности: {ready_percentage:.1f}%")
-        
-        logger.info(f"Проверка готовности для {table_name}: {result}")
+        logger.info(
+            f"Готовность ссылочных таблиц {table_name}: {len(ready_tables)}/{len(referenced_tables)} "
+            f"({ready_percentage:.1f}%)",
+            extra={'table_name': table_name, 'ready_percentage': ready_percentage,
+                   'not_ready_tables': not_ready_tables}
+        )
         return result
     
     def detect_circular_dependencies(self) -> List[List[str]]:
@@ -459,7 +458,7 @@ class DependencyAnalyzer:
         Returns:
             list: Цепочка зависимостей
         """
-        console.print(f"[blue]🔍 Анализ цепочки зависимостей для {table_name}[/blue]")
+        logger.debug(f"Анализ цепочки зависимостей для {table_name}")
         
         graph = self._build_dependency_graph()
         visited = set()
@@ -477,8 +476,8 @@ class DependencyAnalyzer:
         
         dfs(table_name, chain)
         
-        console.print(f"   🔗 Цепочка зависимостей: {' → '.join(chain)}")
-        logger.info(f"Цепочка зависимостей для {table_name}: {chain}")
+        logger.info(f"Цепочка зависимостей для {table_name}: {' → '.join(chain)}",
+                    extra={'table_name': table_name, 'chain': chain})
         return chain
     
     def get_critical_dependencies(self) -> List[Dict]:
@@ -520,7 +519,7 @@ class DependencyAnalyzer:
         Returns:
             bool: True если зависимости корректны
         """
-        console.print(f"[blue]🔍 Валидация целостности зависимостей для {table_name}[/blue]")
+        logger.debug(f"Валидация целостности зависимостей для {table_name}")
         
         try:
             # Проверяем готовность ссылочных таблиц
@@ -530,18 +529,15 @@ class DependencyAnalyzer:
             is_valid = readiness['ready_percentage'] == 100.0
             
             if is_valid:
-                console.print(f"   ✅ Все зависимости для {table_name} корректны")
+                logger.info(f"Все зависимости для {table_name} корректны", extra={'table_name': table_name})
             else:
-                console.print(f"   ❌ Не все зависимости для {table_name} готовы")
-                for not_ready in readiness['not_ready_tables']:
-                    console.print(f"      - {not_ready['table']}: {not_ready['reason']}")
-            
-            logger.info(f"Валидация целостности для {table_name}: {is_valid}")
+                not_ready = ', '.join(f"{t['table']}: {t['reason']}" for t in readiness['not_ready_tables'])
+                logger.warning(f"Не все зависимости для {table_name} готовы: {not_ready}",
+                               extra={'table_name': table_name})
             return is_valid
             
         except Exception as e:
-            console.print(f"   ❌ Ошибка валидации: {e}")
-            logger.error(f"Ошибка валидации для {table_name}: {e}")
+            logger.error(f"Ошибка валидации для {table_name}: {e}", extra={'table_name': table_name})
             return False
     
     def display_dependency_tree(self, table_name: str):
@@ -624,6 +620,8 @@ class DependencyAnalyzer:
 
 # Примеры использования
 if __name__ == "__main__":
+    setup_logging(LOG_FILE)
+    
     # Инициализация ConnectionManager (task_id=2 по умолчанию)
     manager = ConnectionManager()
     
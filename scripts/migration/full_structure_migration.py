@@ -2,6 +2,8 @@
 """
 Полный перенос таблиц с реальной структурой и данными из MS SQL Server в PostgreSQL
 """
+import sys
+from pathlib import Path
 import pyodbc
 import psycopg2
 import yaml
@@ -11,11 +13,17 @@ from rich.table import Table
 from rich.progress import Progress, BarColumn, TextColumn, TimeElapsedColumn
 from datetime import datetime
 
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+CONFIG_PATH = PROJECT_ROOT / 'config' / 'config.yaml'
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.code.infrastructure.classes.source_reader import PyodbcSourceReader
+
 console = Console()
 
 def get_mssql_connection():
     """Подключение к MS SQL Server"""
-    with open('/home/alex/projects/sql/femcl/config/config.yaml', 'r', encoding='utf-8') as file:
+    with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
         config = yaml.safe_load(file)
     
     mssql_config = config['database']['mssql']
@@ -33,7 +41,7 @@ def get_mssql_connection():
 
 def get_postgres_connection():
     """Подключение к PostgreSQL"""
-    with open('/home/alex/projects/sql/femcl/config/config.yaml', 'r', encoding='utf-8') as file:
+    with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
         config = yaml.safe_load(file)
     
     postgres_config = config['database']['postgres']
@@ -169,28 +177,15 @@ def create_table_structure(table_name, columns):
 
 def migrate_table_data(table_name, columns):
     """Перенос данных таблицы"""
-    mssql_conn = get_mssql_connection()
+    source_reader = PyodbcSourceReader(connection_factory=get_mssql_connection)
     postgres_conn = get_postgres_connection()
     
-    mssql_cursor = mssql_conn.cursor()
     postgres_cursor = postgres_conn.cursor()
     
     try:
         console.print(f"🚀 Перенос данных таблицы: {table_name}")
         
-        # Получаем данные из MS SQL Server
         column_names = [col[0] for col in columns]
-        select_columns = ', '.join([f'[{col}]' for col in column_names])
-        query = f"SELECT {select_columns} FROM ags.{table_name}"
-        
-        mssql_cursor.execute(query)
-        rows = mssql_cursor.fetchall()
-        
-        console.print(f"   📊 Загружено записей: {len(rows)}")
-        
-        if len(rows) == 0:
-            console.print(f"   ⚠️ Таблица {table_name} пуста")
-            return True
         
         # Вставляем данные в PostgreSQL
         target_table = f'ags.{table_name}' if table_name != 'cnInvCmmAgN' else 'ags."cnInvCmmAgN"'
@@ -202,13 +197,12 @@ def migrate_table_data(table_name, columns):
             VALUES ({placeholders})
         """
         
-        # Вставляем данные пакетами
+        # Читаем и вставляем данные пакетами
         batch_size = 1000
         total_inserted = 0
         
-        for i in range(0, len(rows), batch_size):
-            batch = rows[i:i + batch_size]
-            
+        for batch_number, batch in enumerate(source_reader.read_batches(
+                table_name, columns=column_names, batch_size=batch_size)):
             # Преобразуем данные для PostgreSQL
             processed_batch = []
             for row in batch:
@@ -225,8 +219,12 @@ def migrate_table_data(table_name, columns):
             postgres_cursor.executemany(insert_query, processed_batch)
             total_inserted += len(batch)
             
-            if i % (batch_size * 10) == 0:
-                console.print(f"      📊 Обработано: {total_inserted}/{len(rows)} записей")
+            if batch_number % 10 == 0:
+                console.print(f"      📊 Обработано: {total_inserted} записей")
+        
+        if total_inserted == 0:
+            console.print(f"   ⚠️ Таблица {table_name} пуста")
+            return True
         
         postgres_conn.commit()
         console.print(f"   ✅ Успешно перенесено: {total_inserted} записей")
@@ -238,8 +236,7 @@ def migrate_table_data(table_name, columns):
         postgres_conn.rollback()
         return False
     finally:
-        mssql_cursor.close()
-        mssql_conn.close()
+        source_reader.close()
         postgres_cursor.close()
         postgres_conn.close()
 
@@ -267,8 +264,7 @@ def verify_full_migration():
             console.print(f"\n🔍 Таблица: {table}")
             
             # Сравниваем количество записей
-            mssql_cursor.execute(f"SELECT COUNT(*) FROM ags.{table}")
-            mssql_count = mssql_cursor.fetchone()[0]
+            mssql_count = PyodbcSourceReader(mssql_conn).count_rows(table)
             
             target_table = f'ags.{table}' if table != 'cnInvCmmAgN' else 'ags."cnInvCmmAgN"'
             postgres_cursor.execute(f"SELECT COUNT(*) FROM {target_table}")
@@ -11,6 +11,7 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from enum import Enum
+from pathlib import Path
 import yaml
 from rich.console import Console
 from rich.panel import Panel
@@ -18,23 +19,19 @@ from rich.table import Table
 from rich.progress import Progress, BarColumn, TextColumn, TimeElapsedColumn
 
 # Добавляем путь к проекту
-sys.path.append('/home/alex/projects/sql/femcl')
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
 
 from scripts.migration.table_list_manager import TableListManager
 from scripts.migration.dependency_analyzer import DependencyAnalyzer
 from scripts.migration.monitoring_reporter import MigrationMonitor
+from src.code.infrastructure.classes.migration_profiler import MigrationProfiler
+from src.code.infrastructure.classes.migration_logging import setup_logging
 
 console = Console()
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/home/alex/projects/sql/femcl/logs/coordinator.log', mode='a'),
-        logging.StreamHandler()
-    ]
-)
+# Журнал: очередь и фоновый поток записи (setup_logging вызывается точкой входа)
+LOG_FILE = PROJECT_ROOT / 'logs' / 'coordinator.jsonl'
 logger = logging.getLogger(__name__)
 
 class MigrationState(Enum):
@@ -50,11 +47,25 @@ class MigrationState(Enum):
 class MigrationCoordinator:
     """Главный координатор системы миграции"""
     
-    def __init__(self, config_path="/home/alex/projects/sql/femcl/config/config.yaml"):
-        """Инициализация координатора"""
+    def __init__(self, config_path=str(PROJECT_ROOT / "config" / "config.yaml"),
+                 profile: bool = False, profile_dir: Optional[str] = None):
+        """
+        Инициализация координатора
+        
+        Args:
+            config_path (str): Путь к файлу конфигурации
+            profile (bool): Профилировать задачу каждой таблицы
+            profile_dir (str): Каталог профилей (по умолчанию reports/profiles)
+        """
+        setup_logging(LOG_FILE)
         self.config_path = config_path
         self.config = self._load_config()
         
+        # Идентификатор запуска и профилирование
+        self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.profile = profile
+        self.profile_dir = profile_dir
+        
         # Состояние системы
         self.state = MigrationState.INITIALIZING
         self.start_time = None
@@ -210,21 +221,34 @@ class MigrationCoordinator:
                 if not self.migration_active:
                     break
                 
-                console.print(f"   🔄 Миграция таблицы {i+1}/{len(tables_to_migrate)}: {table_name}")
+                # Шаги по таблицам - в журнал: консоль отрисовывает поток QueueListener
+                logger.info(f"🔄 Миграция таблицы {i+1}/{len(tables_to_migrate)}: {table_name}",
+                            extra={'table_name': table_name, 'position': i + 1, 'total': len(tables_to_migrate)})
                 
                 # Проверяем готовность зависимостей
                 readiness = self.dependency_analyzer.check_referenced_tables_ready(table_name)
                 if readiness['ready_percentage'] < 100.0:
-                    console.print(f"      ⏳ Ожидание готовности зависимостей...")
+                    logger.info(f"⏳ {table_name}: ожидание готовности зависимостей",
+                                extra={'table_name': table_name, 'ready_percentage': readiness['ready_percentage']})
                     time.sleep(5)
                     continue
                 
                 # Выполняем миграцию таблицы
-                success = self._migrate_single_table(table_name)
+                if self.profile:
+                    with MigrationProfiler(table_name, self.run_id, self.profile_dir) as profiler:
+                        success = self._migrate_single_table(table_name)
+                    logger.info(f"🔬 Профиль {table_name}: {profiler.artifacts.get('summary', 'не сохранен')}, "
+                                f"{profiler.describe_memory()}",
+                                extra={'table_name': table_name, 'peak_rss_kb': profiler.peak_rss_kb,
+                                       'process_peak_rss_kb': profiler.process_peak_rss_kb})
+                else:
+                    success = self._migrate_single_table(table_name)
                 if success:
-                    console.print(f"      ✅ Таблица {table_name} мигрирована успешно")
+                    logger.info(f"✅ Таблица {table_name} мигрирована успешно",
+                                extra={'table_name': table_name, 'status': 'completed'})
                 else:
-                    console.print(f"      ❌ Ошибка миграции таблицы {table_name}")
+                    logger.error(f"❌ Ошибка миграции таблицы {table_name}",
+                                 extra={'table_name': table_name, 'status': 'failed'})
                     self.error_count += 1
             
             # Завершение миграции
@@ -234,8 +258,7 @@ class MigrationCoordinator:
                 logger.info("Миграция завершена успешно")
             
         except Exception as e:
-            console.print(f"[red]❌ Критическая ошибка в цикле миграции: {e}[/red]")
-            logger.error(f"Критическая ошибка в цикле миграции: {e}")
+            logger.exception(f"❌ Критическая ошибка в цикле миграции: {e}")
             self.state = MigrationState.ERROR
             self.last_error = str(e)
     
@@ -697,8 +720,15 @@ class MigrationCoordinator:
 
 # Примеры использования
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='FEMCL - Координатор миграции')
+    parser.add_argument('--profile', action='store_true', help='Профилирование задачи каждой таблицы')
+    parser.add_argument('--profile-dir', metavar='DIR', help='Каталог профилей (по умолчанию reports/profiles)')
+    args = parser.parse_args()
+    
     # Создаём координатор
-    coordinator = MigrationCoordinator()
+    coordinator = MigrationCoordinator(profile=args.profile, profile_dir=args.profile_dir)
     
     try:
         # Инициализация системы
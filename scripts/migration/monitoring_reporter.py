@@ -22,21 +22,16 @@ from rich.layout import Layout
 from rich.text import Text
 
 # Добавляем путь к модулям проекта
-sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src" / "code"))
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src" / "code"))
 
 from infrastructure.classes import ConnectionManager
+from infrastructure.classes.migration_logging import setup_logging
 
 console = Console()
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/home/alex/projects/sql/femcl/logs/monitoring.log', mode='a'),
-        logging.StreamHandler()
-    ]
-)
+# Журнал: очередь и фоновый поток записи (setup_logging вызывается точкой входа)
+LOG_FILE = PROJECT_ROOT / 'logs' / 'monitoring.jsonl'
 logger = logging.getLogger(__name__)
 
 class MigrationMonitor:
@@ -72,19 +67,27 @@ class MigrationMonitor:
         """
         conn = self.conn_mgr.get_postgres_connection()
         cursor = conn.cursor()
-        cursor.execute(query, params)
-        
-        if cursor.description:
-            columns = [desc[0] for desc in cursor.description]
-            rows = cursor.fetchall()
-            result = [dict(zip(columns, row)) for row in rows]
-        else:
-            conn.commit()
-            result = []
+        try:
+            cursor.execute(query, params)
+            
+            if cursor.description:
+                columns = [desc[0] for desc in cursor.description]
+                rows = cursor.fetchall()
+                result = [dict(zip(columns, row)) for row in rows]
+            else:
+                conn.commit()
+                result = []
+        except Exception:
+            # Прерванная транзакция блокирует все следующие запросы подключения
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            cursor.close()
         
-        cursor.close()
         return result
-                cursor.close()
     
     def _ensure_monitoring_tables(self):
         """Создание таблиц для мониторинга если не существуют"""
@@ -360,7 +363,8 @@ class MigrationMonitor:
         Returns:
             dict: Текущие метрики миграции
         """
-        console.print("[blue]📊 Получение метрик в реальном времени[/blue]")
+        # Вызывается живым дашбордом каждые 2 секунды: вывод - только через журнал
+        logger.debug("Получение метрик в реальном времени")
         
         try:
             # Получаем последние метрики
@@ -402,16 +406,15 @@ class MigrationMonitor:
                 'timestamp': datetime.now().isoformat()
             }
             
-            console.print(f"   📈 Прогресс: {metrics.get('progress_percentage', {}).get('value', 0):.1f}%")
-            console.print(f"   🏃 Скорость: {metrics.get('migration_speed', {}).get('value', 0):.1f} таблиц/час")
-            console.print(f"   ✅ Завершено: {status_breakdown.get('completed', 0)}")
-            console.print(f"   ❌ Ошибок: {status_breakdown.get('failed', 0)}")
-            
-            logger.info(f"Получены метрики в реальном времени: {result}")
+            logger.debug(
+                f"Прогресс: {metrics.get('progress_percentage', {}).get('value', 0):.1f}%, "
+                f"скорость: {metrics.get('migration_speed', {}).get('value', 0):.1f} таблиц/час, "
+                f"завершено: {status_breakdown.get('completed', 0)}, ошибок: {status_breakdown.get('failed', 0)}",
+                extra={'status_breakdown': status_breakdown}
+            )
             return result
             
         except Exception as e:
-            console.print(f"[red]❌ Ошибка получения метрик: {e}[/red]")
             logger.error(f"Ошибка получения метрик: {e}")
             return {}
     
@@ -553,14 +556,21 @@ class MigrationMonitor:
             phase_data = self._execute_query(phase_query)
             phase_metrics = {phase['phase']: phase for phase in phase_data}
             
+            # Распределение времени по фазам из трассировки
+            trace_phases = self.get_trace_phase_breakdown()
+            
             report = {
                 'performance_metrics': performance_metrics,
                 'phase_metrics': phase_metrics,
+                'trace_phases': trace_phases,
                 'generated_at': datetime.now().isoformat()
             }
             
             console.print(f"   📈 Средняя скорость: {performance_metrics.get('migration_speed', {}).get('avg_value', 0):.1f} таблиц/час")
             console.print(f"   ⏱️ Среднее время: {performance_metrics.get('avg_migration_time', {}).get('avg_value', 0):.1f} сек")
+            for phase in trace_phases.get('aggregate', []):
+                console.print(f"   🧭 {phase['span_name']}: {float(phase['total_ms'] or 0) / 1000:.1f} сек "
+                              f"({float(phase['share_percent'] or 0):.1f}%)")
             
             logger.info(f"Сгенерирован отчёт о производительности: {report}")
             return report
@@ -570,6 +580,76 @@ class MigrationMonitor:
             logger.error(f"Ошибка генерации отчёта о производительности: {e}")
             return {}
     
+    def get_trace_phase_breakdown(self, table_name: str = None) -> Dict[str, Any]:
+        """
+        Распределение времени миграции по фазам из mcl.migration_trace_spans
+        
+        Учитываются только спаны последнего запуска каждой таблицы.
+        Доля (share_percent) считается от суммы фаз верхнего уровня,
+        поэтому для подфаз (data.fetch, data.write) она показывает
+        долю подфазы в общем времени.
+        
+        Args:
+            table_name (str): Имя таблицы (None - все таблицы)
+        
+        Returns:
+            dict: {'aggregate': [...], 'tables': [...]}
+        """
+        try:
+            latest_runs = """
+            WITH latest AS (
+                SELECT DISTINCT ON (table_name) table_name, run_id
+                FROM mcl.migration_trace_spans
+                WHERE %(table_name)s IS NULL OR table_name = %(table_name)s
+                ORDER BY table_name, start_time DESC
+            ), spans AS (
+                SELECT s.*, (s.parent_span_id = r.span_id) as is_phase
+                FROM mcl.migration_trace_spans s
+                JOIN latest l ON l.table_name = s.table_name AND l.run_id = s.run_id
+                LEFT JOIN mcl.migration_trace_spans r 
+                    ON r.run_id = s.run_id AND r.table_name = s.table_name AND r.span_name = 'table.migrate'
+                WHERE s.span_name <> 'table.migrate'
+            )
+            """
+            
+            aggregate_query = latest_runs + """
+            SELECT 
+                span_name,
+                COUNT(DISTINCT table_name) as table_count,
+                SUM(duration_ms) as total_ms,
+                AVG(duration_ms) as avg_ms,
+                MAX(duration_ms) as max_ms,
+                SUM(rows_count) as rows_count,
+                SUM(bytes_count) as bytes_count,
+                ROUND(100.0 * SUM(duration_ms) / NULLIF(SUM(SUM(duration_ms) FILTER (WHERE is_phase)) OVER (), 0), 2) as share_percent
+            FROM spans
+            GROUP BY span_name
+            ORDER BY total_ms DESC
+            """
+            
+            tables_query = latest_runs + """
+            SELECT 
+                table_name,
+                run_id,
+                span_name,
+                SUM(duration_ms) as total_ms,
+                SUM(rows_count) as rows_count,
+                SUM(bytes_count) as bytes_count
+            FROM spans
+            GROUP BY table_name, run_id, span_name
+            ORDER BY table_name, total_ms DESC
+            """
+            
+            params = {'table_name': table_name}
+            return {
+                'aggregate': self._execute_query(aggregate_query, params),
+                'tables': self._execute_query(tables_query, params)
+            }
+            
+        except Exception as e:
+            logger.error(f"Ошибка получения трассировки фаз: {e}")
+            return {'aggregate': [], 'tables': []}
+    
     def generate_error_analysis_report(self) -> Dict[str, Any]:
         """
         Генерация отчёта об анализе ошибок
@@ -807,8 +887,6 @@ class MigrationMonitor:
         Returns:
             bool: True если уведомление отправлено
         """
-        console.print(f"[blue]📧 Отправка уведомления: {event_type}[/blue]")
-        
         try:
             # Сохраняем уведомление в базу
             insert_query = """
@@ -822,13 +900,12 @@ class MigrationMonitor:
             # Логируем событие
             self._log_event(event_type, message, severity)
             
-            console.print(f"   ✅ Уведомление сохранено: {title}")
-            logger.info(f"Уведомление отправлено: {event_type} - {message}")
+            logger.info(f"📧 Уведомление отправлено: {event_type} - {message}",
+                        extra={'event_type': event_type, 'severity': severity})
             return True
             
         except Exception as e:
-            console.print(f"[red]❌ Ошибка отправки уведомления: {e}[/red]")
-            logger.error(f"Ошибка отправки уведомления: {e}")
+            logger.error(f"Ошибка отправки уведомления {event_type}: {e}")
             return False
     
     def _send_notification_internal(self, notification: Dict) -> bool:
@@ -862,7 +939,7 @@ class MigrationMonitor:
             if format_type.upper() == 'CSV':
                 # Экспорт в CSV
                 import csv
-                filename = f"/home/alex/projects/sql/femcl/reports/migration_report_{timestamp}.csv"
+                filename = str(PROJECT_ROOT / "reports" / f"migration_report_{timestamp}.csv")
                 
                 # Создаём папку если не существует
                 os.makedirs(os.path.dirname(filename), exist_ok=True)
@@ -884,7 +961,7 @@ class MigrationMonitor:
                 
             elif format_type.upper() == 'JSON':
                 # Экспорт в JSON
-                filename = f"/home/alex/projects/sql/femcl/reports/migration_report_{timestamp}.json"
+                filename = str(PROJECT_ROOT / "reports" / f"migration_report_{timestamp}.json")
                 
                 # Создаём папку если не существует
                 os.makedirs(os.path.dirname(filename), exist_ok=True)
@@ -976,36 +1053,44 @@ class MigrationMonitor:
         if self.connection and not self.connection.closed:
             self.connection.close()
 
-# Примеры использования
-if __name__ == "__main__":
-    # Инициализация ConnectionManager (task_id=2 по умолчанию)
-    manager = ConnectionManager()
-    
+def main(argv=None):
+    """
+    Мониторинг миграции: живой дашборд или снимок метрик и отчеты.
+
+    Args:
+        argv: Аргументы командной строки (по умолчанию sys.argv[1:])
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='FEMCL - Мониторинг миграции')
+    parser.add_argument('--task-id', type=int, default=2, help='ID задачи миграции')
+    parser.add_argument('--once', action='store_true', help='Вывести текущие метрики без живого дашборда')
+    parser.add_argument('--export', choices=['json', 'csv'], help='Экспорт отчета о прогрессе в reports/')
+    parser.add_argument('--html', action='store_true', help='Сохранить HTML дашборд в reports/dashboard.html')
+    args = parser.parse_args(argv)
+
+    setup_logging(LOG_FILE)
+    manager = ConnectionManager(task_id=args.task_id)
     info = manager.get_connection_info()
     console.print(f"[green]✅ Профиль: {info['profile_name']} (task_id={info['task_id']})[/green]\n")
-    
-    # Создаём монитор
+
     monitor = MigrationMonitor(manager)
-    
     try:
-        # Запуск мониторинга
-        monitor.start_monitoring()
-        
-        # Получение метрик
-        metrics = monitor.get_real_time_metrics()
-        console.print(f"Метрики: {metrics}")
-        
-        # Генерация отчёта
-        report = monitor.generate_progress_report()
-        console.print(f"Отчёт: {report}")
-        
-        # Создание дашборда
-        dashboard = monitor.create_dashboard()
-        with open('/home/alex/projects/sql/femcl/reports/dashboard.html', 'w') as f:
-            f.write(dashboard)
-        
-        # Отправка уведомления
-        monitor.send_notification('TEST', 'Test notification', 'INFO')
-        
+        if args.export:
+            monitor.export_report(args.export, monitor.generate_progress_report())
+        if args.html:
+            dashboard_path = PROJECT_ROOT / 'reports' / 'dashboard.html'
+            dashboard_path.parent.mkdir(parents=True, exist_ok=True)
+            dashboard_path.write_text(monitor.create_dashboard(), encoding='utf-8')
+            console.print(f"   ✅ HTML дашборд сохранён: {dashboard_path}")
+        if args.once:
+            console.print(f"Метрики: {monitor.get_real_time_metrics()}")
+        elif not (args.export or args.html):
+            monitor.display_live_dashboard()
     finally:
-        monitor.close()
\ No newline at end of file
+        monitor.close()
+        manager.close_all_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 """
 Перенос реальных данных из MS SQL Server в PostgreSQL (финальная версия)
 """
+from pathlib import Path
 import pyodbc
 import psycopg2
 import yaml
@@ -12,11 +13,13 @@ from rich.progress import Progress, BarColumn, TextColumn, TimeElapsedColumn
 import pandas as pd
 from datetime import datetime
 
+CONFIG_PATH = Path(__file__).resolve().parent.parent.parent / 'config' / 'config.yaml'
+
 console = Console()
 
 def get_mssql_connection():
     """Подключение к MS SQL Server"""
-    with open('/home/alex/projects/sql/femcl/config/config.yaml', 'r', encoding='utf-8') as file:
+    with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
         config = yaml.safe_load(file)
     
     mssql_config = config['database']['mssql']
@@ -34,7 +37,7 @@ def get_mssql_connection():
 
 def get_postgres_connection():
     """Подключение к PostgreSQL"""
-    with open('/home/alex/projects/sql/femcl/config/config.yaml', 'r', encoding='utf-8') as file:
+    with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
         config = yaml.safe_load(file)
     
     postgres_config = config['database']['postgres']
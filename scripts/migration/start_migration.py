@@ -94,7 +94,8 @@ def start_migration():
             cur.execute("""
                 SELECT object_name, schema_name, table_size, row_count 
                 FROM mcl.mssql_tables 
-                WHERE migration_status = 'pending' 
+                WHERE migration_status = 'pending'
+                   OR id IN (SELECT source_table_id FROM mcl.postgres_tables WHERE migration_status = 'stale')
                 ORDER BY table_size DESC, row_count DESC;
             """)
             tables_to_migrate = cur.fetchall()
@@ -16,21 +16,17 @@ from rich.table import Table
 from rich.progress import Progress, TaskID
 
 # Добавляем путь к модулям проекта
-sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src" / "code"))
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src" / "code"))
 
 from infrastructure.classes import ConnectionManager
+from infrastructure.classes.migration_logging import setup_logging
+from migration.classes.source_fingerprint import STALE_TABLES_QUERY
 
 console = Console()
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/home/alex/projects/sql/femcl/logs/migration_status.log', mode='a'),
-        logging.StreamHandler()
-    ]
-)
+# Журнал: очередь и фоновый поток записи (setup_logging вызывается точкой входа)
+LOG_FILE = PROJECT_ROOT / 'logs' / 'migration_status.jsonl'
 logger = logging.getLogger(__name__)
 
 class TableListManager:
@@ -170,17 +166,21 @@ class TableListManager:
         """
         Получение списка незавершённых таблиц
         
+        Завершённые таблицы, метаданные которых помечены stale, переносятся
+        повторно - как pending.
+        
         Returns:
             list: Список таблиц, которые ещё не завершены
         """
-        query = """
+        query = f"""
         SELECT table_name 
         FROM mcl.migration_status 
         WHERE current_status NOT IN ('completed', 'blocked')
+           OR (current_status = 'completed' AND table_name IN ({STALE_TABLES_QUERY}))
         ORDER BY table_name
         """
         
-        tables = self._execute_query(query)
+        tables = self._execute_query(query, (self.task_id,))
         incomplete_tables = [table['table_name'] for table in tables]
         
         logger.info(f"Найдено {len(incomplete_tables)} незавершённых таблиц")
@@ -222,7 +222,8 @@ class TableListManager:
             error_details = json.dumps(details) if details else None
             self._execute_query(update_query, (status, previous_status, error_details, table_name))
             
-            logger.info(f"Статус таблицы {table_name} изменён: {previous_status} -> {status}")
+            logger.info(f"Статус таблицы {table_name} изменён: {previous_status} -> {status}",
+                        extra={'table_name': table_name, 'status': status, 'previous_status': previous_status})
             return True
             
         except Exception as e:
@@ -253,14 +254,33 @@ class TableListManager:
             metrics_json = json.dumps(metrics) if metrics else None
             self._execute_query(update_query, (metrics_json, table_name))
             
-            console.print(f"[green]✅ Таблица {table_name} отмечена как завершённая[/green]")
-            logger.info(f"Таблица {table_name} успешно завершена")
+            logger.info(f"✅ Таблица {table_name} отмечена как завершённая",
+                        extra={'table_name': table_name, 'status': 'completed', 'metrics': metrics})
             return True
             
         except Exception as e:
             logger.error(f"Ошибка отметки таблицы {table_name} как завершённой: {e}")
             return False
     
+    def mark_table_skipped(self, table_name: str, fingerprint: Optional[Dict] = None) -> bool:
+        """
+        Отметка таблицы, пропущенной по неизмененному отпечатку источника
+
+        Args:
+            table_name (str): Имя таблицы
+            fingerprint (dict): Отпечаток источника (SourceFingerprint.to_dict)
+
+        Returns:
+            bool: True если операция успешна
+        """
+        metrics = {'skipped': True, 'reason': 'source_unchanged'}
+        if fingerprint:
+            metrics['fingerprint'] = fingerprint
+        if not self.mark_table_completed(table_name, metrics):
+            return False
+        logger.info(f"Таблица {table_name} пропущена: источник не изменился")
+        return True
+
     def get_migration_progress(self) -> Dict[str, Any]:
         """
         Получение информации о прогрессе миграции
@@ -355,8 +375,8 @@ class TableListManager:
             result = self._execute_query(update_query, (table_name,))
             
             if result:
-                console.print(f"[yellow]🔄 Повторная попытка для таблицы {table_name} инициирована[/yellow]")
-                logger.info(f"Повторная попытка для таблицы {table_name} инициирована")
+                logger.info(f"🔄 Повторная попытка для таблицы {table_name} инициирована",
+                            extra={'table_name': table_name, 'status': 'pending'})
                 return True
             else:
                 logger.warning(f"Таблица {table_name} не найдена или не в статусе 'failed'")
@@ -435,6 +455,8 @@ class TableListManager:
 
 # Примеры использования
 if __name__ == "__main__":
+    setup_logging(LOG_FILE)
+    
     # Инициализация ConnectionManager (task_id=2 по умолчанию)
     conn_manager = ConnectionManager()
     
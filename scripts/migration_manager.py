@@ -36,6 +36,8 @@ from rich import print as rprint
 sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "code"))
 
 from infrastructure.classes import ConnectionManager, ConnectionDiagnostics
+from infrastructure.classes.migration_metrics import migration_status_counts
+from migration.classes.source_fingerprint import STALE_TABLES_QUERY
 
 console = Console()
 
@@ -83,7 +85,13 @@ class MigrationManager:
     def list_tables(self, task_id=2, status='pending'):
         """Список таблиц для миграции"""
         try:
-            query = """
+            # Таблицы с метаданными stale переносятся повторно - как pending
+            stale_filter = ''
+            params = (task_id, status)
+            if status == 'pending':
+                stale_filter = f" OR (ms.current_status = 'completed' AND mt.object_name IN ({STALE_TABLES_QUERY}))"
+                params += (task_id,)
+            query = f"""
             SELECT 
                 mt.object_name,
                 mt.row_count,
@@ -93,11 +101,11 @@ class MigrationManager:
                 ms.current_status
             FROM mcl.mssql_tables mt
             JOIN mcl.migration_status ms ON mt.id = ms.source_table_id
-            WHERE mt.task_id = %s AND ms.current_status = %s
+            WHERE mt.task_id = %s AND (ms.current_status = %s{stale_filter})
             ORDER BY mt.object_name
             """
             
-            tables = self._execute_pg_query(query, (task_id, status))
+            tables = self._execute_pg_query(query, params)
             
             if not tables:
                 rprint(f"[yellow]⚠️ Таблицы со статусом '{status}' не найдены[/yellow]")
@@ -135,18 +143,7 @@ class MigrationManager:
     def get_migration_status(self, task_id=2):
         """Получение статуса миграции"""
         try:
-            query = """
-            SELECT 
-                ms.current_status,
-                COUNT(ms.id) as count
-            FROM mcl.migration_status ms
-            JOIN mcl.mssql_tables mt ON ms.source_table_id = mt.id
-            WHERE mt.task_id = %s
-            GROUP BY ms.current_status
-            ORDER BY ms.current_status
-            """
-            
-            status_summary = self._execute_pg_query(query, (task_id,))
+            status_summary = migration_status_counts(self.conn_mgr.get_postgres_connection(), task_id)
             
             if not status_summary:
                 rprint("[yellow]⚠️ Статус миграции не найден[/yellow]")
@@ -160,9 +157,7 @@ class MigrationManager:
             total_tables = 0
             status_dict = {}
             
-            for row in status_summary:
-                status = row[0]
-                count = row[1]
+            for status, count in status_summary.items():
                 total_tables += count
                 status_dict[status] = count
                 
@@ -301,8 +296,8 @@ class MigrationManager:
             rprint(f"[red]❌ Ошибка генерации отчета: {e}[/red]")
             return None
 
-def main():
-    """Основная функция"""
+def main(argv=None):
+    """Основная функция (argv - аргументы командной строки, по умолчанию sys.argv[1:])"""
     parser = argparse.ArgumentParser(description='FEMCL - Менеджер миграции таблиц')
     parser.add_argument('command', choices=['list', 'migrate', 'batch', 'status', 'validate', 'report'],
                        help='Команда для выполнения')
@@ -311,7 +306,7 @@ def main():
     parser.add_argument('--task-id', type=int, default=2, help='ID задачи миграции')
     parser.add_argument('--status', default='pending', help='Статус таблиц для фильтрации')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     try:
         # Инициализация ConnectionManager
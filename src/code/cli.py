@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FEMCL - Единая точка входа командной строки
+
+Использование:
+    femcl migrate <table_name> [options]   - Миграция таблицы (аргументы migrate_table.py)
+    femcl plan <table_name>                - Компиляция плана миграции без переноса данных
+    femcl validate <table_name>            - Валидация таблицы в PostgreSQL
+    femcl status                           - Статус миграции задачи
+    femcl monitor [--once] [--export FMT]  - Дашборд и отчеты мониторинга
+    femcl metadata [options]               - Генерация метаданных (аргументы generate_metadata.py)
+
+Модуль импортирует только стандартную библиотеку. Скрипт команды
+(а с ним psycopg2, pyodbc, rich и yaml) загружается после выбора
+команды, а скрипты разбирают аргументы до импорта классов миграции:
+--help и ошибки аргументов не загружают драйверы баз данных. Команда
+status читает статус сама и загружает только psycopg2.
+"""
+
+import argparse
+import importlib
+import sys
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Команды, передающие аргументы функции main(argv) скрипта без изменений
+PASSTHROUGH_COMMANDS = {
+    'migrate': ('src.code.migration.scripts.migrate_table',
+                'Миграция таблицы (аргументы migrate_table.py, см. femcl migrate --help)'),
+    'metadata': ('src.code.metadata.scripts.generate_metadata',
+                 'Генерация метаданных в схеме mcl (см. femcl metadata --help)'),
+}
+
+MIGRATION_MANAGER = 'scripts.migration_manager'
+MONITORING_REPORTER = 'scripts.migration.monitoring_reporter'
+
+
+def run_script(module_name: str, argv):
+    """Импорт скрипта проекта и вызов его main(argv)"""
+    root = str(PROJECT_ROOT)
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    return importlib.import_module(module_name).main(list(argv))
+
+
+def plan_command(args):
+    return run_script(PASSTHROUGH_COMMANDS['migrate'][0], [args.table_name, '--compile-plan'])
+
+
+def validate_command(args):
+    return run_script(MIGRATION_MANAGER, ['validate', '--table', args.table_name, '--task-id', str(args.task_id)])
+
+
+def status_command(args):
+    """
+    Статус миграции задачи.
+
+    Загружает только psycopg2 и запрос статуса: migration_manager
+    (rich, ConnectionManager с pyodbc) для этой команды не нужен.
+    """
+    from src.code.infrastructure.classes.connection_profile_loader import (
+        ConnectionProfileLoader, postgres_connection_params
+    )
+    from src.code.infrastructure.classes.migration_metrics import migration_status_counts
+
+    profile = ConnectionProfileLoader().get_profile_by_task_id(args.task_id)
+    if not profile:
+        print(f"❌ Профиль для task_id={args.task_id} не найден в connections.json")
+        return 1
+
+    import psycopg2
+
+    try:
+        connection = psycopg2.connect(**postgres_connection_params(profile['target']))
+        try:
+            counts = migration_status_counts(connection, args.task_id)
+        finally:
+            connection.close()
+    except psycopg2.Error as e:
+        print(f"❌ Ошибка получения статуса миграции: {e}")
+        return 1
+
+    if not counts:
+        print("⚠️ Статус миграции не найден")
+        return 0
+    print(f"📊 Статус миграции (задача ID={args.task_id})")
+    for status, count in counts.items():
+        print(f"   {status:<15} {count:>8}")
+    print(f"📊 Всего таблиц: {sum(counts.values())}")
+    return 0
+
+
+def monitor_command(args):
+    argv = ['--task-id', str(args.task_id)]
+    if args.once:
+        argv.append('--once')
+    if args.export:
+        argv.extend(['--export', args.export])
+    if args.html:
+        argv.append('--html')
+    return run_script(MONITORING_REPORTER, argv)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Парсер команд femcl"""
+    from src import __version__
+
+    parser = argparse.ArgumentParser(prog='femcl', description='FEMCL - Миграция MS SQL Server в PostgreSQL')
+    parser.add_argument('--version', action='version', version=f'femcl {__version__}')
+    commands = parser.add_subparsers(dest='command', metavar='<command>')
+
+    for name, (_, help_text) in PASSTHROUGH_COMMANDS.items():
+        commands.add_parser(name, help=help_text, add_help=False)
+
+    plan = commands.add_parser('plan', help='Компиляция плана миграции без переноса данных')
+    plan.add_argument('table_name', help='Имя таблицы')
+    plan.set_defaults(handler=plan_command)
+
+    validate = commands.add_parser('validate', help='Валидация таблицы в PostgreSQL')
+    validate.add_argument('table_name', help='Имя таблицы')
+    validate.add_argument('--task-id', type=int, default=2, help='ID задачи миграции')
+    validate.set_defaults(handler=validate_command)
+
+    status = commands.add_parser('status', help='Статус миграции задачи')
+    status.add_argument('--task-id', type=int, default=2, help='ID задачи миграции')
+    status.set_defaults(handler=status_command)
+
+    monitor = commands.add_parser('monitor', help='Живой дашборд, метрики и отчеты мониторинга')
+    monitor.add_argument('--task-id', type=int, default=2, help='ID задачи миграции')
+    monitor.add_argument('--once', action='store_true', help='Вывести текущие метрики без живого дашборда')
+    monitor.add_argument('--export', choices=['json', 'csv'], help='Экспорт отчета о прогрессе в reports/')
+    monitor.add_argument('--html', action='store_true', help='Сохранить HTML дашборд в reports/dashboard.html')
+    monitor.set_defaults(handler=monitor_command)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    """
+    Разбор команды и вызов ее обработчика.
+
+    Args:
+        argv: Аргументы командной строки (по умолчанию sys.argv[1:])
+
+    Returns:
+        int: Код завершения
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    # Аргументы migrate/metadata разбирает сам скрипт (включая --help)
+    if argv and argv[0] in PASSTHROUGH_COMMANDS:
+        return run_script(PASSTHROUGH_COMMANDS[argv[0]][0], argv[1:]) or 0
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, 'handler', None):
+        parser.print_help()
+        return 2
+    return args.handler(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
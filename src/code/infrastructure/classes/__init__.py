@@ -2,21 +2,60 @@
 Infrastructure classes for FEMCL migration system.
 
 Классы инфраструктуры для системы миграции FEMCL.
+
+Классы загружаются при первом обращении (PEP 562): импорт пакета не
+загружает pyodbc, psycopg2 и pyarrow, пока не запрошен использующий их класс.
 """
 
-from .connection_profile_loader import ConnectionProfileLoader
-from .connection_manager import ConnectionManager
-from .connection_diagnostics import ConnectionDiagnostics
-from .migration_metrics import MigrationMetrics
-from .function_mapping_model import FunctionMappingModel
-from .function_mapping_state import FunctionMappingState
-
-__all__ = [
-    'ConnectionProfileLoader',
-    'ConnectionManager',
-    'ConnectionDiagnostics',
-    'MigrationMetrics',
-    'FunctionMappingModel',
-    'FunctionMappingState',
-]
+import importlib
+
+# Имя -> модуль пакета, в котором оно определено
+_EXPORTS = {
+    'ConnectionProfileLoader': 'connection_profile_loader',
+    'ConnectionManager': 'connection_manager',
+    'ConnectionDiagnostics': 'connection_diagnostics',
+    'MigrationMetrics': 'migration_metrics',
+    'FunctionMappingModel': 'function_mapping_model',
+    'FunctionMappingState': 'function_mapping_state',
+    'FunctionMappingRuleCache': 'function_mapping_cache',
+    'get_rule_cache': 'function_mapping_cache',
+    'TSqlExpressionTranslator': 'tsql_expression_translator',
+    'TranslationResult': 'tsql_expression_translator',
+    'get_tsql_translator': 'tsql_expression_translator',
+    'MigrationTracer': 'migration_tracer',
+    'TraceSpan': 'migration_tracer',
+    'BatchMetrics': 'batch_metrics',
+    'LatencyHistogram': 'batch_metrics',
+    'BatchSizeController': 'batch_size_controller',
+    'estimate_row_width': 'batch_size_controller',
+    'TokenBucket': 'source_throttle',
+    'SourceGovernor': 'source_throttle',
+    'get_source_governor': 'source_throttle',
+    'MigrationProfiler': 'migration_profiler',
+    'LoggingPipeline': 'migration_logging',
+    'JsonFormatter': 'migration_logging',
+    'RateLimitFilter': 'migration_logging',
+    'setup_logging': 'migration_logging',
+    'shutdown_logging': 'migration_logging',
+    'SourceReader': 'source_reader',
+    'SourceBatch': 'source_reader',
+    'PyodbcSourceReader': 'source_reader',
+    'BcpFileSourceReader': 'source_reader',
+    'ParquetSourceReader': 'source_reader',
+    'create_source_reader': 'source_reader',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
 
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
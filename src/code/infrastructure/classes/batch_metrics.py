@@ -0,0 +1,226 @@
+"""
+BatchMetrics - Инструментирование пакетного переноса данных.
+
+Легковесные измерения для каждого пакета в цикле переноса: время
+выборки (fetch), преобразования (transform) и записи (write) по
+монотонным часам, размер пакета в строках и байтах. Время
+накапливается в гистограммах с фиксированными корзинами в памяти
+и сводится в p50/p95/p99 по завершении таблицы.
+
+Запись одного значения - это bisect по ~40 границам и два сложения,
+поэтому инструментирование включено всегда.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+
+def _default_bounds_ns() -> List[int]:
+    """Границы корзин: от 10 мкс до ~160 с, шаг x1.5 (~40 корзин)"""
+    bounds = []
+    value = 10_000.0
+    while value < 200_000_000_000:
+        bounds.append(int(value))
+        value *= 1.5
+    return bounds
+
+
+DEFAULT_BOUNDS_NS = _default_bounds_ns()
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек с фиксированными корзинами.
+
+    Хранит только счетчики по корзинам, поэтому объем памяти не
+    зависит от количества записанных значений. Перцентили
+    вычисляются с линейной интерполяцией внутри корзины.
+
+    Example:
+        >>> histogram = LatencyHistogram()
+        >>> histogram.record(1_500_000)
+        >>> histogram.percentile(99)
+    """
+
+    def __init__(self, bounds_ns: Optional[List[int]] = None):
+        """
+        Инициализация гистограммы.
+
+        Args:
+            bounds_ns: Верхние границы корзин в наносекундах (по возрастанию)
+        """
+        self.bounds_ns = bounds_ns or DEFAULT_BOUNDS_NS
+        # Последняя корзина - переполнение (больше последней границы)
+        self.counts = [0] * (len(self.bounds_ns) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns: Optional[int] = None
+        self.max_ns: Optional[int] = None
+
+    def record(self, value_ns: int) -> None:
+        """Запись одного значения в наносекундах"""
+        self.counts[bisect_left(self.bounds_ns, value_ns)] += 1
+        self.count += 1
+        self.total_ns += value_ns
+        if self.min_ns is None or value_ns < self.min_ns:
+            self.min_ns = value_ns
+        if self.max_ns is None or value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def percentile(self, percent: float) -> float:
+        """
+        Оценка перцентиля.
+
+        Args:
+            percent: Перцентиль (0-100)
+
+        Returns:
+            float: Значение в наносекундах (0 если значений нет)
+        """
+        if self.count == 0:
+            return 0.0
+
+        rank = percent / 100.0 * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count == 0:
+                continue
+            if cumulative + bucket_count >= rank:
+                lower = self.bounds_ns[index - 1] if index > 0 else 0
+                upper = self.bounds_ns[index] if index < len(self.bounds_ns) else self.max_ns
+                # Ограничиваем корзину фактическими min/max
+                lower = max(lower, self.min_ns)
+                upper = min(upper, self.max_ns)
+                fraction = (rank - cumulative) / bucket_count
+                return lower + (upper - lower) * fraction
+            cumulative += bucket_count
+        return float(self.max_ns)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Сводка гистограммы в миллисекундах.
+
+        Returns:
+            Dict: count, total_ms, mean_ms, min_ms, max_ms, p50_ms, p95_ms, p99_ms
+        """
+        if self.count == 0:
+            return {'count': 0, 'total_ms': 0.0}
+
+        def to_ms(value_ns: float) -> float:
+            return round(value_ns / 1_000_000, 3)
+
+        return {
+            'count': self.count,
+            'total_ms': to_ms(self.total_ns),
+            'mean_ms': to_ms(self.total_ns / self.count),
+            'min_ms': to_ms(self.min_ns),
+            'max_ms': to_ms(self.max_ns),
+            'p50_ms': to_ms(self.percentile(50)),
+            'p95_ms': to_ms(self.percentile(95)),
+            'p99_ms': to_ms(self.percentile(99))
+        }
+
+
+class BatchMetrics:
+    """
+    Метрики пакетного переноса одной таблицы.
+
+    Стадии пакета: 'fetch' (fetchmany), 'transform' (преобразование
+    строк), 'write' (executemany/COPY). Для каждой стадии ведется
+    отдельная гистограмма.
+
+    Example:
+        >>> metrics = BatchMetrics('accnt')
+        >>> started = metrics.clock()
+        >>> rows = cursor.fetchmany(1000)
+        >>> metrics.observe('fetch', started)
+        >>> metrics.add_batch(len(rows), payload_bytes)
+        >>> metrics.summary()
+    """
+
+    STAGES = ('fetch', 'transform', 'write')
+
+    def __init__(self, table_name: str):
+        """
+        Инициализация BatchMetrics.
+
+        Args:
+            table_name: Имя таблицы
+        """
+        self.table_name = table_name
+        self.histograms: Dict[str, LatencyHistogram] = {
+            stage: LatencyHistogram() for stage in self.STAGES
+        }
+        self.batches = 0
+        self.total_rows = 0
+        self.total_bytes = 0
+        self.min_batch_rows: Optional[int] = None
+        self.max_batch_rows = 0
+        self.max_batch_bytes = 0
+
+    # Монотонные часы для замеров стадий
+    clock = staticmethod(time.perf_counter_ns)
+
+    def observe(self, stage: str, started_ns: int) -> int:
+        """
+        Запись длительности стадии, начатой в started_ns.
+
+        Args:
+            stage: Имя стадии ('fetch', 'transform', 'write')
+            started_ns: Значение clock() в начале стадии
+
+        Returns:
+            int: Длительность стадии, нс
+        """
+        elapsed = time.perf_counter_ns() - started_ns
+        self.histograms[stage].record(elapsed)
+        return elapsed
+
+    def add_batch(self, rows: int, payload_bytes: int) -> None:
+        """Учет размера пакета"""
+        self.batches += 1
+        self.total_rows += rows
+        self.total_bytes += payload_bytes
+        if self.min_batch_rows is None or rows < self.min_batch_rows:
+            self.min_batch_rows = rows
+        if rows > self.max_batch_rows:
+            self.max_batch_rows = rows
+        if payload_bytes > self.max_batch_bytes:
+            self.max_batch_bytes = payload_bytes
+
+    def stage_total_ns(self, stage: str) -> int:
+        """Суммарное время стадии, нс"""
+        return self.histograms[stage].total_ns
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Сводка метрик по завершении таблицы.
+
+        Returns:
+            Dict: Размеры пакетов и сводки гистограмм по стадиям
+        """
+        return {
+            'table_name': self.table_name,
+            'batches': self.batches,
+            'rows': self.total_rows,
+            'bytes': self.total_bytes,
+            'avg_batch_rows': round(self.total_rows / self.batches, 1) if self.batches else 0,
+            'min_batch_rows': self.min_batch_rows or 0,
+            'max_batch_rows': self.max_batch_rows,
+            'max_batch_bytes': self.max_batch_bytes,
+            'stages': {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+        }
+
+    def format_summary(self) -> str:
+        """Краткая текстовая сводка для вывода в консоль"""
+        lines = [f"📦 Пакетов: {self.batches}, строк: {self.total_rows}, байт: {self.total_bytes}"]
+        for stage, histogram in self.histograms.items():
+            stats = histogram.summary()
+            if stats['count']:
+                lines.append(
+                    f"   {stage}: p50={stats['p50_ms']:.2f} мс, "
+                    f"p95={stats['p95_ms']:.2f} мс, p99={stats['p99_ms']:.2f} мс, "
+                    f"всего={stats['total_ms']:.1f} мс"
+                )
+        return "\n".join(lines)
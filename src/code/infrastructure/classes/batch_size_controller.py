@@ -0,0 +1,217 @@
+"""
+BatchSizeController - Адаптивный размер пакета переноса данных.
+
+Начальный размер пакета выбирается по оценке ширины строки из
+метаданных колонок (ColumnModel), затем подстраивается по измеренной
+задержке и объему каждого пакета (AIMD):
+
+    - пакет уложился в целевую задержку и бюджет байт - размер
+      увеличивается на постоянный шаг (аддитивное увеличение);
+    - превышена задержка или бюджет байт - размер умножается на
+      коэффициент уменьшения (мультипликативное уменьшение).
+
+Решения контроллера пишутся в лог и сохраняются для последующей
+настройки параметров.
+"""
+
+import logging
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+# Оценка ширины значений по типу PostgreSQL, байт
+FIXED_TYPE_WIDTHS = {
+    'boolean': 1, 'smallint': 2, 'integer': 4, 'int': 4, 'bigint': 8, 'real': 4,
+    'double precision': 8, 'money': 8, 'date': 4, 'time': 8, 'timestamp': 8,
+    'timestamp without time zone': 8, 'timestamp with time zone': 8, 'timestamptz': 8,
+    'interval': 16, 'uuid': 16,
+}
+
+# Оценка для колонок без ограничения длины (text, bytea, varchar(max), xml)
+LOB_WIDTH_ESTIMATE = 16 * 1024
+LOB_TYPES = {'text', 'bytea', 'xml', 'json', 'jsonb'}
+
+
+def estimate_column_width(data_type: Optional[str], max_length: Optional[int] = None,
+                          precision: Optional[int] = None) -> int:
+    """
+    Оценка ширины значения колонки в байтах.
+
+    Args:
+        data_type: Тип PostgreSQL (например 'varchar(50)', 'numeric(10,2)')
+        max_length: Длина из метаданных (-1 или None для max)
+        precision: Точность числового типа
+    """
+    if not data_type:
+        return 8
+    base = data_type.split('(')[0].strip().lower()
+    if base in FIXED_TYPE_WIDTHS:
+        return FIXED_TYPE_WIDTHS[base]
+    if base in ('numeric', 'decimal'):
+        return 8 + (precision or 18) // 2
+    if base in LOB_TYPES:
+        return LOB_WIDTH_ESTIMATE
+    if base in ('varchar', 'character varying', 'char', 'character', 'bpchar'):
+        if max_length is None and '(' in data_type:
+            try:
+                max_length = int(data_type.split('(')[1].rstrip(')').split(',')[0])
+            except ValueError:
+                max_length = None
+        if max_length is None or max_length < 0:
+            return LOB_WIDTH_ESTIMATE
+        # Строки в среднем заполнены наполовину
+        return max(1, max_length // 2)
+    return 8
+
+
+def estimate_row_width(columns: Iterable[Any]) -> int:
+    """
+    Оценка ширины строки по метаданным колонок (ColumnModel).
+
+    Returns:
+        int: Ширина строки в байтах (не меньше 1)
+    """
+    width = 0
+    for column in columns:
+        width += estimate_column_width(
+            getattr(column, 'data_type', None),
+            getattr(column, 'data_type_max_length', None),
+            getattr(column, 'data_type_precision', None)
+        )
+    return max(1, width)
+
+
+class BatchSizeController:
+    """
+    AIMD-контроллер размера пакета.
+
+    Экземпляр вызываемый: читатели источника запрашивают размер
+    очередного пакета вызовом controller().
+
+    Example:
+        >>> controller = BatchSizeController.for_row_width(estimate_row_width(columns))
+        >>> for batch in reader.read_batches('accnt', batch_size=controller):
+        ...     started = time.perf_counter_ns()
+        ...     write(batch.rows)
+        ...     controller.observe(len(batch), time.perf_counter_ns() - started, payload_bytes)
+    """
+
+    def __init__(self, initial_size: int, min_size: int = 100, max_size: int = 50000,
+                 target_latency_ms: float = 500.0, max_batch_bytes: int = 32 * 1024 * 1024,
+                 increase_step: Optional[int] = None, decrease_factor: float = 0.5,
+                 table_name: Optional[str] = None, history_size: int = 1000):
+        """
+        Инициализация контроллера.
+
+        Args:
+            initial_size: Начальный размер пакета в строках
+            min_size: Минимальный размер пакета
+            max_size: Максимальный размер пакета
+            target_latency_ms: Целевая задержка обработки пакета
+            max_batch_bytes: Бюджет объема пакета в байтах
+            increase_step: Шаг аддитивного увеличения (по умолчанию 10% начального размера)
+            decrease_factor: Коэффициент мультипликативного уменьшения (0 < f < 1)
+            table_name: Имя таблицы для лога решений
+            history_size: Количество сохраняемых решений
+        """
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.size = min(self.max_size, max(self.min_size, initial_size))
+        self.initial_size = self.size
+        self.target_latency_ns = int(target_latency_ms * 1_000_000)
+        self.max_batch_bytes = max_batch_bytes
+        self.increase_step = increase_step or max(1, self.size // 10)
+        self.decrease_factor = decrease_factor
+        self.table_name = table_name
+        self.decisions: deque = deque(maxlen=history_size)
+        self.increases = 0
+        self.decreases = 0
+
+    @classmethod
+    def for_row_width(cls, row_width: int, **options) -> 'BatchSizeController':
+        """
+        Контроллер с начальным размером по ширине строки: четверть бюджета байт,
+        чтобы первые пакеты гарантированно уложились в бюджет.
+        """
+        max_batch_bytes = options.get('max_batch_bytes', 32 * 1024 * 1024)
+        initial_size = max(1, max_batch_bytes // 4 // max(1, row_width))
+        return cls(initial_size, **options)
+
+    @classmethod
+    def from_config(cls, config_loader, row_width: int,
+                    table_name: Optional[str] = None) -> 'BatchSizeController':
+        """Контроллер по секции migration.adaptive_batch из config.yaml"""
+        settings = config_loader.get_config_value('migration.adaptive_batch', {}) or {}
+        return cls.for_row_width(
+            row_width,
+            min_size=settings.get('min_size', 100),
+            max_size=settings.get('max_size', 50000),
+            target_latency_ms=settings.get('target_latency_ms', 500),
+            max_batch_bytes=int(settings.get('max_batch_mb', 32) * 1024 * 1024),
+            table_name=table_name
+        )
+
+    def __call__(self) -> int:
+        return self.size
+
+    def observe(self, rows: int, latency_ns: int, payload_bytes: int) -> int:
+        """
+        Учет измерений пакета и выбор размера следующего.
+
+        Args:
+            rows: Строк в пакете
+            latency_ns: Задержка обработки пакета (выборка + запись)
+            payload_bytes: Объем пакета
+
+        Returns:
+            int: Размер следующего пакета
+        """
+        previous = self.size
+        if rows <= 0:
+            return self.size
+
+        if latency_ns > self.target_latency_ns or payload_bytes > self.max_batch_bytes:
+            reason = 'latency' if latency_ns > self.target_latency_ns else 'bytes'
+            # Не больше, чем помещается в бюджет байт при измеренной ширине строки
+            by_bytes = self.max_batch_bytes * rows // max(1, payload_bytes)
+            self.size = max(self.min_size, min(int(previous * self.decrease_factor), by_bytes))
+            self.decreases += 1
+        elif rows >= previous:
+            reason = 'increase'
+            self.size = min(self.max_size, previous + self.increase_step)
+            if self.size != previous:
+                self.increases += 1
+        else:
+            # Неполный (последний) пакет не дает информации о пределе
+            reason = 'hold'
+
+        decision = {
+            'rows': rows,
+            'latency_ms': round(latency_ns / 1_000_000, 3),
+            'bytes': payload_bytes,
+            'size': previous,
+            'next_size': self.size,
+            'reason': reason,
+        }
+        self.decisions.append(decision)
+        if self.size != previous:
+            logger.debug(f"Пакет {self.table_name or ''}: {previous} -> {self.size} ({reason}, "
+                         f"{decision['latency_ms']} мс, {payload_bytes} байт)")
+        return self.size
+
+    def summary(self) -> Dict[str, Any]:
+        """Сводка решений контроллера"""
+        sizes: List[int] = [d['size'] for d in self.decisions]
+        return {
+            'initial_size': self.initial_size,
+            'final_size': self.size,
+            'min_observed': min(sizes) if sizes else self.size,
+            'max_observed': max(sizes) if sizes else self.size,
+            'increases': self.increases,
+            'decreases': self.decreases,
+            'target_latency_ms': self.target_latency_ns / 1_000_000,
+            'max_batch_bytes': self.max_batch_bytes,
+        }
@@ -12,7 +12,7 @@ from typing import Optional, Dict, Any
 import pyodbc
 import psycopg2
 
-from .connection_profile_loader import ConnectionProfileLoader
+from .connection_profile_loader import ConnectionProfileLoader, postgres_connection_params
 
 
 logger = logging.getLogger(__name__)
@@ -201,22 +201,7 @@ class ConnectionManager:
         target = self.current_profile['target']
         
         try:
-            connection_params = {
-                'host': target['host'],
-                'port': target['port'],
-                'dbname': target['database'],
-                'user': target['user'],
-                'password': target['password']
-            }
-            
-            # Добавляем опции если есть
-            if 'options' in target:
-                if 'connect_timeout' in target['options']:
-                    connection_params['connect_timeout'] = int(target['options']['connect_timeout'])
-            
-            # Добавляем SSL если указан
-            if 'ssl' in target:
-                connection_params['sslmode'] = target['ssl']
+            connection_params = postgres_connection_params(target)
             
             self.logger.info(
                 f"Подключение к PostgreSQL: "
@@ -3,17 +3,238 @@ ConnectionProfileLoader класс для загрузки профилей по
 
 Этот класс отвечает за чтение, загрузку и управление профилями подключений
 из файла connections.json для работы в режиме ЭКСПЛУАТАЦИИ.
+
+Разобранный connections.json хранится в ConnectionProfileStore, общем для
+всех загрузчиков процесса: файл перечитывается только при изменении mtime
+(проверка stat не чаще CHECK_INTERVAL секунд). Отметки last_used копятся
+в памяти и записываются редко - не чаще FLUSH_INTERVAL секунд и при выходе
+из процесса - через временный файл и os.replace, поэтому параллельные
+рабочие потоки не читают и не переписывают файл конфигурации.
 """
 
+import atexit
+import copy
 import json
 import os
-from typing import Dict, List, Optional, Any
+import stat
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_CONNECTIONS_PATH = Path(__file__).parent.parent / "config" / "connections.json"
+
+
+def postgres_connection_params(target: Dict[str, Any]) -> Dict[str, Any]:
+    """Параметры psycopg2.connect по секции target профиля"""
+    connection_params = {
+        'host': target['host'],
+        'port': target['port'],
+        'dbname': target['database'],
+        'user': target['user'],
+        'password': target['password']
+    }
+    # Добавляем опции если есть
+    if 'options' in target:
+        if 'connect_timeout' in target['options']:
+            connection_params['connect_timeout'] = int(target['options']['connect_timeout'])
+    # Добавляем SSL если указан
+    if 'ssl' in target:
+        connection_params['sslmode'] = target['ssl']
+    return connection_params
+
+
+def write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    """Запись JSON во временный файл рядом с path и замена path через os.replace"""
+    fd, temp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            os.chmod(temp_path, stat.S_IMODE(path.stat().st_mode))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+class ConnectionProfileStore:
+    """
+    Кэш connections.json на процесс.
+
+    Example:
+        >>> store = get_profile_store(path)
+        >>> data = store.get_data()           # stat не чаще CHECK_INTERVAL, чтение при смене mtime
+        >>> store.touch('default')            # last_used - только в памяти
+        >>> store.flush()                     # атомарная запись отложенных last_used
+    """
+
+    # Интервал проверки mtime файла, секунд
+    CHECK_INTERVAL = 2.0
+    # Минимальный интервал между записями last_used, секунд
+    FLUSH_INTERVAL = 300.0
+
+    def __init__(self, path: Path, clock: Callable[[], float] = time.monotonic):
+        """
+        Инициализация ConnectionProfileStore.
+
+        Args:
+            path: Путь к connections.json
+            clock: Источник времени для интервалов проверки и записи
+        """
+        self.path = Path(path)
+        self.clock = clock
+        self.loads = 0
+        self.flushes = 0
+        self._data: Optional[Dict[str, Any]] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._checked = False
+        self._last_check = 0.0
+        self._last_flush = clock()
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.RLock()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def refresh(self, force: bool = False) -> None:
+        """Перечитать файл, если изменились mtime или размер"""
+        with self._lock:
+            now = self.clock()
+            if not force and self._checked and now - self._last_check < self.CHECK_INTERVAL:
+                return
+            self._last_check = now
+            signature = self._stat()
+            if self._checked and signature == self._signature:
+                return
+            self._checked = True
+            self._signature = signature
+            self._data = self._read() if signature is not None else None
+            if signature is None:
+                logger.warning(
+                    f"Файл {self.path} не найден. "
+                    "Создайте connections.json из connections.example.json"
+                )
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.loads += 1
+            logger.info(f"Профили загружены из {self.path}")
+            return data
+        except json.JSONDecodeError as e:
+            logger.error(f"Ошибка парсинга JSON в {self.path}: {e}")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки профилей: {e}")
+        return None
+
+    def get_data(self) -> Optional[Dict[str, Any]]:
+        """Разобранный connections.json (None - файл отсутствует или поврежден)"""
+        self.refresh()
+        return self._data
+
+    def last_used(self, profile_id: str) -> Optional[str]:
+        """Отметка last_used с учетом еще не записанных обновлений"""
+        with self._lock:
+            if profile_id in self._pending:
+                return self._pending[profile_id]
+            for profile in (self._data or {}).get('profiles', []):
+                if profile.get('profile_id') == profile_id:
+                    return profile.get('last_used')
+        return None
+
+    def touch(self, profile_id: str) -> None:
+        """Отметить использование профиля (запись в файл - не чаще FLUSH_INTERVAL)"""
+        with self._lock:
+            self._pending[profile_id] = datetime.now().isoformat()
+            due = self.clock() - self._last_flush >= self.FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        Записать отложенные last_used.
+
+        Перед записью файл перечитывается, если его изменили, чтобы не
+        затереть правки других процессов.
+
+        Returns:
+            bool: Файл был записан
+        """
+        with self._lock:
+            self._last_flush = self.clock()
+            if not self._pending:
+                return False
+            try:
+                self.refresh(force=True)
+                if self._data is None:
+                    return False
+                data = copy.deepcopy(self._data)
+                for profile in data.get('profiles', []):
+                    if profile.get('profile_id') in self._pending:
+                        profile['last_used'] = self._pending[profile.get('profile_id')]
+                write_json_atomic(self.path, data)
+            except Exception as e:
+                logger.warning(f"Не удалось записать last_used в {self.path}: {e}")
+                return False
+            self._data = data
+            self._signature = self._stat()
+            self._pending.clear()
+            self.flushes += 1
+            return True
+
+
+_profile_stores: Dict[str, ConnectionProfileStore] = {}
+_profile_stores_lock = threading.Lock()
+
+
+def get_profile_store(path: Optional[Path] = None) -> ConnectionProfileStore:
+    """
+    Общий кэш connections.json на процесс.
+
+    Args:
+        path: Путь к connections.json (по умолчанию - стандартное расположение)
+    """
+    key = os.path.realpath(str(path or DEFAULT_CONNECTIONS_PATH))
+    store = _profile_stores.get(key)
+    if store is None:
+        with _profile_stores_lock:
+            store = _profile_stores.setdefault(key, ConnectionProfileStore(Path(key)))
+    return store
+
+
+def flush_profile_stores() -> None:
+    """Записать отложенные last_used всех кэшей процесса"""
+    for store in list(_profile_stores.values()):
+        store.flush()
+
+
+def reset_profile_stores() -> None:
+    """Запись отложенных last_used и сброс кэшей процесса"""
+    with _profile_stores_lock:
+        stores = list(_profile_stores.values())
+        _profile_stores.clear()
+    for store in stores:
+        store.flush()
+
+
+atexit.register(flush_profile_stores)
+
+
 class ConnectionProfileLoader:
     """
     Класс для загрузки и управления профилями подключений к БД.
@@ -21,48 +242,41 @@ class ConnectionProfileLoader:
     Работает с файлом connections.json для режима ЭКСПЛУАТАЦИИ.
     """
     
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(self, config_path: Optional[str] = None,
+                 store: Optional[ConnectionProfileStore] = None):
         """
         Инициализация ConnectionProfileLoader.
         
         Args:
             config_path: Путь к файлу connections.json. 
                         Если не указан, использует стандартное расположение.
+            store: Кэш профилей (по умолчанию - общий кэш процесса для config_path)
         """
         self.logger = logging.getLogger(__name__)
         
-        if config_path is None:
+        if store is not None:
+            self.config_path = store.path
+        elif config_path is None:
             # Стандартный путь к конфигурации
-            base_path = Path(__file__).parent.parent / "config"
-            self.config_path = base_path / "connections.json"
+            self.config_path = DEFAULT_CONNECTIONS_PATH
         else:
             self.config_path = Path(config_path)
         
-        self.profiles_data = None
+        self.store = store or get_profile_store(self.config_path)
         self._load_profiles()
     
+    @property
+    def profiles_data(self) -> Optional[Dict[str, Any]]:
+        """Содержимое connections.json из общего кэша"""
+        return self.store.get_data()
+    
     def _load_profiles(self) -> None:
-        """Загрузить profiles из connections.json."""
-        try:
-            if not self.config_path.exists():
-                self.logger.warning(
-                    f"Файл {self.config_path} не найден. "
-                    "Создайте connections.json из connections.example.json"
-                )
-                self.profiles_data = None
-                return
-            
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                self.profiles_data = json.load(f)
-            
-            self.logger.info(f"Профили загружены из {self.config_path}")
-            
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Ошибка парсинга JSON в {self.config_path}: {e}")
-            self.profiles_data = None
-        except Exception as e:
-            self.logger.error(f"Ошибка загрузки профилей: {e}")
-            self.profiles_data = None
+        """Загрузить profiles из connections.json (повторно - только при изменении файла)."""
+        self.store.refresh()
+    
+    def flush(self) -> bool:
+        """Записать отложенные отметки last_used в connections.json."""
+        return self.store.flush()
     
     def list_profiles(self) -> List[Dict[str, Any]]:
         """
@@ -71,11 +285,12 @@ class ConnectionProfileLoader:
         Returns:
             Список словарей с информацией о профилях
         """
-        if self.profiles_data is None:
+        data = self.profiles_data
+        if data is None:
             self.logger.warning("Профили не загружены")
             return []
         
-        profiles = self.profiles_data.get('profiles', [])
+        profiles = data.get('profiles', [])
         
         # Возвращаем краткую информацию о профилях
         return [
@@ -85,7 +300,7 @@ class ConnectionProfileLoader:
                 'task_id': p.get('task_id'),
                 'description': p.get('description'),
                 'active': p.get('active', True),
-                'last_used': p.get('last_used')
+                'last_used': self.store.last_used(p.get('profile_id'))
             }
             for p in profiles
         ]
@@ -100,11 +315,12 @@ class ConnectionProfileLoader:
         Returns:
             Словарь с полными данными профиля или None
         """
-        if self.profiles_data is None:
+        data = self.profiles_data
+        if data is None:
             self.logger.error("Профили не загружены")
             return None
         
-        profiles = self.profiles_data.get('profiles', [])
+        profiles = data.get('profiles', [])
         
         for profile in profiles:
             if profile.get('profile_id') == profile_id:
@@ -113,13 +329,14 @@ class ConnectionProfileLoader:
                 # Обновляем last_used
                 self._update_last_used(profile_id)
                 
+                # Копии source/target: изменения вызывающего кода не попадают в общий кэш
                 return {
                     'profile_id': profile.get('profile_id'),
                     'name': profile.get('name'),
                     'task_id': profile.get('task_id'),
                     'description': profile.get('description'),
-                    'source': profile.get('source'),
-                    'target': profile.get('target'),
+                    'source': copy.deepcopy(profile.get('source')),
+                    'target': copy.deepcopy(profile.get('target')),
                     'active': profile.get('active', True)
                 }
         
@@ -133,10 +350,11 @@ class ConnectionProfileLoader:
         Returns:
             Словарь с данными профиля по умолчанию или None
         """
-        if self.profiles_data is None:
+        data = self.profiles_data
+        if data is None:
             return None
         
-        default_profile_id = self.profiles_data.get('default_profile')
+        default_profile_id = data.get('default_profile')
         
         if default_profile_id:
             return self.load_profile(default_profile_id)
@@ -151,26 +369,8 @@ class ConnectionProfileLoader:
         return None
     
     def _update_last_used(self, profile_id: str) -> None:
-        """Обновить last_used для профиля."""
-        from datetime import datetime
-        
-        try:
-            if self.profiles_data is None:
-                return
-            
-            profiles = self.profiles_data.get('profiles', [])
-            
-            for profile in profiles:
-                if profile.get('profile_id') == profile_id:
-                    profile['last_used'] = datetime.now().isoformat()
-                    break
-            
-            # Сохраняем обновленные данные
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.profiles_data, f, indent=2, ensure_ascii=False)
-            
-        except Exception as e:
-            self.logger.warning(f"Не удалось обновить last_used для профиля '{profile_id}': {e}")
+        """Обновить last_used для профиля (в памяти; запись в файл - ConnectionProfileStore.flush)."""
+        self.store.touch(profile_id)
     
     def get_profile_by_task_id(self, task_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -182,10 +382,11 @@ class ConnectionProfileLoader:
         Returns:
             Словарь с данными профиля или None
         """
-        if self.profiles_data is None:
+        data = self.profiles_data
+        if data is None:
             return None
         
-        profiles = self.profiles_data.get('profiles', [])
+        profiles = data.get('profiles', [])
         
         for profile in profiles:
             if profile.get('task_id') == task_id:
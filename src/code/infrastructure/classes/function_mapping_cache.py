@@ -0,0 +1,249 @@
+"""
+FunctionMappingRuleCache - Кэш правил маппинга функций на процесс.
+
+Все активные правила mcl.function_mapping_rules загружаются одним
+запросом, шаблоны mapping_pattern компилируются один раз. Кэш
+инвалидируется по водяному знаку (max(updated_at), count(*)), который
+проверяется не чаще check_interval секунд. Результаты применения
+правил к выражениям запоминаются по хэшу выражения.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .function_mapping_model import FunctionMappingModel
+
+
+logger = logging.getLogger(__name__)
+
+
+RULES_QUERY = """
+    SELECT id, source_function, target_function, mapping_pattern, replacement_pattern,
+           mapping_type, is_active, updated_at
+    FROM mcl.function_mapping_rules
+    WHERE is_active = true
+    ORDER BY id
+"""
+
+WATERMARK_QUERY = """
+    SELECT max(updated_at), count(*)
+    FROM mcl.function_mapping_rules
+    WHERE is_active = true
+"""
+
+
+class FunctionMappingRuleCache:
+    """
+    Кэш правил маппинга функций.
+
+    Example:
+        >>> cache = get_rule_cache(config_loader)
+        >>> rule = cache.get_rule('getdate')
+        >>> cache.apply('getdate()', rule)
+        'now()'
+    """
+
+    # Предел запомненных переводов; при переполнении память очищается целиком
+    MAX_TRANSLATIONS = 100_000
+
+    def __init__(self, connection_factory: Optional[Callable[[], Any]] = None,
+                 check_interval: float = 30.0):
+        """
+        Инициализация FunctionMappingRuleCache.
+
+        Args:
+            connection_factory: Функция создания подключения к PostgreSQL
+            check_interval: Интервал проверки водяного знака, секунд
+        """
+        self.connection_factory = connection_factory
+        self.check_interval = check_interval
+        self.rules: Dict[str, FunctionMappingModel] = {}
+        self.watermark: Optional[Tuple[Any, int]] = None
+        self.loaded = False
+        self.loads = 0
+        self._last_check = 0.0
+        self._translations: Dict[str, str] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls, config_loader) -> 'FunctionMappingRuleCache':
+        """Создание кэша по конфигурации database.postgres"""
+        postgres_config = config_loader.get_database_config('postgres')
+        check_interval = config_loader.get_config_value('migration.function_rules_check_interval')
+
+        def connect():
+            import psycopg2
+
+            return psycopg2.connect(
+                host=postgres_config['host'],
+                port=postgres_config['port'],
+                dbname=postgres_config['database'],
+                user=postgres_config['user'],
+                password=postgres_config['password']
+            )
+
+        return cls(connect, check_interval if check_interval is not None else 30.0)
+
+    @staticmethod
+    def build_rule(row: tuple) -> FunctionMappingModel:
+        """Модель правила из строки RULES_QUERY с предкомпилированным шаблоном"""
+        rule_id, source, target, pattern, replacement, mapping_type, is_active, updated_at = row
+        rule = FunctionMappingModel(
+            source_function=source,
+            target_function=target,
+            mapping_type=mapping_type,
+            is_automatic=is_active
+        )
+        rule.id = rule_id
+        rule.mapping_pattern = pattern or ""
+        rule.replacement_pattern = replacement or ""
+        rule.updated_at = updated_at
+        rule.compile_pattern()
+        return rule
+
+    def load_rules(self, rows, watermark: Optional[Tuple[Any, int]] = None) -> None:
+        """
+        Замена содержимого кэша загруженными строками правил.
+
+        Args:
+            rows: Строки RULES_QUERY
+            watermark: Водяной знак загруженного набора
+        """
+        rules = {}
+        for row in rows:
+            try:
+                rule = self.build_rule(row)
+            except re.error as e:
+                logger.warning(f"Некорректный mapping_pattern у правила {row[1]}: {e}")
+                continue
+            # При нескольких правилах для функции действует правило с меньшим id
+            rules.setdefault(rule.source_function.lower(), rule)
+
+        with self._lock:
+            self.rules = rules
+            self.watermark = watermark
+            self._translations = {}
+            self.loaded = True
+            self.loads += 1
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Проверка водяного знака и перезагрузка правил при изменении.
+
+        Проверка выполняется не чаще check_interval секунд. Ошибка
+        подключения не сбрасывает уже загруженные правила.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and self.loaded and now - self._last_check < self.check_interval:
+                return
+            if not force and not self.loaded and self._last_check and now - self._last_check < self.check_interval:
+                # Предыдущая загрузка не удалась - не повторяем ее на каждое выражение
+                return
+            self._last_check = now
+
+            if self.connection_factory is None:
+                return
+
+            try:
+                conn = self.connection_factory()
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute(WATERMARK_QUERY)
+                    max_updated_at, count = cursor.fetchone()
+                    watermark = (max_updated_at, count)
+                    if force or not self.loaded or watermark != self.watermark:
+                        cursor.execute(RULES_QUERY)
+                        self.load_rules(cursor.fetchall(), watermark)
+                        logger.info(f"Загружено правил маппинга функций: {len(self.rules)}")
+                    cursor.close()
+                finally:
+                    conn.close()
+            except Exception as e:
+                logger.warning(f"Не удалось загрузить правила маппинга функций: {e}")
+
+    def invalidate(self) -> None:
+        """Принудительная перезагрузка при следующем обращении"""
+        with self._lock:
+            self.loaded = False
+            self._last_check = 0.0
+            self._translations = {}
+
+    def get_rule(self, function_name: str) -> Optional[FunctionMappingModel]:
+        """
+        Правило для функции.
+
+        Args:
+            function_name: Имя функции MS SQL (регистр не важен)
+
+        Returns:
+            Optional[FunctionMappingModel]: Правило или None
+        """
+        self.refresh()
+        return self.rules.get(function_name.lower())
+
+    @staticmethod
+    def expression_key(expression: str, rule: FunctionMappingModel) -> str:
+        """Хэш пары (правило, выражение) для памяти переводов"""
+        payload = f"{rule.id}\x00{rule.source_function}\x00{expression}".encode('utf-8')
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def apply(self, expression: str, rule: FunctionMappingModel) -> str:
+        """
+        Применение правила к выражению с запоминанием результата.
+
+        Args:
+            expression: Исходное выражение
+            rule: Правило маппинга
+
+        Returns:
+            str: Преобразованное выражение
+        """
+        key = self.expression_key(expression, rule)
+        result = self._translations.get(key)
+        if result is None:
+            result = rule.map_function(expression)
+            if len(self._translations) >= self.MAX_TRANSLATIONS:
+                self._translations = {}
+            self._translations[key] = result
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние кэша"""
+        return {
+            'rules': len(self.rules),
+            'translations': len(self._translations),
+            'loads': self.loads,
+            'watermark': [str(value) for value in self.watermark] if self.watermark else None
+        }
+
+
+_rule_cache: Optional[FunctionMappingRuleCache] = None
+_rule_cache_lock = threading.Lock()
+
+
+def get_rule_cache(config_loader=None) -> FunctionMappingRuleCache:
+    """
+    Кэш правил маппинга функций на процесс.
+
+    Args:
+        config_loader: Загрузчик конфигурации (нужен при первом обращении)
+    """
+    global _rule_cache
+    if _rule_cache is None or (_rule_cache.connection_factory is None and config_loader):
+        with _rule_cache_lock:
+            if _rule_cache is None or (_rule_cache.connection_factory is None and config_loader):
+                _rule_cache = (FunctionMappingRuleCache.from_config(config_loader)
+                               if config_loader else FunctionMappingRuleCache())
+    return _rule_cache
+
+
+def reset_rule_cache() -> None:
+    """Сброс кэша процесса (для тестов и после обновления правил)"""
+    global _rule_cache
+    with _rule_cache_lock:
+        _rule_cache = None
@@ -3,6 +3,7 @@ FunctionMappingModel - Модель правил маппинга функций
 """
 
 from typing import Optional
+import re
 
 
 class FunctionMappingModel:
@@ -23,6 +24,15 @@ class FunctionMappingModel:
         self.is_automatic = is_automatic
         self.is_semi_automatic = False
         self.is_manual = False
+        self.updated_at = None
+        self.compiled_pattern: Optional[re.Pattern] = None
+    
+    def compile_pattern(self) -> None:
+        """Предкомпиляция mapping_pattern для regex-правил"""
+        if self.mapping_type == "regex" and self.mapping_pattern and self.replacement_pattern:
+            self.compiled_pattern = re.compile(self.mapping_pattern, re.IGNORECASE)
+        else:
+            self.compiled_pattern = None
     
     def get_mapping(self) -> dict:
         """Получение правила маппинга"""
@@ -43,8 +53,22 @@ class FunctionMappingModel:
     
     def map_function(self, source_code: str) -> str:
         """Применение маппинга к исходному коду"""
-        # TODO: Реализовать применение маппинга
-        return source_code
+        try:
+            if self.mapping_type == "direct":
+                # Простая замена функции
+                return source_code.replace(self.source_function, self.target_function)
+            elif self.mapping_type == "regex":
+                if self.mapping_pattern and self.replacement_pattern:
+                    if self.compiled_pattern is None:
+                        self.compile_pattern()
+                    return self.compiled_pattern.sub(self.replacement_pattern, source_code)
+                # Fallback к простой замене
+                return source_code.replace(self.source_function, self.target_function)
+            else:
+                # Неизвестный тип маппинга
+                return source_code
+        except Exception:
+            return source_code
     
     def to_dict(self) -> dict:
         """Преобразование в словарь для JSON"""
@@ -2,17 +2,25 @@
 FunctionMappingState - Состояние функции и порядок дальнейшей работы
 """
 
-from typing import Optional, List
+from typing import Optional, List, Dict
 import re
 
+from .tsql_expression_translator import TranslationError, collect_functions, parse_expression
+
 
 class FunctionMappingState:
     """Состояние функции и порядок дальнейшей работы"""
     
-    def __init__(self, source_expression: str, config_loader=None):
+    def __init__(self, source_expression: str, config_loader=None,
+                 column_map: Optional[Dict[str, str]] = None,
+                 column_types: Optional[Dict[str, str]] = None):
         self.source_expression = source_expression
         self.config_loader = config_loader
+        self.column_map = column_map
+        self.column_types = column_types
         self.function_mapping_model: Optional['FunctionMappingModel'] = None
+        self.target_expression: Optional[str] = None
+        self.translation = None
         
         # Анализируем выражение
         self.functions = self._extract_functions(source_expression)
@@ -31,10 +39,13 @@ class FunctionMappingState:
     
     def _extract_functions(self, expression: str) -> List[str]:
         """Извлечение функций из выражения"""
-        # Ищем все функции в выражении
-        functions = re.findall(r'(\w+)\s*\(', expression)
-        # Нормализуем имена функций (в нижний регистр)
-        return [func.lower() for func in functions]
+        try:
+            # Функции из дерева выражения, включая вложенные вызовы
+            return [func for func in collect_functions(parse_expression(expression)) if func != 'case']
+        except TranslationError:
+            # Выражение не разбирается - ищем вызовы по шаблону
+            functions = re.findall(r'(\w+)\s*\(', expression)
+            return [func.lower() for func in functions]
     
     def _analyze_complexity(self) -> str:
         """Анализ сложности выражения"""
@@ -53,11 +64,29 @@ class FunctionMappingState:
         """Проверка метаданных и создание правильного состояния"""
         if len(self.functions) == 0:
             self._create_no_functions_state()
+            return
+        
+        # Переводим выражение целиком: правила применяются к каждому вызову
+        translation = self._translate_expression()
+        if (translation and translation.success
+                and self._is_valid_postgres_expression(translation.target_expression)):
+            self._create_with_translation(translation)
         elif len(self.functions) == 1:
             self._check_single_function_metadata()
         else:
             self._create_complex_expression_state()
     
+    def _translate_expression(self):
+        """Перевод выражения по дереву с правилами из кэша"""
+        try:
+            from .tsql_expression_translator import get_tsql_translator
+            self.translation = get_tsql_translator(self.config_loader).translate(
+                self.source_expression, self.column_map, self.column_types
+            )
+            return self.translation
+        except Exception:
+            return None
+    
     def _create_no_functions_state(self):
         """Создание состояния для выражения без функций"""
         self.status = "no_functions"
@@ -91,45 +120,15 @@ class FunctionMappingState:
         self.next_action = "create_manual_review_issue"
         self.confidence = 0
         self.notes = f"Сложное выражение с {len(self.functions)} функциями: {', '.join(self.functions)}"
+        if self.translation and self.translation.unmapped_functions:
+            self.notes += f"; без правил: {', '.join(self.translation.unmapped_functions)}"
         self.requires_manual_review = True
     
     def _load_mapping_from_metadata(self, function_name: str) -> Optional['FunctionMappingModel']:
-        """Загрузка маппинга из метаданных PostgreSQL"""
+        """Загрузка маппинга из кэша правил mcl.function_mapping_rules"""
         try:
-            import psycopg2
-            postgres_config = self.config_loader.get_database_config('postgres')
-            conn = psycopg2.connect(
-                host=postgres_config['host'],
-                port=postgres_config['port'],
-                dbname=postgres_config['database'],
-                user=postgres_config['user'],
-                password=postgres_config['password']
-            )
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT source_function, target_function, mapping_pattern, replacement_pattern, mapping_type, is_active
-                FROM mcl.function_mapping_rules 
-                WHERE source_function = %s AND is_active = true
-            """, (function_name,))
-            
-            result = cursor.fetchone()
-            cursor.close()
-            conn.close()
-            
-            if result:
-                from .function_mapping_model import FunctionMappingModel
-                mapping = FunctionMappingModel(
-                    source_function=result[0],
-                    target_function=result[1],
-                    mapping_type=result[4],
-                    is_automatic=result[5]  # is_active
-                )
-                # Загружаем дополнительные поля
-                mapping.mapping_pattern = result[2]
-                mapping.replacement_pattern = result[3]
-                return mapping
-            return None
+            from .function_mapping_cache import get_rule_cache
+            return get_rule_cache(self.config_loader).get_rule(function_name)
         except Exception:
             return None
     
@@ -145,23 +144,10 @@ class FunctionMappingState:
             return False
     
     def _apply_mapping(self, expression: str, mapping: 'FunctionMappingModel') -> str:
-        """Применение маппинга к выражению"""
+        """Применение маппинга к выражению (результат запоминается в кэше правил)"""
         try:
-            if mapping.mapping_type == "direct":
-                # Простая замена функции
-                return expression.replace(mapping.source_function, mapping.target_function)
-            elif mapping.mapping_type == "regex":
-                # Применение regex-маппинга
-                if mapping.mapping_pattern and mapping.replacement_pattern:
-                    # Применяем regex-замену
-                    result = re.sub(mapping.mapping_pattern, mapping.replacement_pattern, expression, flags=re.IGNORECASE)
-                    return result
-                else:
-                    # Fallback к простой замене
-                    return expression.replace(mapping.source_function, mapping.target_function)
-            else:
-                # Неизвестный тип маппинга
-                return expression
+            from .function_mapping_cache import get_rule_cache
+            return get_rule_cache(self.config_loader).apply(expression, mapping)
         except Exception:
             return expression
     
@@ -180,6 +166,23 @@ class FunctionMappingState:
         
         return True
     
+    def _create_with_translation(self, translation):
+        """Создание состояния для полностью переведенного выражения"""
+        from .function_mapping_cache import get_rule_cache
+        
+        rule_cache = get_rule_cache(self.config_loader)
+        self.function_mapping_model = next(
+            (rule_cache.rules[func] for func in self.functions if func in rule_cache.rules), None
+        )
+        self.target_expression = translation.target_expression
+        self.status = "mapped"
+        self.confidence = 90 if len(self.functions) == 1 else 80
+        self.next_action = "use_mapping"
+        self.notes = f"Выражение переведено, функции: {', '.join(self.functions)}"
+        if translation.notes:
+            self.notes += f"; {'; '.join(translation.notes)}"
+        self.requires_manual_review = False
+    
     def _create_with_mapping_model(self, mapping_model: 'FunctionMappingModel'):
         """Создание состояния с объектом модели маппинга"""
         self.function_mapping_model = mapping_model
@@ -221,6 +224,7 @@ class FunctionMappingState:
             'confidence': self.confidence,
             'notes': self.notes,
             'requires_manual_review': self.requires_manual_review,
+            'target_expression': self.target_expression,
             'function_mapping_model': self.function_mapping_model.to_dict() if self.function_mapping_model else None
         }
     
@@ -0,0 +1,304 @@
+"""
+MigrationLogging - Асинхронное журналирование через очередь
+
+logging.basicConfig с FileHandler пишет в файл и консоль в потоке,
+вызвавшем logger: при высокой частоте таблиц ввод-вывод журнала
+оказывается на критическом пути миграции. LoggingPipeline заменяет
+его схемой QueueHandler/QueueListener:
+
+    - рабочие потоки только кладут запись в очередь; при переполнении
+      INFO/DEBUG записи отбрасываются и учитываются в dropped, а записи
+      WARNING и выше ждут места в очереди и не теряются. Число
+      отброшенных записей записывается в журнал (WARNING) при остановке
+      конвейера;
+    - RateLimitFilter ограничивает частоту INFO/DEBUG записей каждого
+      модуля (token bucket на имя логгера), число подавленных записей
+      передается в следующей пропущенной записи (поле suppressed);
+    - поток QueueListener передает записи потребителям: файлу в формате
+      JSON Lines (JsonFormatter) и консоли (RichHandler, без rich -
+      StreamHandler), поэтому отрисовка консоли не задерживает миграцию.
+
+Поля extra записи (table_name, rows, duration и т.п.) попадают в JSON
+как отдельные ключи.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Стандартные атрибуты LogRecord; остальные атрибуты записи - поля extra
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись журнала одной строкой JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Ограничение частоты записей по модулю.
+
+    Записи уровня exempt_level и выше не ограничиваются.
+    """
+
+    def __init__(self, rate: float = 50.0, burst: int = 200, exempt_level: int = logging.WARNING,
+                 module_rates: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Инициализация RateLimitFilter.
+
+        Args:
+            rate: Записей в секунду на логгер (0 - без ограничения)
+            burst: Допустимый всплеск записей
+            exempt_level: Уровень, начиная с которого записи не ограничиваются
+            module_rates: Частота для отдельных логгеров (имя -> записей в секунду)
+            clock: Монотонные часы
+        """
+        super().__init__()
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.exempt_level = exempt_level
+        self.module_rates = dict(module_rates or {})
+        self.clock = clock
+        self.suppressed = 0
+        # имя логгера -> [токены, время пополнения, подавлено с последней записи]
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.module_rates.get(record.name, self.rate)
+        if record.levelno >= self.exempt_level or rate <= 0:
+            return True
+        with self._lock:
+            now = self.clock()
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                self.suppressed += 1
+                return False
+            bucket[0] -= 1.0
+            suppressed, bucket[2] = int(bucket[2]), 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который при переполнении очереди отбрасывает запись, а не ждет.
+
+    Записи уровня block_level и выше не отбрасываются: поток ждет места
+    в очереди (ошибки и предупреждения редки, а их потеря скрывает
+    причину сбоя миграции).
+    """
+
+    def __init__(self, log_queue: queue.Queue, block_level: int = logging.WARNING):
+        super().__init__(log_queue)
+        self.block_level = block_level
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Сообщение и трассировка формируются в потоке вызова (аргументы могут измениться),
+        # но трассировка хранится отдельно от сообщения для поля exc_info в JSON
+        prepared = logging.makeLogRecord(vars(record))
+        prepared.msg = record.getMessage()
+        prepared.args = None
+        if record.exc_info:
+            prepared.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+        prepared.exc_info = None
+        return prepared
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if record.levelno >= self.block_level:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener, который при остановке ждет места в очереди для метки конца.
+
+    QueueListener.stop кладет метку через put_nowait и при переполненной
+    очереди завершается с queue.Full; поток потребителей продолжает
+    разбирать очередь, поэтому ожидание места конечно.
+    """
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def create_console_handler(level: int = logging.INFO) -> logging.Handler:
+    """Потребитель для консоли: RichHandler, без rich - StreamHandler"""
+    try:
+        from rich.logging import RichHandler
+
+        handler: logging.Handler = RichHandler(level=level, show_path=False, markup=False)
+    except ImportError:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    handler.setLevel(level)
+    return handler
+
+
+class LoggingPipeline:
+    """
+    Журналирование миграции через очередь.
+
+    Example:
+        >>> pipeline = setup_logging(PROJECT_ROOT / 'logs' / 'coordinator.jsonl')
+        >>> logger.info("Таблица перенесена", extra={'table_name': 'accnt', 'rows': 120000})
+        >>> shutdown_logging()                 # дожидается записи очереди
+    """
+
+    def __init__(self, log_file: Optional[Path] = None, level: int = logging.INFO, console: bool = True,
+                 console_level: int = logging.INFO, rate: float = 50.0, burst: int = 200,
+                 module_rates: Optional[Dict[str, float]] = None, queue_size: int = 10000,
+                 handlers: Optional[List[logging.Handler]] = None):
+        """
+        Инициализация LoggingPipeline.
+
+        Args:
+            log_file: Файл журнала JSON Lines (None - без файла)
+            level: Уровень корневого логгера
+            console: Вывод в консоль
+            console_level: Уровень консольного вывода
+            rate: Записей INFO/DEBUG в секунду на модуль (0 - без ограничения)
+            burst: Допустимый всплеск записей модуля
+            module_rates: Частота для отдельных логгеров
+            queue_size: Размер очереди записей
+            handlers: Дополнительные потребители записей
+        """
+        self.level = level
+        self.log_file = Path(log_file) if log_file else None
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.rate_filter = RateLimitFilter(rate, burst, module_rates=module_rates)
+        self.handler = NonBlockingQueueHandler(self.queue, block_level=self.rate_filter.exempt_level)
+        self.handler.addFilter(self.rate_filter)
+        self.handler.pipeline = self
+
+        self.consumers: List[logging.Handler] = []
+        if self.log_file:
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
+            file_handler = logging.FileHandler(self.log_file, mode='a', encoding='utf-8')
+            file_handler.setFormatter(JsonFormatter())
+            self.consumers.append(file_handler)
+        if console:
+            self.consumers.append(create_console_handler(console_level))
+        self.consumers.extend(handlers or [])
+        self.listener = DrainingQueueListener(self.queue, *self.consumers, respect_handler_level=True)
+        self.started = False
+
+    def start(self, logger: Optional[logging.Logger] = None) -> 'LoggingPipeline':
+        """Подключение к логгеру (по умолчанию - корневому) и запуск потока потребителей"""
+        target = logger or logging.getLogger()
+        target.addHandler(self.handler)
+        target.setLevel(self.level)
+        self.listener.start()
+        self.started = True
+        return self
+
+    def stop(self, logger: Optional[logging.Logger] = None) -> None:
+        """Отключение от логгера, запись оставшихся в очереди записей и закрытие потребителей"""
+        if not self.started:
+            return
+        (logger or logging.getLogger()).removeHandler(self.handler)
+
+        # Отчет о потерях - последней записью журнала (WARNING не отбрасывается)
+        stats = self.stats()
+        if stats['dropped'] or stats['suppressed']:
+            report = logging.getLogger(__name__)
+            self.handler.handle(report.makeRecord(
+                report.name, logging.WARNING, __file__, 0,
+                "Журнал: отброшено записей (очередь переполнена): %d, подавлено ограничением частоты: %d",
+                (stats['dropped'], stats['suppressed']), None,
+                extra={'dropped': stats['dropped'], 'suppressed': stats['suppressed']}
+            ))
+
+        self.listener.stop()
+        self.started = False
+        for consumer in self.consumers:
+            consumer.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Отброшенные (очередь переполнена) и подавленные (ограничение частоты) записи"""
+        return {
+            'queued': self.queue.qsize(),
+            'dropped': self.handler.dropped,
+            'suppressed': self.rate_filter.suppressed,
+        }
+
+
+_logging_pipeline: Optional[LoggingPipeline] = None
+_logging_pipeline_lock = threading.Lock()
+
+
+def setup_logging(log_file: Optional[Path] = None, **options) -> LoggingPipeline:
+    """
+    Журналирование процесса через очередь (замена logging.basicConfig).
+
+    Как и basicConfig, действует первый вызов: последующие возвращают
+    уже запущенный конвейер (в том числе установленный копией модуля,
+    импортированной по другому пути). Очередь записывается при выходе
+    из процесса.
+
+    Args:
+        log_file: Файл журнала JSON Lines
+        **options: Параметры LoggingPipeline
+    """
+    global _logging_pipeline
+    if _logging_pipeline is None:
+        with _logging_pipeline_lock:
+            if _logging_pipeline is None:
+                installed = [getattr(h, 'pipeline', None) for h in logging.getLogger().handlers]
+                _logging_pipeline = next((p for p in installed if p is not None), None)
+            if _logging_pipeline is None:
+                _logging_pipeline = LoggingPipeline(log_file, **options).start()
+    return _logging_pipeline
+
+
+def shutdown_logging() -> None:
+    """Остановка конвейера процесса с записью оставшихся записей"""
+    global _logging_pipeline
+    with _logging_pipeline_lock:
+        if _logging_pipeline is not None:
+            _logging_pipeline.stop()
+        _logging_pipeline = None
+
+
+atexit.register(shutdown_logging)
@@ -12,6 +12,32 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+# Количество таблиц задачи по статусам mcl.migration_status
+STATUS_COUNTS_QUERY = """
+    SELECT ms.current_status, COUNT(ms.id)
+    FROM mcl.migration_status ms
+    JOIN mcl.mssql_tables mt ON ms.source_table_id = mt.id
+    WHERE mt.task_id = %s
+    GROUP BY ms.current_status
+    ORDER BY ms.current_status
+"""
+
+
+def migration_status_counts(connection, task_id: int) -> Dict[str, int]:
+    """
+    Количество таблиц задачи по статусам миграции.
+
+    Функция модуля без ConnectionManager: femcl status подключается
+    к PostgreSQL сам и не загружает pyodbc.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(STATUS_COUNTS_QUERY, (task_id,))
+        return {status: count for status, count in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
 class MigrationMetrics:
     """
     Класс для расчета и получения метрик миграции.
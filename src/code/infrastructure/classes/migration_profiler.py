@@ -0,0 +1,279 @@
+"""
+MigrationProfiler - Профилирование миграции отдельной таблицы.
+
+Запускает задачу переноса таблицы под детерминированным профилировщиком
+(cProfile) и одновременно под сэмплирующим профилировщиком стеков.
+Для каждой таблицы в reports/profiles/<run_id>/ сохраняются:
+    <table>.pstats     - статистика cProfile (pstats/snakeviz)
+    <table>.collapsed  - свернутые стеки для flamegraph.pl/speedscope
+    <table>.json       - сводка: длительность, RSS за время таблицы, топ функций
+
+Оба профилировщика видят только поток, открывший профиль: работа
+рабочих потоков (загрузка секций, проверка ограничений) в профиль
+не попадает.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PROFILE_DIR = Path(__file__).parent.parent.parent.parent.parent / "reports" / "profiles"
+
+
+def get_peak_rss_kb() -> int:
+    """
+    Пиковый RSS процесса за все время его работы в килобайтах.
+
+    Returns:
+        int: ru_maxrss (на macOS значение в байтах приводится к КБ)
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+
+def get_current_rss_kb() -> Optional[int]:
+    """
+    Текущий RSS процесса в килобайтах.
+
+    Returns:
+        Optional[int]: RSS из /proc/self/statm, None - недоступно (не Linux)
+    """
+    try:
+        with open('/proc/self/statm', encoding='ascii') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * resource.getpagesize() // 1024
+
+
+class StackSampler:
+    """
+    Сэмплирующий профилировщик стеков одного потока.
+
+    Отдельный поток-демон с заданным интервалом снимает стек целевого
+    потока через sys._current_frames() и считает одинаковые стеки.
+    Стеки других потоков не снимаются. С тем же интервалом замеряется
+    текущий RSS процесса (peak_rss_kb - максимум за время сэмплирования).
+    """
+
+    def __init__(self, target_thread_id: int, interval: float = 0.005):
+        """
+        Инициализация StackSampler.
+
+        Args:
+            target_thread_id: Идентификатор профилируемого потока
+            interval: Интервал сэмплирования в секундах
+        """
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.peak_rss_kb: Optional[int] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Запуск сэмплирования"""
+        self._thread = threading.Thread(target=self._run, name="femcl-stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Остановка сэмплирования"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def sample_rss(self) -> None:
+        """Замер текущего RSS процесса"""
+        rss = get_current_rss_kb()
+        if rss is not None and (self.peak_rss_kb is None or rss > self.peak_rss_kb):
+            self.peak_rss_kb = rss
+
+    def _run(self) -> None:
+        """Цикл сэмплирования"""
+        while not self._stop_event.wait(self.interval):
+            self.sample_rss()
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            key = ';'.join(reversed(names))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def to_collapsed(self) -> str:
+        """Свернутые стеки в формате 'frame;frame;frame count'"""
+        lines = [f"{stack} {count}" for stack, count in sorted(self.stacks.items())]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+
+class MigrationProfiler:
+    """
+    Профилировщик задачи переноса одной таблицы.
+
+    Используется как контекстный менеджер вокруг задачи таблицы.
+    cProfile и сэмплер профилируют только текущий поток: время рабочих
+    потоков таблицы видно в профиле лишь как ожидание их завершения.
+
+    peak_rss_kb - пик RSS процесса за время таблицы (замеры сэмплера),
+    а не за все время процесса; при параллельной миграции таблиц в него
+    входит память других таблиц. process_peak_rss_kb - ru_maxrss
+    процесса на момент завершения таблицы.
+
+    Example:
+        >>> with MigrationProfiler('accnt', run_id) as profiler:
+        ...     migrator.migrate()
+        >>> print(profiler.artifacts)
+    """
+
+    def __init__(self, table_name: str, run_id: str,
+                 output_dir: Optional[str] = None,
+                 sample_interval: float = 0.005,
+                 top_functions: int = 25):
+        """
+        Инициализация MigrationProfiler.
+
+        Args:
+            table_name: Имя таблицы
+            run_id: Идентификатор запуска
+            output_dir: Каталог профилей (по умолчанию reports/profiles)
+            sample_interval: Интервал сэмплирования стеков, секунд
+            top_functions: Количество функций в сводке
+        """
+        self.table_name = table_name
+        self.run_id = run_id
+        self.output_dir = Path(output_dir) if output_dir else DEFAULT_PROFILE_DIR
+        self.sample_interval = sample_interval
+        self.top_functions = top_functions
+
+        self._profile = cProfile.Profile()
+        self._sampler: Optional[StackSampler] = None
+        self._started = 0.0
+        self.duration_seconds = 0.0
+        self.rss_kb_before: Optional[int] = None
+        self.peak_rss_kb: Optional[int] = None
+        self.process_peak_rss_kb = 0
+        self.artifacts: Dict[str, str] = {}
+
+    def __enter__(self) -> 'MigrationProfiler':
+        self._sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        self._sampler.sample_rss()
+        self.rss_kb_before = self._sampler.peak_rss_kb
+        self._sampler.start()
+        self._started = time.perf_counter()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._profile.disable()
+        self.duration_seconds = time.perf_counter() - self._started
+        self._sampler.stop()
+        self._sampler.sample_rss()
+        self.peak_rss_kb = self._sampler.peak_rss_kb
+        self.process_peak_rss_kb = get_peak_rss_kb()
+
+        try:
+            self.save()
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить профиль таблицы {self.table_name}: {e}")
+
+    @property
+    def peak_rss_growth_kb(self) -> Optional[int]:
+        """Рост RSS за время таблицы (пик минус RSS на входе)"""
+        if self.peak_rss_kb is None or self.rss_kb_before is None:
+            return None
+        return self.peak_rss_kb - self.rss_kb_before
+
+    def describe_memory(self) -> str:
+        """Память таблицы для вывода: пик за время таблицы и пик процесса"""
+        process = f"пик процесса {self.process_peak_rss_kb / 1024:.1f} МБ"
+        if self.peak_rss_kb is None:
+            return process
+        return (f"пик RSS за таблицу {self.peak_rss_kb / 1024:.1f} МБ "
+                f"(+{self.peak_rss_growth_kb / 1024:.1f} МБ), {process}")
+
+    def get_top_functions(self) -> List[Dict[str, Any]]:
+        """
+        Функции с наибольшим накопленным временем.
+
+        Returns:
+            List[Dict]: function, calls, tottime, cumtime
+        """
+        stats = pstats.Stats(self._profile, stream=io.StringIO())
+        stats.sort_stats('cumulative')
+        result = []
+        for func in stats.fcn_list[:self.top_functions]:
+            _, calls, tottime, cumtime, _ = stats.stats[func]
+            filename, line, name = func
+            result.append({
+                'function': f"{os.path.basename(filename)}:{line}({name})",
+                'calls': calls,
+                'tottime': round(tottime, 6),
+                'cumtime': round(cumtime, 6)
+            })
+        return result
+
+    def save(self) -> Dict[str, str]:
+        """
+        Сохранение артефактов профиля.
+
+        Returns:
+            Dict: Пути к файлам pstats, collapsed и summary
+        """
+        run_dir = self.output_dir / self.run_id
+        run_dir.mkdir(parents=True, exist_ok=True)
+
+        pstats_path = run_dir / f"{self.table_name}.pstats"
+        self._profile.dump_stats(str(pstats_path))
+
+        collapsed_path = run_dir / f"{self.table_name}.collapsed"
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            f.write(self._sampler.to_collapsed())
+
+        summary_path = run_dir / f"{self.table_name}.json"
+        summary = {
+            'table_name': self.table_name,
+            'run_id': self.run_id,
+            'created_at': datetime.now().isoformat(),
+            'duration_seconds': round(self.duration_seconds, 3),
+            'rss_kb_before': self.rss_kb_before,
+            'peak_rss_kb': self.peak_rss_kb,
+            'peak_rss_growth_kb': self.peak_rss_growth_kb,
+            'process_peak_rss_kb': self.process_peak_rss_kb,
+            'stack_samples': self._sampler.samples,
+            'sample_interval': self.sample_interval,
+            'top_functions': self.get_top_functions(),
+            'files': {
+                'pstats': pstats_path.name,
+                'collapsed': collapsed_path.name
+            }
+        }
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+        self.artifacts = {
+            'pstats': str(pstats_path),
+            'collapsed': str(collapsed_path),
+            'summary': str(summary_path)
+        }
+        return self.artifacts
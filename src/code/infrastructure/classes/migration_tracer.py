@@ -0,0 +1,362 @@
+"""
+MigrationTracer - Трассировка фаз миграции таблицы.
+
+Записывает структурированные спаны (span) для каждой фазы и подфазы
+миграции (метаданные, DDL, выборка, преобразование, запись, индексы,
+валидация) с количеством строк и байт. Спаны сохраняются в таблицу
+mcl.migration_trace_spans и при необходимости экспортируются в JSON
+файлы, совместимые с форматом OTLP.
+"""
+
+import json
+import logging
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_payload_bytes(rows) -> int:
+    """
+    Приблизительная оценка объема данных в пакете строк.
+
+    Строки и бинарные значения учитываются по длине, остальные
+    значения (числа, даты) - по 8 байт.
+
+    Args:
+        rows: Последовательность строк (кортежей значений)
+
+    Returns:
+        int: Оценка объема в байтах
+    """
+    total = 0
+    for row in rows:
+        for value in row:
+            if value is None:
+                continue
+            if isinstance(value, (str, bytes, bytearray, memoryview)):
+                total += len(value)
+            else:
+                total += 8
+    return total
+
+
+class TraceSpan:
+    """
+    Спан трассировки - одна фаза или подфаза миграции.
+
+    Attributes:
+        name: Имя фазы (например, 'data.fetch')
+        span_id: Идентификатор спана (16 hex символов)
+        parent_span_id: Идентификатор родительского спана
+        start_time: Время начала (wall clock)
+        end_time: Время окончания (wall clock)
+        duration_ns: Длительность по монотонным часам, нс
+        rows: Количество обработанных строк
+        bytes: Объем обработанных данных, байт
+        status: 'ok' или 'error'
+        attributes: Дополнительные атрибуты
+    """
+
+    def __init__(self, name: str, parent_span_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.start_time = datetime.now()
+        self.end_time: Optional[datetime] = None
+        self._start_ns = time.monotonic_ns()
+        self.duration_ns = 0
+        self.rows: Optional[int] = None
+        self.bytes: Optional[int] = None
+        self.status = "ok"
+        self.error_message: Optional[str] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+
+    def set_counts(self, rows: Optional[int] = None, bytes: Optional[int] = None) -> None:
+        """Установка количества строк и байт"""
+        if rows is not None:
+            self.rows = rows
+        if bytes is not None:
+            self.bytes = bytes
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Установка дополнительного атрибута"""
+        self.attributes[key] = value
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Завершение спана"""
+        self.duration_ns = time.monotonic_ns() - self._start_ns
+        self.end_time = datetime.now()
+        if error is not None:
+            self.status = "error"
+            self.error_message = str(error)
+
+    @property
+    def duration_ms(self) -> float:
+        """Длительность спана в миллисекундах"""
+        return self.duration_ns / 1_000_000
+
+    def to_dict(self) -> dict:
+        """Преобразование в словарь для JSON"""
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_span_id,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'duration_ms': round(self.duration_ms, 3),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'status': self.status,
+            'error_message': self.error_message,
+            'attributes': self.attributes
+        }
+
+
+class MigrationTracer:
+    """
+    Трассировщик фаз миграции одной таблицы.
+
+    Спаны образуют дерево: корневой спан 'table.migrate' и вложенные
+    спаны фаз. Вложенность определяется стеком открытых спанов.
+
+    Example:
+        >>> tracer = MigrationTracer('accnt')
+        >>> with tracer.span('table.migrate'):
+        ...     with tracer.span('data.write') as span:
+        ...         span.set_counts(rows=1000, bytes=65536)
+        >>> tracer.save_to_database(pg_conn)
+        >>> tracer.export_otlp_json('reports/traces')
+    """
+
+    SERVICE_NAME = "femcl"
+
+    def __init__(self, table_name: str, run_id: Optional[str] = None):
+        """
+        Инициализация MigrationTracer.
+
+        Args:
+            table_name: Имя мигрируемой таблицы
+            run_id: Идентификатор запуска (создается автоматически)
+        """
+        self.table_name = table_name
+        self.run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S_') + secrets.token_hex(3)
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[TraceSpan] = []
+        self._stack: List[TraceSpan] = []
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[TraceSpan]:
+        """
+        Контекстный менеджер для трассировки фазы.
+
+        Args:
+            name: Имя фазы
+            **attributes: Дополнительные атрибуты спана
+
+        Yields:
+            TraceSpan: Открытый спан
+        """
+        parent_id = self._stack[-1].span_id if self._stack else None
+        current = TraceSpan(name, parent_id, attributes)
+        self._stack.append(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.finish(error=e)
+            raise
+        else:
+            current.finish()
+        finally:
+            self._stack.pop()
+            self.spans.append(current)
+
+    def record_span(self, name: str, duration_ns: int, rows: Optional[int] = None,
+                    bytes: Optional[int] = None, **attributes) -> TraceSpan:
+        """
+        Запись агрегированного спана подфазы.
+
+        Используется для подфаз, которые выполняются многократно
+        в цикле (выборка/запись пакетов): суммарное время записывается
+        одним дочерним спаном текущего открытого спана.
+
+        Args:
+            name: Имя подфазы
+            duration_ns: Суммарная длительность, нс
+            rows: Количество строк
+            bytes: Объем данных, байт
+            **attributes: Дополнительные атрибуты
+
+        Returns:
+            TraceSpan: Записанный спан
+        """
+        parent = self._stack[-1] if self._stack else None
+        recorded = TraceSpan(name, parent.span_id if parent else None, attributes)
+        recorded.set_attribute('aggregated', True)
+        if parent:
+            recorded.start_time = parent.start_time
+        recorded.duration_ns = duration_ns
+        recorded.end_time = datetime.fromtimestamp(
+            recorded.start_time.timestamp() + duration_ns / 1_000_000_000
+        )
+        recorded.set_counts(rows=rows, bytes=bytes)
+        self.spans.append(recorded)
+        return recorded
+
+    def get_phase_summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Получение сводки по фазам.
+
+        Returns:
+            Dict: {имя фазы: {'duration_ms', 'rows', 'bytes', 'status'}}
+        """
+        summary: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans:
+            entry = summary.setdefault(span.name, {
+                'duration_ms': 0.0,
+                'rows': 0,
+                'bytes': 0,
+                'status': 'ok'
+            })
+            entry['duration_ms'] += span.duration_ms
+            entry['rows'] += span.rows or 0
+            entry['bytes'] += span.bytes or 0
+            if span.status != 'ok':
+                entry['status'] = span.status
+        return summary
+
+    def save_to_database(self, connection) -> bool:
+        """
+        Сохранение спанов в mcl.migration_trace_spans.
+
+        Таблица создается скриптом database/sql/migration_state.
+
+        Args:
+            connection: Подключение к PostgreSQL
+
+        Returns:
+            bool: True если спаны сохранены
+        """
+        if not self.spans:
+            return True
+
+        try:
+            cursor = connection.cursor()
+            cursor.executemany("""
+                INSERT INTO mcl.migration_trace_spans
+                    (run_id, trace_id, span_id, parent_span_id, table_name, span_name,
+                     start_time, end_time, duration_ms, rows_count, bytes_count,
+                     status, attributes)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, [
+                (
+                    self.run_id, self.trace_id, span.span_id, span.parent_span_id,
+                    self.table_name, span.name, span.start_time,
+                    span.end_time or span.start_time, round(span.duration_ms, 3),
+                    span.rows, span.bytes, span.status,
+                    json.dumps(span.attributes, default=str) if span.attributes else None
+                )
+                for span in self.spans
+            ])
+            connection.commit()
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить трассировку таблицы {self.table_name}: {e}")
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+            return False
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """
+        Преобразование спанов в структуру OTLP/JSON (ExportTraceServiceRequest).
+
+        Returns:
+            Dict: Документ OTLP/JSON
+        """
+        otlp_spans = []
+        for span in self.spans:
+            start_ns = int(span.start_time.timestamp() * 1_000_000_000)
+            attributes = {
+                'femcl.table_name': self.table_name,
+                'femcl.run_id': self.run_id,
+                **span.attributes
+            }
+            if span.rows is not None:
+                attributes['femcl.rows'] = span.rows
+            if span.bytes is not None:
+                attributes['femcl.bytes'] = span.bytes
+
+            otlp_span = {
+                'traceId': self.trace_id,
+                'spanId': span.span_id,
+                'name': span.name,
+                'kind': 1,  # SPAN_KIND_INTERNAL
+                'startTimeUnixNano': str(start_ns),
+                'endTimeUnixNano': str(start_ns + span.duration_ns),
+                'attributes': [self._otlp_attribute(k, v) for k, v in attributes.items()],
+                'status': {'code': 2, 'message': span.error_message or ''}
+                          if span.status == 'error' else {'code': 1}
+            }
+            if span.parent_span_id:
+                otlp_span['parentSpanId'] = span.parent_span_id
+            otlp_spans.append(otlp_span)
+
+        return {
+            'resourceSpans': [{
+                'resource': {
+                    'attributes': [self._otlp_attribute('service.name', self.SERVICE_NAME)]
+                },
+                'scopeSpans': [{
+                    'scope': {'name': 'femcl.migration'},
+                    'spans': otlp_spans
+                }]
+            }]
+        }
+
+    def export_otlp_json(self, directory: str) -> Optional[str]:
+        """
+        Экспорт трассировки в JSON файл формата OTLP.
+
+        Args:
+            directory: Каталог для файлов трассировки
+
+        Returns:
+            str: Путь к созданному файлу или None при ошибке
+        """
+        try:
+            target_dir = Path(directory)
+            target_dir.mkdir(parents=True, exist_ok=True)
+            file_path = target_dir / f"trace_{self.table_name}_{self.run_id}.json"
+
+            tmp_path = file_path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_otlp(), f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, file_path)
+
+            return str(file_path)
+        except Exception as e:
+            logger.warning(f"Не удалось экспортировать трассировку таблицы {self.table_name}: {e}")
+            return None
+
+    @staticmethod
+    def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+        """Преобразование атрибута в формат OTLP KeyValue"""
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        return {'key': key, 'value': typed}
@@ -0,0 +1,472 @@
+"""
+SourceReader - Абстракция чтения данных исходной БД.
+
+Мигратор читает исходные таблицы только через интерфейс SourceReader:
+проверка существования, подсчет строк и потоковое чтение пакетов с
+проекцией колонок и диапазоном ключа. Реализации:
+
+    PyodbcSourceReader   - MS SQL Server через pyodbc
+    BcpFileSourceReader  - файлы, выгруженные bcp в символьном формате (-c)
+    ParquetSourceReader  - подготовленные Parquet файлы (требуется pyarrow)
+
+Новые источники добавляются реализацией SourceReader без изменений
+в TableMigrator.
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+logger = logging.getLogger(__name__)
+
+
+# Диапазон ключа [low, high): None означает отсутствие границы
+KeyRange = Tuple[Optional[Any], Optional[Any]]
+
+# Размер пакета: число строк или функция, возвращающая размер очередного
+# пакета (адаптивный BatchSizeController)
+BatchSize = Union[int, Callable[[], int]]
+
+
+def resolve_batch_size(batch_size: BatchSize) -> int:
+    """Размер очередного пакета"""
+    return max(1, int(batch_size() if callable(batch_size) else batch_size))
+
+
+class SourceBatch:
+    """
+    Пакет строк исходной таблицы.
+
+    Attributes:
+        columns: Имена колонок в порядке значений строки
+        rows: Строки пакета (кортежи значений)
+    """
+
+    __slots__ = ('columns', 'rows')
+
+    def __init__(self, columns: List[str], rows: List[tuple]):
+        self.columns = columns
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class SourceReader(ABC):
+    """
+    Абстрактный читатель исходной БД.
+
+    Example:
+        >>> with PyodbcSourceReader.from_config(mssql_config) as reader:
+        ...     for batch in reader.read_batches('accnt', columns=['account_key'],
+        ...                                      key_column='account_key', key_range=(1, 10000)):
+        ...         process(batch.rows)
+    """
+
+    @abstractmethod
+    def table_exists(self, table_name: str, schema: str = 'ags') -> bool:
+        """Проверка существования таблицы"""
+        pass
+
+    @abstractmethod
+    def count_rows(self, table_name: str, schema: str = 'ags',
+                   key_column: Optional[str] = None, key_range: Optional[KeyRange] = None) -> int:
+        """Количество строк таблицы (в диапазоне ключа, если указан)"""
+        pass
+
+    @abstractmethod
+    def read_batches(self, table_name: str, columns: Optional[Sequence[str]] = None,
+                     batch_size: BatchSize = 1000, schema: str = 'ags',
+                     key_column: Optional[str] = None,
+                     key_range: Optional[KeyRange] = None) -> Iterator[SourceBatch]:
+        """
+        Потоковое чтение таблицы пакетами.
+
+        Args:
+            table_name: Имя таблицы
+            columns: Проекция - список колонок (None - все колонки)
+            batch_size: Размер пакета в строках или функция размера очередного пакета
+            schema: Схема исходной таблицы
+            key_column: Колонка ключа для диапазона и упорядочивания
+            key_range: Диапазон ключа [low, high)
+
+        Yields:
+            SourceBatch: Пакеты строк
+        """
+        pass
+
+    def close(self) -> None:
+        """Освобождение ресурсов"""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _in_range(value: Any, key_range: Optional[KeyRange]) -> bool:
+        """Проверка попадания значения в диапазон [low, high)"""
+        if key_range is None:
+            return True
+        low, high = key_range
+        if value is None:
+            return False
+        if low is not None and value < low:
+            return False
+        if high is not None and value >= high:
+            return False
+        return True
+
+
+class PyodbcSourceReader(SourceReader):
+    """
+    Читатель MS SQL Server через pyodbc.
+
+    Проекция и диапазон ключа передаются в SELECT (WHERE key >= ? AND key < ?),
+    поэтому сервер возвращает только нужные колонки и строки.
+    """
+
+    def __init__(self, connection=None, connection_factory: Optional[Callable[[], Any]] = None):
+        """
+        Инициализация PyodbcSourceReader.
+
+        Args:
+            connection: Готовое подключение pyodbc
+            connection_factory: Функция создания подключения (вызывается лениво)
+        """
+        if connection is None and connection_factory is None:
+            raise ValueError("Требуется connection или connection_factory")
+        self._connection = connection
+        self._connection_factory = connection_factory
+        self._owns_connection = connection is None
+
+    @classmethod
+    def from_config(cls, mssql_config: Dict[str, Any]) -> 'PyodbcSourceReader':
+        """
+        Создание читателя по секции database.mssql из config.yaml.
+
+        Args:
+            mssql_config: Конфигурация MS SQL Server
+        """
+        def connect():
+            import pyodbc
+
+            connection_string = (
+                f"DRIVER={{{mssql_config['driver']}}};"
+                f"SERVER={mssql_config['server']},{mssql_config['port']};"
+                f"DATABASE={mssql_config['database']};"
+                f"UID={mssql_config['user']};"
+                f"PWD={mssql_config['password']};"
+                "TrustServerCertificate=yes;"
+            )
+            return pyodbc.connect(connection_string)
+
+        return cls(connection_factory=connect)
+
+    @property
+    def connection(self):
+        """Подключение pyodbc (создается при первом обращении)"""
+        if self._connection is None:
+            self._connection = self._connection_factory()
+        return self._connection
+
+    @staticmethod
+    def quote(name: str) -> str:
+        """Экранирование идентификатора MS SQL"""
+        return '[' + name.replace(']', ']]') + ']'
+
+    def _where(self, key_column: Optional[str], key_range: Optional[KeyRange]) -> Tuple[str, list]:
+        """Условие WHERE для диапазона ключа"""
+        if not key_column or not key_range:
+            return "", []
+        conditions, params = [], []
+        low, high = key_range
+        if low is not None:
+            conditions.append(f"{self.quote(key_column)} >= ?")
+            params.append(low)
+        if high is not None:
+            conditions.append(f"{self.quote(key_column)} < ?")
+            params.append(high)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def table_exists(self, table_name: str, schema: str = 'ags') -> bool:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT COUNT(*)
+                FROM information_schema.tables
+                WHERE table_name = ? AND table_schema = ?
+            """, (table_name, schema))
+            return cursor.fetchone()[0] > 0
+        finally:
+            cursor.close()
+
+    def count_rows(self, table_name: str, schema: str = 'ags',
+                   key_column: Optional[str] = None, key_range: Optional[KeyRange] = None) -> int:
+        where, params = self._where(key_column, key_range)
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {self.quote(schema)}.{self.quote(table_name)}{where}", params
+            )
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def read_batches(self, table_name: str, columns: Optional[Sequence[str]] = None,
+                     batch_size: BatchSize = 1000, schema: str = 'ags',
+                     key_column: Optional[str] = None,
+                     key_range: Optional[KeyRange] = None) -> Iterator[SourceBatch]:
+        select_list = ', '.join(self.quote(c) for c in columns) if columns else '*'
+        where, params = self._where(key_column, key_range)
+        order_by = f" ORDER BY {self.quote(key_column)}" if key_column else ""
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                f"SELECT {select_list} FROM {self.quote(schema)}.{self.quote(table_name)}{where}{order_by}",
+                params
+            )
+            names = [d[0] for d in cursor.description]
+            while True:
+                rows = cursor.fetchmany(resolve_batch_size(batch_size))
+                if not rows:
+                    break
+                yield SourceBatch(names, [tuple(row) for row in rows])
+        finally:
+            cursor.close()
+
+    def close(self) -> None:
+        if self._owns_connection and self._connection is not None:
+            try:
+                self._connection.close()
+            finally:
+                self._connection = None
+
+
+# Преобразование текстовых значений bcp -c в типы Python по типу MS SQL
+_BCP_CONVERTERS: Dict[str, Callable[[str], Any]] = {
+    'int': int, 'bigint': int, 'smallint': int, 'tinyint': int,
+    'bit': lambda v: v == '1',
+    'decimal': Decimal, 'numeric': Decimal, 'money': Decimal, 'smallmoney': Decimal,
+    'float': float, 'real': float,
+    'datetime': datetime.fromisoformat, 'datetime2': datetime.fromisoformat,
+    'smalldatetime': datetime.fromisoformat, 'date': lambda v: datetime.fromisoformat(v).date(),
+    'binary': bytes.fromhex, 'varbinary': bytes.fromhex, 'image': bytes.fromhex,
+}
+
+
+class BcpFileSourceReader(SourceReader):
+    """
+    Читатель файлов, выгруженных утилитой bcp в символьном формате.
+
+    Ожидаемая структура каталога:
+        <directory>/<schema>.<table>.dat           - данные (bcp ... out -c)
+        <directory>/<schema>.<table>.columns.json  - [{"name": ..., "type": ...}, ...]
+
+    Пустое поле считается NULL (bcp -c без -k пишет NULL как пустую строку).
+    Нативный двоичный формат bcp (-n) не поддерживается: для него
+    требуется fmt-файл и разбор длин полей.
+    """
+
+    def __init__(self, directory: str, field_terminator: str = '\t',
+                 row_terminator: str = '\n', encoding: str = 'utf-8'):
+        """
+        Инициализация BcpFileSourceReader.
+
+        Args:
+            directory: Каталог с выгруженными файлами
+            field_terminator: Разделитель полей (bcp -t)
+            row_terminator: Разделитель строк (bcp -r)
+            encoding: Кодировка файлов
+        """
+        self.directory = Path(directory)
+        self.field_terminator = field_terminator
+        self.row_terminator = row_terminator
+        self.encoding = encoding
+
+    @staticmethod
+    def export_command(table_name: str, directory: str, mssql_config: Dict[str, Any],
+                       schema: str = 'ags') -> List[str]:
+        """
+        Команда bcp для выгрузки таблицы в формате, понятном этому читателю.
+
+        Returns:
+            List[str]: Аргументы командной строки bcp
+        """
+        data_file = Path(directory) / f"{schema}.{table_name}.dat"
+        return [
+            'bcp', f"{mssql_config['database']}.{schema}.{table_name}", 'out', str(data_file),
+            '-c', '-t', '\\t', '-C', '65001',
+            '-S', f"{mssql_config['server']},{mssql_config['port']}",
+            '-U', mssql_config['user'], '-P', mssql_config['password']
+        ]
+
+    def _data_path(self, table_name: str, schema: str) -> Path:
+        return self.directory / f"{schema}.{table_name}.dat"
+
+    def _load_columns(self, table_name: str, schema: str) -> List[Dict[str, str]]:
+        with open(self.directory / f"{schema}.{table_name}.columns.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _iter_rows(self, table_name: str, schema: str) -> Iterator[List[str]]:
+        """Чтение строк файла данных без загрузки файла целиком"""
+        with open(self._data_path(table_name, schema), 'r', encoding=self.encoding, newline='') as f:
+            buffer = ''
+            while True:
+                chunk = f.read(1 << 20)
+                if not chunk:
+                    break
+                buffer += chunk
+                *lines, buffer = buffer.split(self.row_terminator)
+                for line in lines:
+                    yield line.split(self.field_terminator)
+            if buffer:
+                yield buffer.split(self.field_terminator)
+
+    def table_exists(self, table_name: str, schema: str = 'ags') -> bool:
+        return self._data_path(table_name, schema).exists()
+
+    def count_rows(self, table_name: str, schema: str = 'ags',
+                   key_column: Optional[str] = None, key_range: Optional[KeyRange] = None) -> int:
+        if not key_column or not key_range:
+            return sum(1 for _ in self._iter_rows(table_name, schema))
+        return sum(len(batch) for batch in self.read_batches(
+            table_name, [key_column], 10000, schema, key_column, key_range
+        ))
+
+    def read_batches(self, table_name: str, columns: Optional[Sequence[str]] = None,
+                     batch_size: BatchSize = 1000, schema: str = 'ags',
+                     key_column: Optional[str] = None,
+                     key_range: Optional[KeyRange] = None) -> Iterator[SourceBatch]:
+        all_columns = self._load_columns(table_name, schema)
+        positions = {c['name'].lower(): i for i, c in enumerate(all_columns)}
+        names = list(columns) if columns else [c['name'] for c in all_columns]
+        indexes = [positions[name.lower()] for name in names]
+        converters = [_BCP_CONVERTERS.get(all_columns[i]['type'].lower()) for i in indexes]
+        key_index = positions[key_column.lower()] if key_column and key_range else None
+        key_converter = _BCP_CONVERTERS.get(all_columns[key_index]['type'].lower()) if key_index is not None else None
+
+        def convert(raw: str, converter):
+            if raw == '':
+                return None
+            return converter(raw) if converter else raw
+
+        batch: List[tuple] = []
+        limit = resolve_batch_size(batch_size)
+        for fields in self._iter_rows(table_name, schema):
+            if key_index is not None and not self._in_range(convert(fields[key_index], key_converter), key_range):
+                continue
+            batch.append(tuple(convert(fields[i], conv) for i, conv in zip(indexes, converters)))
+            if len(batch) >= limit:
+                yield SourceBatch(names, batch)
+                batch = []
+                limit = resolve_batch_size(batch_size)
+        if batch:
+            yield SourceBatch(names, batch)
+
+
+class ParquetSourceReader(SourceReader):
+    """
+    Читатель подготовленных Parquet файлов (pyarrow.dataset).
+
+    Таблица - это файл <directory>/<schema>.<table>.parquet или каталог
+    <directory>/<schema>.<table>/ с файлами *.parquet. Проекция и фильтр
+    по диапазону ключа передаются в pyarrow, поэтому читаются только
+    нужные колонки и row group'ы.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Инициализация ParquetSourceReader.
+
+        Args:
+            directory: Каталог с Parquet файлами
+
+        Raises:
+            ImportError: Если pyarrow не установлен
+        """
+        try:
+            import pyarrow.dataset  # noqa: F401
+        except ImportError as e:
+            raise ImportError("Для ParquetSourceReader требуется pyarrow: pip install pyarrow") from e
+        self.directory = Path(directory)
+
+    def _dataset(self, table_name: str, schema: str):
+        import pyarrow.dataset as ds
+
+        file_path = self.directory / f"{schema}.{table_name}.parquet"
+        if file_path.exists():
+            return ds.dataset(str(file_path), format='parquet')
+        return ds.dataset(str(self.directory / f"{schema}.{table_name}"), format='parquet')
+
+    @staticmethod
+    def _filter(key_column: Optional[str], key_range: Optional[KeyRange]):
+        import pyarrow.dataset as ds
+
+        if not key_column or not key_range:
+            return None
+        low, high = key_range
+        expression = None
+        if low is not None:
+            expression = ds.field(key_column) >= low
+        if high is not None:
+            upper = ds.field(key_column) < high
+            expression = upper if expression is None else expression & upper
+        return expression
+
+    def table_exists(self, table_name: str, schema: str = 'ags') -> bool:
+        return ((self.directory / f"{schema}.{table_name}.parquet").exists()
+                or (self.directory / f"{schema}.{table_name}").is_dir())
+
+    def count_rows(self, table_name: str, schema: str = 'ags',
+                   key_column: Optional[str] = None, key_range: Optional[KeyRange] = None) -> int:
+        return self._dataset(table_name, schema).count_rows(filter=self._filter(key_column, key_range))
+
+    def read_batches(self, table_name: str, columns: Optional[Sequence[str]] = None,
+                     batch_size: BatchSize = 1000, schema: str = 'ags',
+                     key_column: Optional[str] = None,
+                     key_range: Optional[KeyRange] = None) -> Iterator[SourceBatch]:
+        dataset = self._dataset(table_name, schema)
+        names = list(columns) if columns else dataset.schema.names
+        # pyarrow задает размер пакета один раз: адаптивный размер
+        # берется на момент начала чтения
+        for record_batch in dataset.to_batches(columns=names, filter=self._filter(key_column, key_range),
+                                               batch_size=resolve_batch_size(batch_size)):
+            if record_batch.num_rows == 0:
+                continue
+            values = [column.to_pylist() for column in record_batch.columns]
+            yield SourceBatch(names, list(zip(*values)))
+
+
+def create_source_reader(kind: str, **options) -> SourceReader:
+    """
+    Фабричный метод создания читателя источника.
+
+    Args:
+        kind: 'pyodbc', 'bcp' или 'parquet'
+        **options: Параметры конструктора (mssql_config для pyodbc, directory для файлов)
+
+    Returns:
+        SourceReader: Читатель источника
+    """
+    kind = kind.lower()
+    if kind == 'pyodbc':
+        if 'mssql_config' in options:
+            return PyodbcSourceReader.from_config(options['mssql_config'])
+        return PyodbcSourceReader(options.get('connection'), options.get('connection_factory'))
+    if kind == 'bcp':
+        return BcpFileSourceReader(**options)
+    if kind == 'parquet':
+        return ParquetSourceReader(**options)
+    raise ValueError(f"Неизвестный тип источника: {kind}. Используйте 'pyodbc', 'bcp' или 'parquet'")
@@ -0,0 +1,380 @@
+"""
+SourceGovernor - Ограничение нагрузки на исходный MS SQL Server.
+
+Миграция читает рабочий (OLTP) сервер, поэтому нагрузка чтения
+ограничивается глобально на процесс:
+
+    - TokenBucket: лимиты строк/с и байт/с на источник;
+    - SourcePressureMonitor: обратная связь по sys.dm_os_wait_stats
+      (прирост ожиданий ввода-вывода, блокировок, CPU, памяти) и
+      sys.dm_exec_requests (активные и заблокированные запросы);
+    - SourceGovernor: при нагрузке на источнике уменьшает коэффициент
+      скорости вдвое и число параллельных читателей, при спаде
+      нагрузки постепенно возвращает их к настроенным значениям.
+
+Опрос DMV выполняется в потоке читателя не чаще sample_interval и
+требует права VIEW SERVER STATE; без него регулирование выполняется
+только по лимитам.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+# Ожидания, характерные для конкуренции с OLTP нагрузкой
+WAIT_STATS_QUERY = """
+    SELECT SUM(wait_time_ms)
+    FROM sys.dm_os_wait_stats
+    WHERE wait_type LIKE 'PAGEIOLATCH%'
+       OR wait_type LIKE 'LCK_M_%'
+       OR wait_type IN ('RESOURCE_SEMAPHORE', 'SOS_SCHEDULER_YIELD', 'WRITELOG', 'THREADPOOL')
+"""
+
+REQUESTS_QUERY = """
+    SELECT COUNT(*), SUM(CASE WHEN r.blocking_session_id <> 0 THEN 1 ELSE 0 END)
+    FROM sys.dm_exec_requests r
+    JOIN sys.dm_exec_sessions s ON s.session_id = r.session_id
+    WHERE s.is_user_process = 1 AND r.session_id <> @@SPID
+"""
+
+
+class TokenBucket:
+    """
+    Потокобезопасный token bucket.
+
+    rate = 0 означает отсутствие ограничения.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Инициализация TokenBucket.
+
+        Args:
+            rate: Пополнение, единиц в секунду (0 - без ограничения)
+            capacity: Емкость (по умолчанию - секунда пополнения)
+            clock: Монотонные часы
+            sleep: Функция ожидания
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.waited = 0.0
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float) -> None:
+        """Изменение скорости пополнения (емкость - секунда пополнения)"""
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+            self.capacity = float(rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float) -> float:
+        """
+        Получение amount единиц с ожиданием.
+
+        Запрос больше емкости разрешается в долг: следующие запросы
+        ждут, пока долг не будет погашен.
+
+        Returns:
+            float: Время ожидания, секунд
+        """
+        if self.rate <= 0 or amount <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            self.sleep(wait)
+            self.waited += wait
+        return wait
+
+
+class SourcePressureMonitor:
+    """Оценка нагрузки на источник по DMV"""
+
+    def __init__(self, connection_factory: Callable[[], Any], max_wait_ms_per_sec: float = 2000.0,
+                 max_blocked_requests: int = 1, max_active_requests: int = 64,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Инициализация SourcePressureMonitor.
+
+        Args:
+            connection_factory: Функция создания отдельного подключения pyodbc
+            max_wait_ms_per_sec: Допустимый прирост ожиданий, мс за секунду
+            max_blocked_requests: Допустимое число заблокированных запросов
+            max_active_requests: Допустимое число активных пользовательских запросов
+            clock: Монотонные часы
+        """
+        self.connection_factory = connection_factory
+        self.max_wait_ms_per_sec = max_wait_ms_per_sec
+        self.max_blocked_requests = max_blocked_requests
+        self.max_active_requests = max_active_requests
+        self.clock = clock
+        self.available = True
+        self.last_sample: Dict[str, Any] = {}
+        self._connection = None
+        self._previous_wait: Optional[float] = None
+        self._previous_time: Optional[float] = None
+
+    def _query(self, sql: str) -> tuple:
+        if self._connection is None:
+            self._connection = self.connection_factory()
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(sql)
+            return tuple(cursor.fetchone())
+        finally:
+            cursor.close()
+
+    def sample(self) -> Optional[bool]:
+        """
+        Снимок нагрузки.
+
+        Returns:
+            Optional[bool]: True - источник под нагрузкой, False - нет,
+                None - недостаточно данных (первый снимок или DMV недоступны)
+        """
+        if not self.available:
+            return None
+        try:
+            wait_total = float(self._query(WAIT_STATS_QUERY)[0] or 0)
+            active, blocked = self._query(REQUESTS_QUERY)
+        except Exception as e:
+            logger.warning(f"DMV источника недоступны, регулирование только по лимитам: {e}")
+            self.available = False
+            self.close()
+            return None
+
+        now = self.clock()
+        wait_rate = None
+        if self._previous_wait is not None and now > self._previous_time:
+            wait_rate = max(0.0, (wait_total - self._previous_wait) / (now - self._previous_time))
+        self._previous_wait, self._previous_time = wait_total, now
+
+        self.last_sample = {
+            'wait_ms_per_sec': wait_rate,
+            'active_requests': active or 0,
+            'blocked_requests': blocked or 0,
+        }
+        if (blocked or 0) > self.max_blocked_requests or (active or 0) > self.max_active_requests:
+            return True
+        if wait_rate is None:
+            return None
+        return wait_rate > self.max_wait_ms_per_sec
+
+    def close(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+
+class SourceGovernor:
+    """
+    Глобальный регулятор нагрузки на источник.
+
+    Example:
+        >>> governor = get_source_governor(config_loader)
+        >>> with governor.reader_slot():
+        ...     for batch in reader.read_batches('accnt'):
+        ...         governor.throttle(len(batch), payload_bytes)
+    """
+
+    def __init__(self, rows_per_second: float = 0, bytes_per_second: float = 0,
+                 max_readers: int = 4, monitor: Optional[SourcePressureMonitor] = None,
+                 sample_interval: float = 10.0, min_factor: float = 0.05,
+                 decrease_factor: float = 0.5, increase_step: float = 0.1,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Инициализация SourceGovernor.
+
+        Args:
+            rows_per_second: Лимит строк/с (0 - без ограничения)
+            bytes_per_second: Лимит байт/с (0 - без ограничения)
+            max_readers: Максимум одновременных читателей источника
+            monitor: Монитор нагрузки (None - без обратной связи)
+            sample_interval: Интервал опроса DMV, секунд
+            min_factor: Минимальный коэффициент скорости
+            decrease_factor: Множитель коэффициента при нагрузке
+            increase_step: Шаг восстановления коэффициента при спаде нагрузки
+        """
+        self.rows_per_second = rows_per_second
+        self.bytes_per_second = bytes_per_second
+        self.max_readers = max(1, max_readers)
+        self.monitor = monitor
+        self.sample_interval = sample_interval
+        self.min_factor = min_factor
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.clock = clock
+
+        self.factor = 1.0
+        self.readers_limit = self.max_readers
+        self.active_readers = 0
+        self.adjustments = 0
+        self.rows_bucket = TokenBucket(rows_per_second, clock=clock, sleep=sleep)
+        self.bytes_bucket = TokenBucket(bytes_per_second, clock=clock, sleep=sleep)
+        self._last_sample = clock()
+        self._sampling = False
+        self._lock = threading.Lock()
+        self._readers_changed = threading.Condition(self._lock)
+
+    @classmethod
+    def from_config(cls, config_loader) -> 'SourceGovernor':
+        """Регулятор по секции migration.source_throttle и database.mssql"""
+        settings = config_loader.get_config_value('migration.source_throttle', {}) or {}
+        monitor = None
+        if settings.get('monitor_dmv', True):
+            mssql_config = config_loader.get_database_config('mssql')
+
+            def connect():
+                import pyodbc
+
+                return pyodbc.connect(
+                    f"DRIVER={{{mssql_config['driver']}}};"
+                    f"SERVER={mssql_config['server']};"
+                    f"DATABASE={mssql_config['database']};"
+                    f"UID={mssql_config['user']};"
+                    f"PWD={mssql_config['password']}"
+                )
+
+            monitor = SourcePressureMonitor(
+                connect,
+                max_wait_ms_per_sec=settings.get('max_wait_ms_per_sec', 2000),
+                max_blocked_requests=settings.get('max_blocked_requests', 1),
+                max_active_requests=settings.get('max_active_requests', 64)
+            )
+        return cls(
+            rows_per_second=settings.get('rows_per_second', 0),
+            bytes_per_second=settings.get('bytes_per_second_mb', 0) * 1024 * 1024,
+            max_readers=settings.get('max_readers', 4),
+            monitor=monitor,
+            sample_interval=settings.get('sample_interval', 10),
+            min_factor=settings.get('min_factor', 0.05)
+        )
+
+    @contextmanager
+    def reader_slot(self) -> Iterator[None]:
+        """Слот параллельного читателя (ожидание, пока число читателей выше предела)"""
+        with self._readers_changed:
+            while self.active_readers >= self.readers_limit:
+                self._readers_changed.wait()
+            self.active_readers += 1
+        try:
+            yield
+        finally:
+            with self._readers_changed:
+                self.active_readers -= 1
+                self._readers_changed.notify_all()
+
+    def throttle(self, rows: int, payload_bytes: int = 0) -> float:
+        """
+        Учет прочитанного пакета: ожидание по лимитам и, не чаще
+        sample_interval, проверка нагрузки источника.
+
+        Returns:
+            float: Время ожидания, секунд
+        """
+        self._maybe_sample()
+        return self.rows_bucket.acquire(rows) + self.bytes_bucket.acquire(payload_bytes)
+
+    def _maybe_sample(self) -> None:
+        if self.monitor is None:
+            return
+        with self._lock:
+            if self._sampling or self.clock() - self._last_sample < self.sample_interval:
+                return
+            self._sampling = True
+        try:
+            pressure = self.monitor.sample()
+        finally:
+            with self._lock:
+                self._sampling = False
+                self._last_sample = self.clock()
+        if pressure is not None:
+            self.adjust(pressure)
+
+    def adjust(self, pressure: bool) -> None:
+        """
+        Изменение коэффициента скорости и числа читателей (AIMD).
+
+        Args:
+            pressure: Источник под нагрузкой
+        """
+        with self._readers_changed:
+            previous = self.factor
+            if pressure:
+                self.factor = max(self.min_factor, self.factor * self.decrease_factor)
+            else:
+                self.factor = min(1.0, round(self.factor + self.increase_step, 6))
+            if self.factor == previous:
+                return
+            self.adjustments += 1
+            self.readers_limit = max(1, round(self.max_readers * self.factor))
+            self._readers_changed.notify_all()
+        self.rows_bucket.set_rate(self.rows_per_second * self.factor)
+        self.bytes_bucket.set_rate(self.bytes_per_second * self.factor)
+        logger.info(f"Нагрузка источника {'высокая' if pressure else 'снизилась'}: коэффициент скорости "
+                    f"{previous:.2f} -> {self.factor:.2f}, читателей {self.readers_limit} "
+                    f"({self.monitor.last_sample if self.monitor else {}})")
+
+    def summary(self) -> Dict[str, Any]:
+        """Состояние регулятора"""
+        return {
+            'factor': round(self.factor, 3),
+            'readers_limit': self.readers_limit,
+            'adjustments': self.adjustments,
+            'rows_wait_s': round(self.rows_bucket.waited, 3),
+            'bytes_wait_s': round(self.bytes_bucket.waited, 3),
+            'last_sample': self.monitor.last_sample if self.monitor else {},
+        }
+
+
+_source_governor: Optional[SourceGovernor] = None
+_source_governor_lock = threading.Lock()
+
+
+def get_source_governor(config_loader=None) -> SourceGovernor:
+    """
+    Регулятор нагрузки на источник на процесс.
+
+    Args:
+        config_loader: Загрузчик конфигурации (нужен при первом обращении)
+    """
+    global _source_governor
+    if _source_governor is None:
+        with _source_governor_lock:
+            if _source_governor is None:
+                _source_governor = (SourceGovernor.from_config(config_loader)
+                                    if config_loader else SourceGovernor())
+    return _source_governor
+
+
+def reset_source_governor() -> None:
+    """Сброс регулятора процесса (для тестов и после изменения конфигурации)"""
+    global _source_governor
+    with _source_governor_lock:
+        if _source_governor is not None and _source_governor.monitor is not None:
+            _source_governor.monitor.close()
+        _source_governor = None
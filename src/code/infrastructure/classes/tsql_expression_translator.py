@@ -0,0 +1,752 @@
+"""
+TSqlExpressionTranslator - Перевод выражений T-SQL в PostgreSQL.
+
+Выражение вычисляемой колонки разбирается на токены и в дерево
+(вызовы функций, CASE, CAST/CONVERT, операторы). Правила
+mcl.function_mapping_rules применяются к каждому вызову рекурсивно,
+начиная с самых вложенных, поэтому выражения с несколькими
+функциями переводятся без ручного разбора.
+
+Переводы запоминаются по нормализованному выражению (регистр
+ключевых слов, пробелы), ссылки на колонки подставляются после
+перевода - одинаковые выражения разных таблиц переводятся один раз.
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+class TranslationError(Exception):
+    """Ошибка разбора или перевода выражения"""
+    pass
+
+
+# Функции, которые в PostgreSQL называются и работают так же
+IDENTICAL_FUNCTIONS = {
+    'abs', 'ceiling', 'floor', 'round', 'power', 'sqrt', 'exp', 'sign',
+    'upper', 'lower', 'ltrim', 'rtrim', 'replace', 'coalesce', 'nullif', 'reverse',
+    'left', 'right', 'substring', 'concat',
+}
+
+# Функции с первым аргументом-частью даты (day, month, ...)
+DATEPART_FUNCTIONS = {'dateadd', 'datediff', 'datediff_big', 'datepart', 'datename', 'datetrunc'}
+
+# Функции T-SQL, возвращающие строки (для выбора || вместо +)
+STRING_FUNCTIONS = {
+    'left', 'right', 'substring', 'ltrim', 'rtrim', 'trim', 'upper', 'lower', 'replace',
+    'str', 'char', 'nchar', 'concat', 'format', 'replicate', 'reverse', 'stuff', 'datename',
+}
+
+STRING_TYPES = {'char', 'varchar', 'nchar', 'nvarchar', 'text', 'ntext', 'character varying', 'character'}
+
+# Значения без скобок, одинаковые в T-SQL и PostgreSQL
+VALUE_KEYWORDS = {'CURRENT_TIMESTAMP', 'CURRENT_USER', 'SESSION_USER', 'NULL'}
+
+# Типы T-SQL -> типы PostgreSQL для CAST/CONVERT
+TYPE_MAP = {
+    'int': 'integer', 'bigint': 'bigint', 'smallint': 'smallint', 'tinyint': 'smallint',
+    'bit': 'boolean', 'float': 'double precision', 'real': 'real',
+    'decimal': 'numeric', 'numeric': 'numeric', 'money': 'numeric(19,4)', 'smallmoney': 'numeric(10,4)',
+    'char': 'char', 'nchar': 'char', 'varchar': 'varchar', 'nvarchar': 'varchar',
+    'text': 'text', 'ntext': 'text', 'sysname': 'varchar(128)',
+    'datetime': 'timestamp', 'datetime2': 'timestamp', 'smalldatetime': 'timestamp',
+    'datetimeoffset': 'timestamptz', 'date': 'date', 'time': 'time',
+    'uniqueidentifier': 'uuid', 'binary': 'bytea', 'varbinary': 'bytea', 'image': 'bytea',
+}
+
+# Функции PostgreSQL без скобок (правило direct getdate -> CURRENT_TIMESTAMP)
+SQL_VALUE_FUNCTIONS = {'current_timestamp', 'current_date', 'current_time', 'localtimestamp', 'localtime'}
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<string>N?'(?:[^']|'')*')
+  | (?P<hex>0x[0-9A-Fa-f]*)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<bracket>\[(?:[^\]]|\]\])*\])
+  | (?P<quoted>"(?:[^"]|"")*")
+  | (?P<variable>@@?\w+)
+  | (?P<name>[A-Za-z_\#][\w\#\$]*)
+  | (?P<op><>|!=|<=|>=|!<|!>|[-+*/%=<>&|^~(),.])
+""", re.VERBOSE)
+
+KEYWORDS = {
+    'CASE', 'WHEN', 'THEN', 'ELSE', 'END', 'AND', 'OR', 'NOT', 'IS', 'NULL', 'IN',
+    'LIKE', 'BETWEEN', 'ESCAPE', 'AS', 'CAST', 'CONVERT', 'TRY_CAST', 'TRY_CONVERT',
+}
+
+# Приоритеты бинарных операторов T-SQL
+PRECEDENCE = {
+    'OR': 10, 'AND': 20,
+    '=': 40, '<>': 40, '!=': 40, '<': 40, '>': 40, '<=': 40, '>=': 40, '!<': 40, '!>': 40,
+    'IS': 40, 'IN': 40, 'LIKE': 40, 'BETWEEN': 40, 'NOT': 40,
+    '+': 50, '-': 50, '&': 50, '|': 50, '^': 50,
+    '*': 60, '/': 60, '%': 60,
+}
+
+# Приоритеты арифметических операторов PostgreSQL. Побитовые &, |, #
+# и || в PostgreSQL - "прочие" операторы: ниже + и -, тогда как в T-SQL
+# &, |, ^ имеют приоритет + и -
+PG_PRECEDENCE = {'*': 60, '/': 60, '%': 60, '+': 50, '-': 50}
+PG_OTHER_PRECEDENCE = 45
+
+
+class Token:
+    """Токен выражения"""
+
+    __slots__ = ('kind', 'value')
+
+    def __init__(self, kind: str, value: str):
+        self.kind = kind
+        self.value = value
+
+    @property
+    def normalized(self) -> str:
+        """Представление для ключа кэша"""
+        if self.kind == 'name':
+            upper = self.value.upper()
+            return upper if upper in KEYWORDS or upper in VALUE_KEYWORDS else f"[{self.value.lower()}]"
+        if self.kind in ('bracket', 'quoted'):
+            return f"[{self.value[1:-1].lower()}]"
+        return self.value
+
+    def __repr__(self) -> str:
+        return f"Token({self.kind}, {self.value!r})"
+
+
+def tokenize(expression: str) -> List[Token]:
+    """
+    Разбор выражения T-SQL на токены.
+
+    Raises:
+        TranslationError: Недопустимый символ
+    """
+    tokens = []
+    position = 0
+    length = len(expression)
+    while position < length:
+        match = _TOKEN_RE.match(expression, position)
+        if not match:
+            raise TranslationError(f"Недопустимый символ в позиции {position}: {expression[position]!r}")
+        kind = match.lastgroup
+        if kind != 'ws':
+            tokens.append(Token(kind, match.group()))
+        position = match.end()
+    return tokens
+
+
+# Узлы дерева выражения: кортежи (тип, ...)
+#   ('literal', text)                 ('column', name)
+#   ('keyword', text)                 ('call', name, args)
+#   ('datepart', text)                ('cast', expr, type, try)
+#   ('convert', type, expr, style, try)
+#   ('case', operand, [(when, then)], else)
+#   ('binary', op, left, right)       ('unary', op, operand)
+#   ('paren', expr)                   ('is_null', expr, negated)
+#   ('in', expr, items, negated)      ('like', expr, pattern, escape, negated)
+#   ('between', expr, low, high, negated)
+#   ('type', name, params)
+
+
+class _Parser:
+    """Рекурсивный разбор выражения по приоритетам операторов"""
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> Optional[Token]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def peek_word(self, offset: int = 0) -> Optional[str]:
+        token = self.peek(offset)
+        if token is None:
+            return None
+        return token.value.upper() if token.kind in ('name', 'op') else None
+
+    def advance(self) -> Token:
+        token = self.peek()
+        if token is None:
+            raise TranslationError("Неожиданный конец выражения")
+        self.position += 1
+        return token
+
+    def expect(self, word: str) -> Token:
+        token = self.advance()
+        if token.value.upper() != word:
+            raise TranslationError(f"Ожидалось {word}, получено {token.value}")
+        return token
+
+    def parse(self):
+        node = self.parse_expression()
+        if self.peek() is not None:
+            raise TranslationError(f"Лишний токен: {self.peek().value}")
+        return node
+
+    def parse_expression(self, min_precedence: int = 0):
+        if self.peek_word() == 'NOT':
+            self.advance()
+            left = ('unary', 'NOT', self.parse_expression(30))
+        else:
+            left = self.parse_operand()
+
+        while True:
+            word = self.peek_word()
+            if word == 'NOT' and self.peek_word(1) in ('IN', 'LIKE', 'BETWEEN'):
+                precedence = PRECEDENCE['NOT']
+            elif word in PRECEDENCE and word != 'NOT':
+                precedence = PRECEDENCE[word]
+            else:
+                break
+            if precedence <= min_precedence:
+                break
+            left = self.parse_infix(left, precedence)
+        return left
+
+    def parse_infix(self, left, precedence: int):
+        word = self.advance().value.upper()
+        negated = False
+        if word == 'NOT':
+            negated = True
+            word = self.advance().value.upper()
+
+        if word == 'IS':
+            if self.peek_word() == 'NOT':
+                self.advance()
+                negated = True
+            self.expect('NULL')
+            return ('is_null', left, negated)
+        if word == 'IN':
+            self.expect('(')
+            items = [self.parse_expression()]
+            while self.peek_word() == ',':
+                self.advance()
+                items.append(self.parse_expression())
+            self.expect(')')
+            return ('in', left, items, negated)
+        if word == 'LIKE':
+            pattern = self.parse_expression(precedence)
+            escape = None
+            if self.peek_word() == 'ESCAPE':
+                self.advance()
+                escape = self.parse_expression(precedence)
+            return ('like', left, pattern, escape, negated)
+        if word == 'BETWEEN':
+            low = self.parse_expression(PRECEDENCE['AND'])
+            self.expect('AND')
+            high = self.parse_expression(PRECEDENCE['AND'])
+            return ('between', left, low, high, negated)
+
+        right = self.parse_expression(precedence)
+        return ('binary', word, left, right)
+
+    def parse_operand(self):
+        token = self.advance()
+        kind, value = token.kind, token.value
+        upper = value.upper()
+
+        if kind in ('string', 'number', 'hex'):
+            return ('literal', value)
+        if kind == 'variable':
+            raise TranslationError(f"Переменные не поддерживаются: {value}")
+        if kind in ('bracket', 'quoted'):
+            return self.parse_column(value[1:-1].replace(']]', ']').replace('""', '"'))
+        if kind == 'op':
+            if value == '(':
+                node = self.parse_expression()
+                self.expect(')')
+                return ('paren', node)
+            if value in ('-', '+', '~'):
+                return ('unary', value, self.parse_expression(70))
+            raise TranslationError(f"Неожиданный оператор: {value}")
+
+        # Имена и ключевые слова
+        if upper == 'CASE':
+            return self.parse_case()
+        if upper in ('CAST', 'TRY_CAST'):
+            self.expect('(')
+            expr = self.parse_expression()
+            self.expect('AS')
+            data_type = self.parse_type()
+            self.expect(')')
+            return ('cast', expr, data_type, upper == 'TRY_CAST')
+        if upper in ('CONVERT', 'TRY_CONVERT'):
+            self.expect('(')
+            data_type = self.parse_type()
+            self.expect(',')
+            expr = self.parse_expression()
+            style = None
+            if self.peek_word() == ',':
+                self.advance()
+                style = self.parse_expression()
+            self.expect(')')
+            return ('convert', data_type, expr, style, upper == 'TRY_CONVERT')
+        if upper in VALUE_KEYWORDS:
+            return ('keyword', upper)
+        if upper in KEYWORDS:
+            raise TranslationError(f"Неожиданное ключевое слово: {value}")
+        if self.peek_word() == '(':
+            return self.parse_call(value)
+        return self.parse_column(value)
+
+    def parse_column(self, name: str):
+        # Составные имена (alias.column) сводятся к имени колонки
+        while self.peek_word() == '.':
+            self.advance()
+            token = self.advance()
+            name = token.value[1:-1] if token.kind in ('bracket', 'quoted') else token.value
+        return ('column', name)
+
+    def parse_call(self, name: str):
+        self.expect('(')
+        lowered = name.lower()
+        args = []
+        if self.peek_word() != ')':
+            if lowered in DATEPART_FUNCTIONS:
+                args.append(('datepart', self.advance().value.lower()))
+            else:
+                args.append(self.parse_expression())
+            while self.peek_word() == ',':
+                self.advance()
+                args.append(self.parse_expression())
+        self.expect(')')
+        return ('call', lowered, args)
+
+    def parse_case(self):
+        operand = None
+        if self.peek_word() != 'WHEN':
+            operand = self.parse_expression()
+        whens = []
+        while self.peek_word() == 'WHEN':
+            self.advance()
+            condition = self.parse_expression()
+            self.expect('THEN')
+            whens.append((condition, self.parse_expression()))
+        if not whens:
+            raise TranslationError("CASE без WHEN")
+        otherwise = None
+        if self.peek_word() == 'ELSE':
+            self.advance()
+            otherwise = self.parse_expression()
+        self.expect('END')
+        return ('case', operand, whens, otherwise)
+
+    def parse_type(self):
+        token = self.advance()
+        name = (token.value[1:-1] if token.kind == 'bracket' else token.value).lower()
+        params = None
+        if self.peek_word() == '(':
+            self.advance()
+            params = [self.advance().value.lower()]
+            while self.peek_word() == ',':
+                self.advance()
+                params.append(self.advance().value.lower())
+            self.expect(')')
+        return ('type', name, params)
+
+
+def parse_expression(expression: str):
+    """
+    Разбор выражения T-SQL в дерево.
+
+    Raises:
+        TranslationError: Ошибка разбора
+    """
+    return _Parser(tokenize(expression)).parse()
+
+
+def collect_functions(node) -> List[str]:
+    """Имена всех вызываемых функций дерева (в порядке обхода, нижний регистр)"""
+    functions = []
+
+    def walk(item):
+        if isinstance(item, tuple) and item and isinstance(item[0], str):
+            kind = item[0]
+            if kind == 'call':
+                functions.append(item[1])
+            elif kind in ('cast', 'convert'):
+                functions.append('try_' + kind if item[-1] else kind)
+            elif kind == 'case':
+                functions.append('case')
+            for child in item[1:]:
+                walk(child)
+        elif isinstance(item, (list, tuple)):
+            for child in item:
+                walk(child)
+
+    walk(node)
+    return functions
+
+
+class TranslationResult:
+    """
+    Результат перевода выражения.
+
+    Attributes:
+        source_expression: Исходное выражение T-SQL
+        target_expression: Выражение PostgreSQL (None при ошибке разбора)
+        functions: Функции выражения
+        unmapped_functions: Функции без правила маппинга
+        notes: Замечания перевода
+    """
+
+    __slots__ = ('source_expression', 'target_expression', 'functions', 'unmapped_functions', 'notes')
+
+    def __init__(self, source_expression: str, target_expression: Optional[str],
+                 functions: List[str], unmapped_functions: List[str], notes: List[str]):
+        self.source_expression = source_expression
+        self.target_expression = target_expression
+        self.functions = functions
+        self.unmapped_functions = unmapped_functions
+        self.notes = notes
+
+    @property
+    def success(self) -> bool:
+        """Выражение переведено полностью"""
+        return self.target_expression is not None and not self.unmapped_functions
+
+    def to_dict(self) -> dict:
+        """Преобразование в словарь для JSON"""
+        return {
+            'source_expression': self.source_expression,
+            'target_expression': self.target_expression,
+            'success': self.success,
+            'functions': self.functions,
+            'unmapped_functions': self.unmapped_functions,
+            'notes': self.notes
+        }
+
+
+_PLACEHOLDER_RE = re.compile(r'femcl__c(\d+)__')
+_SIMPLE_IDENTIFIER_RE = re.compile(r'[a-z_][a-z0-9_]*')
+
+
+def quote_identifier(name: str) -> str:
+    """Имя колонки PostgreSQL: простые имена без кавычек, остальные в кавычках"""
+    if _SIMPLE_IDENTIFIER_RE.fullmatch(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+class _Template:
+    """Запомненный перевод с местами подстановки колонок"""
+
+    __slots__ = ('target', 'functions', 'unmapped', 'notes')
+
+    def __init__(self, target: Optional[str], functions: List[str], unmapped: List[str], notes: List[str]):
+        self.target = target
+        self.functions = functions
+        self.unmapped = unmapped
+        self.notes = notes
+
+
+class TSqlExpressionTranslator:
+    """
+    Переводчик выражений T-SQL в PostgreSQL.
+
+    Example:
+        >>> translator = TSqlExpressionTranslator(get_rule_cache(config_loader))
+        >>> result = translator.translate("isnull([Qty], 0) * [Price]",
+        ...                               column_map={'qty': 'qty', 'price': 'price'})
+        >>> result.target_expression
+        'coalesce("qty", 0) * "price"'
+    """
+
+    # Предел запомненных переводов на процесс
+    MAX_TEMPLATES = 50_000
+
+    _templates: Dict[Tuple, _Template] = {}
+    _templates_lock = threading.Lock()
+
+    def __init__(self, rule_cache=None):
+        """
+        Инициализация переводчика.
+
+        Args:
+            rule_cache: FunctionMappingRuleCache (None - только встроенные преобразования)
+        """
+        self.rule_cache = rule_cache
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Сброс запомненных переводов"""
+        with cls._templates_lock:
+            cls._templates = {}
+
+    @classmethod
+    def cache_size(cls) -> int:
+        return len(cls._templates)
+
+    def translate(self, expression: str, column_map: Optional[Dict[str, str]] = None,
+                  column_types: Optional[Dict[str, str]] = None) -> TranslationResult:
+        """
+        Перевод выражения.
+
+        Args:
+            expression: Выражение T-SQL
+            column_map: Исходное имя колонки (нижний регистр) -> целевое имя
+            column_types: Исходное имя колонки (нижний регистр) -> тип MS SQL
+
+        Returns:
+            TranslationResult: Результат перевода
+        """
+        column_types = column_types or {}
+        try:
+            tokens = tokenize(expression or '')
+        except TranslationError as e:
+            return TranslationResult(expression, None, [], [], [str(e)])
+
+        # Колонки в порядке первого появления и признак строкового типа
+        columns: List[str] = []
+        for token in tokens:
+            if token.kind in ('bracket', 'quoted') or (
+                    token.kind == 'name' and token.value.upper() not in KEYWORDS
+                    and token.value.upper() not in VALUE_KEYWORDS):
+                name = token.normalized[1:-1]
+                if name not in columns:
+                    columns.append(name)
+        string_flags = tuple(self._is_string_type(column_types.get(name)) for name in columns)
+
+        rules_version = None
+        if self.rule_cache:
+            self.rule_cache.refresh()
+            rules_version = (id(self.rule_cache), self.rule_cache.loads)
+        key = (rules_version, ' '.join(token.normalized for token in tokens), string_flags)
+
+        template = self._templates.get(key)
+        if template is None:
+            template = self._build_template(tokens, columns, string_flags)
+            with self._templates_lock:
+                if len(self._templates) >= self.MAX_TEMPLATES:
+                    type(self)._templates = {}
+                self._templates[key] = template
+
+        target = template.target
+        if target is not None:
+            def substitute(match):
+                name = columns[int(match.group(1))]
+                if column_map and name in column_map:
+                    return f'"{column_map[name]}"'
+                return quote_identifier(name)
+            target = _PLACEHOLDER_RE.sub(substitute, target)
+
+        return TranslationResult(expression, target, list(template.functions),
+                                 list(template.unmapped), list(template.notes))
+
+    @staticmethod
+    def _is_string_type(data_type: Optional[str]) -> bool:
+        if not data_type:
+            return False
+        return data_type.lower().split('(')[0].strip() in STRING_TYPES
+
+    def _build_template(self, tokens: List[Token], columns: List[str], string_flags: Tuple) -> _Template:
+        """Разбор и перевод выражения с местами подстановки колонок"""
+        try:
+            tree = _Parser(tokens).parse()
+        except TranslationError as e:
+            return _Template(None, [], [], [str(e)])
+
+        renderer = _Renderer(self.rule_cache, {name: i for i, name in enumerate(columns)}, string_flags)
+        try:
+            target = renderer.render(tree)
+        except TranslationError as e:
+            return _Template(None, collect_functions(tree), [], [str(e)])
+        return _Template(target, collect_functions(tree), renderer.unmapped, renderer.notes)
+
+
+class _Renderer:
+    """Построение выражения PostgreSQL по дереву"""
+
+    def __init__(self, rule_cache, column_index: Dict[str, int], string_flags: Tuple):
+        self.rule_cache = rule_cache
+        self.column_index = column_index
+        self.string_flags = string_flags
+        self.unmapped: List[str] = []
+        self.notes: List[str] = []
+
+    def rule(self, name: str):
+        return self.rule_cache.rules.get(name) if self.rule_cache else None
+
+    def is_string(self, node) -> bool:
+        """Выражение строкового типа (для выбора || вместо +)"""
+        kind = node[0]
+        if kind == 'literal':
+            return node[1].startswith(("'", "N'"))
+        if kind == 'column':
+            index = self.column_index.get(node[1].lower())
+            return index is not None and self.string_flags[index]
+        if kind == 'paren':
+            return self.is_string(node[1])
+        if kind == 'call':
+            return node[1] in STRING_FUNCTIONS
+        if kind == 'cast':
+            return node[2][1] in STRING_TYPES
+        if kind == 'convert':
+            return node[1][1] in STRING_TYPES
+        if kind == 'binary' and node[1] == '+':
+            return self.is_string(node[2]) or self.is_string(node[3])
+        if kind == 'case':
+            return any(self.is_string(then) for _, then in node[2])
+        return False
+
+    def render_type(self, node) -> str:
+        _, name, params = node
+        mapped = TYPE_MAP.get(name, name)
+        if params and params[0] == 'max':
+            return 'bytea' if mapped == 'bytea' else 'text'
+        if params and '(' not in mapped and mapped not in ('integer', 'bigint', 'smallint', 'boolean',
+                                                            'double precision', 'real', 'bytea', 'uuid',
+                                                            'timestamp', 'timestamptz', 'date', 'text'):
+            return f"{mapped}({','.join(params)})"
+        return mapped
+
+    def render(self, node) -> str:
+        kind = node[0]
+
+        if kind == 'literal':
+            value = node[1]
+            if value.startswith("N'"):
+                return value[1:]
+            if value.lower().startswith('0x'):
+                return f"'\\x{value[2:]}'::bytea"
+            return value
+        if kind == 'keyword':
+            return node[1]
+        if kind == 'datepart':
+            return node[1]
+        if kind == 'column':
+            index = self.column_index.get(node[1].lower())
+            return f"femcl__c{index}__" if index is not None else quote_identifier(node[1].lower())
+        if kind == 'paren':
+            return f"({self.render(node[1])})"
+        if kind == 'unary':
+            operand = self.render(node[2])
+            if node[1] == 'NOT':
+                return f"NOT {operand}"
+            return f"{node[1]}{operand}"
+        if kind == 'binary':
+            return self.render_binary(node)
+        if kind == 'is_null':
+            return f"{self.render(node[1])} IS {'NOT ' if node[2] else ''}NULL"
+        if kind == 'in':
+            items = ', '.join(self.render(item) for item in node[2])
+            return f"{self.render(node[1])} {'NOT ' if node[3] else ''}IN ({items})"
+        if kind == 'like':
+            result = f"{self.render(node[1])} {'NOT ' if node[4] else ''}LIKE {self.render(node[2])}"
+            if node[3] is not None:
+                result += f" ESCAPE {self.render(node[3])}"
+            return result
+        if kind == 'between':
+            return (f"{self.render(node[1])} {'NOT ' if node[4] else ''}BETWEEN "
+                    f"{self.render(node[2])} AND {self.render(node[3])}")
+        if kind == 'case':
+            parts = ['CASE']
+            if node[1] is not None:
+                parts.append(self.render(node[1]))
+            for condition, result in node[2]:
+                parts.append(f"WHEN {self.render(condition)} THEN {self.render(result)}")
+            if node[3] is not None:
+                parts.append(f"ELSE {self.render(node[3])}")
+            parts.append('END')
+            return ' '.join(parts)
+        if kind == 'cast':
+            if node[3]:
+                return self.render_unmapped('try_cast', f"TRY_CAST({self.render(node[1])} AS {node[2][1]})")
+            return f"CAST({self.render(node[1])} AS {self.render_type(node[2])})"
+        if kind == 'convert':
+            return self.render_convert(node)
+        if kind == 'call':
+            return self.render_call(node)
+        raise TranslationError(f"Неизвестный узел выражения: {kind}")
+
+    def binary_operator(self, node) -> str:
+        """Оператор PostgreSQL для бинарного узла"""
+        _, op, left, right = node
+        if op == '+' and (self.is_string(left) or self.is_string(right)):
+            return '||'
+        return {'!=': '<>', '!<': '>=', '!>': '<=', '^': '#'}.get(op, op)
+
+    def render_binary(self, node) -> str:
+        _, _, left, right = node
+        op = self.binary_operator(node)
+
+        precedence = PRECEDENCE.get(node[1], 0)
+        left_sql, right_sql = self.render(left), self.render(right)
+        # Приоритеты арифметики, побитовых операторов и || в PostgreSQL
+        # отличаются от T-SQL - левый операнд другой группы PostgreSQL
+        # и любой бинарный правый операнд фиксируются скобками
+        if precedence >= 50:
+            group = PG_PRECEDENCE.get(op, PG_OTHER_PRECEDENCE)
+            if left[0] == 'binary':
+                left_op = self.binary_operator(left)
+                if PG_PRECEDENCE.get(left_op, PG_OTHER_PRECEDENCE) != group or op == '||':
+                    left_sql = f"({left_sql})"
+            if right[0] == 'binary':
+                right_sql = f"({right_sql})"
+        return f"{left_sql} {op} {right_sql}"
+
+    def render_convert(self, node) -> str:
+        _, data_type, expr, style, is_try = node
+        name = 'try_convert' if is_try else 'convert'
+        rule = self.rule(name)
+        if rule is not None:
+            args = [data_type[1] + (f"({','.join(data_type[2])})" if data_type[2] else ''), self.render(expr)]
+            if style is not None:
+                args.append(self.render(style))
+            return self.apply_rule(rule, f"{name}({', '.join(args)})")
+        if is_try:
+            return self.render_unmapped(name, f"TRY_CONVERT({data_type[1]}, {self.render(expr)})")
+        if style is not None:
+            self.notes.append(f"Стиль CONVERT {self.render(style)} не переносится, используется CAST")
+        return f"CAST({self.render(expr)} AS {self.render_type(data_type)})"
+
+    def render_call(self, node) -> str:
+        _, name, args = node
+        rendered_args = [self.render(arg) for arg in args]
+        call_sql = f"{name}({', '.join(rendered_args)})"
+
+        rule = self.rule(name)
+        if rule is not None:
+            if rule.mapping_type == 'direct':
+                target = rule.target_function
+                if not rendered_args and target.lower() in SQL_VALUE_FUNCTIONS:
+                    return target
+                return f"{target}({', '.join(rendered_args)})"
+            return self.apply_rule(rule, call_sql)
+
+        if name in IDENTICAL_FUNCTIONS:
+            return call_sql
+        if name == 'iif' and len(args) == 3:
+            return f"CASE WHEN {rendered_args[0]} THEN {rendered_args[1]} ELSE {rendered_args[2]} END"
+        return self.render_unmapped(name, call_sql)
+
+    def apply_rule(self, rule, call_sql: str) -> str:
+        result = self.rule_cache.apply(call_sql, rule)
+        if result == call_sql and rule.source_function.lower() != rule.target_function.lower():
+            self.notes.append(f"Правило {rule.source_function} не изменило вызов: {call_sql}")
+        return result
+
+    def render_unmapped(self, name: str, call_sql: str) -> str:
+        if name not in self.unmapped:
+            self.unmapped.append(name)
+        return call_sql
+
+
+_translator: Optional[TSqlExpressionTranslator] = None
+
+
+def get_tsql_translator(config_loader=None) -> TSqlExpressionTranslator:
+    """
+    Переводчик выражений, связанный с кэшем правил процесса.
+
+    Args:
+        config_loader: Загрузчик конфигурации (для подключения к mcl)
+    """
+    global _translator
+    from .function_mapping_cache import get_rule_cache
+
+    rule_cache = get_rule_cache(config_loader)
+    if _translator is None or _translator.rule_cache is not rule_cache:
+        _translator = TSqlExpressionTranslator(rule_cache)
+    return _translator
@@ -1,14 +1,300 @@
 """
 Модуль анализа структуры исходной БД MS SQL Server
-Планируется к реализации
+
+Каталог всей базы читается несколькими пакетными запросами к sys.*
+(по одному на вид объектов), без запросов по каждой таблице.
+Результат - CatalogSnapshot со строками каталога в памяти.
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+# Пакетные запросы к каталогу: один запрос на вид объектов для всей БД
+CATALOG_QUERIES: Dict[str, str] = {
+    'tables': """
+        SELECT s.name AS schema_name, t.name AS table_name, t.object_id,
+               t.create_date, {modify_date} AS modify_date,
+               ISNULL(p.row_count, 0) AS row_count,
+               ISNULL(a.total_bytes, 0) AS table_size
+        FROM sys.tables t
+        JOIN sys.schemas s ON s.schema_id = t.schema_id
+        LEFT JOIN (
+            SELECT object_id, SUM(rows) AS row_count
+            FROM sys.partitions
+            WHERE index_id IN (0, 1)
+            GROUP BY object_id
+        ) p ON p.object_id = t.object_id
+        LEFT JOIN (
+            SELECT p.object_id, SUM(a.used_pages) * 8192 AS total_bytes
+            FROM sys.partitions p
+            JOIN sys.allocation_units a ON a.container_id = p.partition_id
+            GROUP BY p.object_id
+        ) a ON a.object_id = t.object_id
+        WHERE t.is_ms_shipped = 0
+    """,
+    'columns': """
+        SELECT s.name AS schema_name, t.name AS table_name, c.name AS column_name,
+               c.column_id AS ordinal_position, ty.name AS type_name,
+               c.max_length, c.precision, c.scale, c.is_nullable, c.is_identity,
+               CAST(ic.seed_value AS bigint) AS identity_seed,
+               CAST(ic.increment_value AS bigint) AS identity_increment,
+               c.is_computed, cc.definition AS computed_definition,
+               ISNULL(cc.is_persisted, 0) AS is_persisted,
+               dc.name AS default_name, dc.definition AS default_definition,
+               ISNULL(dc.is_system_named, 0) AS default_is_system_named,
+               c.collation_name
+        FROM sys.columns c
+        JOIN sys.tables t ON t.object_id = c.object_id
+        JOIN sys.schemas s ON s.schema_id = t.schema_id
+        JOIN sys.types ty ON ty.user_type_id = c.user_type_id
+        LEFT JOIN sys.identity_columns ic ON ic.object_id = c.object_id AND ic.column_id = c.column_id
+        LEFT JOIN sys.computed_columns cc ON cc.object_id = c.object_id AND cc.column_id = c.column_id
+        LEFT JOIN sys.default_constraints dc ON dc.parent_object_id = c.object_id
+                                            AND dc.parent_column_id = c.column_id
+        WHERE t.is_ms_shipped = 0
+    """,
+    'indexes': """
+        SELECT s.name AS schema_name, t.name AS table_name, i.name AS index_name,
+               i.type_desc AS index_type, i.is_unique, i.is_primary_key,
+               i.is_unique_constraint, i.is_disabled, i.fill_factor, i.is_padded,
+               i.allow_row_locks, i.allow_page_locks
+        FROM sys.indexes i
+        JOIN sys.tables t ON t.object_id = i.object_id
+        JOIN sys.schemas s ON s.schema_id = t.schema_id
+        WHERE t.is_ms_shipped = 0 AND i.type IN (1, 2) AND i.name IS NOT NULL
+    """,
+    'index_columns': """
+        SELECT s.name AS schema_name, t.name AS table_name, i.name AS index_name,
+               c.name AS column_name, ic.key_ordinal, ic.index_column_id,
+               ic.is_descending_key AS is_descending, ic.is_included_column
+        FROM sys.index_columns ic
+        JOIN sys.indexes i ON i.object_id = ic.object_id AND i.index_id = ic.index_id
+        JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+        JOIN sys.tables t ON t.object_id = i.object_id
+        JOIN sys.schemas s ON s.schema_id = t.schema_id
+        WHERE t.is_ms_shipped = 0 AND i.type IN (1, 2) AND i.name IS NOT NULL
+    """,
+    'foreign_keys': """
+        SELECT s.name AS schema_name, t.name AS table_name, fk.name AS constraint_name,
+               rs.name AS referenced_schema, rt.name AS referenced_table,
+               fk.delete_referential_action_desc AS delete_action,
+               fk.update_referential_action_desc AS update_action,
+               fk.is_disabled, fk.is_not_trusted
+        FROM sys.foreign_keys fk
+        JOIN sys.tables t ON t.object_id = fk.parent_object_id
+        JOIN sys.schemas s ON s.schema_id = t.schema_id
+        JOIN sys.tables rt ON rt.object_id = fk.referenced_object_id
+        JOIN sys.schemas rs ON rs.schema_id = rt.schema_id
+        WHERE t.is_ms_shipped = 0
+    """,
+    'foreign_key_columns': """
+        SELECT s.name AS schema_name, t.name AS table_name, fk.name AS constraint_name,
+               c.name AS column_name, rc.name AS referenced_column,
+               fkc.constraint_column_id AS ordinal_position
+        FROM sys.foreign_key_columns fkc
+        JOIN sys.foreign_keys fk ON fk.object_id = fkc.constraint_object_id
+        JOIN sys.tables t ON t.object_id = fkc.parent_object_id
+        JOIN sys.schemas s ON s.schema_id = t.schema_id
+        JOIN sys.columns c ON c.object_id = fkc.parent_object_id AND c.column_id = fkc.parent_column_id
+        JOIN sys.columns rc ON rc.object_id = fkc.referenced_object_id AND rc.column_id = fkc.referenced_column_id
+        WHERE t.is_ms_shipped = 0
+    """,
+}
+
+# Дата изменения таблицы с учетом подчиненных объектов sys.objects
+# (ограничения, триггеры): ALTER TABLE ... ADD CONSTRAINT не всегда меняет
+# modify_date самой таблицы
+EFFECTIVE_MODIFY_DATE = """
+    (SELECT MAX(d) FROM (VALUES (t.modify_date), (
+        SELECT MAX(o.modify_date) FROM sys.objects o WHERE o.parent_object_id = t.object_id
+    )) AS dates(d))
+"""
+CATALOG_QUERIES['tables'] = CATALOG_QUERIES['tables'].format(modify_date=EFFECTIVE_MODIFY_DATE.strip())
+
+# Легкий запрос для инкрементального режима: только идентификаторы и даты
+OBJECTS_QUERY = f"""
+    SELECT s.name AS schema_name, t.name AS table_name, t.object_id,
+           {EFFECTIVE_MODIFY_DATE.strip()} AS modify_date
+    FROM sys.tables t
+    JOIN sys.schemas s ON s.schema_id = t.schema_id
+    WHERE t.is_ms_shipped = 0
 """
 
+# Предел идентификаторов в одном условии IN
+OBJECT_ID_CHUNK = 1000
+
+ObjectKey = Tuple[str, str]
+
+
+class ChangeSet:
+    """
+    Различия между каталогом MS SQL и mcl.mssql_tables.
+
+    Attributes:
+        new: Таблицы, которых нет в mcl
+        changed: Таблицы с другим object_id или modify_date
+        dropped: Таблицы mcl, которых нет в источнике
+        unchanged: Количество неизмененных таблиц
+    """
+
+    def __init__(self, new: List[ObjectKey], changed: List[ObjectKey], dropped: List[ObjectKey],
+                 unchanged: int, object_ids: Dict[ObjectKey, int]):
+        self.new = new
+        self.changed = changed
+        self.dropped = dropped
+        self.unchanged = unchanged
+        self.object_ids = object_ids
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.new or self.changed or self.dropped)
+
+    def harvest_object_ids(self) -> List[int]:
+        """object_id таблиц, которые нужно прочитать заново"""
+        return sorted(self.object_ids[key] for key in self.new + self.changed)
+
+    def summary(self) -> Dict[str, int]:
+        return {'new': len(self.new), 'changed': len(self.changed),
+                'dropped': len(self.dropped), 'unchanged': self.unchanged}
+
+
+def detect_changes(current: Dict[ObjectKey, Tuple[int, Any]],
+                   stored: Dict[ObjectKey, Tuple[Optional[int], Any]]) -> ChangeSet:
+    """
+    Сравнение каталога источника с mcl.mssql_tables.
+
+    Args:
+        current: (схема, таблица) -> (object_id, modify_date) из OBJECTS_QUERY
+        stored: (схема, таблица) -> (object_id, modify_date) из mcl.mssql_tables
+
+    Returns:
+        ChangeSet: Новые, измененные и удаленные таблицы
+    """
+    new, changed = [], []
+    for key, (object_id, modify_date) in current.items():
+        if key not in stored:
+            new.append(key)
+        elif stored[key] != (object_id, modify_date):
+            changed.append(key)
+    dropped = [key for key in stored if key not in current]
+    unchanged = len(current) - len(new) - len(changed)
+    object_ids = {key: value[0] for key, value in current.items()}
+    return ChangeSet(sorted(new), sorted(changed), sorted(dropped), unchanged, object_ids)
+
+
+class CatalogSnapshot:
+    """
+    Снимок каталога MS SQL Server.
+
+    Attributes:
+        entities: Вид объектов ('tables', 'columns', ...) -> список строк (dict)
+        timings: Время выполнения каждого запроса каталога, секунд
+    """
+
+    def __init__(self, entities: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.entities: Dict[str, List[Dict[str, Any]]] = {name: [] for name in CATALOG_QUERIES}
+        if entities:
+            self.entities.update(entities)
+        self.timings: Dict[str, float] = {}
+
+    def schemas(self) -> List[str]:
+        """Схемы, в которых есть таблицы"""
+        return sorted({row['schema_name'] for row in self.entities['tables']})
+
+    def for_schema(self, schema_name: str) -> 'CatalogSnapshot':
+        """Подмножество снимка для одной схемы"""
+        return CatalogSnapshot({
+            name: [row for row in rows if row['schema_name'] == schema_name]
+            for name, rows in self.entities.items()
+        })
+
+    def counts(self) -> Dict[str, int]:
+        """Количество строк по видам объектов"""
+        return {name: len(rows) for name, rows in self.entities.items()}
+
+
 class Analyzer:
     """Анализатор структуры БД MS SQL Server"""
-    
-    def __init__(self):
-        pass
-    
-    def scan_database(self):
-        """Сканирование структуры БД"""
-        pass
+
+    def __init__(self, connection_factory: Callable[[], Any], schemas: Optional[Iterable[str]] = None,
+                 fetch_size: int = 10000):
+        """
+        Инициализация Analyzer.
+
+        Args:
+            connection_factory: Функция получения подключения pyodbc
+            schemas: Ограничение списка схем (None - все схемы)
+            fetch_size: Размер пакета fetchmany
+        """
+        self.connection_factory = connection_factory
+        self.schemas = set(schemas) if schemas else None
+        self.fetch_size = fetch_size
+
+    def scan_objects(self) -> Dict[ObjectKey, Tuple[int, Any]]:
+        """
+        Идентификаторы и даты изменения всех таблиц (для инкрементального режима).
+
+        Returns:
+            Dict[ObjectKey, Tuple[int, Any]]: (схема, таблица) -> (object_id, modify_date)
+        """
+        conn = self.connection_factory()
+        cursor = conn.cursor()
+        try:
+            return {(row['schema_name'], row['table_name']): (row['object_id'], row['modify_date'])
+                    for row in self._fetch(cursor, OBJECTS_QUERY)}
+        finally:
+            cursor.close()
+
+    def scan_database(self, object_ids: Optional[Iterable[int]] = None) -> CatalogSnapshot:
+        """
+        Сканирование структуры БД.
+
+        Args:
+            object_ids: Ограничение списка таблиц (None - вся БД)
+
+        Returns:
+            CatalogSnapshot: Строки каталога
+        """
+        snapshot = CatalogSnapshot()
+        ids = sorted(set(object_ids)) if object_ids is not None else None
+        if ids == []:
+            return snapshot
+
+        conn = self.connection_factory()
+        cursor = conn.cursor()
+        try:
+            for entity, query in CATALOG_QUERIES.items():
+                started = time.perf_counter()
+                if ids is None:
+                    rows = self._fetch(cursor, query)
+                else:
+                    rows = []
+                    for start in range(0, len(ids), OBJECT_ID_CHUNK):
+                        chunk = ', '.join(str(int(i)) for i in ids[start:start + OBJECT_ID_CHUNK])
+                        rows.extend(self._fetch(cursor, f"{query} AND t.object_id IN ({chunk})"))
+                snapshot.entities[entity] = rows
+                snapshot.timings[entity] = round(time.perf_counter() - started, 3)
+                logger.info(f"Каталог {entity}: {len(rows)} строк за {snapshot.timings[entity]} с")
+        finally:
+            cursor.close()
+        return snapshot
+
+    def _fetch(self, cursor, query: str) -> List[Dict[str, Any]]:
+        """Выполнение запроса каталога с фильтром по схемам"""
+        cursor.execute(query)
+        names = [d[0] for d in cursor.description]
+        rows = []
+        while True:
+            batch = cursor.fetchmany(self.fetch_size)
+            if not batch:
+                break
+            for values in batch:
+                row = dict(zip(names, values))
+                if self.schemas is None or row['schema_name'] in self.schemas:
+                    rows.append(row)
+        return rows
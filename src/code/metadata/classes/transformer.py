@@ -1,14 +1,375 @@
 """
 Модуль трансформации метаданных MS SQL → PostgreSQL
-Планируется к реализации
+
+Строки CatalogSnapshot преобразуются в памяти в строки для
+промежуточных таблиц Writer: имена приводятся к snake_case по правилам
+функций mcl.normalize_*_name, типы - по TYPE_MAP, вычисляемые колонки
+и значения по умолчанию переводятся TSqlExpressionTranslator.
 """
 
+import logging
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from src.code.infrastructure.classes.tsql_expression_translator import (
+    TYPE_MAP, TSqlExpressionTranslator
+)
+
+from .analyzer import CatalogSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+
+# Категории базовых типов MS SQL (mcl.mssql_base_types.type_category)
+TYPE_CATEGORIES = {
+    'int': 'integer', 'bigint': 'integer', 'smallint': 'integer', 'tinyint': 'integer',
+    'decimal': 'decimal', 'numeric': 'decimal', 'money': 'decimal', 'smallmoney': 'decimal',
+    'float': 'float', 'real': 'float',
+    'char': 'string', 'nchar': 'string', 'varchar': 'string', 'nvarchar': 'string',
+    'text': 'string', 'ntext': 'string', 'sysname': 'string',
+    'datetime': 'datetime', 'datetime2': 'datetime', 'smalldatetime': 'datetime',
+    'datetimeoffset': 'datetime', 'date': 'datetime', 'time': 'datetime',
+    'bit': 'boolean', 'uniqueidentifier': 'uuid',
+    'binary': 'binary', 'varbinary': 'binary', 'image': 'binary',
+}
+
+VARIABLE_LENGTH_TYPES = {'varchar', 'nvarchar', 'varbinary'}
+UNICODE_TYPES = {'nchar', 'nvarchar'}
+LENGTH_TYPES = {'char', 'nchar', 'varchar', 'nvarchar', 'binary', 'varbinary'}
+PRECISION_TYPES = {'decimal', 'numeric'}
+FRACTIONAL_SECONDS_TYPES = {'datetime2', 'datetimeoffset', 'time'}
+
+MAX_IDENTIFIER_LENGTH = 63
+MAX_INDEX_COLUMNS = 16
+MSSQL_CONSTRAINT_NAME_RE = re.compile(r'^[A-Za-z][A-Za-z0-9_]*$')
+
+
+def _truncate(name: str) -> str:
+    """Ограничение длины имени PostgreSQL (как mcl.normalize_sequence_name)"""
+    if len(name) > MAX_IDENTIFIER_LENGTH:
+        return name[:60] + '_pg'
+    return name
+
+
+def to_snake_case(name: str) -> str:
+    """
+    Имя объекта PostgreSQL из имени MS SQL: cnInvAccnt -> cn_inv_accnt.
+
+    Недопустимые символы заменяются на '_', длина ограничивается 63.
+    """
+    result = re.sub(r'__+', '_', name)
+    result = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', result)
+    result = re.sub(r'([A-Z])([A-Z][a-z])', r'\1_\2', result)
+    result = re.sub(r'[^a-z0-9_]', '_', result.lower())
+    result = re.sub(r'_+', '_', result).strip('_')
+    if not result or not result[0].isalpha():
+        result = f"c_{result}"
+    return _truncate(result)
+
+
+def normalize_index_name(name: str, is_primary_key: bool, is_unique: bool) -> str:
+    """Аналог mcl.normalize_index_name"""
+    if is_primary_key:
+        prefix, pattern = 'pk_', r'^PK_'
+    elif is_unique:
+        prefix, pattern = 'uk_', r'^UK_|^UQ_'
+    else:
+        prefix, pattern = 'ix_', r'^IX_|^IDX_'
+    return _truncate(prefix + to_snake_case(re.sub(pattern, '', name, flags=re.IGNORECASE)))
+
+
+def normalize_foreign_key_name(name: str) -> str:
+    """Аналог mcl.normalize_foreign_key_name"""
+    return _truncate('fk_' + to_snake_case(re.sub(r'^FK_', '', name, flags=re.IGNORECASE)))
+
+
+def map_column_type(type_name: str, max_length: int, precision: int, scale: int) -> Dict[str, Any]:
+    """
+    Параметры производного типа MS SQL и целевой тип PostgreSQL.
+
+    Args:
+        type_name: Имя типа sys.types
+        max_length: sys.columns.max_length (-1 для MAX, байты для n-типов)
+        precision: sys.columns.precision
+        scale: sys.columns.scale
+
+    Returns:
+        Dict[str, Any]: Параметры mssql_derived_types и имя целевого типа
+    """
+    type_name = type_name.lower()
+    is_max = max_length == -1
+    length = None
+    if type_name in LENGTH_TYPES and not is_max:
+        length = max_length // 2 if type_name in UNICODE_TYPES else max_length
+
+    precision_value = precision if type_name in PRECISION_TYPES | {'float'} else None
+    scale_value = scale if type_name in PRECISION_TYPES | FRACTIONAL_SECONDS_TYPES else None
+
+    target = TYPE_MAP.get(type_name, 'text')
+    if type_name in PRECISION_TYPES:
+        target_with_params = f"numeric({precision},{scale})"
+    elif type_name in ('varchar', 'nvarchar', 'char', 'nchar') and length is not None:
+        target_with_params = f"{target}({length})"
+    elif type_name in ('varchar', 'nvarchar') and is_max:
+        target, target_with_params = 'text', 'text'
+    elif type_name in FRACTIONAL_SECONDS_TYPES and scale is not None and scale < 6:
+        target_with_params = f"{target}({scale})"
+    else:
+        target_with_params = target
+
+    return {
+        'base_type_name': type_name,
+        'type_category': TYPE_CATEGORIES.get(type_name, 'other'),
+        'precision_value': precision_value,
+        'scale_value': scale_value,
+        'length_value': length,
+        'max_value': 'max' if is_max else None,
+        'is_max_length': is_max,
+        'is_variable_length': type_name in VARIABLE_LENGTH_TYPES,
+        'target_type_name': target_with_params.split('(')[0],
+        'target_typname_with_params': target_with_params,
+        'type_mapping_quality': 'exact' if type_name in TYPE_MAP else 'fallback',
+    }
+
+
+def strip_outer_parentheses(definition: Optional[str]) -> Optional[str]:
+    """Снятие внешних скобок определений sys.default_constraints и sys.computed_columns: ((0)) -> 0"""
+    if definition is None:
+        return None
+    result = definition.strip()
+    while result.startswith('(') and result.endswith(')'):
+        depth = 0
+        for i, char in enumerate(result):
+            depth += char == '('
+            depth -= char == ')'
+            if depth == 0 and i < len(result) - 1:
+                return result
+        result = result[1:-1].strip()
+    return result
+
+
+class TransformedSchema:
+    """
+    Строки промежуточных таблиц одной схемы MS SQL.
+
+    Attributes:
+        schema_name: Исходная схема
+        entities: Промежуточная таблица -> список строк (dict)
+        warnings: Пропущенные объекты и причины
+    """
+
+    def __init__(self, schema_name: str):
+        self.schema_name = schema_name
+        self.entities: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.warnings: List[str] = []
+
+    def counts(self) -> Dict[str, int]:
+        return {name: len(rows) for name, rows in self.entities.items()}
+
+
 class Transformer:
     """Трансформатор метаданных"""
-    
-    def __init__(self):
-        pass
-    
-    def transform_metadata(self):
-        """Трансформация метаданных"""
-        pass
+
+    def __init__(self, target_schema: str = 'ags', translator: Optional[TSqlExpressionTranslator] = None):
+        """
+        Инициализация Transformer.
+
+        Args:
+            target_schema: Целевая схема PostgreSQL
+            translator: Переводчик выражений T-SQL (None - без правил маппинга из mcl)
+        """
+        self.target_schema = target_schema
+        self.translator = translator or TSqlExpressionTranslator()
+
+    def transform_metadata(self, snapshot: CatalogSnapshot) -> List[TransformedSchema]:
+        """
+        Трансформация метаданных.
+
+        Args:
+            snapshot: Снимок каталога MS SQL
+
+        Returns:
+            List[TransformedSchema]: Строки промежуточных таблиц по схемам
+        """
+        return [self.transform_schema(snapshot.for_schema(schema), schema) for schema in snapshot.schemas()]
+
+    def transform_schema(self, snapshot: CatalogSnapshot, schema_name: str) -> TransformedSchema:
+        """Трансформация одной схемы"""
+        result = TransformedSchema(schema_name)
+        columns_by_table: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for row in snapshot.entities['columns']:
+            columns_by_table[row['table_name']].append(row)
+        indexes_by_table: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for row in snapshot.entities['indexes']:
+            indexes_by_table[row['table_name']].append(row)
+        fk_count: Dict[str, int] = defaultdict(int)
+        for row in snapshot.entities['foreign_keys']:
+            fk_count[row['table_name']] += 1
+
+        for table in snapshot.entities['tables']:
+            name = table['table_name']
+            columns = sorted(columns_by_table[name], key=lambda c: c['ordinal_position'])
+            indexes = indexes_by_table[name]
+            result.entities['tables'].append(self._transform_table(table, columns, indexes, fk_count[name]))
+            result.entities['columns'].extend(self._transform_columns(table, columns))
+
+        for index in snapshot.entities['indexes']:
+            result.entities['indexes'].append(self._transform_index(index))
+        result.entities['index_columns'].extend(
+            self._transform_index_columns(snapshot.entities['index_columns'], result.warnings))
+
+        skipped_fks = set()
+        for fk in snapshot.entities['foreign_keys']:
+            row = self._transform_foreign_key(fk, result.warnings)
+            if row is None:
+                skipped_fks.add((fk['table_name'], fk['constraint_name']))
+            else:
+                result.entities['foreign_keys'].append(row)
+        for fkc in snapshot.entities['foreign_key_columns']:
+            if (fkc['table_name'], fkc['constraint_name']) not in skipped_fks:
+                result.entities['foreign_key_columns'].append({
+                    'schema_name': fkc['schema_name'],
+                    'table_name': fkc['table_name'],
+                    'constraint_name': fkc['constraint_name'],
+                    'column_name': fkc['column_name'],
+                    'referenced_column': fkc['referenced_column'],
+                    'ordinal_position': fkc['ordinal_position'],
+                })
+        return result
+
+    def _transform_table(self, table: Dict[str, Any], columns: List[Dict[str, Any]],
+                         indexes: List[Dict[str, Any]], foreign_key_count: int) -> Dict[str, Any]:
+        target_name = to_snake_case(table['table_name'])
+        has_computed = any(c['is_computed'] for c in columns)
+        primary_key_count = sum(1 for i in indexes if i['is_primary_key'])
+        return {
+            'schema_name': table['schema_name'],
+            'table_name': table['table_name'],
+            'object_id': table['object_id'],
+            'create_date': table['create_date'],
+            'modify_date': table['modify_date'],
+            'row_count': table['row_count'],
+            'table_size': table['table_size'],
+            'column_count': len(columns),
+            'index_count': len(indexes),
+            'primary_key_count': primary_key_count,
+            'foreign_key_count': foreign_key_count,
+            'target_schema': self.target_schema,
+            'target_table_name': target_name,
+            'base_table_name': _truncate(f"{target_name}_bt") if has_computed else target_name,
+            'view_name': target_name,
+            'has_computed_columns': has_computed,
+        }
+
+    def _transform_columns(self, table: Dict[str, Any], columns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        column_map = {c['column_name'].lower(): to_snake_case(c['column_name']) for c in columns}
+        column_types = {c['column_name'].lower(): c['type_name'].lower() for c in columns}
+
+        rows = []
+        for column in columns:
+            row = map_column_type(column['type_name'], column['max_length'], column['precision'], column['scale'])
+            postgres_computed = None
+            notes = None
+            if column['is_computed'] and column['computed_definition']:
+                translation = self.translator.translate(strip_outer_parentheses(column['computed_definition']),
+                                                        column_map, column_types)
+                postgres_computed = translation.target_expression if translation.success else None
+                notes = '; '.join(translation.notes) or None
+            default_value = strip_outer_parentheses(column['default_definition'])
+            postgres_default = None
+            if default_value is not None:
+                translation = self.translator.translate(default_value)
+                postgres_default = translation.target_expression if translation.success else None
+
+            row.update({
+                'schema_name': column['schema_name'],
+                'table_name': column['table_name'],
+                'column_name': column['column_name'],
+                'ordinal_position': column['ordinal_position'],
+                'is_nullable': column['is_nullable'],
+                'is_identity': column['is_identity'],
+                'identity_seed': column['identity_seed'],
+                'identity_increment': column['identity_increment'],
+                'is_computed': column['is_computed'],
+                'computed_definition': column['computed_definition'],
+                'is_persisted': column['is_persisted'],
+                'default_name': column['default_name'],
+                'default_definition': column['default_definition'],
+                'default_is_system_named': column['default_is_system_named'],
+                'collation_name': column['collation_name'],
+                'target_column_name': column_map[column['column_name'].lower()],
+                'target_type': 'view' if column['is_computed'] else 'both',
+                'postgres_computed_definition': postgres_computed,
+                'postgres_default_value': postgres_default,
+                'migration_notes': notes,
+            })
+            rows.append(row)
+        return rows
+
+    def _transform_index(self, index: Dict[str, Any]) -> Dict[str, Any]:
+        fill_factor = index['fill_factor'] or None
+        return {
+            'schema_name': index['schema_name'],
+            'table_name': index['table_name'],
+            'index_name': index['index_name'],
+            'index_type': index['index_type'],
+            'is_unique': index['is_unique'],
+            'is_primary_key': index['is_primary_key'],
+            'is_disabled': index['is_disabled'],
+            'fill_factor': fill_factor,
+            'is_padded': index['is_padded'],
+            'allow_row_locks': index['allow_row_locks'],
+            'allow_page_locks': index['allow_page_locks'],
+            'target_index_name': normalize_index_name(index['index_name'], index['is_primary_key'],
+                                                      index['is_unique']),
+            'target_fill_factor': fill_factor if fill_factor and fill_factor >= 10 else None,
+        }
+
+    @staticmethod
+    def _transform_index_columns(rows: List[Dict[str, Any]], warnings: List[str]) -> List[Dict[str, Any]]:
+        """Сквозная нумерация колонок индекса: сначала ключевые, затем включенные"""
+        by_index: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            by_index[(row['table_name'], row['index_name'])].append(row)
+
+        result = []
+        for (table_name, index_name), columns in by_index.items():
+            columns.sort(key=lambda c: (c['is_included_column'], c['key_ordinal'], c['index_column_id']))
+            if len(columns) > MAX_INDEX_COLUMNS:
+                warnings.append(f"{table_name}.{index_name}: учтены первые {MAX_INDEX_COLUMNS} "
+                                f"из {len(columns)} колонок")
+            for position, column in enumerate(columns[:MAX_INDEX_COLUMNS], start=1):
+                result.append({
+                    'schema_name': column['schema_name'],
+                    'table_name': table_name,
+                    'index_name': index_name,
+                    'column_name': column['column_name'],
+                    'ordinal_position': position,
+                    'is_descending': column['is_descending'],
+                    'is_included_column': column['is_included_column'],
+                })
+        return result
+
+    @staticmethod
+    def _transform_foreign_key(fk: Dict[str, Any], warnings: List[str]) -> Optional[Dict[str, Any]]:
+        name = f"{fk['table_name']}.{fk['constraint_name']}"
+        if fk['schema_name'] == fk['referenced_schema'] and fk['table_name'] == fk['referenced_table']:
+            warnings.append(f"{name}: ссылка на ту же таблицу не поддерживается mcl")
+            return None
+        if not MSSQL_CONSTRAINT_NAME_RE.match(fk['constraint_name']):
+            warnings.append(f"{name}: недопустимое имя ограничения")
+            return None
+        return {
+            'schema_name': fk['schema_name'],
+            'table_name': fk['table_name'],
+            'constraint_name': fk['constraint_name'],
+            'referenced_schema': fk['referenced_schema'],
+            'referenced_table': fk['referenced_table'],
+            'delete_action': fk['delete_action'],
+            'update_action': fk['update_action'],
+            'is_disabled': fk['is_disabled'],
+            'is_not_trusted': fk['is_not_trusted'],
+            'target_constraint_name': normalize_foreign_key_name(fk['constraint_name']),
+        }
@@ -1,14 +1,726 @@
 """
 Модуль записи метаданных в схему mcl
-Планируется к реализации
+
+Строки каждой схемы MS SQL загружаются командой COPY во временные
+промежуточные таблицы (ON COMMIT DROP), после чего переносятся в
+mcl.mssql_* и mcl.postgres_* несколькими множественными UPDATE/INSERT.
+Идентификаторы связанных записей определяются соединением по
+естественным ключам (task_id, схема, имя таблицы, имя колонки, ...).
+Каждая схема пишется в своей транзакции; внешние ключи пишутся
+вторым проходом, когда таблицы всех схем уже есть в mcl.
+
+В инкрементальном режиме пишутся только новые и измененные таблицы
+(ChangeSet), после чего mark_stale помечает зависимые записи
+mcl.postgres_* для повторной миграции.
+"""
+
+import io
+import logging
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .analyzer import ChangeSet
+from .transformer import TransformedSchema
+
+
+logger = logging.getLogger(__name__)
+
+
+# Колонки промежуточных таблиц (заполняются COPY из строк Transformer)
+STAGE_COLUMNS: Dict[str, List[Tuple[str, str]]] = {
+    'tables': [
+        ('schema_name', 'text'), ('table_name', 'text'), ('object_id', 'integer'),
+        ('create_date', 'timestamp'), ('modify_date', 'timestamp'),
+        ('row_count', 'bigint'), ('table_size', 'bigint'), ('column_count', 'integer'),
+        ('index_count', 'integer'), ('primary_key_count', 'integer'), ('foreign_key_count', 'integer'),
+        ('target_schema', 'text'), ('target_table_name', 'text'), ('base_table_name', 'text'),
+        ('view_name', 'text'), ('has_computed_columns', 'boolean'),
+    ],
+    'columns': [
+        ('schema_name', 'text'), ('table_name', 'text'), ('column_name', 'text'),
+        ('ordinal_position', 'integer'), ('base_type_name', 'text'), ('type_category', 'text'),
+        ('precision_value', 'integer'), ('scale_value', 'integer'), ('length_value', 'integer'),
+        ('max_value', 'text'), ('is_max_length', 'boolean'), ('is_variable_length', 'boolean'),
+        ('is_nullable', 'boolean'), ('is_identity', 'boolean'), ('identity_seed', 'bigint'),
+        ('identity_increment', 'bigint'), ('is_computed', 'boolean'), ('computed_definition', 'text'),
+        ('is_persisted', 'boolean'), ('default_name', 'text'), ('default_definition', 'text'),
+        ('default_is_system_named', 'boolean'), ('collation_name', 'text'),
+        ('target_column_name', 'text'), ('target_type_name', 'text'),
+        ('target_typname_with_params', 'text'), ('type_mapping_quality', 'text'),
+        ('target_type', 'text'), ('postgres_computed_definition', 'text'),
+        ('postgres_default_value', 'text'), ('migration_notes', 'text'),
+    ],
+    'indexes': [
+        ('schema_name', 'text'), ('table_name', 'text'), ('index_name', 'text'), ('index_type', 'text'),
+        ('is_unique', 'boolean'), ('is_primary_key', 'boolean'), ('is_disabled', 'boolean'),
+        ('fill_factor', 'integer'), ('is_padded', 'boolean'), ('allow_row_locks', 'boolean'),
+        ('allow_page_locks', 'boolean'), ('target_index_name', 'text'), ('target_fill_factor', 'integer'),
+    ],
+    'index_columns': [
+        ('schema_name', 'text'), ('table_name', 'text'), ('index_name', 'text'), ('column_name', 'text'),
+        ('ordinal_position', 'integer'), ('is_descending', 'boolean'), ('is_included_column', 'boolean'),
+    ],
+    'foreign_keys': [
+        ('schema_name', 'text'), ('table_name', 'text'), ('constraint_name', 'text'),
+        ('referenced_schema', 'text'), ('referenced_table', 'text'), ('delete_action', 'text'),
+        ('update_action', 'text'), ('is_disabled', 'boolean'), ('is_not_trusted', 'boolean'),
+        ('target_constraint_name', 'text'),
+    ],
+    'foreign_key_columns': [
+        ('schema_name', 'text'), ('table_name', 'text'), ('constraint_name', 'text'),
+        ('column_name', 'text'), ('referenced_column', 'text'), ('ordinal_position', 'integer'),
+    ],
+}
+
+# Идентификаторы записей mcl, вычисляемые в промежуточных таблицах
+STAGE_IDS: Dict[str, List[str]] = {
+    'tables': ['mssql_table_id', 'postgres_table_id'],
+    'columns': ['mssql_table_id', 'postgres_table_id', 'mssql_type_id', 'postgres_type_id',
+                'mssql_column_id', 'postgres_column_id'],
+    'indexes': ['mssql_table_id', 'postgres_table_id', 'mssql_index_id', 'postgres_index_id'],
+    'index_columns': ['mssql_index_id', 'postgres_index_id', 'mssql_column_id', 'postgres_column_id',
+                      'mssql_index_column_id'],
+    'foreign_keys': ['mssql_table_id', 'postgres_table_id', 'mssql_referenced_table_id',
+                     'postgres_referenced_table_id', 'mssql_foreign_key_id'],
+    'foreign_key_columns': ['mssql_foreign_key_id', 'postgres_foreign_key_id', 'mssql_column_id',
+                            'postgres_column_id', 'mssql_referenced_column_id',
+                            'postgres_referenced_column_id', 'mssql_foreign_key_column_id'],
+}
+
+OBJECT_ENTITIES = ('tables', 'columns', 'indexes', 'index_columns')
+FOREIGN_KEY_ENTITIES = ('foreign_keys', 'foreign_key_columns')
+
+# Таблица mcl.mssql_tables по естественному ключу промежуточной строки s
+_RESOLVE_TABLES = """
+    UPDATE femcl_stage_{stage} s
+    SET mssql_table_id = mt.id, postgres_table_id = pt.id
+    FROM mcl.mssql_tables mt
+    LEFT JOIN mcl.postgres_tables pt ON pt.source_table_id = mt.id
+    WHERE mt.task_id = %(task_id)s AND mt.schema_name = s.schema_name AND mt.object_name = s.table_name
+"""
+
+OBJECT_MERGE_SQL: List[str] = [
+    # Базовые и производные типы
+    """
+    INSERT INTO mcl.mssql_base_types (base_type_name, type_category, type_family, is_user_defined,
+                                      postgres_equivalent_type)
+    SELECT DISTINCT ON (s.base_type_name) s.base_type_name, s.type_category, s.type_category, false,
+           s.target_type_name
+    FROM femcl_stage_columns s
+    WHERE NOT EXISTS (SELECT 1 FROM mcl.mssql_base_types b WHERE b.base_type_name = s.base_type_name)
+    """,
+    """
+    INSERT INTO mcl.mssql_derived_types (task_id, base_type_id, precision_value, scale_value, length_value,
+                                         max_value, is_max_length, is_variable_length, is_nullable)
+    SELECT DISTINCT %(task_id)s, b.id, s.precision_value, s.scale_value, s.length_value,
+           s.max_value, s.is_max_length, s.is_variable_length, s.is_nullable
+    FROM femcl_stage_columns s
+    JOIN mcl.mssql_base_types b ON b.base_type_name = s.base_type_name
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mcl.mssql_derived_types d
+        WHERE d.task_id = %(task_id)s AND d.base_type_id = b.id
+          AND d.precision_value IS NOT DISTINCT FROM s.precision_value
+          AND d.scale_value IS NOT DISTINCT FROM s.scale_value
+          AND d.length_value IS NOT DISTINCT FROM s.length_value
+          AND d.max_value IS NOT DISTINCT FROM s.max_value
+          AND d.is_nullable IS NOT DISTINCT FROM s.is_nullable
+    )
+    """,
+    """
+    UPDATE femcl_stage_columns s
+    SET mssql_type_id = d.id
+    FROM mcl.mssql_derived_types d
+    JOIN mcl.mssql_base_types b ON b.id = d.base_type_id
+    WHERE d.task_id = %(task_id)s AND b.base_type_name = s.base_type_name
+      AND d.precision_value IS NOT DISTINCT FROM s.precision_value
+      AND d.scale_value IS NOT DISTINCT FROM s.scale_value
+      AND d.length_value IS NOT DISTINCT FROM s.length_value
+      AND d.max_value IS NOT DISTINCT FROM s.max_value
+      AND d.is_nullable IS NOT DISTINCT FROM s.is_nullable
+    """,
+    """
+    INSERT INTO mcl.postgres_derived_types (base_type_id, precision_value, scale_value, length_value,
+                                            max_value, is_max_length, is_variable_length, is_nullable,
+                                            typname_with_params, migration_quality)
+    SELECT DISTINCT ON (s.target_typname_with_params, s.is_nullable)
+           (SELECT min(b.id) FROM mcl.postgres_base_types b WHERE b.base_type_name = s.target_type_name),
+           s.precision_value, s.scale_value, s.length_value, s.max_value, s.is_max_length,
+           s.is_variable_length, s.is_nullable, s.target_typname_with_params, s.type_mapping_quality
+    FROM femcl_stage_columns s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mcl.postgres_derived_types d
+        WHERE d.typname_with_params = s.target_typname_with_params
+          AND d.is_nullable IS NOT DISTINCT FROM s.is_nullable
+    )
+    """,
+    """
+    UPDATE femcl_stage_columns s
+    SET postgres_type_id = d.id
+    FROM mcl.postgres_derived_types d
+    WHERE d.typname_with_params = s.target_typname_with_params
+      AND d.is_nullable IS NOT DISTINCT FROM s.is_nullable
+    """,
+    # Таблицы
+    """
+    UPDATE mcl.mssql_tables mt
+    SET object_id = s.object_id, create_date = s.create_date, modify_date = s.modify_date,
+        row_count = s.row_count, table_size = s.table_size, column_count = s.column_count,
+        index_count = s.index_count, primary_key_count = s.primary_key_count,
+        foreign_key_count = s.foreign_key_count,
+        migration_status = CASE WHEN mt.migration_status = 'dropped' THEN 'pending' ELSE mt.migration_status END,
+        updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_tables s
+    WHERE mt.task_id = %(task_id)s AND mt.schema_name = s.schema_name AND mt.object_name = s.table_name
+    """,
+    """
+    INSERT INTO mcl.mssql_tables (task_id, object_name, object_type, schema_name, object_id, create_date,
+                                  modify_date, row_count, table_size, column_count, index_count,
+                                  primary_key_count, foreign_key_count)
+    SELECT %(task_id)s, s.table_name, 'BASE TABLE', s.schema_name, s.object_id, s.create_date,
+           s.modify_date, s.row_count, s.table_size, s.column_count, s.index_count,
+           s.primary_key_count, s.foreign_key_count
+    FROM femcl_stage_tables s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mcl.mssql_tables mt
+        WHERE mt.task_id = %(task_id)s AND mt.schema_name = s.schema_name AND mt.object_name = s.table_name
+    )
+    """,
+    _RESOLVE_TABLES.format(stage='tables'),
+    """
+    UPDATE mcl.postgres_tables pt
+    SET object_name = s.target_table_name, schema_name = s.target_schema,
+        base_table_name = s.base_table_name, view_name = s.view_name,
+        has_computed_columns = s.has_computed_columns, row_count = s.row_count,
+        column_count = s.column_count, has_primary_key = s.primary_key_count > 0,
+        has_foreign_keys = s.foreign_key_count > 0, has_indexes = s.index_count > 0,
+        updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_tables s
+    WHERE pt.source_table_id = s.mssql_table_id
+    """,
+    """
+    INSERT INTO mcl.postgres_tables (task_id, object_name, object_type, schema_name, source_table_id,
+                                     base_table_name, view_name, has_computed_columns, row_count,
+                                     column_count, has_primary_key, has_foreign_keys, has_indexes)
+    SELECT %(task_id)s, s.target_table_name, 'BASE TABLE', s.target_schema, s.mssql_table_id,
+           s.base_table_name, s.view_name, s.has_computed_columns, s.row_count, s.column_count,
+           s.primary_key_count > 0, s.foreign_key_count > 0, s.index_count > 0
+    FROM femcl_stage_tables s
+    WHERE NOT EXISTS (SELECT 1 FROM mcl.postgres_tables pt WHERE pt.source_table_id = s.mssql_table_id)
+    """,
+    # Колонки и значения по умолчанию
+    _RESOLVE_TABLES.format(stage='columns'),
+    """
+    UPDATE mcl.mssql_columns mc
+    SET data_type_id = s.mssql_type_id, ordinal_position = s.ordinal_position,
+        default_value = s.default_definition, is_identity = s.is_identity,
+        identity_seed = s.identity_seed, identity_increment = s.identity_increment,
+        is_computed = s.is_computed, computed_definition = s.computed_definition,
+        is_persisted = s.is_persisted, updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_columns s
+    WHERE mc.table_id = s.mssql_table_id AND mc.column_name = s.column_name
+    """,
+    """
+    INSERT INTO mcl.mssql_columns (table_id, data_type_id, column_name, ordinal_position, default_value,
+                                   is_identity, identity_seed, identity_increment, is_computed,
+                                   computed_definition, is_persisted)
+    SELECT s.mssql_table_id, s.mssql_type_id, s.column_name, s.ordinal_position, s.default_definition,
+           s.is_identity, s.identity_seed, s.identity_increment, s.is_computed,
+           s.computed_definition, s.is_persisted
+    FROM femcl_stage_columns s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mcl.mssql_columns mc
+        WHERE mc.table_id = s.mssql_table_id AND mc.column_name = s.column_name
+    )
+    """,
+    """
+    UPDATE femcl_stage_columns s
+    SET mssql_column_id = mc.id
+    FROM mcl.mssql_columns mc
+    WHERE mc.table_id = s.mssql_table_id AND mc.column_name = s.column_name
+    """,
+    """
+    UPDATE mcl.postgres_columns pc
+    SET table_id = s.postgres_table_id, postgres_data_type_id = s.postgres_type_id,
+        column_name = s.target_column_name, ordinal_position = s.ordinal_position,
+        default_value = s.postgres_default_value, is_identity = s.is_identity,
+        identity_seed = s.identity_seed, identity_increment = s.identity_increment,
+        is_computed = s.is_computed, computed_definition = s.computed_definition,
+        target_type = s.target_type, postgres_computed_definition = s.postgres_computed_definition,
+        type_mapping_quality = s.type_mapping_quality, data_type_migration_notes = s.migration_notes,
+        updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_columns s
+    WHERE pc.source_column_id = s.mssql_column_id
+    """,
+    """
+    INSERT INTO mcl.postgres_columns (table_id, source_column_id, postgres_data_type_id, column_name,
+                                      ordinal_position, default_value, is_identity, identity_seed,
+                                      identity_increment, is_computed, computed_definition, target_type,
+                                      postgres_computed_definition, type_mapping_quality,
+                                      data_type_migration_notes)
+    SELECT s.postgres_table_id, s.mssql_column_id, s.postgres_type_id, s.target_column_name,
+           s.ordinal_position, s.postgres_default_value, s.is_identity, s.identity_seed,
+           s.identity_increment, s.is_computed, s.computed_definition, s.target_type,
+           s.postgres_computed_definition, s.type_mapping_quality, s.migration_notes
+    FROM femcl_stage_columns s
+    WHERE NOT EXISTS (SELECT 1 FROM mcl.postgres_columns pc WHERE pc.source_column_id = s.mssql_column_id)
+    """,
+    """
+    UPDATE femcl_stage_columns s
+    SET postgres_column_id = pc.id
+    FROM mcl.postgres_columns pc
+    WHERE pc.source_column_id = s.mssql_column_id
+    """,
+    """
+    UPDATE mcl.mssql_default_constraints dc
+    SET constraint_name = s.default_name, definition = s.default_definition,
+        is_system_named = s.default_is_system_named, updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_columns s
+    WHERE s.default_name IS NOT NULL AND dc.table_id = s.mssql_table_id AND dc.column_id = s.mssql_column_id
+    """,
+    """
+    INSERT INTO mcl.mssql_default_constraints (table_id, column_id, constraint_name, definition,
+                                               is_system_named)
+    SELECT s.mssql_table_id, s.mssql_column_id, s.default_name, s.default_definition,
+           s.default_is_system_named
+    FROM femcl_stage_columns s
+    WHERE s.default_name IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM mcl.mssql_default_constraints dc
+        WHERE dc.table_id = s.mssql_table_id AND dc.column_id = s.mssql_column_id
+    )
+    """,
+    # Индексы
+    _RESOLVE_TABLES.format(stage='indexes'),
+    """
+    UPDATE mcl.mssql_indexes mi
+    SET index_type = s.index_type, is_unique = s.is_unique, is_primary_key = s.is_primary_key,
+        is_disabled = s.is_disabled, fill_factor = s.fill_factor, is_padded = s.is_padded,
+        allow_row_locks = s.allow_row_locks, allow_page_locks = s.allow_page_locks,
+        updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_indexes s
+    WHERE mi.table_id = s.mssql_table_id AND mi.index_name = s.index_name
+    """,
+    """
+    INSERT INTO mcl.mssql_indexes (table_id, index_name, index_type, is_unique, is_primary_key,
+                                   is_disabled, fill_factor, is_padded, allow_row_locks, allow_page_locks)
+    SELECT s.mssql_table_id, s.index_name, s.index_type, s.is_unique, s.is_primary_key,
+           s.is_disabled, s.fill_factor, s.is_padded, s.allow_row_locks, s.allow_page_locks
+    FROM femcl_stage_indexes s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mcl.mssql_indexes mi
+        WHERE mi.table_id = s.mssql_table_id AND mi.index_name = s.index_name
+    )
+    """,
+    """
+    UPDATE femcl_stage_indexes s
+    SET mssql_index_id = mi.id
+    FROM mcl.mssql_indexes mi
+    WHERE mi.table_id = s.mssql_table_id AND mi.index_name = s.index_name
+    """,
+    """
+    UPDATE mcl.postgres_indexes pi
+    SET table_id = s.postgres_table_id, index_name = s.target_index_name,
+        original_index_name = s.index_name, is_unique = s.is_unique,
+        is_primary_key = s.is_primary_key, fill_factor = s.target_fill_factor,
+        updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_indexes s
+    WHERE pi.source_index_id = s.mssql_index_id
+    """,
+    """
+    INSERT INTO mcl.postgres_indexes (table_id, source_index_id, index_name, original_index_name,
+                                      is_unique, is_primary_key, fill_factor)
+    SELECT s.postgres_table_id, s.mssql_index_id, s.target_index_name, s.index_name,
+           s.is_unique, s.is_primary_key, s.target_fill_factor
+    FROM femcl_stage_indexes s
+    WHERE NOT EXISTS (SELECT 1 FROM mcl.postgres_indexes pi WHERE pi.source_index_id = s.mssql_index_id)
+    """,
+    """
+    UPDATE femcl_stage_indexes s
+    SET postgres_index_id = pi.id
+    FROM mcl.postgres_indexes pi
+    WHERE pi.source_index_id = s.mssql_index_id
+    """,
+    """
+    UPDATE femcl_stage_index_columns s
+    SET mssql_index_id = i.mssql_index_id, postgres_index_id = i.postgres_index_id,
+        mssql_column_id = c.mssql_column_id, postgres_column_id = c.postgres_column_id
+    FROM femcl_stage_indexes i, femcl_stage_columns c
+    WHERE i.table_name = s.table_name AND i.index_name = s.index_name
+      AND c.table_name = s.table_name AND c.column_name = s.column_name
+    """,
+    """
+    UPDATE mcl.mssql_index_columns mic
+    SET ordinal_position = s.ordinal_position, is_descending = s.is_descending,
+        is_included_column = s.is_included_column, updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_index_columns s
+    WHERE mic.index_id = s.mssql_index_id AND mic.column_id = s.mssql_column_id
+    """,
+    """
+    INSERT INTO mcl.mssql_index_columns (index_id, column_id, ordinal_position, is_descending,
+                                         is_included_column)
+    SELECT s.mssql_index_id, s.mssql_column_id, s.ordinal_position, s.is_descending, s.is_included_column
+    FROM femcl_stage_index_columns s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mcl.mssql_index_columns mic
+        WHERE mic.index_id = s.mssql_index_id AND mic.column_id = s.mssql_column_id
+    )
+    """,
+    """
+    UPDATE femcl_stage_index_columns s
+    SET mssql_index_column_id = mic.id
+    FROM mcl.mssql_index_columns mic
+    WHERE mic.index_id = s.mssql_index_id AND mic.column_id = s.mssql_column_id
+    """,
+    """
+    UPDATE mcl.postgres_index_columns pic
+    SET index_id = s.postgres_index_id, column_id = s.postgres_column_id,
+        ordinal_position = s.ordinal_position, is_descending = s.is_descending,
+        is_included_column = s.is_included_column, updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_index_columns s
+    WHERE pic.source_index_column_id = s.mssql_index_column_id
+    """,
+    """
+    INSERT INTO mcl.postgres_index_columns (index_id, column_id, source_index_column_id, ordinal_position,
+                                            is_descending, is_included_column)
+    SELECT s.postgres_index_id, s.postgres_column_id, s.mssql_index_column_id, s.ordinal_position,
+           s.is_descending, s.is_included_column
+    FROM femcl_stage_index_columns s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mcl.postgres_index_columns pic WHERE pic.source_index_column_id = s.mssql_index_column_id
+    )
+    """,
+    # Колонки и индексы, удаленные в источнике у перечитанных таблиц
+    """
+    UPDATE mcl.postgres_columns pc
+    SET data_type_migration_status = 'stale',
+        data_type_migration_notes = 'Колонка отсутствует в источнике', updated_at = CURRENT_TIMESTAMP
+    FROM mcl.mssql_columns mc
+    JOIN femcl_stage_tables t ON t.mssql_table_id = mc.table_id
+    WHERE pc.source_column_id = mc.id
+      AND pc.data_type_migration_status IS DISTINCT FROM 'stale'
+      AND NOT EXISTS (SELECT 1 FROM femcl_stage_columns s WHERE s.mssql_column_id = mc.id)
+    """,
+    """
+    UPDATE mcl.postgres_indexes pi
+    SET migration_status = 'skipped', error_message = 'Индекс отсутствует в источнике',
+        updated_at = CURRENT_TIMESTAMP
+    FROM mcl.mssql_indexes mi
+    JOIN femcl_stage_tables t ON t.mssql_table_id = mi.table_id
+    WHERE pi.source_index_id = mi.id AND pi.migration_status <> 'skipped'
+      AND NOT EXISTS (SELECT 1 FROM femcl_stage_indexes s WHERE s.mssql_index_id = mi.id)
+    """,
+]
+
+STORED_OBJECTS_QUERY = """
+    SELECT schema_name, object_name, object_id, modify_date
+    FROM mcl.mssql_tables
+    WHERE task_id = %(task_id)s AND migration_status IS DISTINCT FROM 'dropped'
+"""
+
+# Пометка устаревших записей для измененных и удаленных таблиц источника.
+# Для postgres_indexes/postgres_foreign_keys статус 'stale' запрещен
+# ограничением - перенесенные объекты возвращаются в 'pending'.
+_STALE_TABLES = """
+    SELECT mt.id FROM mcl.mssql_tables mt
+    JOIN unnest(%(schemas)s::text[], %(tables)s::text[]) AS k(schema_name, object_name)
+      ON k.schema_name = mt.schema_name AND k.object_name = mt.object_name
+    WHERE mt.task_id = %(task_id)s
+"""
+
+STALE_SQL: List[str] = [
+    f"""
+    UPDATE mcl.postgres_tables
+    SET migration_status = 'stale', updated_at = CURRENT_TIMESTAMP
+    WHERE source_table_id IN ({_STALE_TABLES}) AND migration_status <> 'pending'
+    """,
+    f"""
+    UPDATE mcl.postgres_indexes pi
+    SET migration_status = 'pending', migration_date = NULL,
+        error_message = 'Исходная таблица изменена', updated_at = CURRENT_TIMESTAMP
+    FROM mcl.postgres_tables pt
+    WHERE pi.table_id = pt.id AND pt.source_table_id IN ({_STALE_TABLES})
+      AND pi.migration_status IN ('completed', 'failed', 'in_progress')
+    """,
+    f"""
+    UPDATE mcl.postgres_foreign_keys pfk
+    SET migration_status = 'pending', migration_date = NULL,
+        error_message = 'Исходная таблица изменена', updated_at = CURRENT_TIMESTAMP
+    FROM mcl.postgres_tables pt
+    WHERE (pfk.table_id = pt.id OR pfk.referenced_table_id = pt.id)
+      AND pt.source_table_id IN ({_STALE_TABLES})
+      AND pfk.migration_status IN ('completed', 'failed', 'in_progress')
+    """,
+]
+
+DROPPED_SQL = f"""
+    UPDATE mcl.mssql_tables
+    SET migration_status = 'dropped', updated_at = CURRENT_TIMESTAMP
+    WHERE id IN ({_STALE_TABLES})
 """
 
+FOREIGN_KEY_MERGE_SQL: List[str] = [
+    _RESOLVE_TABLES.format(stage='foreign_keys'),
+    """
+    UPDATE femcl_stage_foreign_keys s
+    SET mssql_referenced_table_id = mt.id, postgres_referenced_table_id = pt.id
+    FROM mcl.mssql_tables mt
+    LEFT JOIN mcl.postgres_tables pt ON pt.source_table_id = mt.id
+    WHERE mt.task_id = %(task_id)s AND mt.schema_name = s.referenced_schema
+      AND mt.object_name = s.referenced_table
+    """,
+    """
+    UPDATE mcl.mssql_foreign_keys fk
+    SET referenced_table_id = s.mssql_referenced_table_id, is_disabled = s.is_disabled,
+        is_not_trusted = s.is_not_trusted, delete_action = s.delete_action,
+        update_action = s.update_action, updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_foreign_keys s
+    WHERE fk.table_id = s.mssql_table_id AND fk.constraint_name = s.constraint_name
+      AND s.mssql_referenced_table_id IS NOT NULL
+    """,
+    """
+    INSERT INTO mcl.mssql_foreign_keys (table_id, referenced_table_id, constraint_name, is_disabled,
+                                        is_not_trusted, delete_action, update_action)
+    SELECT s.mssql_table_id, s.mssql_referenced_table_id, s.constraint_name, s.is_disabled,
+           s.is_not_trusted, s.delete_action, s.update_action
+    FROM femcl_stage_foreign_keys s
+    WHERE s.mssql_referenced_table_id IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM mcl.mssql_foreign_keys fk
+        WHERE fk.table_id = s.mssql_table_id AND fk.constraint_name = s.constraint_name
+    )
+    """,
+    """
+    UPDATE femcl_stage_foreign_keys s
+    SET mssql_foreign_key_id = fk.id
+    FROM mcl.mssql_foreign_keys fk
+    WHERE fk.table_id = s.mssql_table_id AND fk.constraint_name = s.constraint_name
+    """,
+    """
+    UPDATE mcl.postgres_foreign_keys pfk
+    SET table_id = s.postgres_table_id, referenced_table_id = s.postgres_referenced_table_id,
+        constraint_name = s.target_constraint_name, original_constraint_name = s.constraint_name,
+        delete_action = s.delete_action, update_action = s.update_action, updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_foreign_keys s
+    WHERE pfk.source_foreign_key_id = s.mssql_foreign_key_id
+    """,
+    """
+    INSERT INTO mcl.postgres_foreign_keys (table_id, referenced_table_id, source_foreign_key_id,
+                                           constraint_name, original_constraint_name, delete_action,
+                                           update_action)
+    SELECT s.postgres_table_id, s.postgres_referenced_table_id, s.mssql_foreign_key_id,
+           s.target_constraint_name, s.constraint_name, s.delete_action, s.update_action
+    FROM femcl_stage_foreign_keys s
+    WHERE s.mssql_foreign_key_id IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM mcl.postgres_foreign_keys pfk WHERE pfk.source_foreign_key_id = s.mssql_foreign_key_id
+    )
+    """,
+    """
+    UPDATE femcl_stage_foreign_key_columns s
+    SET mssql_foreign_key_id = fk.mssql_foreign_key_id, postgres_foreign_key_id = pfk.id,
+        mssql_column_id = mc.id, postgres_column_id = pc.id,
+        mssql_referenced_column_id = rmc.id, postgres_referenced_column_id = rpc.id
+    FROM femcl_stage_foreign_keys fk
+    JOIN mcl.postgres_foreign_keys pfk ON pfk.source_foreign_key_id = fk.mssql_foreign_key_id,
+         mcl.mssql_columns mc
+    JOIN mcl.postgres_columns pc ON pc.source_column_id = mc.id,
+         mcl.mssql_columns rmc
+    JOIN mcl.postgres_columns rpc ON rpc.source_column_id = rmc.id
+    WHERE fk.table_name = s.table_name AND fk.constraint_name = s.constraint_name
+      AND mc.table_id = fk.mssql_table_id AND mc.column_name = s.column_name
+      AND rmc.table_id = fk.mssql_referenced_table_id AND rmc.column_name = s.referenced_column
+    """,
+    """
+    UPDATE mcl.mssql_foreign_key_columns fkc
+    SET referenced_column_id = s.mssql_referenced_column_id, ordinal_position = s.ordinal_position,
+        updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_foreign_key_columns s
+    WHERE fkc.foreign_key_id = s.mssql_foreign_key_id AND fkc.column_id = s.mssql_column_id
+    """,
+    """
+    INSERT INTO mcl.mssql_foreign_key_columns (foreign_key_id, column_id, referenced_column_id,
+                                               ordinal_position)
+    SELECT s.mssql_foreign_key_id, s.mssql_column_id, s.mssql_referenced_column_id, s.ordinal_position
+    FROM femcl_stage_foreign_key_columns s
+    WHERE s.mssql_foreign_key_id IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM mcl.mssql_foreign_key_columns fkc
+        WHERE fkc.foreign_key_id = s.mssql_foreign_key_id AND fkc.column_id = s.mssql_column_id
+    )
+    """,
+    """
+    UPDATE femcl_stage_foreign_key_columns s
+    SET mssql_foreign_key_column_id = fkc.id
+    FROM mcl.mssql_foreign_key_columns fkc
+    WHERE fkc.foreign_key_id = s.mssql_foreign_key_id AND fkc.column_id = s.mssql_column_id
+    """,
+    """
+    UPDATE mcl.postgres_foreign_key_columns pfkc
+    SET foreign_key_id = s.postgres_foreign_key_id, column_id = s.postgres_column_id,
+        referenced_column_id = s.postgres_referenced_column_id, ordinal_position = s.ordinal_position,
+        updated_at = CURRENT_TIMESTAMP
+    FROM femcl_stage_foreign_key_columns s
+    WHERE pfkc.source_foreign_key_column_id = s.mssql_foreign_key_column_id
+    """,
+    """
+    INSERT INTO mcl.postgres_foreign_key_columns (foreign_key_id, column_id, referenced_column_id,
+                                                  source_foreign_key_column_id, ordinal_position)
+    SELECT s.postgres_foreign_key_id, s.postgres_column_id, s.postgres_referenced_column_id,
+           s.mssql_foreign_key_column_id, s.ordinal_position
+    FROM femcl_stage_foreign_key_columns s
+    WHERE s.mssql_foreign_key_column_id IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM mcl.postgres_foreign_key_columns pfkc
+        WHERE pfkc.source_foreign_key_column_id = s.mssql_foreign_key_column_id
+    )
+    """,
+]
+
+
+def copy_value(value: Any) -> str:
+    """Значение в текстовом формате COPY"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    text = str(value)
+    if any(char in text for char in '\\\t\n\r'):
+        text = (text.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+    return text
+
+
+def copy_buffer(rows: Iterable[Dict[str, Any]], columns: List[str]) -> io.StringIO:
+    """Буфер COPY FROM STDIN для строк Transformer"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_value(row.get(column)) for column in columns))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
 class Writer:
     """Записыватель метаданных в БД"""
-    
-    def __init__(self):
-        pass
-    
-    def write_metadata(self):
-        """Запись метаданных в схему mcl"""
-        pass
+
+    def __init__(self, connection_factory: Callable[[], Any], task_id: int = 2):
+        """
+        Инициализация Writer.
+
+        Args:
+            connection_factory: Функция получения подключения psycopg2 к БД с mcl
+                (подключение не закрывается - им владеет вызывающая сторона)
+            task_id: Задача миграции
+        """
+        self.connection_factory = connection_factory
+        self.task_id = task_id
+
+    def write_metadata(self, schemas: List[TransformedSchema]) -> Dict[str, Dict[str, Any]]:
+        """
+        Запись метаданных в схему mcl.
+
+        Args:
+            schemas: Результат Transformer.transform_metadata
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Результат по каждой схеме MS SQL
+        """
+        stats: Dict[str, Dict[str, Any]] = {}
+        conn = self.connection_factory()
+        for schema in schemas:
+            stats[schema.schema_name] = self._write_stage(conn, schema, OBJECT_ENTITIES, OBJECT_MERGE_SQL)
+            stats[schema.schema_name]['warnings'] = list(schema.warnings)
+        for schema in schemas:
+            if stats[schema.schema_name]['status'] != 'completed':
+                continue
+            fk_stats = self._write_stage(conn, schema, FOREIGN_KEY_ENTITIES, FOREIGN_KEY_MERGE_SQL)
+            stats[schema.schema_name]['rows'].update(fk_stats['rows'])
+            stats[schema.schema_name]['duration'] += fk_stats['duration']
+            if fk_stats['status'] != 'completed':
+                stats[schema.schema_name].update(status=fk_stats['status'], error=fk_stats['error'])
+        return stats
+
+    def load_stored_objects(self, schemas: Optional[Iterable[str]] = None) -> Dict[Tuple[str, str], Tuple[Any, Any]]:
+        """
+        Таблицы источника, уже записанные в mcl.mssql_tables.
+
+        Args:
+            schemas: Ограничение списка схем (None - все схемы)
+
+        Returns:
+            Dict: (схема, таблица) -> (object_id, modify_date)
+        """
+        schemas = set(schemas) if schemas else None
+        conn = self.connection_factory()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(STORED_OBJECTS_QUERY, {'task_id': self.task_id})
+            return {(schema_name, object_name): (object_id, modify_date)
+                    for schema_name, object_name, object_id, modify_date in cursor.fetchall()
+                    if schemas is None or schema_name in schemas}
+        finally:
+            cursor.close()
+            conn.rollback()
+
+    def mark_stale(self, changes: ChangeSet) -> Dict[str, int]:
+        """
+        Пометка устаревших записей mcl.postgres_* для измененных и удаленных таблиц.
+
+        Вызывается после write_metadata: измененные таблицы к этому моменту
+        перечитаны, их перенесенные объекты в PostgreSQL требуют повторной миграции.
+
+        Returns:
+            Dict[str, int]: Количество помеченных строк по запросам
+        """
+        stale = changes.changed + changes.dropped
+        result = {'stale_tables': 0, 'stale_indexes': 0, 'stale_foreign_keys': 0, 'dropped_tables': 0}
+        if not stale:
+            return result
+
+        def params(keys):
+            return {'task_id': self.task_id, 'schemas': [k[0] for k in keys], 'tables': [k[1] for k in keys]}
+
+        conn = self.connection_factory()
+        cursor = conn.cursor()
+        try:
+            for key, statement in zip(('stale_tables', 'stale_indexes', 'stale_foreign_keys'), STALE_SQL):
+                cursor.execute(statement, params(stale))
+                result[key] = cursor.rowcount
+            if changes.dropped:
+                cursor.execute(DROPPED_SQL, params(changes.dropped))
+                result['dropped_tables'] = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        return result
+
+    def _write_stage(self, conn, schema: TransformedSchema, entities: Tuple[str, ...],
+                     merge_sql: List[str]) -> Dict[str, Any]:
+        """Загрузка промежуточных таблиц и перенос в mcl в одной транзакции"""
+        started = time.perf_counter()
+        result: Dict[str, Any] = {'status': 'completed', 'error': None, 'rows': {}}
+        cursor = conn.cursor()
+        try:
+            for entity in entities:
+                columns = [name for name, _ in STAGE_COLUMNS[entity]]
+                definition = ', '.join([f"{name} {sql_type}" for name, sql_type in STAGE_COLUMNS[entity]] +
+                                       [f"{name} integer" for name in STAGE_IDS[entity]])
+                cursor.execute(f"CREATE TEMP TABLE femcl_stage_{entity} ({definition}) ON COMMIT DROP")
+                rows = schema.entities.get(entity, [])
+                cursor.copy_expert(f"COPY femcl_stage_{entity} ({', '.join(columns)}) FROM STDIN",
+                                   copy_buffer(rows, columns))
+                result['rows'][entity] = len(rows)
+            if 'columns' in entities:
+                cursor.execute("ANALYZE femcl_stage_columns")
+            for statement in merge_sql:
+                cursor.execute(statement, {'task_id': self.task_id})
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            result.update(status='failed', error=str(e))
+            logger.error(f"Ошибка записи метаданных схемы {schema.schema_name}: {e}")
+        finally:
+            cursor.close()
+        result['duration'] = round(time.perf_counter() - started, 3)
+        return result
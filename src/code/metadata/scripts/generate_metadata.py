@@ -1,8 +1,110 @@
 #!/usr/bin/env python3
+# -*- coding: utf-8 -*-
 """
-Скрипт генерации метаданных для миграции
-Планируется к реализации
+FEMCL - Скрипт генерации метаданных для миграции
+
+Каталог MS SQL Server читается пакетными запросами (Analyzer),
+преобразуется в памяти (Transformer) и записывается в схему mcl
+через COPY в промежуточные таблицы по каждой схеме (Writer).
 """
 
+import sys
+import os
+import argparse
+import time
+from datetime import datetime
+
+# Добавляем путь к модулям
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+
+# Классы метаданных (pyodbc, psycopg2, yaml) импортируются после разбора аргументов
+
+
+def main(argv=None):
+    """
+    Основная функция скрипта
+
+    Args:
+        argv: Аргументы командной строки (по умолчанию sys.argv[1:])
+    """
+
+    parser = argparse.ArgumentParser(description='FEMCL - Генерация метаданных в схеме mcl')
+    parser.add_argument('--task-id', type=int, default=2, help='Задача миграции (по умолчанию 2)')
+    parser.add_argument('--schemas', nargs='+', metavar='SCHEMA', help='Ограничить список схем MS SQL')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Перечитать только таблицы, измененные после предыдущего запуска')
+    parser.add_argument('--dry-run', action='store_true', help='Только чтение и трансформация, без записи в mcl')
+
+    args = parser.parse_args(argv)
+
+    print(f"🚀 FEMCL - Генерация метаданных, задача {args.task_id}")
+    print(f"📅 Время запуска: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("-" * 60)
+
+    from src.code.infrastructure.classes.connection_manager import ConnectionManager
+    from src.code.infrastructure.classes.tsql_expression_translator import get_tsql_translator
+    from src.code.infrastructure.config.config_loader import ConfigLoader
+    from src.code.metadata.classes.analyzer import Analyzer, detect_changes
+    from src.code.metadata.classes.transformer import Transformer
+    from src.code.metadata.classes.writer import Writer
+
+    try:
+        config_loader = ConfigLoader()
+        target_schema = config_loader.get_config_value('migration.target_schema', 'ags')
+
+        with ConnectionManager(task_id=args.task_id) as manager:
+            analyzer = Analyzer(manager.get_mssql_connection, args.schemas)
+            writer = Writer(manager.get_postgres_connection, args.task_id)
+            changes = None
+
+            started = time.perf_counter()
+            if args.incremental:
+                changes = detect_changes(analyzer.scan_objects(), writer.load_stored_objects(args.schemas))
+                print(f"🔎 Изменения каталога: {changes.summary()}")
+                if changes.is_empty:
+                    print("✅ Метаданные актуальны")
+                    return
+                snapshot = analyzer.scan_database(changes.harvest_object_ids())
+            else:
+                snapshot = analyzer.scan_database()
+            print(f"🔍 Каталог прочитан за {time.perf_counter() - started:.1f} с: {snapshot.counts()}")
+
+            started = time.perf_counter()
+            transformer = Transformer(target_schema, get_tsql_translator(config_loader))
+            schemas = transformer.transform_metadata(snapshot)
+            print(f"🔄 Трансформация {len(schemas)} схем за {time.perf_counter() - started:.1f} с")
+
+            if args.dry_run:
+                for schema in schemas:
+                    print(f"   📋 {schema.schema_name}: {schema.counts()}")
+                    for warning in schema.warnings:
+                        print(f"   ⚠️ {warning}")
+                return
+
+            started = time.perf_counter()
+            stats = writer.write_metadata(schemas)
+            print(f"💾 Запись в mcl за {time.perf_counter() - started:.1f} с")
+
+            if changes is not None:
+                print(f"🕒 Помечено устаревшим: {writer.mark_stale(changes)}")
+
+        failed = False
+        for schema_name, schema_stats in stats.items():
+            if schema_stats['status'] == 'completed':
+                print(f"   ✅ {schema_name}: {schema_stats['rows']} ({schema_stats['duration']:.2f} с)")
+            else:
+                failed = True
+                print(f"   ❌ {schema_name}: {schema_stats['error']}")
+            for warning in schema_stats['warnings']:
+                print(f"   ⚠️ {warning}")
+
+        if failed:
+            sys.exit(1)
+
+    except Exception as e:
+        print(f"💥 Критическая ошибка: {e}")
+        sys.exit(1)
+
+
 if __name__ == "__main__":
-    print("Генерация метаданных - планируется к реализации")
+    main()
@@ -74,11 +74,11 @@ class BaseTableModel(TableModel):
             "computed_columns": computed_columns
         }
     
-    def load_metadata(self, config_loader) -> bool:
+    def load_metadata(self, config_loader, source_reader=None) -> bool:
         """Загрузка всех метаданных таблицы"""
         try:
             # Вызываем родительский метод
-            if not super().load_metadata(config_loader):
+            if not super().load_metadata(config_loader, source_reader=source_reader):
                 return False
             
             # Загружаем метаданные представления
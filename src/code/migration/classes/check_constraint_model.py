@@ -4,24 +4,53 @@ CheckConstraintModel - Модель check ограничения
 
 from typing import Optional
 
+from src.code.migration.classes.type_descriptor import intern_name
+
 
 class CheckConstraintModel:
     """Модель check ограничения"""
     
+    # Вид ограничения и таблица статусов в mcl
+    constraint_kind = "check"
+    status_table = "mcl.postgres_check_constraints"
+    
+    __slots__ = (
+        'id', 'name', 'original_name', 'check_clause', 'column_name', 'function_mapping_rule_id',
+        'mapping_status', 'mapping_complexity', 'mapping_notes', 'migration_status', 'error_message',
+        'schema_name', 'table_name', 'source_table_name',
+    )
+    
     def __init__(self, name: str, check_clause: str):
         self.id: Optional[int] = None
-        self.name = name
+        self.name = intern_name(name)
+        self.original_name: Optional[str] = None
         self.check_clause = check_clause
         self.column_name: Optional[str] = None
         self.function_mapping_rule_id: Optional[int] = None
         self.mapping_status = "pending"
         self.mapping_complexity = "simple"
         self.mapping_notes = ""
+        self.migration_status = "pending"
+        self.error_message: Optional[str] = None
+        
+        # Целевая таблица (PostgreSQL) и исходное имя (MS SQL)
+        self.schema_name = "ags"
+        self.table_name = ""
+        self.source_table_name = ""
     
     def get_ddl_definition(self) -> str:
         """Генерация DDL определения check ограничения"""
         return f"ALTER TABLE ... ADD CONSTRAINT {self.name} CHECK ({self.check_clause})"
     
+    def generate_create_sql(self, not_valid: bool = True) -> str:
+        """Генерация ALTER TABLE ... ADD CONSTRAINT ... CHECK"""
+        sql = f"ALTER TABLE {self.schema_name}.{self.table_name} ADD CONSTRAINT {self.name} CHECK ({self.check_clause})"
+        return sql + " NOT VALID" if not_valid else sql
+    
+    def generate_validate_sql(self) -> str:
+        """Генерация VALIDATE CONSTRAINT (проверка существующих строк)"""
+        return f"ALTER TABLE {self.schema_name}.{self.table_name} VALIDATE CONSTRAINT {self.name}"
+    
     def validate(self) -> bool:
         """Валидация check ограничения"""
         return bool(self.name) and bool(self.check_clause)
@@ -4,22 +4,72 @@ ColumnModel - Модель колонки таблицы
 
 from typing import Optional
 
+from src.code.migration.classes.type_descriptor import TypeDescriptor, intern_name, type_descriptor
+
 
 class ColumnModel:
-    """Модель колонки таблицы"""
-    
-    def __init__(self, name: str, source_name: str, data_type: str):
-        self.name = name
-        self.source_name = source_name
-        self.data_type = data_type
-        self.data_type_precision: Optional[int] = None
-        self.data_type_scale: Optional[int] = None
-        self.data_type_max_length: Optional[int] = None
+    """
+    Модель колонки таблицы.
+    
+    Экземпляры без __dict__: тип, точность, масштаб и длина хранятся в
+    общем TypeDescriptor, имена интернируются. Атрибуты вычисляемых
+    колонок (is_computed, target_type, computed_definition,
+    postgres_computed_definition) и типа источника (source_data_type,
+    source_is_max_length) не заданы, пока их не установит загрузчик, -
+    getattr(column, ..., default) возвращает default.
+    """
+    
+    __slots__ = (
+        'name', 'source_name', 'type_descriptor', 'is_nullable', 'is_identity', 'default_value',
+        'ordinal_position', 'is_computed', 'target_type', 'computed_definition', 'postgres_computed_definition',
+        'source_data_type', 'source_is_max_length',
+    )
+    
+    def __init__(self, name: str, source_name: str, data_type: str,
+                 data_type_precision: Optional[int] = None, data_type_scale: Optional[int] = None,
+                 data_type_max_length: Optional[int] = None):
+        self.name = intern_name(name)
+        self.source_name = intern_name(source_name)
+        self.type_descriptor: TypeDescriptor = type_descriptor(
+            data_type, data_type_precision, data_type_scale, data_type_max_length
+        )
         self.is_nullable = True
         self.is_identity = False
         self.default_value: Optional[str] = None
         self.ordinal_position = 0
     
+    @property
+    def data_type(self) -> Optional[str]:
+        return self.type_descriptor.data_type
+    
+    @data_type.setter
+    def data_type(self, value: Optional[str]) -> None:
+        self.type_descriptor = self.type_descriptor.replace(data_type=value)
+    
+    @property
+    def data_type_precision(self) -> Optional[int]:
+        return self.type_descriptor.precision
+    
+    @data_type_precision.setter
+    def data_type_precision(self, value: Optional[int]) -> None:
+        self.type_descriptor = self.type_descriptor.replace(precision=value)
+    
+    @property
+    def data_type_scale(self) -> Optional[int]:
+        return self.type_descriptor.scale
+    
+    @data_type_scale.setter
+    def data_type_scale(self, value: Optional[int]) -> None:
+        self.type_descriptor = self.type_descriptor.replace(scale=value)
+    
+    @property
+    def data_type_max_length(self) -> Optional[int]:
+        return self.type_descriptor.max_length
+    
+    @data_type_max_length.setter
+    def data_type_max_length(self, value: Optional[int]) -> None:
+        self.type_descriptor = self.type_descriptor.replace(max_length=value)
+    
     def get_ddl_definition(self) -> str:
         """Генерация DDL определения колонки"""
         definition = f"{self.name} {self.data_type}"
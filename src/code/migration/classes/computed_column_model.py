@@ -32,12 +32,14 @@ class ComputedColumnModel:
         """Валидация вычисляемой колонки"""
         return self.is_mapped and bool(self.target_expression)
     
-    def analyze_function_state(self, config_loader) -> 'FunctionMappingState':
+    def analyze_function_state(self, config_loader, column_map: Optional[dict] = None,
+                               column_types: Optional[dict] = None) -> 'FunctionMappingState':
         """Анализ состояния функции с проверкой метаданных"""
-        from .function_mapping_state import FunctionMappingState
+        from src.code.infrastructure.classes.function_mapping_state import FunctionMappingState
         
         # Создаем состояние с проверкой метаданных
-        function_state = FunctionMappingState(self.source_expression, config_loader)
+        function_state = FunctionMappingState(self.source_expression, config_loader,
+                                              column_map=column_map, column_types=column_types)
         
         # Устанавливаем состояние
         self.function_mapping = function_state
@@ -57,6 +59,13 @@ class ComputedColumnModel:
             self.mapping_status = "manual_review_required"
             return False
         
+        if self.function_mapping.target_expression:
+            # Выражение уже переведено целиком (вложенные вызовы, CASE, CONVERT)
+            self.target_expression = self.function_mapping.target_expression
+            self.is_mapped = True
+            self.mapping_status = "mapped"
+            return True
+        
         if self.function_mapping.function_mapping_model:
             try:
                 # Применяем маппинг к выражению
@@ -0,0 +1,466 @@
+"""
+ConstraintStage - Ограничения целевых таблиц после загрузки данных
+
+Внешние ключи и check ограничения добавляются сразу после загрузки
+таблицы как NOT VALID: ALTER TABLE держит блокировку только на время
+изменения каталога и не проверяет строки. Проверка существующих строк
+(VALIDATE CONSTRAINT) выполняется отдельной стадией параллельно по
+таблицам: она берет SHARE UPDATE EXCLUSIVE на проверяемую таблицу и
+ROW SHARE на таблицу, на которую ссылается ключ, - чтение и запись
+не блокируются.
+
+Уникальные ограничения не поддерживают NOT VALID: индекс строится
+CREATE UNIQUE INDEX CONCURRENTLY (или берется готовый уникальный
+индекс по тем же колонкам) и присоединяется через ADD CONSTRAINT ...
+UNIQUE USING INDEX.
+
+Метаданные читаются из mcl.postgres_foreign_keys,
+mcl.postgres_check_constraints и mcl.postgres_unique_constraints одним
+запросом на вид ограничения - для всей задачи или одной таблицы.
+Секция migration.constraints: enabled: false - ограничения не
+добавляются; defer: true - после загрузки таблицы ограничения не
+добавляются, все добавляет и проверяет стадия run().
+
+Статусы: pending - не добавлено (например, таблица, на которую
+ссылается ключ, еще не загружена), in_progress - добавлено NOT VALID,
+completed - проверено, failed - ошибка. Статус mcl сверяется с
+pg_constraint: после DROP TABLE ... CASCADE (--force) ограничения со
+статусом completed добавляются заново.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from src.code.migration.classes.check_constraint_model import CheckConstraintModel
+from src.code.migration.classes.foreign_key_model import ForeignKeyModel
+from src.code.migration.classes.type_descriptor import intern_name
+from src.code.migration.classes.unique_constraint_model import UniqueConstraintModel
+
+
+logger = logging.getLogger(__name__)
+
+
+OPEN_STATUSES = ['pending', 'in_progress', 'failed']
+ALL_STATUSES = OPEN_STATUSES + ['completed']
+
+# Коды ошибок PostgreSQL
+LOCK_NOT_AVAILABLE = '55P03'
+DEFERRED_ERRORS = {
+    '42P01',  # undefined_table: таблица, на которую ссылается ключ, еще не создана
+    '42830',  # invalid_foreign_key: нет уникального индекса по колонкам ссылки
+}
+
+_TABLE_FILTER = """
+      AND (%(table_name)s::text IS NULL OR mt.object_name = %(table_name)s)
+"""
+
+FOREIGN_KEYS_QUERY = """
+    SELECT pfk.id, pfk.constraint_name, pfk.original_constraint_name, pfk.delete_action, pfk.update_action,
+           pfk.migration_status, mt.object_name, pt.schema_name, COALESCE(pt.base_table_name, pt.object_name),
+           rmt.object_name, rpt.schema_name, COALESCE(rpt.base_table_name, rpt.object_name),
+           array_agg(pc.column_name ORDER BY pfkc.ordinal_position),
+           array_agg(rpc.column_name ORDER BY pfkc.ordinal_position)
+    FROM mcl.postgres_foreign_keys pfk
+    JOIN mcl.postgres_tables pt ON pfk.table_id = pt.id
+    JOIN mcl.mssql_tables mt ON pt.source_table_id = mt.id
+    JOIN mcl.postgres_tables rpt ON pfk.referenced_table_id = rpt.id
+    JOIN mcl.mssql_tables rmt ON rpt.source_table_id = rmt.id
+    JOIN mcl.postgres_foreign_key_columns pfkc ON pfkc.foreign_key_id = pfk.id
+    JOIN mcl.postgres_columns pc ON pfkc.column_id = pc.id
+    JOIN mcl.postgres_columns rpc ON pfkc.referenced_column_id = rpc.id
+    WHERE mt.task_id = %(task_id)s AND pfk.migration_status = ANY(%(statuses)s)
+      AND (%(table_name)s::text IS NULL OR mt.object_name = %(table_name)s
+           OR (%(include_referencing)s AND rmt.object_name = %(table_name)s))
+    GROUP BY pfk.id, mt.object_name, pt.schema_name, pt.base_table_name, pt.object_name,
+             rmt.object_name, rpt.schema_name, rpt.base_table_name, rpt.object_name
+    ORDER BY mt.object_name, pfk.constraint_name
+"""
+
+CHECK_CONSTRAINTS_QUERY = """
+    SELECT pcc.id, pcc.constraint_name, pcc.original_constraint_name, pcc.definition, pcc.migration_status,
+           mt.object_name, pt.schema_name, COALESCE(pt.base_table_name, pt.object_name)
+    FROM mcl.postgres_check_constraints pcc
+    JOIN mcl.postgres_tables pt ON pcc.table_id = pt.id
+    JOIN mcl.mssql_tables mt ON pt.source_table_id = mt.id
+    WHERE mt.task_id = %(task_id)s AND pcc.migration_status = ANY(%(statuses)s)
+""" + _TABLE_FILTER + """
+    ORDER BY mt.object_name, pcc.constraint_name
+"""
+
+UNIQUE_CONSTRAINTS_QUERY = """
+    SELECT puc.id, puc.constraint_name, puc.original_constraint_name, puc.migration_status,
+           mt.object_name, pt.schema_name, COALESCE(pt.base_table_name, pt.object_name),
+           array_agg(pc.column_name ORDER BY pucc.ordinal_position)
+    FROM mcl.postgres_unique_constraints puc
+    JOIN mcl.postgres_tables pt ON puc.table_id = pt.id
+    JOIN mcl.mssql_tables mt ON pt.source_table_id = mt.id
+    JOIN mcl.postgres_unique_constraint_columns pucc ON pucc.unique_constraint_id = puc.id
+    JOIN mcl.postgres_columns pc ON pucc.column_id = pc.id
+    WHERE mt.task_id = %(task_id)s AND puc.migration_status = ANY(%(statuses)s)
+""" + _TABLE_FILTER + """
+    GROUP BY puc.id, mt.object_name, pt.schema_name, pt.base_table_name, pt.object_name
+    ORDER BY mt.object_name, puc.constraint_name
+"""
+
+CONSTRAINT_STATE_QUERY = """
+    SELECT c.convalidated
+    FROM pg_constraint c
+    JOIN pg_class t ON t.oid = c.conrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    WHERE n.nspname = %s AND t.relname = %s AND c.conname = %s
+"""
+
+# Готовый уникальный btree индекс по тем же колонкам (по возрастанию,
+# без выражений и условия), не принадлежащий другому ограничению.
+# USING INDEX переименовывает индекс, поэтому индексы, учтенные в
+# mcl.postgres_indexes, не используются: их имя в mcl устарело бы
+MATCHING_UNIQUE_INDEX_QUERY = """
+    SELECT i.relname
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    JOIN pg_class t ON t.oid = x.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    JOIN pg_am am ON am.oid = i.relam
+    WHERE n.nspname = %s AND t.relname = %s
+      AND x.indisunique AND x.indisvalid AND am.amname = 'btree'
+      AND x.indexprs IS NULL AND x.indpred IS NULL
+      AND NOT (0 < ANY (x.indoption::int2[]))
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+      AND NOT EXISTS (SELECT 1 FROM mcl.postgres_indexes pi
+                      JOIN mcl.postgres_tables pt ON pi.table_id = pt.id
+                      WHERE pt.schema_name = n.nspname AND pi.index_name = i.relname::text
+                        AND COALESCE(pt.base_table_name, pt.object_name) = t.relname::text)
+      AND (SELECT array_agg(a.attname::text ORDER BY k.ord)
+           FROM unnest(x.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+           JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attnum = k.attnum) = %s::text[]
+    ORDER BY i.relname
+    LIMIT 1
+"""
+
+def _action(value: Optional[str]) -> str:
+    """Действие внешнего ключа: NO_ACTION -> NO ACTION"""
+    return (value or 'NO_ACTION').replace('_', ' ')
+
+
+def load_foreign_keys(cursor, task_id: int = 2, table_name: Optional[str] = None,
+                      statuses: Sequence[str] = OPEN_STATUSES,
+                      include_referencing: bool = False) -> List[ForeignKeyModel]:
+    """
+    Внешние ключи из mcl.postgres_foreign_keys.
+
+    Args:
+        cursor: Курсор PostgreSQL
+        task_id: Задача миграции
+        table_name: Исходная таблица (None - все таблицы задачи)
+        statuses: Статусы загружаемых ключей
+        include_referencing: Также ключи других таблиц, ссылающиеся на table_name
+    """
+    cursor.execute(FOREIGN_KEYS_QUERY, {
+        'task_id': task_id, 'table_name': table_name, 'statuses': list(statuses),
+        'include_referencing': include_referencing,
+    })
+    foreign_keys = []
+    for row in cursor.fetchall():
+        fk = ForeignKeyModel(row[1])
+        fk.id, fk.original_name = row[0], row[2]
+        fk.delete_action, fk.update_action = _action(row[3]), _action(row[4])
+        fk.migration_status = row[5]
+        fk.source_table_name, fk.schema_name, fk.table_name = map(intern_name, row[6:9])
+        fk.referenced_source_table, fk.referenced_schema, fk.referenced_table = map(intern_name, row[9:12])
+        fk.columns = [intern_name(column) for column in row[12]]
+        fk.referenced_columns = [intern_name(column) for column in row[13]]
+        foreign_keys.append(fk)
+    return foreign_keys
+
+
+def load_check_constraints(cursor, task_id: int = 2, table_name: Optional[str] = None,
+                           statuses: Sequence[str] = OPEN_STATUSES) -> List[CheckConstraintModel]:
+    """Check ограничения из mcl.postgres_check_constraints"""
+    cursor.execute(CHECK_CONSTRAINTS_QUERY, {
+        'task_id': task_id, 'table_name': table_name, 'statuses': list(statuses),
+    })
+    constraints = []
+    for row in cursor.fetchall():
+        constraint = CheckConstraintModel(row[1], row[3])
+        constraint.id, constraint.original_name, constraint.migration_status = row[0], row[2], row[4]
+        constraint.source_table_name, constraint.schema_name, constraint.table_name = map(intern_name, row[5:8])
+        constraints.append(constraint)
+    return constraints
+
+
+def load_unique_constraints(cursor, task_id: int = 2, table_name: Optional[str] = None,
+                            statuses: Sequence[str] = OPEN_STATUSES) -> List[UniqueConstraintModel]:
+    """Уникальные ограничения из mcl.postgres_unique_constraints"""
+    cursor.execute(UNIQUE_CONSTRAINTS_QUERY, {
+        'task_id': task_id, 'table_name': table_name, 'statuses': list(statuses),
+    })
+    constraints = []
+    for row in cursor.fetchall():
+        constraint = UniqueConstraintModel(row[1])
+        constraint.id, constraint.original_name, constraint.migration_status = row[0], row[2], row[3]
+        constraint.source_table_name, constraint.schema_name, constraint.table_name = map(intern_name, row[4:7])
+        constraint.columns = [intern_name(column) for column in row[7]]
+        constraints.append(constraint)
+    return constraints
+
+
+def validation_levels(tables: Iterable[str], foreign_keys: Iterable[ForeignKeyModel]) -> List[List[str]]:
+    """
+    Уровни таблиц для проверки: таблицы, на которые ссылаются ключи,
+    проверяются раньше ссылающихся. Таблицы одного уровня независимы.
+    Таблицы, образующие цикл ссылок, попадают на последний уровень.
+    """
+    pending = set(tables)
+    references: Dict[str, set] = {table: set() for table in pending}
+    for fk in foreign_keys:
+        if fk.source_table_name in pending and fk.referenced_source_table in pending \
+                and fk.referenced_source_table != fk.source_table_name:
+            references[fk.source_table_name].add(fk.referenced_source_table)
+
+    levels = []
+    while pending:
+        level = sorted(t for t in pending if not references[t] & pending)
+        if not level:
+            levels.append(sorted(pending))
+            break
+        levels.append(level)
+        pending -= set(level)
+    return levels
+
+
+class ConstraintStage:
+    """
+    Стадия ограничений после загрузки.
+
+    Example:
+        >>> stage = ConstraintStage.from_config(config_loader)
+        >>> stage.add(pg_conn, load_foreign_keys(cursor, table_name='accnt'))  # сразу после загрузки
+        >>> summary = stage.run()                                               # после загрузки всех таблиц
+    """
+
+    def __init__(self, connection_factory: Callable[[], Any], task_id: int = 2, workers: int = 4,
+                 lock_timeout_ms: int = 5000, retries: int = 3, retry_delay: float = 1.0,
+                 enabled: bool = True, defer: bool = False):
+        """
+        Инициализация ConstraintStage.
+
+        Args:
+            connection_factory: Функция создания подключения psycopg2 (по одному на поток проверки)
+            task_id: Задача миграции
+            workers: Число таблиц, проверяемых параллельно
+            lock_timeout_ms: lock_timeout для ALTER TABLE: DDL не ждет долгих транзакций
+                и не блокирует очередь запросов к таблице
+            retries: Повторы при превышении lock_timeout
+            retry_delay: Пауза перед повтором, секунд
+            enabled: False - ограничения не добавляются и не проверяются
+            defer: True - ограничения добавляет только стадия run(), не загрузка таблицы
+        """
+        self.connection_factory = connection_factory
+        self.task_id = task_id
+        self.workers = max(1, workers)
+        self.lock_timeout_ms = lock_timeout_ms
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.enabled = enabled
+        self.defer = defer
+
+    @property
+    def add_after_load(self) -> bool:
+        """Добавлять ограничения NOT VALID сразу после загрузки таблицы"""
+        return self.enabled and not self.defer
+
+    @classmethod
+    def from_config(cls, config_loader, task_id: int = 2) -> 'ConstraintStage':
+        """Стадия по секции migration.constraints и database.postgres"""
+        settings = config_loader.get_config_value('migration.constraints', {}) or {}
+        pg_config = config_loader.get_database_config('postgres')
+
+        def connect():
+            import psycopg2
+
+            return psycopg2.connect(
+                host=pg_config['host'],
+                port=pg_config['port'],
+                dbname=pg_config['database'],
+                user=pg_config['user'],
+                password=pg_config['password']
+            )
+
+        return cls(
+            connect, task_id=task_id,
+            workers=settings.get('workers', 4),
+            lock_timeout_ms=settings.get('lock_timeout_ms', 5000),
+            retries=settings.get('retries', 3),
+            enabled=settings.get('enabled', True),
+            defer=settings.get('defer', False)
+        )
+
+    @contextmanager
+    def _autocommit(self, connection) -> Iterator[Any]:
+        """Курсор в режиме autocommit: каждый ALTER TABLE - отдельная короткая транзакция"""
+        connection.commit()
+        autocommit = connection.autocommit
+        connection.autocommit = True
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"SET lock_timeout = {int(self.lock_timeout_ms)}")
+            yield cursor
+        finally:
+            try:
+                cursor.execute("RESET lock_timeout")
+            finally:
+                cursor.close()
+                connection.autocommit = autocommit
+
+    def _execute(self, cursor, sql: str) -> None:
+        """Выполнение DDL с повтором при превышении lock_timeout"""
+        for attempt in range(self.retries + 1):
+            try:
+                cursor.execute(sql)
+                return
+            except Exception as e:
+                if getattr(e, 'pgcode', None) != LOCK_NOT_AVAILABLE or attempt == self.retries:
+                    raise
+                logger.info(f"Таблица занята, повтор через {self.retry_delay} с: {sql}")
+                time.sleep(self.retry_delay * (attempt + 1))
+
+    def _set_status(self, cursor, constraint, status: str, error: Optional[str] = None) -> None:
+        """Статус ограничения в mcl и в модели"""
+        cursor.execute(f"""
+            UPDATE {constraint.status_table}
+            SET migration_status = %s, error_message = %s,
+                migration_date = CASE WHEN %s = 'completed' THEN NOW() ELSE migration_date END,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+        """, (status, error, status, constraint.id))
+        constraint.migration_status = status
+        constraint.error_message = error
+
+    def _constraint_state(self, cursor, constraint) -> Optional[bool]:
+        """None - ограничения нет, иначе признак convalidated"""
+        cursor.execute(CONSTRAINT_STATE_QUERY, (constraint.schema_name, constraint.table_name, constraint.name))
+        row = cursor.fetchone()
+        return None if row is None else bool(row[0])
+
+    def _add_one(self, cursor, constraint) -> str:
+        """Добавление одного ограничения, возвращает итоговый статус"""
+        state = self._constraint_state(cursor, constraint)
+        if state is None:
+            if constraint.constraint_kind == 'unique':
+                cursor.execute(MATCHING_UNIQUE_INDEX_QUERY,
+                               (constraint.schema_name, constraint.table_name, constraint.columns))
+                row = cursor.fetchone()
+                index_name = row[0] if row else constraint.name
+                if not row:
+                    self._execute(cursor, constraint.generate_index_sql())
+                self._execute(cursor, constraint.generate_create_sql(index_name))
+                state = True
+            else:
+                self._execute(cursor, constraint.generate_create_sql(not_valid=True))
+                state = False
+        status = 'completed' if state else 'in_progress'
+        self._set_status(cursor, constraint, status)
+        return status
+
+    def add(self, connection, constraints: Iterable[Any]) -> Dict[str, int]:
+        """
+        Добавление ограничений без проверки строк.
+
+        Внешний ключ, для которого еще не загружена таблица, на которую он
+        ссылается, остается в статусе pending и добавляется позже.
+        Ограничение со статусом in_progress или completed пропускается,
+        только если оно есть в pg_constraint.
+
+        Returns:
+            Dict[str, int]: added, deferred, failed
+        """
+        counts = {'added': 0, 'deferred': 0, 'failed': 0}
+        with self._autocommit(connection) as cursor:
+            for constraint in constraints:
+                if constraint.migration_status in ('in_progress', 'completed') \
+                        and self._constraint_state(cursor, constraint) is not None:
+                    continue
+                try:
+                    self._add_one(cursor, constraint)
+                    counts['added'] += 1
+                except Exception as e:
+                    if constraint.constraint_kind == 'foreign_key' and getattr(e, 'pgcode', None) in DEFERRED_ERRORS:
+                        counts['deferred'] += 1
+                        logger.info(f"Внешний ключ {constraint.name} отложен: {e}")
+                        continue
+                    counts['failed'] += 1
+                    logger.error(f"Ошибка добавления ограничения {constraint.name}: {e}")
+                    self._set_status(cursor, constraint, 'failed', str(e))
+        return counts
+
+    def _validate_table(self, table_name: str, constraints: List[Any]) -> Dict[str, int]:
+        """Проверка ограничений одной таблицы на отдельном подключении"""
+        counts = {'validated': 0, 'failed': 0}
+        connection = self.connection_factory()
+        try:
+            with self._autocommit(connection) as cursor:
+                for constraint in constraints:
+                    try:
+                        self._execute(cursor, constraint.generate_validate_sql())
+                        self._set_status(cursor, constraint, 'completed')
+                        counts['validated'] += 1
+                    except Exception as e:
+                        counts['failed'] += 1
+                        logger.error(f"Проверка ограничения {constraint.name} ({table_name}) не прошла: {e}")
+                        self._set_status(cursor, constraint, 'failed', str(e))
+        finally:
+            connection.close()
+        return counts
+
+    def validate(self, constraints: Sequence[Any]) -> Dict[str, int]:
+        """
+        VALIDATE CONSTRAINT для добавленных NOT VALID ограничений.
+
+        Таблицы проверяются параллельно по уровням зависимостей,
+        ограничения одной таблицы - последовательно (VALIDATE берет
+        SHARE UPDATE EXCLUSIVE, которая конфликтует сама с собой).
+        """
+        by_table: Dict[str, List[Any]] = {}
+        for constraint in constraints:
+            if constraint.migration_status == 'in_progress':
+                by_table.setdefault(constraint.source_table_name, []).append(constraint)
+
+        foreign_keys = [c for c in constraints if c.constraint_kind == 'foreign_key']
+        levels = validation_levels(by_table, foreign_keys)
+        counts = {'validated': 0, 'failed': 0, 'levels': len(levels)}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for level in levels:
+                for result in executor.map(lambda t: self._validate_table(t, by_table[t]), level):
+                    counts['validated'] += result['validated']
+                    counts['failed'] += result['failed']
+        return counts
+
+    def run(self, table_name: Optional[str] = None) -> Dict[str, int]:
+        """
+        Стадия ограничений после загрузки: добавление отложенных
+        ограничений и параллельная проверка.
+
+        Args:
+            table_name: Исходная таблица (None - все таблицы задачи)
+        """
+        connection = self.connection_factory()
+        try:
+            cursor = connection.cursor()
+            try:
+                constraints: List[Any] = []
+                constraints += load_check_constraints(cursor, self.task_id, table_name)
+                constraints += load_unique_constraints(cursor, self.task_id, table_name)
+                constraints += load_foreign_keys(cursor, self.task_id, table_name)
+            finally:
+                cursor.close()
+            summary = self.add(connection, constraints)
+        finally:
+            connection.close()
+        validated = self.validate(constraints)
+        summary['validated'] = validated['validated']
+        summary['failed'] += validated['failed']
+        summary['levels'] = validated['levels']
+        return summary
@@ -4,13 +4,20 @@ DefaultConstraintModel - Модель ограничения по умолчан
 
 from typing import Optional
 
+from src.code.migration.classes.type_descriptor import intern_name
+
 
 class DefaultConstraintModel:
     """Модель ограничения по умолчанию"""
     
+    __slots__ = (
+        'id', 'name', 'definition', 'is_system_named', 'column_id', 'source_definition', 'target_definition',
+        'function_mapping_rule_id', 'mapping_status', 'mapping_complexity', 'mapping_notes',
+    )
+    
     def __init__(self, name: str, definition: str, column_id: int):
         self.id: Optional[int] = None
-        self.name = name
+        self.name = intern_name(name)
         self.definition = definition
         self.is_system_named = False
         self.column_id = column_id
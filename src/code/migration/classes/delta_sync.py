@@ -0,0 +1,387 @@
+"""
+DeltaSync - Догоняющая синхронизация изменений после первичной загрузки
+
+Перед первичной загрузкой фиксируется водяной знак источника, после
+загрузки DeltaSync раунд за раундом переносит только строки, измененные
+после водяного знака: пакетные upsert (INSERT ... ON CONFLICT DO UPDATE)
+и удаления в PostgreSQL. Водяной знак хранится в mcl.table_sync_state и
+фиксируется в той же транзакции, что и данные раунда.
+
+Режимы (выбираются автоматически):
+    change_tracking - MS SQL Change Tracking (CHANGETABLE), включая удаления
+    rowversion      - колонка rowversion/timestamp; удаления не отслеживаются
+"""
+
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+# Режим и ключ таблицы источника (один запрос к каталогу)
+SOURCE_INFO_QUERY = """
+    SELECT
+        CASE WHEN EXISTS (SELECT 1 FROM sys.change_tracking_tables ctt
+                          WHERE ctt.object_id = t.object_id) THEN 1 ELSE 0 END AS has_change_tracking,
+        (SELECT TOP 1 c.name FROM sys.columns c
+         JOIN sys.types ty ON ty.user_type_id = c.user_type_id
+         WHERE c.object_id = t.object_id AND ty.name = 'timestamp') AS rowversion_column
+    FROM sys.tables t
+    WHERE t.object_id = OBJECT_ID(?)
+"""
+
+PRIMARY_KEY_QUERY = """
+    SELECT c.name
+    FROM sys.indexes i
+    JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+    JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+    WHERE i.object_id = OBJECT_ID(?) AND i.is_primary_key = 1
+    ORDER BY ic.key_ordinal
+"""
+
+
+class DeltaSyncError(Exception):
+    """Догоняющая синхронизация невозможна (нужна полная перезагрузка)"""
+    pass
+
+
+def quote(name: str) -> str:
+    """Экранирование идентификатора MS SQL"""
+    return '[' + name.replace(']', ']]') + ']'
+
+
+class DeltaSync:
+    """
+    Догоняющая синхронизация одной таблицы.
+
+    Example:
+        >>> sync = DeltaSync('accnt', mssql_conn, pg_conn, source_columns, target_columns)
+        >>> sync.begin()              # перед первичной загрузкой
+        >>> ...                       # первичная загрузка
+        >>> sync.run(max_rounds=10)   # догоняющие раунды перед переключением
+    """
+
+    def __init__(self, table_name: str, source_connection, target_connection,
+                 source_columns: Sequence[str], target_columns: Sequence[str],
+                 task_id: int = 2, source_schema: str = 'ags', target_schema: str = 'ags',
+                 batch_size: int = 5000):
+        """
+        Инициализация DeltaSync.
+
+        Args:
+            table_name: Имя таблицы
+            source_connection: Подключение pyodbc к MS SQL Server
+            target_connection: Подключение psycopg2 к PostgreSQL
+            source_columns: Колонки источника (в порядке target_columns)
+            target_columns: Колонки целевой таблицы
+            task_id: Задача миграции
+            source_schema: Схема таблицы в MS SQL
+            target_schema: Схема таблицы в PostgreSQL
+            batch_size: Размер пакета upsert/delete
+        """
+        self.table_name = table_name
+        self.source_connection = source_connection
+        self.target_connection = target_connection
+        self.source_columns = list(source_columns)
+        self.target_columns = list(target_columns)
+        self.task_id = task_id
+        self.source_schema = source_schema
+        self.target_schema = target_schema
+        self.batch_size = batch_size
+
+        self.mode: Optional[str] = None
+        self.rowversion_column: Optional[str] = None
+        self.key_columns: List[str] = []
+        self._detected = False
+
+    @property
+    def source_table(self) -> str:
+        return f"{quote(self.source_schema)}.{quote(self.table_name)}"
+
+    @property
+    def target_table(self) -> str:
+        return f"{self.target_schema}.{self.table_name}"
+
+    def _source_query(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        cursor = self.source_connection.cursor()
+        try:
+            cursor.execute(sql, params)
+            return [tuple(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def detect(self) -> Optional[str]:
+        """
+        Определение режима синхронизации и первичного ключа источника.
+
+        Returns:
+            Optional[str]: Режим или None, если таблица не поддерживает синхронизацию
+        """
+        if self._detected:
+            return self.mode
+        self._detected = True
+
+        object_name = f"{self.source_schema}.{self.table_name}"
+        rows = self._source_query(SOURCE_INFO_QUERY, (object_name,))
+        if not rows:
+            return None
+        has_change_tracking, self.rowversion_column = rows[0]
+
+        self.key_columns = [row[0] for row in self._source_query(PRIMARY_KEY_QUERY, (object_name,))]
+        if not self.key_columns:
+            logger.info(f"Таблица {self.table_name} без первичного ключа: синхронизация недоступна")
+            return None
+
+        if has_change_tracking:
+            self.mode = 'change_tracking'
+        elif self.rowversion_column:
+            self.mode = 'rowversion'
+        return self.mode
+
+    def current_watermark(self) -> int:
+        """
+        Текущий водяной знак источника.
+
+        Для rowversion берется MIN_ACTIVE_ROWVERSION() - 1: строки
+        незафиксированных транзакций в раунд не попадают и будут
+        перенесены следующим раундом.
+        """
+        if self.mode == 'change_tracking':
+            sql = "SELECT CHANGE_TRACKING_CURRENT_VERSION()"
+        else:
+            sql = "SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1"
+        return int(self._source_query(sql)[0][0])
+
+    def load_state(self) -> Optional[Dict[str, Any]]:
+        """Состояние синхронизации из mcl.table_sync_state (database/sql/migration_state)"""
+        cursor = self.target_connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT sync_mode, watermark, rows_upserted, rows_deleted, sync_count, last_sync_at
+                FROM mcl.table_sync_state
+                WHERE task_id = %s AND table_name = %s
+            """, (self.task_id, self.table_name))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if not row:
+            return None
+        keys = ('sync_mode', 'watermark', 'rows_upserted', 'rows_deleted', 'sync_count', 'last_sync_at')
+        return dict(zip(keys, row))
+
+    def begin(self, snapshot=None) -> Optional[int]:
+        """
+        Фиксация водяного знака перед первичной загрузкой.
+
+        Изменения, сделанные во время загрузки, попадут в первый раунд
+        синхронизации (upsert идемпотентен).
+
+        Args:
+            snapshot: Снимок базы источника (SourceSnapshot), данные
+                которого загружаются; водяной знак берется из снимка
+
+        Returns:
+            Optional[int]: Водяной знак или None, если синхронизация недоступна
+        """
+        if not self.detect():
+            return None
+        watermark = snapshot.watermark(self.mode) if snapshot else self.current_watermark()
+        if watermark is None:
+            raise DeltaSyncError(f"В снимке {snapshot.snapshot_database} нет водяного знака режима {self.mode}")
+
+        cursor = self.target_connection.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO mcl.table_sync_state (task_id, table_name, sync_mode, watermark)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (task_id, table_name) DO UPDATE
+                SET sync_mode = EXCLUDED.sync_mode, watermark = EXCLUDED.watermark,
+                    rows_upserted = 0, rows_deleted = 0, sync_count = 0,
+                    last_sync_at = NULL, updated_at = CURRENT_TIMESTAMP
+            """, (self.task_id, self.table_name, self.mode, watermark))
+            self.target_connection.commit()
+        finally:
+            cursor.close()
+        return watermark
+
+    def _key_positions(self) -> List[int]:
+        """Позиции колонок ключа в списке колонок источника"""
+        positions = {name.lower(): i for i, name in enumerate(self.source_columns)}
+        try:
+            return [positions[name.lower()] for name in self.key_columns]
+        except KeyError as e:
+            raise DeltaSyncError(f"Колонка ключа {e} отсутствует в списке переносимых колонок")
+
+    def _fetch_changes(self, low: int, high: int) -> Iterator[Tuple[str, tuple]]:
+        """
+        Изменения в окне (low, high].
+
+        Yields:
+            Tuple[str, tuple]: ('U', строка) для upsert или ('D', ключ) для удаления
+        """
+        select_list = ', '.join(f"t.{quote(c)}" for c in self.source_columns)
+        key_count = len(self.key_columns)
+
+        if self.mode == 'change_tracking':
+            min_valid = self._source_query(
+                "SELECT CHANGE_TRACKING_MIN_VALID_VERSION(OBJECT_ID(?))",
+                (f"{self.source_schema}.{self.table_name}",)
+            )[0][0]
+            if min_valid is not None and low < min_valid:
+                raise DeltaSyncError(
+                    f"Водяной знак {low} таблицы {self.table_name} старше срока хранения "
+                    f"Change Tracking ({min_valid}): требуется полная перезагрузка"
+                )
+            ct_keys = ', '.join(f"ct.{quote(c)}" for c in self.key_columns)
+            join = ' AND '.join(f"t.{quote(c)} = ct.{quote(c)}" for c in self.key_columns)
+            sql = f"""
+                SELECT CASE WHEN t.{quote(self.key_columns[0])} IS NULL THEN 'D' ELSE 'U' END,
+                       {ct_keys}, {select_list}
+                FROM CHANGETABLE(CHANGES {self.source_table}, ?) AS ct
+                LEFT JOIN {self.source_table} AS t ON {join}
+                WHERE ct.SYS_CHANGE_VERSION <= ?
+                ORDER BY ct.SYS_CHANGE_VERSION
+            """
+        else:
+            rowversion = quote(self.rowversion_column)
+            sql = f"""
+                SELECT 'U', {', '.join(f"t.{quote(c)}" for c in self.key_columns)}, {select_list}
+                FROM {self.source_table} AS t
+                WHERE t.{rowversion} > CAST(CAST(? AS BIGINT) AS BINARY(8))
+                  AND t.{rowversion} <= CAST(CAST(? AS BIGINT) AS BINARY(8))
+                ORDER BY t.{rowversion}
+            """
+
+        cursor = self.source_connection.cursor()
+        try:
+            cursor.execute(sql, (low, high))
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    operation = row[0]
+                    if operation == 'D':
+                        yield 'D', tuple(row[1:1 + key_count])
+                    else:
+                        yield 'U', tuple(row[1 + key_count:])
+        finally:
+            cursor.close()
+
+    def _upsert_sql(self) -> str:
+        key_targets = [self.target_columns[i] for i in self._key_positions()]
+        updates = [c for c in self.target_columns if c not in key_targets]
+        conflict = (f"DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in updates)}"
+                    if updates else "DO NOTHING")
+        return (
+            f"INSERT INTO {self.target_table} ({', '.join(self.target_columns)}) "
+            f"OVERRIDING SYSTEM VALUE VALUES ({', '.join(['%s'] * len(self.target_columns))}) "
+            f"ON CONFLICT ({', '.join(key_targets)}) {conflict}"
+        )
+
+    def _delete_sql(self) -> str:
+        key_targets = [self.target_columns[i] for i in self._key_positions()]
+        return (f"DELETE FROM {self.target_table} WHERE "
+                + ' AND '.join(f"{c} = %s" for c in key_targets))
+
+    def sync_once(self) -> Dict[str, Any]:
+        """
+        Один раунд синхронизации: изменения от сохраненного водяного знака
+        до текущего. Данные и новый водяной знак фиксируются одной транзакцией.
+
+        Returns:
+            Dict[str, Any]: Статистика раунда (upserted, deleted, watermark, duration)
+
+        Raises:
+            DeltaSyncError: Нет сохраненного водяного знака или он устарел
+        """
+        started = time.perf_counter()
+        if not self.detect():
+            raise DeltaSyncError(f"Таблица {self.table_name} не поддерживает догоняющую синхронизацию")
+        state = self.load_state()
+        if state is None:
+            raise DeltaSyncError(f"Нет водяного знака таблицы {self.table_name}: выполните первичную загрузку")
+        if state['sync_mode'] != self.mode:
+            raise DeltaSyncError(
+                f"Режим синхронизации {self.table_name} изменился ({state['sync_mode']} -> {self.mode}): "
+                f"требуется полная перезагрузка"
+            )
+
+        low = state['watermark']
+        high = self.current_watermark()
+        upserted = deleted = 0
+
+        if high > low:
+            upsert_sql, delete_sql = self._upsert_sql(), self._delete_sql()
+            upserts: List[tuple] = []
+            deletes: List[tuple] = []
+            cursor = self.target_connection.cursor()
+            try:
+                # CHANGETABLE возвращает одну (итоговую) строку на ключ,
+                # поэтому upsert и удаления применяются независимыми пакетами
+                for operation, values in self._fetch_changes(low, high):
+                    if operation == 'D':
+                        deletes.append(values)
+                        if len(deletes) >= self.batch_size:
+                            cursor.executemany(delete_sql, deletes)
+                            deleted += len(deletes)
+                            deletes = []
+                    else:
+                        upserts.append(values)
+                        if len(upserts) >= self.batch_size:
+                            cursor.executemany(upsert_sql, upserts)
+                            upserted += len(upserts)
+                            upserts = []
+                if upserts:
+                    cursor.executemany(upsert_sql, upserts)
+                    upserted += len(upserts)
+                if deletes:
+                    cursor.executemany(delete_sql, deletes)
+                    deleted += len(deletes)
+
+                cursor.execute("""
+                    UPDATE mcl.table_sync_state
+                    SET watermark = %s, rows_upserted = rows_upserted + %s,
+                        rows_deleted = rows_deleted + %s, sync_count = sync_count + 1,
+                        last_sync_at = %s, updated_at = CURRENT_TIMESTAMP
+                    WHERE task_id = %s AND table_name = %s
+                """, (high, upserted, deleted, datetime.now(), self.task_id, self.table_name))
+                self.target_connection.commit()
+            except Exception:
+                self.target_connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        return {
+            'mode': self.mode,
+            'from_watermark': low,
+            'watermark': max(low, high),
+            'upserted': upserted,
+            'deleted': deleted,
+            'duration': time.perf_counter() - started,
+        }
+
+    def run(self, max_rounds: int = 10, interval: float = 5.0, converge_rows: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Раунды синхронизации до сходимости.
+
+        Остановка, когда за раунд перенесено не больше converge_rows строк
+        (остаток переносится за секунды в окне переключения) или после
+        max_rounds раундов.
+
+        Returns:
+            List[Dict[str, Any]]: Статистика раундов
+        """
+        rounds = []
+        for round_number in range(max_rounds):
+            stats = self.sync_once()
+            rounds.append(stats)
+            if stats['upserted'] + stats['deleted'] <= converge_rows:
+                break
+            if round_number + 1 < max_rounds and interval > 0:
+                time.sleep(interval)
+        return rounds
@@ -2,19 +2,42 @@
 ForeignKeyModel - Модель внешнего ключа
 """
 
-from typing import List
+from typing import List, Optional
+
+from src.code.migration.classes.type_descriptor import intern_name
 
 
 class ForeignKeyModel:
     """Модель внешнего ключа"""
     
+    # Вид ограничения и таблица статусов в mcl
+    constraint_kind = "foreign_key"
+    status_table = "mcl.postgres_foreign_keys"
+    
+    __slots__ = (
+        'id', 'name', 'original_name', 'columns', 'referenced_table', 'referenced_columns',
+        'delete_action', 'update_action', 'migration_status', 'error_message',
+        'schema_name', 'table_name', 'source_table_name', 'referenced_schema', 'referenced_source_table',
+    )
+    
     def __init__(self, name: str):
-        self.name = name
+        self.id: Optional[int] = None
+        self.name = intern_name(name)
+        self.original_name: Optional[str] = None
         self.columns: List[str] = []
         self.referenced_table = ""
         self.referenced_columns: List[str] = []
         self.delete_action = "NO ACTION"
         self.update_action = "NO ACTION"
+        self.migration_status = "pending"
+        self.error_message: Optional[str] = None
+        
+        # Целевые таблицы (PostgreSQL) и исходные имена (MS SQL)
+        self.schema_name = "ags"
+        self.table_name = ""
+        self.source_table_name = ""
+        self.referenced_schema = "ags"
+        self.referenced_source_table = ""
     
     def get_ddl_definition(self) -> str:
         """Генерация DDL определения внешнего ключа"""
@@ -23,6 +46,23 @@ class ForeignKeyModel:
                 f"REFERENCES {self.referenced_table} ({', '.join(self.referenced_columns)}) "
                 f"ON DELETE {self.delete_action} ON UPDATE {self.update_action}")
     
+    def generate_create_sql(self, not_valid: bool = True) -> str:
+        """
+        Генерация ALTER TABLE ... ADD CONSTRAINT.
+        
+        NOT VALID: существующие строки не проверяются, блокировка
+        держится только на время изменения каталога.
+        """
+        sql = (f"ALTER TABLE {self.schema_name}.{self.table_name} ADD CONSTRAINT {self.name} "
+               f"FOREIGN KEY ({', '.join(self.columns)}) "
+               f"REFERENCES {self.referenced_schema}.{self.referenced_table} ({', '.join(self.referenced_columns)}) "
+               f"ON DELETE {self.delete_action} ON UPDATE {self.update_action}")
+        return sql + " NOT VALID" if not_valid else sql
+    
+    def generate_validate_sql(self) -> str:
+        """Генерация VALIDATE CONSTRAINT (проверка существующих строк)"""
+        return f"ALTER TABLE {self.schema_name}.{self.table_name} VALIDATE CONSTRAINT {self.name}"
+    
     def validate(self) -> bool:
         """Валидация внешнего ключа"""
         return (bool(self.name) and 
@@ -4,13 +4,17 @@ IndexColumnModel - Модель для представления колонки
 
 from typing import Optional
 
+from src.code.migration.classes.type_descriptor import intern_name
+
 
 class IndexColumnModel:
     """Модель для представления колонки в индексе"""
     
+    __slots__ = ('index_name', 'column_name', 'ordinal_position', 'is_descending', 'column_id', 'index_id')
+    
     def __init__(self, index_name: str, column_name: str, ordinal_position: int, is_descending: bool = False):
-        self.index_name = index_name
-        self.column_name = column_name
+        self.index_name = intern_name(index_name)
+        self.column_name = intern_name(column_name)
         self.ordinal_position = ordinal_position
         self.is_descending = is_descending
         
@@ -5,13 +5,22 @@ IndexModel - Модель для представления индекса
 from typing import List, Optional
 from datetime import datetime
 
+from src.code.migration.classes.type_descriptor import intern_name
+
 
 class IndexModel:
     """Модель для представления индекса таблицы"""
     
+    __slots__ = (
+        'name', 'table_name', 'original_name', 'index_type', 'is_unique', 'is_primary_key',
+        'migration_status', 'migration_date', 'error_message', 'fill_factor', 'is_concurrent',
+        'name_conflict_resolved', 'name_conflict_reason', 'alternative_name', 'columns',
+        'postgres_definition', 'source_index_id', 'table_id',
+    )
+    
     def __init__(self, name: str, table_name: str):
-        self.name = name
-        self.table_name = table_name
+        self.name = intern_name(name)
+        self.table_name = intern_name(table_name)
         self.original_name: Optional[str] = None
         self.index_type: str = "btree"
         self.is_unique: bool = False
@@ -37,7 +46,7 @@ class IndexModel:
     
     def add_column(self, column_name: str, ordinal_position: int, is_descending: bool = False):
         """Добавление колонки в индекс"""
-        from src.classes.index_column_model import IndexColumnModel
+        from src.code.migration.classes.index_column_model import IndexColumnModel
         
         column = IndexColumnModel(
             index_name=self.name,
@@ -55,8 +64,13 @@ class IndexModel:
             columns_sql.append(f"{col.column_name} {direction}")
         return ", ".join(columns_sql)
     
-    def generate_create_sql(self) -> str:
-        """Генерация SQL для создания индекса"""
+    def generate_create_sql(self, if_not_exists: bool = False) -> str:
+        """
+        Генерация SQL для создания индекса.
+        
+        Args:
+            if_not_exists: CREATE INDEX IF NOT EXISTS (индекс мог остаться от прерванной загрузки)
+        """
         if not self.columns:
             raise ValueError(f"Индекс {self.name} не содержит колонок")
         
@@ -74,8 +88,10 @@ class IndexModel:
         # Определяем схему
         schema_name = "ags"  # Целевая схема
         
+        if_not_exists_clause = "IF NOT EXISTS " if if_not_exists else ""
+        
         # Генерируем SQL
-        sql = f"""CREATE {unique_clause}INDEX {index_name} ON {schema_name}.{self.table_name}{index_type_clause} ({self.get_columns_sql()})"""
+        sql = f"""CREATE {unique_clause}INDEX {if_not_exists_clause}{index_name} ON {schema_name}.{self.table_name}{index_type_clause} ({self.get_columns_sql()})"""
         
         # Добавляем параметры
         if self.fill_factor != 90:
@@ -0,0 +1,351 @@
+"""
+LobTransfer - Перенос таблиц с LOB колонками с ограничением памяти
+
+Колонки без ограничения длины (varbinary(max), (n)varchar(max), image,
+text, ntext, xml) определяются по типу и длине колонки источника
+(ColumnModel.source_data_type, source_is_max_length): varbinary(n) и
+varchar(n) переносятся вместе со строкой, хотя в PostgreSQL это тоже
+bytea и text. Строки читаются
+страницами по ключу (keyset), размер страницы рассчитывается из бюджета
+памяти. Значения LOB не длиннее порога читаются вместе со строкой,
+более длинные - частями через SUBSTRING по ключу строки. Все значения
+пишутся одним COPY FROM STDIN из потока, который формирует текст COPY
+по частям, поэтому полное значение LOB в памяти не собирается.
+
+Пиковая память процесса ограничена бюджетом независимо от размера LOB.
+С SourceGovernor перенос занимает слот читателя источника, а после
+каждой страницы и каждой части LOB ожидает по лимитам строк и байт.
+"""
+
+import logging
+from contextlib import ExitStack
+from typing import Any, Iterator, List, Optional, Sequence
+
+from src.code.infrastructure.classes.batch_size_controller import estimate_column_width
+from src.code.infrastructure.classes.migration_tracer import estimate_payload_bytes
+
+
+logger = logging.getLogger(__name__)
+
+
+# Типы MS SQL, которые всегда LOB, и типы, которые LOB только с длиной MAX
+LOB_SOURCE_TYPES = {'image': 'binary', 'text': 'text', 'ntext': 'text', 'xml': 'text'}
+MAX_LENGTH_SOURCE_TYPES = {'varbinary': 'binary', 'varchar': 'text', 'nvarchar': 'text'}
+
+
+def lob_kind(column) -> Optional[str]:
+    """
+    Вид LOB колонки по типу и длине колонки источника.
+
+    Returns:
+        Optional[str]: 'binary', 'text' или None для обычной колонки
+            (и для колонки без сведений о типе источника)
+    """
+    source_type = (getattr(column, 'source_data_type', None) or '').lower()
+    if source_type in LOB_SOURCE_TYPES:
+        return LOB_SOURCE_TYPES[source_type]
+    if source_type in MAX_LENGTH_SOURCE_TYPES and getattr(column, 'source_is_max_length', False):
+        return MAX_LENGTH_SOURCE_TYPES[source_type]
+    return None
+
+
+def quote(name: str) -> str:
+    """Экранирование идентификатора MS SQL"""
+    return '[' + name.replace(']', ']]') + ']'
+
+
+def escape_text(text: str) -> str:
+    """Экранирование текста для формата COPY"""
+    if any(char in text for char in '\\\t\n\r'):
+        text = (text.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+    return text
+
+
+def copy_scalar(value: Any) -> str:
+    """Значение обычной колонки в текстовом формате COPY"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\\\x' + bytes(value).hex()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return escape_text(str(value))
+
+
+class CopyStream:
+    """
+    Файлоподобный поток для cursor.copy_expert из итератора строк текста.
+
+    read(size) возвращает не больше size символов, в памяти хранится
+    только текущая часть.
+    """
+
+    def __init__(self, pieces: Iterator[str]):
+        self._pieces = pieces
+        self._piece = ''
+        self._offset = 0
+
+    def read(self, size: int = -1) -> str:
+        if size is None or size < 0:
+            rest = self._piece[self._offset:] + ''.join(self._pieces)
+            self._piece, self._offset = '', 0
+            return rest
+        # Части читаются по смещению без копирования остатка
+        parts, remaining = [], size
+        while remaining > 0:
+            if self._offset >= len(self._piece):
+                piece = next(self._pieces, None)
+                if piece is None:
+                    break
+                self._piece, self._offset = piece, 0
+                continue
+            part = self._piece[self._offset:self._offset + remaining]
+            self._offset += len(part)
+            remaining -= len(part)
+            parts.append(part)
+        return ''.join(parts)
+
+
+class LobColumn:
+    """Колонка переносимой таблицы"""
+
+    __slots__ = ('source_name', 'target_name', 'kind', 'expression')
+
+    def __init__(self, source_name: str, target_name: str, kind: Optional[str], source_type: Optional[str] = None):
+        self.source_name = source_name
+        self.target_name = target_name
+        self.kind = kind
+        # xml не поддерживает SUBSTRING: читается как nvarchar(max)
+        self.expression = quote(source_name)
+        if (source_type or '').lower() == 'xml':
+            self.expression = f"CAST({self.expression} AS NVARCHAR(MAX))"
+
+
+class LobTransfer:
+    """
+    Перенос таблицы с LOB колонками через COPY.
+
+    Example:
+        >>> transfer = LobTransfer(mssql_conn, pg_conn, 'docs', table_model.columns, ['DocId'])
+        >>> rows = transfer.transfer()
+    """
+
+    def __init__(self, source_connection, target_connection, table_name: str,
+                 columns: Sequence[Any], key_columns: Sequence[str],
+                 memory_budget_bytes: int = 64 * 1024 * 1024, chunk_size: int = 1024 * 1024,
+                 source_schema: str = 'ags', target_schema: str = 'ags', governor=None):
+        """
+        Инициализация LobTransfer.
+
+        Args:
+            source_connection: Подключение pyodbc к MS SQL Server
+            target_connection: Подключение psycopg2 (commit выполняет вызывающая сторона)
+            table_name: Имя таблицы
+            columns: Колонки (ColumnModel) в порядке целевой таблицы
+            key_columns: Колонки первичного ключа источника
+            memory_budget_bytes: Бюджет памяти на рабочий процесс
+            chunk_size: Размер части LOB в байтах (и порог чтения вместе со строкой)
+            source_schema: Схема таблицы в MS SQL
+            target_schema: Схема таблицы в PostgreSQL
+            governor: SourceGovernor - слот читателя и лимиты источника
+        """
+        if not key_columns:
+            raise ValueError(f"Для потокового переноса LOB таблицы {table_name} требуется первичный ключ")
+        self.source_connection = source_connection
+        self.target_connection = target_connection
+        self.table_name = table_name
+        self.columns = [LobColumn(c.source_name, c.name, lob_kind(c), getattr(c, 'source_data_type', None))
+                        for c in columns]
+        self.key_columns = list(key_columns)
+        self.governor = governor
+        self.source_table = f"{quote(source_schema)}.{quote(table_name)}"
+        self.target_table = f"{target_schema}.{table_name}"
+
+        # Часть LOB не больше четверти бюджета: в памяти одновременно
+        # строка COPY, буфер потока и часть в шестнадцатеричном виде
+        self.chunk_size = max(1024, min(chunk_size, memory_budget_bytes // 4))
+        lob_count = sum(1 for c in self.columns if c.kind)
+        scalar_width = sum(estimate_column_width(getattr(c, 'data_type', None),
+                                                 getattr(c, 'data_type_max_length', None),
+                                                 getattr(c, 'data_type_precision', None))
+                           for c in columns if not lob_kind(c))
+        row_bytes = scalar_width + lob_count * self.chunk_size * 2
+        self.page_size = max(1, (memory_budget_bytes // 2) // max(1, row_bytes))
+
+        positions = {c.source_name.lower(): i for i, c in enumerate(self.columns)}
+        try:
+            self.key_positions = [positions[name.lower()] for name in self.key_columns]
+        except KeyError as e:
+            raise ValueError(f"Колонка ключа {e} отсутствует в списке переносимых колонок")
+
+        self.rows = 0
+        self.bytes = 0
+        self.streamed_values = 0
+        self.max_value_bytes = 0
+        self.throttle_wait = 0.0
+
+    @property
+    def lob_columns(self) -> List[LobColumn]:
+        return [c for c in self.columns if c.kind]
+
+    def _page_sql(self, first: bool) -> str:
+        """Страница строк по ключу: LOB длиннее порога заменяются на NULL"""
+        select_list = []
+        for column in self.columns:
+            name = column.expression
+            if column.kind:
+                select_list.append(f"CASE WHEN DATALENGTH({name}) <= {self.chunk_size} THEN {name} END")
+                select_list.append(f"DATALENGTH({name})")
+            else:
+                select_list.append(name)
+
+        where = ''
+        if not first:
+            # (k1, k2, ...) > (?, ?, ...) в виде дизъюнкции
+            conditions = []
+            for i in range(len(self.key_columns)):
+                parts = [f"{quote(k)} = ?" for k in self.key_columns[:i]]
+                parts.append(f"{quote(self.key_columns[i])} > ?")
+                conditions.append('(' + ' AND '.join(parts) + ')')
+            where = ' WHERE ' + ' OR '.join(conditions)
+
+        order_by = ', '.join(quote(k) for k in self.key_columns)
+        return f"SELECT TOP ({self.page_size}) {', '.join(select_list)} FROM {self.source_table}{where} ORDER BY {order_by}"
+
+    def _throttle(self, rows: int, payload_bytes: int) -> None:
+        """Ожидание по лимитам источника после чтения страницы или части LOB"""
+        if self.governor:
+            self.throttle_wait += self.governor.throttle(rows, payload_bytes)
+
+    @staticmethod
+    def _keyset_params(key: Sequence[Any]) -> List[Any]:
+        params = []
+        for i in range(len(key)):
+            params.extend(key[:i])
+            params.append(key[i])
+        return params
+
+    def _pages(self) -> Iterator[List[tuple]]:
+        """Страницы строк источника (курсор закрывается до чтения частей LOB)"""
+        last_key = None
+        while True:
+            cursor = self.source_connection.cursor()
+            try:
+                if last_key is None:
+                    cursor.execute(self._page_sql(True))
+                else:
+                    cursor.execute(self._page_sql(False), self._keyset_params(last_key))
+                rows = [tuple(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+            if not rows:
+                return
+            self._throttle(len(rows), estimate_payload_bytes(rows))
+            yield rows
+            if len(rows) < self.page_size:
+                return
+            last_key = self._row_key(rows[-1])
+
+    def _row_values(self, row: tuple) -> List[tuple]:
+        """Пары (значение, длина LOB) по колонкам строки страницы"""
+        values, position = [], 0
+        for column in self.columns:
+            if column.kind:
+                values.append((row[position], row[position + 1]))
+                position += 2
+            else:
+                values.append((row[position], None))
+                position += 1
+        return values
+
+    def _row_key(self, row: tuple) -> List[Any]:
+        values = self._row_values(row)
+        return [values[i][0] for i in self.key_positions]
+
+    def _chunks(self, column: LobColumn, key: Sequence[Any]) -> Iterator[Any]:
+        """Части значения LOB по ключу строки"""
+        # Для текстовых типов SUBSTRING считает символы (nvarchar - 2 байта)
+        size = self.chunk_size // 2 if column.kind == 'text' else self.chunk_size
+        where = ' AND '.join(f"{quote(k)} = ?" for k in self.key_columns)
+        sql = f"SELECT SUBSTRING({column.expression}, ?, ?) FROM {self.source_table} WHERE {where}"
+        start = 1
+        while True:
+            cursor = self.source_connection.cursor()
+            try:
+                cursor.execute(sql, [start, size, *key])
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+            chunk = row[0] if row else None
+            if not chunk:
+                return
+            self._throttle(0, len(chunk))
+            yield chunk
+            # SUBSTRING по nvarchar считает кодовые единицы UTF-16: символ
+            # вне BMP (суррогатная пара) занимает две единицы
+            length = len(chunk.encode('utf-16-le')) // 2 if isinstance(chunk, str) else len(chunk)
+            start += length
+            if length < size:
+                return
+
+    def _lob_pieces(self, column: LobColumn, value: Any, length: Optional[int], key: Sequence[Any]) -> Iterator[str]:
+        """Значение LOB в формате COPY по частям"""
+        if length is None:
+            yield '\\N'
+            return
+        self.max_value_bytes = max(self.max_value_bytes, length)
+        if value is not None or length == 0:
+            chunks = iter([value if value is not None else (b'' if column.kind == 'binary' else '')])
+        else:
+            self.streamed_values += 1
+            chunks = self._chunks(column, key)
+
+        if column.kind == 'binary':
+            yield '\\\\x'
+            for chunk in chunks:
+                yield bytes(chunk).hex()
+        else:
+            for chunk in chunks:
+                yield escape_text(chunk if isinstance(chunk, str) else bytes(chunk).decode('utf-8'))
+
+    def _copy_pieces(self) -> Iterator[str]:
+        """Текст COPY для всей таблицы по частям"""
+        for page in self._pages():
+            for row in page:
+                values = self._row_values(row)
+                key = [values[i][0] for i in self.key_positions]
+                for index, (column, (value, length)) in enumerate(zip(self.columns, values)):
+                    if index:
+                        yield '\t'
+                    if column.kind:
+                        for piece in self._lob_pieces(column, value, length, key):
+                            self.bytes += len(piece)
+                            yield piece
+                    else:
+                        piece = copy_scalar(value)
+                        self.bytes += len(piece)
+                        yield piece
+                yield '\n'
+                self.rows += 1
+
+    def transfer(self) -> int:
+        """
+        Перенос таблицы одним COPY.
+
+        Returns:
+            int: Количество перенесенных строк
+        """
+        with ExitStack() as stack:
+            if self.governor:
+                stack.enter_context(self.governor.reader_slot())
+            cursor = self.target_connection.cursor()
+            stack.callback(cursor.close)
+            column_list = ', '.join(c.target_name for c in self.columns)
+            cursor.copy_expert(f"COPY {self.target_table} ({column_list}) FROM STDIN",
+                               CopyStream(self._copy_pieces()))
+        logger.info(f"LOB перенос {self.table_name}: {self.rows} строк, {self.streamed_values} значений частями, "
+                    f"максимум {self.max_value_bytes} байт")
+        return self.rows
@@ -0,0 +1,367 @@
+"""
+MigrationPlan - Скомпилированный план миграции таблицы
+
+План содержит все, что нужно для переноса таблицы без повторных
+запросов к mcl: DDL, списки колонок, конвертеры значений, SQL индексов,
+DDL представления и зависимости. План сохраняется в JSON вместе с
+хэшем содержимого mcl; MigrationPlanCache перекомпилирует его только
+при изменении хэша.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.code.migration.classes.table_partitioning import PARTITIONING_EXISTS_QUERY
+
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+
+
+PLAN_FORMAT_VERSION = 5
+
+# Хэш структурных метаданных mcl, от которых зависит план таблицы (один
+# запрос, {partitioning} - PARTITIONING_HASH_PART или NULL). Статусы
+# миграции в хэш не входят: план не меняется при их обновлении, статусы
+# индексов читаются отдельно (INDEX_STATUS_QUERY)
+METADATA_HASH_QUERY = """
+    SELECT md5(concat_ws('|',
+        row(pt.object_name, pt.schema_name, pt.base_table_name, pt.view_name, pt.has_computed_columns)::text,
+        (SELECT string_agg(row(pc.column_name, mc.column_name, pdt.typname_with_params, pdt.precision_value,
+                               pdt.scale_value, pdt.length_value, pc.is_identity, pc.ordinal_position,
+                               pc.is_computed, pc.target_type, pc.computed_definition,
+                               pc.postgres_computed_definition, pdt.is_nullable, mbt.base_type_name,
+                               mdt.is_max_length)::text, ','
+                           ORDER BY pc.ordinal_position, pc.id)
+         FROM mcl.postgres_columns pc
+         JOIN mcl.mssql_columns mc ON pc.source_column_id = mc.id
+         LEFT JOIN mcl.postgres_derived_types pdt ON pc.postgres_data_type_id = pdt.id
+         LEFT JOIN mcl.mssql_derived_types mdt ON mc.data_type_id = mdt.id
+         LEFT JOIN mcl.mssql_base_types mbt ON mdt.base_type_id = mbt.id
+         WHERE mc.table_id = mt.id),
+        (SELECT string_agg(row(pi.index_name, pi.index_type, pi.is_unique, pi.is_primary_key, pi.fill_factor,
+                               pi.is_concurrent, pi.alternative_name,
+                               (SELECT string_agg(pc.column_name || ':' || pic.ordinal_position || ':' ||
+                                                  pic.is_descending, ',' ORDER BY pic.ordinal_position)
+                                FROM mcl.postgres_index_columns pic
+                                JOIN mcl.postgres_columns pc ON pic.column_id = pc.id
+                                WHERE pic.index_id = pi.id))::text, ',' ORDER BY pi.id)
+         FROM mcl.postgres_indexes pi
+         JOIN mcl.mssql_indexes mi ON pi.source_index_id = mi.id
+         WHERE mi.table_id = mt.id),
+        (SELECT string_agg(rpt.object_name, ',' ORDER BY rpt.object_name)
+         FROM mcl.postgres_foreign_keys pfk
+         JOIN mcl.postgres_tables rpt ON pfk.referenced_table_id = rpt.id
+         WHERE pfk.table_id = pt.id),
+        (SELECT max(updated_at)::text || '/' || count(*) FROM mcl.function_mapping_rules WHERE is_active = true),
+        {partitioning}
+    ))
+    FROM mcl.mssql_tables mt
+    JOIN mcl.postgres_tables pt ON pt.source_table_id = mt.id
+    WHERE mt.object_name = %s AND mt.task_id = %s
+"""
+
+# Спецификация секционирования в хэше; mcl.table_partitioning создается
+# отдельным скриптом и может отсутствовать (тогда вместо подзапроса - NULL)
+PARTITIONING_HASH_PART = """(SELECT row(tp.partition_column, tp.strategy, tp.range_start, tp.range_end,
+                    tp.partition_interval, tp.include_default)::text
+         FROM mcl.table_partitioning tp
+         WHERE tp.table_name = mt.object_name AND tp.task_id = mt.task_id AND tp.is_enabled = true)"""
+
+# Текущие статусы миграции индексов таблицы (план хранит только структуру)
+INDEX_STATUS_QUERY = """
+    SELECT pi.source_index_id, pi.migration_status
+    FROM mcl.postgres_indexes pi
+    JOIN mcl.mssql_indexes mi ON pi.source_index_id = mi.id
+    JOIN mcl.mssql_tables mt ON mi.table_id = mt.id
+    WHERE mt.object_name = %s AND mt.task_id = %s
+"""
+
+# Приведение значений источника к типам PostgreSQL. Значения pyodbc
+# psycopg2 адаптирует сам; конвертеры нужны источникам, которые отдают
+# строки и числа (BCP, Parquet).
+CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    'bool': lambda value: value if isinstance(value, bool) else str(value).strip().lower() in ('1', 't', 'true'),
+    'uuid': lambda value: str(value),
+    'decimal': lambda value: value if isinstance(value, Decimal) else Decimal(str(value)),
+    'bytes': lambda value: value if isinstance(value, (bytes, bytearray, memoryview)) else bytes.fromhex(value),
+}
+
+_CONVERTER_BY_TYPE = {'boolean': 'bool', 'uuid': 'uuid', 'numeric': 'decimal', 'bytea': 'bytes'}
+
+_COLUMN_FIELDS = (
+    'name', 'source_name', 'data_type', 'data_type_precision', 'data_type_scale', 'data_type_max_length',
+    'is_nullable', 'is_identity', 'default_value', 'ordinal_position',
+)
+_COMPUTED_FIELDS = ('is_computed', 'target_type', 'computed_definition', 'postgres_computed_definition')
+_SOURCE_FIELDS = ('source_data_type', 'source_is_max_length')
+_INDEX_FIELDS = (
+    'name', 'table_name', 'original_name', 'index_type', 'is_unique', 'is_primary_key',
+    'fill_factor', 'is_concurrent', 'alternative_name', 'postgres_definition', 'source_index_id',
+)
+
+
+def converter_for(data_type: Optional[str]) -> Optional[str]:
+    """Имя конвертера для целевого типа колонки (None - без преобразования)"""
+    if not data_type:
+        return None
+    return _CONVERTER_BY_TYPE.get(data_type.split('(')[0].strip().lower())
+
+
+class MigrationPlan:
+    """Скомпилированный план миграции таблицы"""
+
+    def __init__(self, table_name: str, metadata_hash: Optional[str], data: Dict[str, Any]):
+        self.table_name = table_name
+        self.metadata_hash = metadata_hash
+        self.data = data
+
+    @property
+    def source_columns(self) -> List[str]:
+        return self.data['source_columns']
+
+    @property
+    def target_columns(self) -> List[str]:
+        return self.data['target_columns']
+
+    @property
+    def has_computed_columns(self) -> bool:
+        return self.data['has_computed_columns']
+
+    @classmethod
+    def compile(cls, table_model, metadata_hash: Optional[str], table_ddl: str) -> 'MigrationPlan':
+        """
+        Компиляция плана из загруженной модели таблицы.
+
+        Args:
+            table_model: TableModel с загруженными метаданными
+            metadata_hash: Хэш содержимого mcl (METADATA_HASH_QUERY)
+            table_ddl: DDL целевой таблицы
+        """
+        view = getattr(table_model, 'view_reference', None)
+        view_ddl = None
+        if view is not None and view.base_table_model is not None:
+            try:
+                view_ddl = view.generate_view_ddl()
+            except Exception as e:
+                logger.warning(f"Не удалось сгенерировать DDL представления {view.view_name}: {e}")
+
+        partitioning = getattr(table_model, 'partitioning', None)
+
+        columns = []
+        for column in table_model.columns:
+            entry = {field: getattr(column, field, None) for field in _COLUMN_FIELDS + _COMPUTED_FIELDS + _SOURCE_FIELDS}
+            entry['converter'] = converter_for(column.data_type)
+            columns.append(entry)
+
+        indexes = []
+        for index in table_model.indexes:
+            entry = {field: getattr(index, field, None) for field in _INDEX_FIELDS}
+            entry['columns'] = [[c.column_name, c.ordinal_position, c.is_descending] for c in index.columns]
+            try:
+                entry['create_sql'] = index.generate_create_sql()
+            except ValueError:
+                entry['create_sql'] = None
+            indexes.append(entry)
+
+        data = {
+            'format_version': PLAN_FORMAT_VERSION,
+            'compiled_at': datetime.now().isoformat(),
+            'has_computed_columns': view is not None,
+            'target_table_name': getattr(table_model, 'target_table_name', None)
+                                 or getattr(table_model, 'target_base_table_name', None),
+            'view_name': view.view_name if view is not None else None,
+            'columns': columns,
+            'source_columns': [c.source_name for c in table_model.columns],
+            'target_columns': [c.name for c in table_model.columns],
+            'table_ddl': table_ddl,
+            'indexes': indexes,
+            'view_ddl': view_ddl,
+            'dependencies': sorted({fk.referenced_table for fk in table_model.foreign_keys
+                                    if getattr(fk, 'referenced_table', None)}),
+            'partitioning': partitioning.to_dict() if partitioning else None,
+        }
+        return cls(table_model.source_table_name, metadata_hash, data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'table_name': self.table_name, 'metadata_hash': self.metadata_hash, **self.data}
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> 'MigrationPlan':
+        data = dict(payload)
+        return cls(data.pop('table_name'), data.pop('metadata_hash'), data)
+
+    def row_converter(self) -> Optional[Callable[[tuple], tuple]]:
+        """
+        Функция преобразования строки источника или None, если конвертеры не нужны.
+        """
+        converters = [CONVERTERS[c['converter']] if c['converter'] else None for c in self.data['columns']]
+        if not any(converters):
+            return None
+
+        def convert(row: tuple) -> tuple:
+            return tuple(value if value is None or fn is None else fn(value)
+                         for value, fn in zip(row, converters))
+
+        return convert
+
+    def to_table_model(self):
+        """Восстановление TableModel из плана без обращения к mcl"""
+        from src.code.migration.classes.column_model import ColumnModel
+        from src.code.migration.classes.index_model import IndexModel
+        from src.code.migration.classes.table_model import TableModel
+        from src.code.migration.classes.table_partitioning import PartitionSpec
+
+        table_model = TableModel.create_table_model(self.table_name, self.has_computed_columns)
+        table_model.source_exists = True
+
+        for entry in self.data['columns']:
+            column = ColumnModel(entry['name'], entry['source_name'], entry['data_type'],
+                                 entry['data_type_precision'], entry['data_type_scale'],
+                                 entry['data_type_max_length'])
+            for field in _COLUMN_FIELDS[6:] + _COMPUTED_FIELDS + _SOURCE_FIELDS:
+                setattr(column, field, entry[field])
+            table_model.columns.append(column)
+
+        for entry in self.data['indexes']:
+            index = IndexModel(entry['name'], entry['table_name'])
+            for field in _INDEX_FIELDS[2:]:
+                setattr(index, field, entry[field])
+            for column_name, ordinal_position, is_descending in entry['columns']:
+                index.add_column(column_name, ordinal_position, is_descending)
+            table_model.indexes.append(index)
+
+        if self.data.get('partitioning'):
+            table_model.partitioning = PartitionSpec.from_dict(self.data['partitioning']).bind(table_model.columns)
+
+        if self.has_computed_columns:
+            table_model.target_base_table_name = self.data['target_table_name']
+            table_model.view_reference.view_name = self.data['view_name']
+            table_model.view_reference.base_table_name = self.data['target_table_name']
+            table_model.view_reference.view_definition = self.data['view_ddl'] or ""
+            table_model.view_reference.set_base_table_model(table_model)
+        else:
+            table_model.target_table_name = self.data['target_table_name']
+        return table_model
+
+    def to_metadata(self, index_statuses: Optional[Dict[Any, str]] = None) -> Dict[str, Any]:
+        """
+        Словарь метаданных в формате TableMigrator.get_table_metadata.
+
+        Args:
+            index_statuses: Статусы индексов по source_index_id (INDEX_STATUS_QUERY)
+        """
+        table_model = self.to_table_model()
+        for index in table_model.indexes:
+            index.migration_status = (index_statuses or {}).get(index.source_index_id, 'pending')
+        return {
+            'table_name': self.table_name,
+            'table_model': table_model,
+            'source_columns': self.source_columns,
+            'target_columns': self.target_columns,
+            'has_computed_columns': self.has_computed_columns,
+            'plan': self,
+        }
+
+
+class MigrationPlanCache:
+    """
+    Кэш планов миграции в каталоге: <directory>/<table>.plan.json.
+
+    Загруженные планы дополнительно запоминаются в памяти процесса
+    по (таблица, хэш), повторная загрузка не читает файл.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._memory: Dict[Tuple[str, str], MigrationPlan] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config_loader) -> Optional['MigrationPlanCache']:
+        """Кэш по migration.plan_cache_dir (пусто - кэш выключен, относительный путь - от корня проекта)"""
+        directory = config_loader.get_config_value('migration.plan_cache_dir')
+        return cls(str(PROJECT_ROOT / directory)) if directory else None
+
+    @staticmethod
+    def metadata_hash(connection, table_name: str, task_id: int = 2) -> Optional[str]:
+        """Хэш структурных метаданных mcl для таблицы (None - таблицы нет в mcl)"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(PARTITIONING_EXISTS_QUERY)
+            partitioning = PARTITIONING_HASH_PART if cursor.fetchone()[0] else 'NULL'
+            cursor.execute(METADATA_HASH_QUERY.format(partitioning=partitioning), (table_name, task_id))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def index_statuses(connection, table_name: str, task_id: int = 2) -> Dict[Any, str]:
+        """Текущие статусы индексов таблицы по source_index_id"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(INDEX_STATUS_QUERY, (table_name, task_id))
+            return dict(cursor.fetchall())
+        finally:
+            cursor.close()
+
+    def path(self, table_name: str) -> Path:
+        safe_name = ''.join(ch if ch.isalnum() or ch in '._-' else '_' for ch in table_name)
+        return self.directory / f"{safe_name}.plan.json"
+
+    def load(self, table_name: str, metadata_hash: Optional[str]) -> Optional[MigrationPlan]:
+        """
+        План с совпадающим хэшем и версией формата или None.
+        """
+        if metadata_hash is None:
+            return None
+        key = (table_name, metadata_hash)
+        plan = self._memory.get(key)
+        if plan is None:
+            try:
+                with open(self.path(table_name), encoding='utf-8') as f:
+                    payload = json.load(f)
+                if (payload.get('format_version') == PLAN_FORMAT_VERSION
+                        and payload.get('metadata_hash') == metadata_hash):
+                    plan = MigrationPlan.from_dict(payload)
+                    with self._lock:
+                        self._memory[key] = plan
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Поврежденный план {self.path(table_name)}: {e}")
+        if plan is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return plan
+
+    def save(self, plan: MigrationPlan) -> Path:
+        """Атомарная запись плана (временный файл + os.replace)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self.path(plan.table_name)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{uuid.uuid4().hex}", dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(plan.to_dict(), f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, target)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if plan.metadata_hash:
+            with self._lock:
+                self._memory[(plan.table_name, plan.metadata_hash)] = plan
+        return target
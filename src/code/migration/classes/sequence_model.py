@@ -4,12 +4,19 @@ SequenceModel - Модель последовательности PostgreSQL
 
 from typing import Optional
 
+from src.code.migration.classes.type_descriptor import intern_name
+
 
 class SequenceModel:
     """Модель последовательности PostgreSQL"""
     
-    def __init__(self, sequence_name: str, column_id: int):
-        self.sequence_name = sequence_name
+    __slots__ = (
+        'sequence_name', 'start_value', 'increment', 'max_value', 'min_value', 'is_cycled', 'is_called',
+        'column_id', 'schema_name', 'table_name', 'column_name', 'last_value',
+    )
+    
+    def __init__(self, sequence_name: str, column_id: Optional[int] = None):
+        self.sequence_name = intern_name(sequence_name)
         self.start_value = 1
         self.increment = 1
         self.max_value: Optional[int] = None
@@ -17,6 +24,12 @@ class SequenceModel:
         self.is_cycled = False
         self.is_called = False
         self.column_id = column_id
+        
+        # Колонка-владелец (identity или serial) и текущее значение
+        self.schema_name = "ags"
+        self.table_name = ""
+        self.column_name = ""
+        self.last_value: Optional[int] = None
     
     def get_ddl_definition(self) -> str:
         """Генерация DDL определения последовательности"""
@@ -39,6 +52,25 @@ class SequenceModel:
         
         return definition
     
+    def resync_value(self, data_value: Optional[int]) -> Optional[int]:
+        """
+        Значение для setval(..., true) после загрузки с OVERRIDING SYSTEM VALUE.
+        
+        Args:
+            data_value: Максимум (для убывающей последовательности - минимум) колонки
+        
+        Returns:
+            Optional[int]: Новое значение или None, если последовательность
+                уже впереди данных (назад не переводится)
+        """
+        if data_value is None:
+            return None
+        if self.last_value is not None and self.is_called:
+            ahead = self.last_value >= data_value if self.increment > 0 else self.last_value <= data_value
+            if ahead:
+                return None
+        return data_value
+    
     def validate(self) -> bool:
         """Валидация последовательности"""
         return bool(self.sequence_name)
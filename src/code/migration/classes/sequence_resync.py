@@ -0,0 +1,181 @@
+"""
+SequenceResync - Синхронизация identity последовательностей после загрузки
+
+Данные вставляются с OVERRIDING SYSTEM VALUE, поэтому последовательности
+identity (и serial) колонок остаются позади данных. После загрузки
+последовательности переводятся на максимум колонки:
+
+    1. последовательности схемы и колонки-владельцы - один запрос к
+       каталогу (pg_depend + pg_sequences);
+    2. максимумы колонок - запросы UNION ALL по chunk_size таблиц
+       (max() по первичному ключу читает только край индекса), либо
+       значения, собранные во время загрузки;
+    3. setval - один SELECT на chunk_size последовательностей.
+
+Последовательность, которая уже впереди данных, назад не переводится.
+"""
+
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.code.migration.classes.sequence_model import SequenceModel
+
+
+logger = logging.getLogger(__name__)
+
+
+# Последовательности, принадлежащие колонкам таблиц схемы:
+# deptype 'i' - identity, 'a' - serial (OWNED BY)
+SEQUENCES_QUERY = """
+    SELECT sn.nspname || '.' || seq.relname, t.relname, a.attname,
+           ps.start_value, ps.increment_by, ps.min_value, ps.max_value, ps.cycle, ps.last_value
+    FROM pg_depend d
+    JOIN pg_class seq ON seq.oid = d.objid AND seq.relkind = 'S'
+    JOIN pg_namespace sn ON sn.oid = seq.relnamespace
+    JOIN pg_class t ON t.oid = d.refobjid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = d.refobjsubid
+    JOIN pg_sequences ps ON ps.schemaname = sn.nspname AND ps.sequencename = seq.relname
+    WHERE d.classid = 'pg_class'::regclass AND d.refclassid = 'pg_class'::regclass
+      AND d.deptype IN ('i', 'a') AND n.nspname = %(schema)s
+      AND (%(tables)s::text[] IS NULL OR t.relname = ANY(%(tables)s))
+    ORDER BY t.relname, a.attname
+"""
+
+
+def quote_ident(name: str) -> str:
+    """Экранирование идентификатора PostgreSQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def chunks(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SequenceResync:
+    """
+    Синхронизация последовательностей схемы.
+
+    Example:
+        >>> resync = SequenceResync(pg_conn)
+        >>> summary = resync.run()                                  # все таблицы схемы
+        >>> resync.run(['accnt'], observed={('accnt', 'id'): 1500})  # максимум, собранный при загрузке
+    """
+
+    def __init__(self, connection, schema: str = 'ags', chunk_size: int = 500):
+        """
+        Инициализация SequenceResync.
+
+        Args:
+            connection: Подключение psycopg2 (commit выполняется после setval)
+            schema: Целевая схема
+            chunk_size: Таблиц в одном запросе максимумов и setval в одном SELECT
+        """
+        self.connection = connection
+        self.schema = schema
+        self.chunk_size = max(1, chunk_size)
+
+    def load_sequences(self, tables: Optional[Sequence[str]] = None) -> List[SequenceModel]:
+        """Последовательности колонок схемы (или заданных таблиц)"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(SEQUENCES_QUERY, {'schema': self.schema, 'tables': list(tables) if tables else None})
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        sequences = []
+        for name, table_name, column_name, start, increment, min_value, max_value, cycle, last_value in rows:
+            sequence = SequenceModel(name)
+            sequence.schema_name = self.schema
+            sequence.table_name, sequence.column_name = table_name, column_name
+            sequence.start_value, sequence.increment = start, increment
+            sequence.min_value, sequence.max_value, sequence.is_cycled = min_value, max_value, cycle
+            sequence.last_value = last_value
+            sequence.is_called = last_value is not None
+            sequences.append(sequence)
+        return sequences
+
+    def _extreme_sql(self, sequences: Sequence[SequenceModel]) -> str:
+        """Один запрос максимумов (минимумов для убывающих) по нескольким таблицам"""
+        parts = []
+        for position, sequence in enumerate(sequences):
+            aggregate = 'max' if sequence.increment > 0 else 'min'
+            parts.append(f"SELECT {position}, {aggregate}({quote_ident(sequence.column_name)})::bigint "
+                         f"FROM {quote_ident(sequence.schema_name)}.{quote_ident(sequence.table_name)}")
+        return '\nUNION ALL\n'.join(parts)
+
+    def collect_values(self, sequences: Sequence[SequenceModel]) -> Dict[Tuple[str, str], Optional[int]]:
+        """Максимумы колонок-владельцев по (таблица, колонка)"""
+        values: Dict[Tuple[str, str], Optional[int]] = {}
+        cursor = self.connection.cursor()
+        try:
+            for chunk in chunks(sequences, self.chunk_size):
+                cursor.execute(self._extreme_sql(chunk))
+                for position, value in cursor.fetchall():
+                    sequence = chunk[position]
+                    values[(sequence.table_name, sequence.column_name)] = value
+        finally:
+            cursor.close()
+        return values
+
+    def apply(self, assignments: Sequence[Tuple[SequenceModel, int]]) -> int:
+        """
+        setval для последовательностей пакетами.
+
+        Returns:
+            int: Количество переведенных последовательностей
+        """
+        cursor = self.connection.cursor()
+        try:
+            for chunk in chunks(assignments, self.chunk_size):
+                calls = ', '.join('setval(%s::regclass, %s, true)' for _ in chunk)
+                params: List[Any] = []
+                for sequence, value in chunk:
+                    params.extend((sequence.sequence_name, value))
+                cursor.execute(f"SELECT {calls}", params)
+            self.connection.commit()
+        finally:
+            cursor.close()
+        for sequence, value in assignments:
+            sequence.last_value, sequence.is_called = value, True
+        return len(assignments)
+
+    def run(self, tables: Optional[Sequence[str]] = None,
+            observed: Optional[Dict[Tuple[str, str], Optional[int]]] = None) -> Dict[str, Any]:
+        """
+        Синхронизация последовательностей.
+
+        Args:
+            tables: Целевые таблицы (None - вся схема)
+            observed: Максимумы, собранные во время загрузки, по (таблица, колонка);
+                для остальных колонок максимум запрашивается у таблиц
+
+        Returns:
+            Dict[str, Any]: sequences, queried, updated, duration
+        """
+        started = time.perf_counter()
+        sequences = self.load_sequences(tables)
+        observed = observed or {}
+        unknown = [s for s in sequences if (s.table_name, s.column_name) not in observed]
+        values = dict(observed)
+        values.update(self.collect_values(unknown))
+
+        assignments = []
+        for sequence in sequences:
+            value = sequence.resync_value(values.get((sequence.table_name, sequence.column_name)))
+            if value is not None:
+                assignments.append((sequence, value))
+        updated = self.apply(assignments) if assignments else 0
+
+        summary = {
+            'sequences': len(sequences),
+            'queried': len(unknown),
+            'updated': updated,
+            'duration': time.perf_counter() - started,
+        }
+        logger.info(f"Последовательности {self.schema}: {summary['updated']} из {summary['sequences']} "
+                    f"переведены за {summary['duration']:.2f} с")
+        return summary
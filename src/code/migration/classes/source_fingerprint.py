@@ -0,0 +1,243 @@
+"""
+SourceFingerprint - Дешевый отпечаток исходной таблицы
+
+Отпечаток сохраняется после успешной миграции таблицы. При повторном
+запуске (репетиции миграции) таблица пропускается, если отпечаток
+источника не изменился, а целевая таблица прошла проверку.
+
+Состав отпечатка:
+    - COUNT_BIG(*)
+    - MAX(rowversion), если в таблице есть колонка rowversion: любое
+      изменение строки увеличивает ее значение
+    - иначе CHECKSUM_AGG(BINARY_CHECKSUM(*)); колонки text/ntext/image/xml
+      в BINARY_CHECKSUM не участвуют
+    - хэш метаданных mcl (MigrationPlanCache.metadata_hash): изменение
+      колонок, типов или правил преобразования тоже требует переноса
+
+Таблица, помеченная инкрементальным обновлением метаданных как stale
+(mcl.postgres_tables.migration_status), не пропускается: выбор таблиц для
+миграции (STALE_TABLES_QUERY) считает ее pending, а после проверенного
+переноса статус возвращается в completed (FingerprintStore.clear_stale).
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+TABLE_STATUS_QUERY = """
+    SELECT pt.migration_status
+    FROM mcl.postgres_tables pt
+    JOIN mcl.mssql_tables mt ON pt.source_table_id = mt.id
+    WHERE mt.task_id = %s AND mt.object_name = %s
+"""
+
+# Таблицы задачи, перенесенные по устаревшим метаданным (переносятся повторно)
+STALE_TABLES_QUERY = """
+    SELECT mt.object_name
+    FROM mcl.postgres_tables pt
+    JOIN mcl.mssql_tables mt ON pt.source_table_id = mt.id
+    WHERE mt.task_id = %s AND pt.migration_status = 'stale'
+"""
+
+CLEAR_STALE_SQL = """
+    UPDATE mcl.postgres_tables pt
+    SET migration_status = 'completed', updated_at = CURRENT_TIMESTAMP
+    FROM mcl.mssql_tables mt
+    WHERE pt.source_table_id = mt.id AND mt.task_id = %s AND mt.object_name = %s
+      AND pt.migration_status = 'stale'
+"""
+
+ROWVERSION_COLUMN_QUERY = """
+    SELECT TOP 1 c.name
+    FROM sys.columns c
+    JOIN sys.types ty ON ty.user_type_id = c.user_type_id
+    WHERE c.object_id = OBJECT_ID(?) AND ty.name = 'timestamp'
+"""
+
+
+def quote(name: str) -> str:
+    """Экранирование идентификатора MS SQL"""
+    return '[' + name.replace(']', ']]') + ']'
+
+
+class SourceFingerprint:
+    """Отпечаток исходной таблицы"""
+
+    def __init__(self, row_count: int, max_rowversion: Optional[int] = None,
+                 checksum_agg: Optional[int] = None, metadata_hash: Optional[str] = None):
+        self.row_count = row_count
+        self.max_rowversion = max_rowversion
+        self.checksum_agg = checksum_agg
+        # Хэш метаданных mcl таблицы (задает мигратор после compute)
+        self.metadata_hash = metadata_hash
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SourceFingerprint):
+            return NotImplemented
+        return (self.row_count, self.max_rowversion, self.checksum_agg, self.metadata_hash) == \
+               (other.row_count, other.max_rowversion, other.checksum_agg, other.metadata_hash)
+
+    def __repr__(self) -> str:
+        return (f"SourceFingerprint(rows={self.row_count}, rowversion={self.max_rowversion}, "
+                f"checksum={self.checksum_agg}, metadata={(self.metadata_hash or '')[:12]})")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'row_count': self.row_count,
+            'max_rowversion': self.max_rowversion,
+            'checksum_agg': self.checksum_agg,
+            'metadata_hash': self.metadata_hash,
+        }
+
+    @classmethod
+    def compute(cls, connection, table_name: str, schema: str = 'ags') -> 'SourceFingerprint':
+        """
+        Вычисление отпечатка таблицы MS SQL Server.
+
+        Args:
+            connection: Подключение pyodbc
+            table_name: Имя таблицы
+            schema: Схема таблицы
+        """
+        cursor = connection.cursor()
+        try:
+            cursor.execute(ROWVERSION_COLUMN_QUERY, (f"{schema}.{table_name}",))
+            row = cursor.fetchone()
+            rowversion_column = row[0] if row else None
+
+            source_table = f"{quote(schema)}.{quote(table_name)}"
+            if rowversion_column:
+                cursor.execute(
+                    f"SELECT COUNT_BIG(*), CAST(MAX({quote(rowversion_column)}) AS BIGINT), NULL "
+                    f"FROM {source_table}"
+                )
+            else:
+                cursor.execute(f"SELECT COUNT_BIG(*), NULL, CHECKSUM_AGG(BINARY_CHECKSUM(*)) FROM {source_table}")
+            row_count, max_rowversion, checksum_agg = cursor.fetchone()
+            return cls(int(row_count), max_rowversion, checksum_agg)
+        finally:
+            cursor.close()
+
+
+class FingerprintStore:
+    """
+    Хранилище отпечатков в mcl.table_fingerprints (таблица создается
+    скриптом database/sql/migration_state).
+
+    Example:
+        >>> store = FingerprintStore(pg_conn)
+        >>> if store.is_unchanged('accnt', SourceFingerprint.compute(mssql_conn, 'accnt')):
+        ...     print('пропуск')
+    """
+
+    def __init__(self, connection, task_id: int = 2, target_schema: str = 'ags'):
+        self.connection = connection
+        self.task_id = task_id
+        self.target_schema = target_schema
+
+    def load(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """Сохраненный отпечаток и результат проверки целевой таблицы"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT row_count, max_rowversion, checksum_agg, metadata_hash, target_row_count, verified_at
+                FROM mcl.table_fingerprints
+                WHERE task_id = %s AND table_name = %s
+            """, (self.task_id, table_name))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if not row:
+            return None
+        return {
+            'fingerprint': SourceFingerprint(row[0], row[1], row[2], row[3]),
+            'target_row_count': row[4],
+            'verified_at': row[5],
+        }
+
+    def save(self, table_name: str, fingerprint: SourceFingerprint, target_row_count: int) -> None:
+        """Сохранение отпечатка после успешной и проверенной миграции"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO mcl.table_fingerprints
+                    (task_id, table_name, row_count, max_rowversion, checksum_agg, metadata_hash,
+                     target_row_count, verified_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (task_id, table_name) DO UPDATE
+                SET row_count = EXCLUDED.row_count, max_rowversion = EXCLUDED.max_rowversion,
+                    checksum_agg = EXCLUDED.checksum_agg, metadata_hash = EXCLUDED.metadata_hash,
+                    target_row_count = EXCLUDED.target_row_count,
+                    verified_at = EXCLUDED.verified_at, updated_at = CURRENT_TIMESTAMP
+            """, (self.task_id, table_name, fingerprint.row_count, fingerprint.max_rowversion,
+                  fingerprint.checksum_agg, fingerprint.metadata_hash, target_row_count, datetime.now()))
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def invalidate(self, table_name: str) -> None:
+        """Сброс отпечатка (таблица будет перенесена при следующем запуске)"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("DELETE FROM mcl.table_fingerprints WHERE task_id = %s AND table_name = %s",
+                           (self.task_id, table_name))
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def table_status(self, table_name: str) -> Optional[str]:
+        """Статус целевой таблицы в mcl.postgres_tables (stale - метаданные источника изменились)"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(TABLE_STATUS_QUERY, (self.task_id, table_name))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
+
+    def clear_stale(self, table_name: str) -> bool:
+        """Возврат статуса stale в completed после проверенного повторного переноса"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(CLEAR_STALE_SQL, (self.task_id, table_name))
+            cleared = cursor.rowcount > 0
+            self.connection.commit()
+            return cleared
+        finally:
+            cursor.close()
+
+    def target_row_count(self, table_name: str) -> Optional[int]:
+        """Количество строк целевой таблицы (None - таблицы нет)"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT to_regclass(%s)", (f"{self.target_schema}.{table_name}",))
+            if cursor.fetchone()[0] is None:
+                return None
+            cursor.execute(f"SELECT COUNT(*) FROM {self.target_schema}.{table_name}")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def is_unchanged(self, table_name: str, fingerprint: SourceFingerprint) -> bool:
+        """
+        Источник и метаданные не изменились, целевая таблица проверена.
+
+        Целевая таблица должна существовать, не быть помечена stale и
+        содержать столько же строк, сколько было при сохранении отпечатка.
+        """
+        stored = self.load(table_name)
+        if stored is None or stored['verified_at'] is None or stored['fingerprint'] != fingerprint:
+            return False
+        if self.table_status(table_name) == 'stale':
+            logger.info(f"Метаданные таблицы {table_name} помечены stale")
+            return False
+        target_count = self.target_row_count(table_name)
+        if target_count != stored['target_row_count']:
+            logger.info(f"Целевая таблица {table_name} изменилась: {target_count} строк "
+                        f"вместо {stored['target_row_count']}")
+            return False
+        return True
@@ -0,0 +1,273 @@
+"""
+SourceSnapshot - Согласованное чтение источника без блокировок
+
+Режимы (migration.consistent_read.mode):
+
+    snapshot - каждый читатель читает таблицу в транзакции с уровнем
+               изоляции SNAPSHOT (требуется ALLOW_SNAPSHOT_ISOLATION ON).
+               Водяной знак синхронизации берется в той же транзакции,
+               поэтому загрузка таблицы и водяной знак согласованы.
+    database - на запуск создается снимок базы данных
+               (CREATE DATABASE ... AS SNAPSHOT OF), все читатели запуска
+               подключаются к снимку и видят одну точку во времени.
+               Водяные знаки Change Tracking и rowversion фиксируются на
+               рабочей базе перед созданием снимка и хранятся в
+               mcl.source_snapshots: все, что зафиксировано до водяного
+               знака, есть в снимке, остальное перенесет DeltaSync.
+               Снимок создается до запуска (--create-snapshot RUN_ID),
+               идентификатор запуска передается всем таблицам
+               (--snapshot-run или migration.consistent_read.snapshot_run).
+
+Чтение в обоих режимах не ставит разделяемых блокировок и не мешает
+записи в источник.
+"""
+
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+# Водяные знаки рабочей базы: строки незафиксированных транзакций
+# имеют rowversion не меньше MIN_ACTIVE_ROWVERSION()
+WATERMARK_QUERY = """
+    SELECT CHANGE_TRACKING_CURRENT_VERSION(), CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1
+"""
+
+DATA_FILES_QUERY = """
+    SELECT name, physical_name FROM sys.database_files WHERE type = 0 ORDER BY file_id
+"""
+
+SNAPSHOT_ISOLATION_QUERY = """
+    SELECT snapshot_isolation_state FROM sys.databases WHERE database_id = DB_ID()
+"""
+
+
+class SnapshotError(Exception):
+    """Согласованное чтение источника недоступно"""
+    pass
+
+
+def resolve_snapshot_run(config_loader, snapshot_run_id: Optional[str] = None) -> Optional[str]:
+    """
+    Идентификатор снимка базы, общий для всех таблиц запуска.
+
+    Определяется один раз до начала миграции таблиц: аргумент
+    (--snapshot-run), иначе migration.consistent_read.snapshot_run.
+
+    Returns:
+        Optional[str]: Идентификатор снимка или None, если режим не database
+
+    Raises:
+        SnapshotError: Режим database, но идентификатор снимка не задан
+    """
+    snapshot_run_id = snapshot_run_id or config_loader.get_config_value('migration.consistent_read.snapshot_run')
+    if snapshot_run_id:
+        return str(snapshot_run_id)
+    if config_loader.get_config_value('migration.consistent_read.mode', 'none') == 'database':
+        raise SnapshotError("Режим consistent_read.mode: database требует снимок запуска: создайте его "
+                            "(--create-snapshot RUN_ID) и передайте --snapshot-run RUN_ID "
+                            "или migration.consistent_read.snapshot_run")
+    return None
+
+
+def quote(name: str) -> str:
+    """Экранирование идентификатора MS SQL"""
+    return '[' + name.replace(']', ']]') + ']'
+
+
+def begin_snapshot_read(connection) -> None:
+    """
+    Начало чтения с уровнем изоляции SNAPSHOT.
+
+    Текущая (неявная) транзакция фиксируется: уровень SNAPSHOT нельзя
+    включить внутри транзакции, начатой с другим уровнем. Точка снимка
+    определяется первым чтением данных после вызова.
+
+    Raises:
+        SnapshotError: ALLOW_SNAPSHOT_ISOLATION выключен для базы
+    """
+    connection.commit()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(SNAPSHOT_ISOLATION_QUERY)
+        row = cursor.fetchone()
+        connection.commit()
+        if not row or row[0] != 1:
+            raise SnapshotError("Для базы источника не включен ALLOW_SNAPSHOT_ISOLATION")
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL SNAPSHOT")
+    finally:
+        cursor.close()
+
+
+def end_snapshot_read(connection) -> None:
+    """Завершение чтения SNAPSHOT и возврат к READ COMMITTED"""
+    connection.commit()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+    finally:
+        cursor.close()
+
+
+class SourceSnapshot:
+    """
+    Снимок базы данных источника на запуск миграции.
+
+    Example:
+        >>> snapshot = SourceSnapshot.create(mssql_conn, run_id, 'FishEye')
+        >>> snapshot.save(pg_conn)
+        >>> ...                           # читатели подключаются к snapshot.snapshot_database
+        >>> snapshot.drop(mssql_conn, pg_conn)
+    """
+
+    def __init__(self, run_id: str, source_database: str, snapshot_database: str,
+                 change_tracking_version: Optional[int], rowversion_watermark: int,
+                 created_at: Optional[datetime] = None):
+        self.run_id = run_id
+        self.source_database = source_database
+        self.snapshot_database = snapshot_database
+        self.change_tracking_version = change_tracking_version
+        self.rowversion_watermark = rowversion_watermark
+        self.created_at = created_at
+
+    @staticmethod
+    def snapshot_name(source_database: str, run_id: str) -> str:
+        """Имя базы снимка для запуска"""
+        return f"{source_database}_femcl_{re.sub(r'[^0-9A-Za-z_]', '_', run_id)}"
+
+    @staticmethod
+    def sparse_file(physical_name: str, snapshot_database: str, logical_name: str,
+                    directory: Optional[str] = None) -> str:
+        """Путь разреженного файла снимка (по умолчанию - рядом с файлом базы)"""
+        if directory is None:
+            separator = '\\' if '\\' in physical_name else '/'
+            directory = physical_name.rsplit(separator, 1)[0] if separator in physical_name else ''
+        else:
+            separator = '\\' if '\\' in directory else '/'
+            directory = directory.rstrip(separator)
+        file_name = f"{snapshot_database}_{logical_name}.ss"
+        return f"{directory}{separator}{file_name}" if directory else file_name
+
+    @classmethod
+    def create(cls, connection, run_id: str, source_database: str,
+               directory: Optional[str] = None) -> 'SourceSnapshot':
+        """
+        Фиксация водяных знаков и создание снимка базы источника.
+
+        Args:
+            connection: Подключение pyodbc к рабочей базе источника
+            run_id: Идентификатор запуска
+            source_database: Имя базы источника
+            directory: Каталог разреженных файлов снимка на сервере
+        """
+        snapshot_database = cls.snapshot_name(source_database, run_id)
+        autocommit = connection.autocommit
+        # CREATE DATABASE не выполняется внутри транзакции
+        connection.commit()
+        connection.autocommit = True
+        cursor = connection.cursor()
+        try:
+            cursor.execute(WATERMARK_QUERY)
+            change_tracking_version, rowversion_watermark = cursor.fetchone()
+
+            cursor.execute(DATA_FILES_QUERY)
+            files: List[str] = []
+            for logical_name, physical_name in cursor.fetchall():
+                path = cls.sparse_file(physical_name, snapshot_database, logical_name, directory)
+                files.append(f"(NAME = {quote(logical_name)}, FILENAME = '{path.replace(chr(39), chr(39) * 2)}')")
+            if not files:
+                raise SnapshotError(f"Не найдены файлы данных базы {source_database}")
+
+            cursor.execute(f"CREATE DATABASE {quote(snapshot_database)} ON {', '.join(files)} "
+                           f"AS SNAPSHOT OF {quote(source_database)}")
+        finally:
+            cursor.close()
+            connection.autocommit = autocommit
+
+        logger.info(f"Создан снимок {snapshot_database} базы {source_database}: "
+                    f"CT {change_tracking_version}, rowversion {rowversion_watermark}")
+        return cls(run_id, source_database, snapshot_database,
+                   None if change_tracking_version is None else int(change_tracking_version),
+                   int(rowversion_watermark), datetime.now())
+
+    def watermark(self, sync_mode: Optional[str]) -> Optional[int]:
+        """Водяной знак снимка для режима DeltaSync"""
+        if sync_mode == 'change_tracking':
+            return self.change_tracking_version
+        if sync_mode == 'rowversion':
+            return self.rowversion_watermark
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'run_id': self.run_id,
+            'source_database': self.source_database,
+            'snapshot_database': self.snapshot_database,
+            'change_tracking_version': self.change_tracking_version,
+            'rowversion_watermark': self.rowversion_watermark,
+        }
+
+    def save(self, pg_connection) -> None:
+        """Регистрация снимка в mcl.source_snapshots (таблица создается скриптом database/sql/migration_state)"""
+        cursor = pg_connection.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO mcl.source_snapshots
+                    (run_id, source_database, snapshot_database, change_tracking_version, rowversion_watermark)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (run_id) DO UPDATE
+                SET source_database = EXCLUDED.source_database,
+                    snapshot_database = EXCLUDED.snapshot_database,
+                    change_tracking_version = EXCLUDED.change_tracking_version,
+                    rowversion_watermark = EXCLUDED.rowversion_watermark,
+                    created_at = CURRENT_TIMESTAMP, dropped_at = NULL
+            """, (self.run_id, self.source_database, self.snapshot_database,
+                  self.change_tracking_version, self.rowversion_watermark))
+            pg_connection.commit()
+        finally:
+            cursor.close()
+
+    @classmethod
+    def load(cls, pg_connection, run_id: str) -> Optional['SourceSnapshot']:
+        """Действующий снимок запуска из mcl.source_snapshots"""
+        cursor = pg_connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT source_database, snapshot_database, change_tracking_version,
+                       rowversion_watermark, created_at
+                FROM mcl.source_snapshots
+                WHERE run_id = %s AND dropped_at IS NULL
+            """, (run_id,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if not row:
+            return None
+        return cls(run_id, *row)
+
+    def drop(self, connection, pg_connection=None) -> None:
+        """Удаление снимка после загрузки всех таблиц запуска"""
+        connection.commit()
+        autocommit = connection.autocommit
+        connection.autocommit = True
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"IF DB_ID(?) IS NOT NULL DROP DATABASE {quote(self.snapshot_database)}",
+                           (self.snapshot_database,))
+        finally:
+            cursor.close()
+            connection.autocommit = autocommit
+
+        if pg_connection is not None:
+            cursor = pg_connection.cursor()
+            try:
+                cursor.execute("UPDATE mcl.source_snapshots SET dropped_at = CURRENT_TIMESTAMP WHERE run_id = %s",
+                               (self.run_id,))
+                pg_connection.commit()
+            finally:
+                cursor.close()
+        logger.info(f"Снимок {self.snapshot_database} удален")
@@ -0,0 +1,130 @@
+"""
+StagingMerge - Идемпотентная запись пакетов через промежуточную таблицу
+
+Пакет загружается командой COPY во временную (нежурналируемую) таблицу
+и применяется к целевой одним INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+Промежуточная таблица создается один раз и очищается между пакетами.
+Повторная загрузка частично перенесенной таблицы перезаписывает уже
+перенесенные строки без построчной обработки конфликтов.
+"""
+
+import io
+from datetime import date, datetime, time
+from typing import Any, Iterable, List, Sequence
+
+
+def copy_value(value: Any) -> str:
+    """Значение строки данных в текстовом формате COPY"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\\\x' + bytes(value).hex()
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    text = str(value)
+    if any(char in text for char in '\\\t\n\r'):
+        text = (text.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+    return text
+
+
+def copy_buffer(rows: Iterable[Sequence[Any]]) -> io.StringIO:
+    """Буфер COPY FROM STDIN для строк-кортежей"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+class StagingMerge:
+    """
+    Запись пакетов в целевую таблицу через промежуточную таблицу.
+
+    Example:
+        >>> merge = StagingMerge(pg_conn, 'accnt', ['account_key', 'name'], ['account_key'])
+        >>> for rows in batches:
+        ...     merge.merge(rows)
+        >>> merge.close()
+    """
+
+    def __init__(self, connection, table_name: str, columns: Sequence[str],
+                 key_columns: Sequence[str], target_schema: str = 'ags'):
+        """
+        Инициализация StagingMerge.
+
+        Args:
+            connection: Подключение psycopg2 (транзакцией управляет вызывающая сторона)
+            table_name: Имя целевой таблицы
+            columns: Колонки целевой таблицы в порядке значений строк
+            key_columns: Колонки уникального ключа для ON CONFLICT
+            target_schema: Схема целевой таблицы
+        """
+        if not key_columns:
+            raise ValueError(f"Для слияния таблицы {table_name} требуется уникальный ключ")
+        self.connection = connection
+        self.table_name = table_name
+        self.columns = list(columns)
+        self.key_columns = list(key_columns)
+        self.target_table = f"{target_schema}.{table_name}"
+        self.stage_table = f"femcl_stage_{table_name}"
+        self._prepared = False
+        self._dirty = False
+
+    @property
+    def merge_sql(self) -> str:
+        column_list = ', '.join(self.columns)
+        updates = [c for c in self.columns if c not in self.key_columns]
+        conflict = (f"DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in updates)}"
+                    if updates else "DO NOTHING")
+        return (
+            f"INSERT INTO {self.target_table} ({column_list}) OVERRIDING SYSTEM VALUE "
+            f"SELECT {column_list} FROM {self.stage_table} "
+            f"ON CONFLICT ({', '.join(self.key_columns)}) {conflict}"
+        )
+
+    def prepare(self, cursor) -> None:
+        """Создание промежуточной таблицы с колонками целевой (без ограничений)"""
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {self.stage_table} AS "
+            f"SELECT {', '.join(self.columns)} FROM {self.target_table} WITH NO DATA"
+        )
+        self._prepared = True
+
+    def merge(self, rows: List[tuple]) -> int:
+        """
+        Слияние пакета строк с целевой таблицей.
+
+        Returns:
+            int: Количество вставленных или обновленных строк
+        """
+        if not rows:
+            return 0
+        cursor = self.connection.cursor()
+        try:
+            if not self._prepared:
+                self.prepare(cursor)
+            elif self._dirty:
+                cursor.execute(f"TRUNCATE {self.stage_table}")
+            cursor.copy_expert(f"COPY {self.stage_table} ({', '.join(self.columns)}) FROM STDIN",
+                               copy_buffer(rows))
+            self._dirty = True
+            cursor.execute(self.merge_sql)
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def close(self) -> None:
+        """Удаление промежуточной таблицы"""
+        if not self._prepared:
+            return
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.stage_table}")
+        finally:
+            cursor.close()
+        self._prepared = False
+        self._dirty = False
@@ -0,0 +1,300 @@
+"""
+TableMaintenance - ANALYZE и VACUUM (FREEZE) загруженных таблиц
+
+После загрузки у таблицы нет статистики планировщика, а карта
+видимости пуста: первые запросы после переключения получают плохие
+планы, а автоочистка позже перепишет все страницы при заморозке.
+MaintenanceScheduler принимает загруженные таблицы в очередь и
+выполняет ANALYZE (или VACUUM (FREEZE, ANALYZE)) ограниченным пулом
+рабочих потоков, пока загружаются следующие таблицы.
+
+Очередь упорядочена по размеру таблицы: большие таблицы обрабатываются
+первыми, чтобы самые долгие операции не оказались в конце запуска.
+Секционированная таблица обрабатывается вместе с секциями.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+TABLE_SIZE_QUERY = """
+    SELECT pg_total_relation_size(c.oid)
+         + COALESCE((SELECT sum(pg_total_relation_size(i.inhrelid)) FROM pg_inherits i
+                     WHERE i.inhparent = c.oid), 0)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = %s AND c.relname = %s
+"""
+
+SCHEMA_TABLES_QUERY = """
+    SELECT c.relname,
+           pg_total_relation_size(c.oid)
+         + COALESCE((SELECT sum(pg_total_relation_size(i.inhrelid)) FROM pg_inherits i
+                     WHERE i.inhparent = c.oid), 0)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = %s AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+    ORDER BY 2 DESC
+"""
+
+
+def table_size(connection, table_name: str, schema: str = 'ags') -> int:
+    """Размер таблицы с индексами и секциями, байт (0 - таблица не найдена)"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(TABLE_SIZE_QUERY, (schema, table_name))
+        row = cursor.fetchone()
+        return int(row[0]) if row and row[0] is not None else 0
+    finally:
+        cursor.close()
+
+
+class MaintenanceScheduler:
+    """
+    Очередь обслуживания таблиц после загрузки.
+
+    Example:
+        >>> scheduler = get_maintenance_scheduler(config_loader)
+        >>> scheduler.submit('accnt', size=table_size(pg_conn, 'accnt'))
+        >>> ...                                   # загрузка следующих таблиц
+        >>> report = scheduler.wait()
+    """
+
+    def __init__(self, connection_factory: Callable[[], Any], workers: int = 2, freeze: bool = False,
+                 schema: str = 'ags', maintenance_work_mem_mb: int = 0,
+                 clock: Callable[[], float] = time.perf_counter):
+        """
+        Инициализация MaintenanceScheduler.
+
+        Args:
+            connection_factory: Создание подключения psycopg2 (одно на рабочий поток)
+            workers: Размер пула рабочих потоков
+            freeze: VACUUM (FREEZE, ANALYZE) вместо ANALYZE
+            schema: Целевая схема
+            maintenance_work_mem_mb: maintenance_work_mem сеанса (0 - значение сервера)
+            clock: Источник времени
+        """
+        self.connection_factory = connection_factory
+        self.workers = max(1, workers)
+        self.freeze = freeze
+        self.schema = schema
+        self.maintenance_work_mem_mb = maintenance_work_mem_mb
+        self.clock = clock
+
+        self.results: List[Dict[str, Any]] = []
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self._queued = set()
+        self._active = 0
+        self._closing = False
+        self._threads: List[threading.Thread] = []
+        self._changed = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config_loader) -> 'MaintenanceScheduler':
+        """Планировщик по секции migration.maintenance и database.postgres"""
+        settings = config_loader.get_config_value('migration.maintenance', {}) or {}
+        pg_config = config_loader.get_database_config('postgres')
+
+        def connect():
+            import psycopg2
+
+            return psycopg2.connect(
+                host=pg_config['host'],
+                port=pg_config['port'],
+                dbname=pg_config['database'],
+                user=pg_config['user'],
+                password=pg_config['password']
+            )
+
+        return cls(
+            connect,
+            workers=settings.get('workers', 2),
+            freeze=settings.get('freeze', False),
+            schema=config_loader.get_config_value('migration.target_schema', 'ags'),
+            maintenance_work_mem_mb=settings.get('maintenance_work_mem_mb', 0)
+        )
+
+    def statement(self, table_name: str) -> str:
+        if self.freeze:
+            return f"VACUUM (FREEZE, ANALYZE) {self.schema}.{table_name}"
+        return f"ANALYZE {self.schema}.{table_name}"
+
+    def submit(self, table_name: str, size: int = 0) -> bool:
+        """
+        Постановка таблицы в очередь (таблица, уже ожидающая в очереди, не дублируется).
+
+        Returns:
+            bool: Таблица добавлена в очередь
+        """
+        with self._changed:
+            if self._closing:
+                raise RuntimeError("Планировщик обслуживания закрыт")
+            if table_name in self._queued:
+                return False
+            self._queued.add(table_name)
+            heapq.heappush(self._queue, (-size, next(self._sequence), table_name, size, self.clock()))
+            self._start_workers()
+            self._changed.notify()
+        return True
+
+    def submit_schema(self, connection) -> int:
+        """Постановка в очередь всех таблиц схемы (секции - вместе с родителем)"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(SCHEMA_TABLES_QUERY, (self.schema,))
+            tables = cursor.fetchall()
+        finally:
+            cursor.close()
+        return sum(1 for table_name, size in tables if self.submit(table_name, int(size or 0)))
+
+    def _start_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"femcl-maintenance-{len(self._threads)}",
+                                      daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _worker(self) -> None:
+        connection = None
+        try:
+            while True:
+                with self._changed:
+                    while not self._queue and not self._closing:
+                        self._changed.wait()
+                    if not self._queue:
+                        return
+                    _, _, table_name, size, queued_at = heapq.heappop(self._queue)
+                    self._queued.discard(table_name)
+                    self._active += 1
+                try:
+                    result = self._run(connection, table_name, size, queued_at)
+                    connection = result.pop('connection')
+                    if result['error']:
+                        # Подключение могло быть разорвано - следующая задача откроет новое
+                        connection = self._close(connection)
+                finally:
+                    with self._changed:
+                        self._active -= 1
+                        self._changed.notify_all()
+        finally:
+            self._close(connection)
+
+    def _connect(self):
+        connection = self.connection_factory()
+        # VACUUM не выполняется внутри транзакции
+        connection.autocommit = True
+        if self.maintenance_work_mem_mb:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(f"SET maintenance_work_mem = '{int(self.maintenance_work_mem_mb)}MB'")
+            finally:
+                cursor.close()
+        return connection
+
+    @staticmethod
+    def _close(connection) -> None:
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        return None
+
+    def _run(self, connection, table_name: str, size: int, queued_at: float) -> Dict[str, Any]:
+        """Обслуживание одной таблицы"""
+        started = self.clock()
+        result = {
+            'table': table_name,
+            'operation': 'vacuum_freeze' if self.freeze else 'analyze',
+            'size': size,
+            'queued': started - queued_at,
+            'duration': 0.0,
+            'error': None,
+        }
+        try:
+            if connection is None:
+                connection = self._connect()
+            cursor = connection.cursor()
+            try:
+                cursor.execute(self.statement(table_name))
+            finally:
+                cursor.close()
+        except Exception as e:
+            result['error'] = str(e)
+            logger.error(f"Ошибка обслуживания {self.schema}.{table_name}: {e}")
+        result['duration'] = self.clock() - started
+        if not result['error']:
+            logger.info(f"{result['operation']} {self.schema}.{table_name}: {result['duration']:.2f} с "
+                        f"(ожидание в очереди {result['queued']:.2f} с)")
+        with self._changed:
+            self.results.append(result)
+        # Подключение (открытое при необходимости) возвращается рабочему потоку
+        return dict(result, connection=connection)
+
+    def wait(self) -> Dict[str, Any]:
+        """Ожидание обработки всех поставленных в очередь таблиц"""
+        with self._changed:
+            while self._queue or self._active:
+                self._changed.wait()
+        return self.summary()
+
+    def close(self) -> Dict[str, Any]:
+        """Обработка очереди и остановка рабочих потоков"""
+        with self._changed:
+            self._closing = True
+            self._changed.notify_all()
+        for thread in self._threads:
+            thread.join()
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        """Итоги: число таблиц, ошибки, суммарная и максимальная длительность, таблицы по длительности"""
+        with self._changed:
+            results = list(self.results)
+            pending = len(self._queue) + self._active
+        return {
+            'tables': len(results),
+            'failed': sum(1 for r in results if r['error']),
+            'pending': pending,
+            'total_duration': sum(r['duration'] for r in results),
+            'max_duration': max((r['duration'] for r in results), default=0.0),
+            'results': sorted(results, key=lambda r: r['duration'], reverse=True),
+        }
+
+
+_maintenance_scheduler: Optional[MaintenanceScheduler] = None
+_maintenance_scheduler_lock = threading.Lock()
+
+
+def get_maintenance_scheduler(config_loader=None) -> MaintenanceScheduler:
+    """
+    Планировщик обслуживания на процесс (общая очередь для всех таблиц).
+
+    Args:
+        config_loader: Загрузчик конфигурации (нужен при первом обращении)
+    """
+    global _maintenance_scheduler
+    if _maintenance_scheduler is None:
+        with _maintenance_scheduler_lock:
+            if _maintenance_scheduler is None:
+                if config_loader is None:
+                    raise ValueError("Для создания планировщика обслуживания требуется config_loader")
+                _maintenance_scheduler = MaintenanceScheduler.from_config(config_loader)
+    return _maintenance_scheduler
+
+
+def reset_maintenance_scheduler() -> None:
+    """Остановка и сброс планировщика процесса"""
+    global _maintenance_scheduler
+    with _maintenance_scheduler_lock:
+        if _maintenance_scheduler is not None:
+            _maintenance_scheduler.close()
+        _maintenance_scheduler = None
@@ -3,63 +3,164 @@ TableMigrator - Класс для выполнения миграции табл
 """
 
 from typing import Optional, Dict, Any
-import pyodbc
+import logging
 import psycopg2
 import psycopg2.extensions
 import time
+from contextlib import ExitStack
 from datetime import datetime
 
+from src.code.infrastructure.classes.migration_tracer import MigrationTracer, estimate_payload_bytes
+from src.code.infrastructure.classes.batch_metrics import BatchMetrics
+from src.code.infrastructure.classes.batch_size_controller import BatchSizeController, estimate_row_width
+from src.code.infrastructure.classes.source_reader import SourceReader, PyodbcSourceReader
+from src.code.infrastructure.classes.source_throttle import SourceGovernor, get_source_governor
+from src.code.migration.classes.migration_plan import MigrationPlan, MigrationPlanCache
+from src.code.migration.classes.delta_sync import DeltaSync, DeltaSyncError
+from src.code.migration.classes.source_fingerprint import SourceFingerprint, FingerprintStore
+from src.code.migration.classes.staging_merge import StagingMerge
+from src.code.migration.classes.lob_transfer import LobTransfer, lob_kind
+from src.code.migration.classes.constraint_stage import (
+    ALL_STATUSES, ConstraintStage, load_check_constraints, load_foreign_keys, load_unique_constraints
+)
+from src.code.migration.classes.sequence_resync import SequenceResync
+from src.code.migration.classes.table_maintenance import get_maintenance_scheduler, table_size
+from src.code.migration.classes.table_partitioning import (
+    PartitionError, PartitionedIndexBuild, PartitionedLoad
+)
+from src.code.migration.classes.source_snapshot import (
+    SourceSnapshot, SnapshotError, begin_snapshot_read, end_snapshot_read
+)
+
+
+logger = logging.getLogger(__name__)
+
 
 class TableMigrator:
     """Класс для выполнения миграции таблицы"""
     
-    def __init__(self, table_name: str, config_loader, force: bool = False, verbose: bool = False):
+    def __init__(self, table_name: str, config_loader, force: bool = False, verbose: bool = False,
+                 run_id: Optional[str] = None, trace_export_dir: Optional[str] = None,
+                 source_reader: Optional[SourceReader] = None,
+                 plan_cache: Optional[MigrationPlanCache] = None,
+                 write_mode: Optional[str] = None,
+                 snapshot_run_id: Optional[str] = None):
         self.table_name = table_name
         self.config_loader = config_loader
         self.force = force
         self.verbose = verbose
+        # Схема целевых таблиц в PostgreSQL (migration.target_schema)
+        self.target_schema = config_loader.get_config_value('migration.target_schema', 'ags')
         
         # Конфигурации баз данных
         self.mssql_config = config_loader.get_database_config('mssql')
         self.pg_config = config_loader.get_database_config('postgres')
         
         # Подключения
-        self.mssql_conn: Optional[pyodbc.Connection] = None
+        self.mssql_conn = None
         self.pg_conn: Optional[psycopg2.extensions.connection] = None
         
+        # Источник данных: по умолчанию MS SQL Server через pyodbc
+        self.source_reader: SourceReader = source_reader or PyodbcSourceReader(
+            connection_factory=self.get_mssql_connection
+        )
+        
+        # Кэш скомпилированных планов (migration.plan_cache_dir)
+        self.plan_cache = plan_cache or MigrationPlanCache.from_config(config_loader)
+        self.plan: Optional[MigrationPlan] = None
+        
+        # Догоняющая синхронизация (migration.delta_sync)
+        self.delta_sync_enabled = config_loader.get_config_value('migration.delta_sync.enabled', False)
+        self.sync_watermark: Optional[int] = None
+        
+        # Пропуск неизмененных таблиц по отпечатку источника (migration.skip_unchanged)
+        self.skip_unchanged = config_loader.get_config_value('migration.skip_unchanged', False)
+        self.source_fingerprint: Optional[SourceFingerprint] = None
+        self.target_row_count: Optional[int] = None
+        
+        # Режим записи: insert - INSERT пакетами, merge - COPY в промежуточную
+        # таблицу и INSERT ... ON CONFLICT DO UPDATE (повторная загрузка идемпотентна)
+        self.write_mode = write_mode or config_loader.get_config_value('migration.write_mode', 'insert')
+        
+        # Согласованное чтение источника (migration.consistent_read): snapshot -
+        # транзакция SNAPSHOT на таблицу, database - снимок базы, общий для
+        # всех таблиц запуска (идентификатор снимка не зависит от run_id мигратора)
+        self.consistent_read = config_loader.get_config_value('migration.consistent_read.mode', 'none')
+        self.snapshot_run_id = (snapshot_run_id
+                                or config_loader.get_config_value('migration.consistent_read.snapshot_run')
+                                or None)
+        if self.snapshot_run_id:
+            self.consistent_read = 'database'
+        self.source_snapshot: Optional[SourceSnapshot] = None
+        self.snapshot_read_active = False
+        # Количество строк источника, посчитанное в транзакции SNAPSHOT загрузки
+        self.snapshot_row_count: Optional[int] = None
+        
+        # Максимумы identity колонок, собранные во время загрузки (для setval)
+        self.identity_max: Dict[tuple, Optional[int]] = {}
+        
+        # Адаптивный размер пакета (migration.adaptive_batch)
+        self.batch_sizer: Optional[BatchSizeController] = None
+        
+        # Ограничение нагрузки на источник (migration.source_throttle), общее на процесс
+        self.source_governor: Optional[SourceGovernor] = None
+        if (config_loader.get_config_value('migration.source_throttle.enabled', False)
+                and isinstance(self.source_reader, PyodbcSourceReader)):
+            self.source_governor = get_source_governor(config_loader)
+        
         # Результаты миграции
         self.migration_start_time = None
         self.migration_end_time = None
         self.rows_migrated = 0
         self.errors = []
+        self.batch_metrics: Optional[BatchMetrics] = None
+        
+        # Трассировка фаз миграции
+        self.tracer = MigrationTracer(table_name, run_id=run_id)
+        self.trace_export_dir = trace_export_dir or config_loader.get_config_value(
+            'monitoring.trace_export_dir'
+        )
     
-    def get_mssql_connection(self) -> pyodbc.Connection:
+    def get_mssql_connection(self):
         """Получение подключения к MS SQL"""
         if not self.mssql_conn:
-            connection_string = (
-                f"DRIVER={{{self.mssql_config['driver']}}};"
-                f"SERVER={self.mssql_config['server']};"
-                f"DATABASE={self.mssql_config['database']};"
-                f"UID={self.mssql_config['user']};"
-                f"PWD={self.mssql_config['password']}"
-            )
-            self.mssql_conn = pyodbc.connect(connection_string)
+            self.mssql_conn = self.connect_mssql()
         return self.mssql_conn
     
+    def connect_mssql(self):
+        """Новое подключение к MS SQL (рабочим потокам нужны собственные подключения)"""
+        import pyodbc
+        
+        # При чтении из снимка базы все запросы к источнику идут в снимок
+        database = (self.source_snapshot.snapshot_database if self.source_snapshot
+                    else self.mssql_config['database'])
+        connection_string = (
+            f"DRIVER={{{self.mssql_config['driver']}}};"
+            f"SERVER={self.mssql_config['server']};"
+            f"DATABASE={database};"
+            f"UID={self.mssql_config['user']};"
+            f"PWD={self.mssql_config['password']}"
+        )
+        return pyodbc.connect(connection_string)
+    
     def get_pg_connection(self) -> psycopg2.extensions.connection:
         """Получение подключения к PostgreSQL"""
         if not self.pg_conn:
-            # Убираем неподдерживаемые параметры
-            pg_config_clean = {
-                'host': self.pg_config['host'],
-                'port': self.pg_config['port'], 
-                'database': self.pg_config['database'],
-                'user': self.pg_config['user'],
-                'password': self.pg_config['password']
-            }
-            self.pg_conn = psycopg2.connect(**pg_config_clean)
+            self.pg_conn = self.connect_pg()
         return self.pg_conn
     
+    def connect_pg(self) -> psycopg2.extensions.connection:
+        """Новое подключение к PostgreSQL"""
+        # Убираем неподдерживаемые параметры
+        pg_config_clean = {
+            'host': self.pg_config['host'],
+            'port': self.pg_config['port'], 
+            'database': self.pg_config['database'],
+            'user': self.pg_config['user'],
+            'password': self.pg_config['password']
+        }
+        return psycopg2.connect(**pg_config_clean)
+    
     def create_table(self, table_model, force: bool = False) -> bool:
         """Создание таблицы"""
         # TODO: Реализовать создание таблицы
@@ -95,7 +196,15 @@ class TableMigrator:
                         print(f"   SQL: {create_sql}")
                     
                     # Выполняем создание индекса
-                    if index.is_concurrent:
+                    if table_model.partitioning:
+                        # Индекс родителя ON ONLY и параллельно индексы секций
+                        built = PartitionedIndexBuild(
+                            table_model.partitioning, self.connect_pg,
+                            workers=self.config_loader.get_config_value('migration.partitioning.index_workers', 4)
+                        ).create(index)
+                        if self.verbose:
+                            print(f"   Построено индексов секций: {built}")
+                    elif index.is_concurrent:
                         # Для concurrent индексов используем CONCURRENTLY
                         concurrent_sql = create_sql.replace("CREATE ", "CREATE CONCURRENTLY ")
                         cursor.execute(concurrent_sql)
@@ -103,19 +212,7 @@ class TableMigrator:
                         cursor.execute(create_sql)
                     
                     # Обновляем статус в базе данных
-                    cursor.execute("""
-                        UPDATE mcl.postgres_indexes 
-                        SET migration_status = 'completed', 
-                            migration_date = NOW()
-                        WHERE index_name = %s AND source_index_id IN (
-                            SELECT mi.id 
-                            FROM mcl.mssql_indexes mi
-                            JOIN mcl.mssql_index_columns mic ON mi.id = mic.index_id
-                            JOIN mcl.mssql_columns mc ON mic.column_id = mc.id
-                            JOIN mcl.mssql_tables mt ON mc.table_id = mt.id
-                            WHERE mt.object_name = %s
-                        )
-                    """, (index.name, self.table_name))
+                    self._mark_index_completed(cursor, index)
                     
                     conn.commit()
                     created_count += 1
@@ -165,15 +262,101 @@ class TableMigrator:
             self.errors.append(f"Критическая ошибка создания индексов: {e}")
             return False
     
+    def _mark_index_completed(self, cursor, index) -> None:
+        """Отметка индекса созданным в mcl и в модели"""
+        cursor.execute("""
+            UPDATE mcl.postgres_indexes 
+            SET migration_status = 'completed', 
+                migration_date = NOW()
+            WHERE index_name = %s AND source_index_id IN (
+                SELECT mi.id 
+                FROM mcl.mssql_indexes mi
+                JOIN mcl.mssql_index_columns mic ON mi.id = mic.index_id
+                JOIN mcl.mssql_columns mc ON mic.column_id = mc.id
+                JOIN mcl.mssql_tables mt ON mc.table_id = mt.id
+                WHERE mt.object_name = %s
+            )
+        """, (index.name, self.table_name))
+        index.migration_status = "completed"
+    
+    def ensure_merge_key(self, table_model) -> Optional[list]:
+        """
+        Создание уникального индекса для ON CONFLICT до переноса данных.
+        
+        Берется индекс первичного ключа, иначе первый уникальный индекс.
+        
+        Returns:
+            Optional[list]: Колонки ключа или None, если уникального индекса нет
+        """
+        candidates = sorted(
+            (index for index in table_model.indexes if index.is_unique or index.is_primary_key),
+            key=lambda index: not index.is_primary_key
+        )
+        if not candidates:
+            return None
+        index = candidates[0]
+        
+        conn = self.get_pg_connection()
+        cursor = conn.cursor()
+        try:
+            # Статус в mcl не проверяется: индекс мог остаться от прерванной
+            # загрузки или быть удален вместе с таблицей (--force, DROP ... CASCADE)
+            cursor.execute(index.generate_create_sql(if_not_exists=True))
+            self._mark_index_completed(cursor, index)
+            conn.commit()
+            if self.verbose:
+                print(f"🔑 Ключ слияния: {index.name}")
+        finally:
+            cursor.close()
+        return [column.column_name for column in sorted(index.columns, key=lambda c: c.ordinal_position)]
+    
     def create_foreign_keys(self, table_model) -> bool:
-        """Создание внешних ключей"""
-        # TODO: Реализовать создание внешних ключей
-        return True
+        """
+        Создание внешних ключей как NOT VALID сразу после загрузки.
+        
+        Добавляются также отложенные ключи других таблиц, ссылающиеся на
+        загруженную. Загружаются ключи во всех статусах: после --force
+        (DROP TABLE ... CASCADE) ключи со статусом completed отсутствуют
+        в базе и добавляются заново. Проверку строк выполняет ConstraintStage.run().
+        """
+        return self._add_constraints('внешних ключей', lambda cursor: load_foreign_keys(
+            cursor, table_name=table_model.source_table_name, statuses=ALL_STATUSES, include_referencing=True
+        ))
     
     def create_constraints(self, table_model) -> bool:
-        """Создание ограничений"""
-        # TODO: Реализовать создание ограничений
-        return True
+        """Создание check (NOT VALID) и уникальных ограничений сразу после загрузки"""
+        return self._add_constraints('ограничений', lambda cursor: (
+            load_check_constraints(cursor, table_name=table_model.source_table_name, statuses=ALL_STATUSES)
+            + load_unique_constraints(cursor, table_name=table_model.source_table_name, statuses=ALL_STATUSES)
+        ))
+    
+    def _add_constraints(self, kind: str, load) -> bool:
+        """Добавление ограничений из mcl без проверки строк"""
+        try:
+            conn = self.get_pg_connection()
+            cursor = conn.cursor()
+            try:
+                constraints = load(cursor)
+            finally:
+                cursor.close()
+            if not constraints:
+                return True
+            
+            counts = ConstraintStage.from_config(self.config_loader).add(conn, constraints)
+            if self.verbose:
+                print(f"🔗 Добавлено {kind}: {counts['added']} (NOT VALID), "
+                      f"отложено: {counts['deferred']}, ошибок: {counts['failed']}")
+            for constraint in constraints:
+                if constraint.migration_status == 'failed':
+                    self.errors.append(f"Ошибка добавления {constraint.name}: {constraint.error_message}")
+            return counts['failed'] == 0
+            
+        except Exception as e:
+            self.get_pg_connection().rollback()
+            if self.verbose:
+                print(f"❌ Критическая ошибка добавления {kind}: {e}")
+            self.errors.append(f"Критическая ошибка добавления {kind}: {e}")
+            return False
     
     def create_triggers(self, table_model) -> bool:
         """Создание триггеров"""
@@ -195,87 +378,441 @@ class TableMigrator:
         self.migration_start_time = datetime.now()
         
         try:
-            if self.verbose:
-                print(f"🔍 Начинаем миграцию таблицы: {self.table_name}")
+            with self.tracer.span('table.migrate') as root_span:
+                result = self._run_phases()
+                root_span.set_counts(rows=self.rows_migrated)
+                if not result['success']:
+                    root_span.status = 'error'
+                    root_span.error_message = result.get('error')
+            return result
             
-            # Проверка существования таблицы в MS SQL
-            if not self.check_source_table_exists():
+        except Exception as e:
+            self.errors.append(str(e))
+            return {
+                'success': False,
+                'error': f'Критическая ошибка: {e}'
+            }
+        finally:
+            self._finish_trace()
+    
+    def _run_phases(self) -> Dict[str, Any]:
+        """Выполнение фаз миграции с трассировкой каждой фазы"""
+        if self.verbose:
+            print(f"🔍 Начинаем миграцию таблицы: {self.table_name}")
+        
+        # Снимок базы источника запуска (до первого подключения к источнику)
+        if self.consistent_read == 'database' and isinstance(self.source_reader, PyodbcSourceReader):
+            if not self.snapshot_run_id:
                 return {
                     'success': False,
-                    'error': f'Таблица {self.table_name} не найдена в MS SQL Server'
+                    'error': ('Режим consistent_read.mode: database требует снимок запуска '
+                              '(--snapshot-run RUN_ID или migration.consistent_read.snapshot_run)')
                 }
-            
-            # Получение метаданных
-            metadata = self.get_table_metadata()
-            if not metadata:
+            with self.tracer.span('source.snapshot') as span:
+                attached = self.attach_source_snapshot()
+                span.set_attribute('mode', 'database')
+            if not attached:
                 return {
                     'success': False,
-                    'error': f'Не удалось получить метаданные для таблицы {self.table_name}'
+                    'error': f'Снимок источника запуска {self.snapshot_run_id} не найден'
                 }
-            
-            # Создание таблицы
-            if not self.create_target_table(metadata):
+        
+        # Проверка существования таблицы в MS SQL
+        with self.tracer.span('source.check'):
+            source_exists = self.check_source_table_exists()
+        if not source_exists:
+            return {
+                'success': False,
+                'error': f'Таблица {self.table_name} не найдена в MS SQL Server'
+            }
+        
+        # Пропуск таблицы, если источник не изменился с прошлой миграции
+        if self.skip_unchanged and not self.force:
+            with self.tracer.span('source.fingerprint') as span:
+                unchanged = self.check_source_unchanged()
+                span.set_attribute('unchanged', unchanged)
+            if unchanged:
+                duration = (datetime.now() - self.migration_start_time).total_seconds()
                 return {
-                    'success': False,
-                    'error': f'Не удалось создать целевую таблицу {self.table_name}'
+                    'success': True,
+                    'skipped': True,
+                    'duration': f'{duration:.2f} секунд',
+                    'rows_migrated': 0,
+                    'run_id': self.tracer.run_id,
+                    'phases': self.tracer.get_phase_summary()
                 }
+        
+        # Получение метаданных
+        with self.tracer.span('metadata.load') as span:
+            metadata = self.get_table_metadata()
+            if metadata:
+                span.set_attribute('columns_count', len(metadata['target_columns']))
+        if not metadata:
+            return {
+                'success': False,
+                'error': f'Не удалось получить метаданные для таблицы {self.table_name}'
+            }
+        
+        # Создание таблицы
+        with self.tracer.span('table.ddl'):
+            table_created = self.create_target_table(metadata)
+        if not table_created:
+            return {
+                'success': False,
+                'error': f'Не удалось создать целевую таблицу {self.table_name}'
+            }
+        
+        # Чтение SNAPSHOT: водяной знак и данные таблицы в одной транзакции
+        if self.consistent_read == 'snapshot' and isinstance(self.source_reader, PyodbcSourceReader):
+            with self.tracer.span('source.snapshot') as span:
+                self.begin_consistent_read()
+                span.set_attribute('mode', 'snapshot' if self.snapshot_read_active else 'read_committed')
+        
+        try:
+            # Водяной знак фиксируется до переноса: изменения во время
+            # загрузки перенесет первый раунд догоняющей синхронизации
+            if self.delta_sync_enabled:
+                with self.tracer.span('sync.watermark'):
+                    self.capture_sync_watermark(metadata)
             
             # Перенос данных
-            if not self.migrate_table_data(metadata):
-                return {
-                    'success': False,
-                    'error': f'Не удалось перенести данные таблицы {self.table_name}'
-                }
-            
-            # Создание индексов
-            if not self.create_indexes(metadata['table_model']):
-                return {
-                    'success': False,
-                    'error': f'Не удалось создать индексы для таблицы {self.table_name}'
-                }
+            with self.tracer.span('data.migrate') as span:
+                data_migrated = self.migrate_table_data(metadata)
+                span.set_counts(rows=self.rows_migrated)
             
-            # Валидация
-            if not self.validate_migration():
+            # Строки источника для валидации считаются в той же транзакции
+            # SNAPSHOT: после ее завершения источник может измениться
+            if data_migrated and self.snapshot_read_active:
+                self.count_snapshot_rows()
+        finally:
+            self.end_consistent_read()
+        if not data_migrated:
+            return {
+                'success': False,
+                'error': f'Не удалось перенести данные таблицы {self.table_name}'
+            }
+        
+        # Последовательности identity колонок после OVERRIDING SYSTEM VALUE
+        if self.config_loader.get_config_value('migration.sequence_resync.enabled', False):
+            with self.tracer.span('sequence.resync') as span:
+                resync = self.resync_sequences()
+                if resync:
+                    span.set_attribute('sequences', resync['sequences'])
+                    span.set_attribute('updated', resync['updated'])
+        
+        # Создание индексов
+        with self.tracer.span('index.build') as span:
+            span.set_attribute('indexes_count', len(metadata['table_model'].indexes))
+            indexes_created = self.create_indexes(metadata['table_model'])
+        if not indexes_created:
+            return {
+                'success': False,
+                'error': f'Не удалось создать индексы для таблицы {self.table_name}'
+            }
+        
+        # Ограничения NOT VALID: проверка строк - отдельной стадией после загрузки всех таблиц
+        # (migration.constraints.defer - добавление тоже стадией, enabled: false - без ограничений)
+        if ConstraintStage.from_config(self.config_loader).add_after_load:
+            with self.tracer.span('constraint.add'):
+                constraints_added = (self.create_constraints(metadata['table_model'])
+                                     and self.create_foreign_keys(metadata['table_model']))
+            if not constraints_added:
                 return {
                     'success': False,
-                    'error': f'Валидация миграции таблицы {self.table_name} не прошла'
+                    'error': f'Не удалось добавить ограничения таблицы {self.table_name}'
                 }
+        elif self.verbose:
+            print("ℹ️ Ограничения не добавляются после загрузки (migration.constraints)")
+        
+        # Валидация
+        with self.tracer.span('validate'):
+            validated = self.validate_migration()
+        if not validated:
+            return {
+                'success': False,
+                'error': f'Валидация миграции таблицы {self.table_name} не прошла'
+            }
+        
+        if self.skip_unchanged:
+            self.save_source_fingerprint()
+        self.clear_stale_status()
+        
+        # ANALYZE / VACUUM (FREEZE) в фоне, параллельно с загрузкой следующих таблиц
+        maintenance_queued = self.schedule_maintenance()
+        
+        self.migration_end_time = datetime.now()
+        duration = (self.migration_end_time - self.migration_start_time).total_seconds()
+        
+        return {
+            'success': True,
+            'duration': f'{duration:.2f} секунд',
+            'rows_migrated': self.rows_migrated,
+            'run_id': self.tracer.run_id,
+            'phases': self.tracer.get_phase_summary(),
+            'batch_metrics': self.batch_metrics.summary() if self.batch_metrics else None,
+            'maintenance': 'queued' if maintenance_queued else None,
+            'batch_sizing': self.batch_sizer.summary() if self.batch_sizer else None
+        }
+    
+    def check_source_unchanged(self) -> bool:
+        """
+        Проверка отпечатка источника.
+        
+        Отпечаток вычисляется до переноса: изменения во время переноса
+        дадут другой отпечаток при следующем запуске.
+        """
+        if not isinstance(self.source_reader, PyodbcSourceReader):
+            return False
+        try:
+            self.source_fingerprint = self.compute_source_fingerprint()
+            store = FingerprintStore(self.get_pg_connection(), target_schema=self.target_schema)
+            unchanged = store.is_unchanged(self.table_name, self.source_fingerprint)
+            self.get_pg_connection().rollback()
+            if self.verbose:
+                if unchanged:
+                    print(f"⏭️ Источник {self.table_name} не изменился ({self.source_fingerprint}), таблица пропущена")
+                else:
+                    print(f"🔎 Отпечаток источника: {self.source_fingerprint}")
+            return unchanged
+        except Exception as e:
+            self.get_pg_connection().rollback()
+            if self.verbose:
+                print(f"⚠️ Не удалось проверить отпечаток источника: {e}")
+            return False
+    
+    def compute_source_fingerprint(self) -> SourceFingerprint:
+        """Отпечаток источника вместе с хэшем метаданных mcl таблицы"""
+        fingerprint = SourceFingerprint.compute(self.get_mssql_connection(), self.table_name)
+        fingerprint.metadata_hash = MigrationPlanCache.metadata_hash(self.get_pg_connection(), self.table_name)
+        return fingerprint
+    
+    def save_source_fingerprint(self) -> None:
+        """Сохранение отпечатка источника после проверенной миграции"""
+        try:
+            if self.source_fingerprint is None:
+                if not isinstance(self.source_reader, PyodbcSourceReader):
+                    return
+                self.source_fingerprint = self.compute_source_fingerprint()
+            FingerprintStore(self.get_pg_connection(), target_schema=self.target_schema).save(
+                self.table_name, self.source_fingerprint, self.target_row_count
+            )
+        except Exception as e:
+            self.get_pg_connection().rollback()
+            if self.verbose:
+                print(f"⚠️ Не удалось сохранить отпечаток источника: {e}")
+    
+    def clear_stale_status(self) -> None:
+        """Таблица перенесена по актуальным метаданным: статус stale -> completed"""
+        try:
+            store = FingerprintStore(self.get_pg_connection(), target_schema=self.target_schema)
+            if store.clear_stale(self.table_name) and self.verbose:
+                print(f"✅ Статус stale таблицы {self.table_name} снят")
+        except Exception as e:
+            self.get_pg_connection().rollback()
+            logger.warning(f"Не удалось снять статус stale таблицы {self.table_name}: {e}")
+    
+    def resync_sequences(self) -> Optional[Dict[str, Any]]:
+        """
+        Перевод последовательностей identity колонок таблицы на максимум данных.
+        
+        Используются максимумы, собранные при загрузке; для остальных
+        колонок (LOB перенос, режим merge) максимум запрашивается у таблицы.
+        """
+        try:
+            resync = SequenceResync(
+                self.get_pg_connection(), schema=self.target_schema,
+                chunk_size=self.config_loader.get_config_value('migration.sequence_resync.chunk_size', 500)
+            )
+            summary = resync.run([self.table_name], observed=self.identity_max)
+            if self.verbose and summary['sequences']:
+                print(f"🔢 Последовательности: переведено {summary['updated']} из {summary['sequences']}")
+            return summary
+        except Exception as e:
+            self.get_pg_connection().rollback()
+            if self.verbose:
+                print(f"⚠️ Не удалось синхронизировать последовательности: {e}")
+            self.errors.append(f"Ошибка синхронизации последовательностей: {e}")
+            return None
+    
+    def schedule_maintenance(self) -> bool:
+        """Постановка таблицы в очередь обслуживания процесса (migration.maintenance)"""
+        if not self.config_loader.get_config_value('migration.maintenance.enabled', False):
+            return False
+        try:
+            with self.tracer.span('maintenance.queue') as span:
+                conn = self.get_pg_connection()
+                size = table_size(conn, self.table_name, self.target_schema)
+                conn.commit()
+                queued = get_maintenance_scheduler(self.config_loader).submit(self.table_name, size)
+                span.set_attribute('size_bytes', size)
+            if self.verbose:
+                print(f"🧹 Таблица {self.table_name} ({size / 1024 / 1024:.1f} МБ) поставлена в очередь обслуживания")
+            return queued
+        except Exception as e:
+            if self.verbose:
+                print(f"⚠️ Не удалось поставить таблицу в очередь обслуживания: {e}")
+            return False
+    
+    def attach_source_snapshot(self) -> bool:
+        """Подключение к снимку базы источника, созданному для запуска"""
+        try:
+            self.source_snapshot = SourceSnapshot.load(self.get_pg_connection(), self.snapshot_run_id)
+            self.get_pg_connection().rollback()
+        except Exception as e:
+            self.get_pg_connection().rollback()
+            if self.verbose:
+                print(f"⚠️ Не удалось загрузить снимок источника: {e}")
+            return False
+        if self.source_snapshot and self.verbose:
+            print(f"📸 Чтение из снимка {self.source_snapshot.snapshot_database} "
+                  f"(запуск {self.snapshot_run_id})")
+        return self.source_snapshot is not None
+    
+    def begin_consistent_read(self) -> bool:
+        """
+        Начало чтения таблицы с уровнем изоляции SNAPSHOT.
+        
+        Если ALLOW_SNAPSHOT_ISOLATION выключен, чтение выполняется
+        с уровнем READ COMMITTED (с блокировками).
+        """
+        try:
+            begin_snapshot_read(self.get_mssql_connection())
+            self.snapshot_read_active = True
+        except SnapshotError as e:
+            if self.verbose:
+                print(f"⚠️ {e}: чтение с блокировками (READ COMMITTED)")
+        return self.snapshot_read_active
+    
+    def count_snapshot_rows(self) -> Optional[int]:
+        """Количество строк источника в открытой транзакции SNAPSHOT"""
+        try:
+            self.snapshot_row_count = self.source_reader.count_rows(self.table_name)
+        except Exception as e:
+            if self.verbose:
+                print(f"⚠️ Не удалось посчитать строки источника в снимке: {e}")
+        return self.snapshot_row_count
+    
+    def end_consistent_read(self) -> None:
+        """Завершение транзакции SNAPSHOT"""
+        if not self.snapshot_read_active:
+            return
+        self.snapshot_read_active = False
+        try:
+            end_snapshot_read(self.get_mssql_connection())
+        except Exception as e:
+            if self.verbose:
+                print(f"⚠️ Не удалось завершить транзакцию SNAPSHOT: {e}")
+    
+    def create_delta_sync(self, metadata: Dict) -> DeltaSync:
+        """Создание DeltaSync для таблицы по метаданным"""
+        return DeltaSync(
+            self.table_name, self.get_mssql_connection(), self.get_pg_connection(),
+            metadata['source_columns'], metadata['target_columns'],
+            batch_size=self.config_loader.get_config_value('migration.delta_sync.batch_size', 5000),
+            target_schema=self.target_schema
+        )
+    
+    def capture_sync_watermark(self, metadata: Dict) -> Optional[int]:
+        """Фиксация водяного знака источника перед первичной загрузкой"""
+        if not isinstance(self.source_reader, PyodbcSourceReader):
+            return None
+        try:
+            self.sync_watermark = self.create_delta_sync(metadata).begin(self.source_snapshot)
+            if self.verbose:
+                if self.sync_watermark is None:
+                    print(f"ℹ️ Таблица {self.table_name} не поддерживает догоняющую синхронизацию")
+                else:
+                    print(f"🔖 Водяной знак синхронизации: {self.sync_watermark}")
+        except Exception as e:
+            self.get_pg_connection().rollback()
+            if self.verbose:
+                print(f"⚠️ Не удалось зафиксировать водяной знак: {e}")
+        return self.sync_watermark
+    
+    def sync_changes(self, max_rounds: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Догоняющая синхронизация после первичной загрузки.
+        
+        Переносит только изменения после сохраненного водяного знака,
+        раунд за раундом до сходимости (migration.delta_sync.*).
+        """
+        self.migration_start_time = datetime.now()
+        try:
+            with self.tracer.span('sync.delta') as span:
+                metadata = self.get_table_metadata()
+                if not metadata:
+                    return {
+                        'success': False,
+                        'error': f'Не удалось получить метаданные для таблицы {self.table_name}'
+                    }
+                
+                sync = self.create_delta_sync(metadata)
+                rounds = sync.run(
+                    max_rounds=max_rounds or self.config_loader.get_config_value('migration.delta_sync.max_rounds', 10),
+                    interval=self.config_loader.get_config_value('migration.delta_sync.interval', 5),
+                    converge_rows=self.config_loader.get_config_value('migration.delta_sync.converge_rows', 1000)
+                )
+                upserted = sum(r['upserted'] for r in rounds)
+                deleted = sum(r['deleted'] for r in rounds)
+                span.set_counts(rows=upserted + deleted)
+                span.set_attribute('rounds', len(rounds))
+                span.set_attribute('mode', sync.mode)
+                
+                if self.verbose:
+                    for number, stats in enumerate(rounds, 1):
+                        print(f"🔁 Раунд {number}: +{stats['upserted']} / -{stats['deleted']} "
+                              f"(знак {stats['watermark']}, {stats['duration']:.2f} с)")
             
-            self.migration_end_time = datetime.now()
-            duration = (self.migration_end_time - self.migration_start_time).total_seconds()
+            # Раунды вставляют ключи с OVERRIDING SYSTEM VALUE: перед переключением
+            # приложения последовательности identity переводятся на максимум данных
+            # независимо от migration.sequence_resync.enabled
+            with self.tracer.span('sequence.resync') as span:
+                resync = self.resync_sequences()
+                if resync:
+                    span.set_attribute('sequences', resync['sequences'])
+                    span.set_attribute('updated', resync['updated'])
             
+            duration = (datetime.now() - self.migration_start_time).total_seconds()
             return {
                 'success': True,
+                'mode': sync.mode,
+                'rounds': rounds,
+                'rows_upserted': upserted,
+                'rows_deleted': deleted,
+                'watermark': rounds[-1]['watermark'] if rounds else None,
+                'sequences': resync,
                 'duration': f'{duration:.2f} секунд',
-                'rows_migrated': self.rows_migrated
             }
-            
+        except DeltaSyncError as e:
+            return {'success': False, 'error': str(e)}
         except Exception as e:
             self.errors.append(str(e))
-            return {
-                'success': False,
-                'error': f'Критическая ошибка: {e}'
-            }
+            return {'success': False, 'error': f'Критическая ошибка синхронизации: {e}'}
+        finally:
+            self._finish_trace()
+    
+    def _finish_trace(self) -> None:
+        """Сохранение трассировки в mcl и экспорт в OTLP JSON"""
+        try:
+            self.tracer.save_to_database(self.get_pg_connection())
+        except Exception as e:
+            if self.verbose:
+                print(f"⚠️ Не удалось сохранить трассировку: {e}")
+        
+        if self.trace_export_dir:
+            trace_file = self.tracer.export_otlp_json(self.trace_export_dir)
+            if trace_file and self.verbose:
+                print(f"🧭 Трассировка сохранена: {trace_file}")
     
     def check_source_table_exists(self) -> bool:
         """Проверка существования таблицы в MS SQL"""
         try:
-            conn = self.get_mssql_connection()
-            cursor = conn.cursor()
+            exists = self.source_reader.table_exists(self.table_name)
             
-            cursor.execute("""
-                SELECT COUNT(*) 
-                FROM INFORMATION_SCHEMA.TABLES 
-                WHERE TABLE_NAME = ?
-            """, (self.table_name,))
-            
-            count = cursor.fetchone()[0]
-            cursor.close()
-            
-            if self.verbose:
+            if exists and self.verbose:
                 print(f"✅ Таблица {self.table_name} найдена в MS SQL Server")
             
-            return count > 0
+            return exists
             
         except Exception as e:
             if self.verbose:
@@ -283,9 +820,57 @@ class TableMigrator:
             return False
     
     def get_table_metadata(self) -> Optional[Dict]:
-        """Получение метаданных таблицы через модель таблицы"""
+        """
+        Получение метаданных таблицы.
+        
+        При совпадении хэша метаданных mcl план берется из кэша без
+        загрузки модели (статусы индексов читаются отдельно); иначе
+        модель загружается из mcl и план компилируется.
+        """
+        metadata_hash = None
+        if self.plan_cache:
+            try:
+                metadata_hash = self.plan_cache.metadata_hash(self.get_pg_connection(), self.table_name)
+                plan = self.plan_cache.load(self.table_name, metadata_hash)
+                index_statuses = (self.plan_cache.index_statuses(self.get_pg_connection(), self.table_name)
+                                  if plan else None)
+                self.get_pg_connection().rollback()
+                if plan:
+                    if self.verbose:
+                        print(f"📦 План миграции загружен из кэша ({metadata_hash[:12]})")
+                    self.plan = plan
+                    return plan.to_metadata(index_statuses)
+            except Exception as e:
+                self.get_pg_connection().rollback()
+                logger.warning(f"Кэш планов недоступен для {self.table_name}, план компилируется из mcl: {e}")
+                if self.verbose:
+                    print(f"⚠️ Кэш планов недоступен: {e}")
+        
+        metadata = self._load_table_metadata()
+        if not metadata:
+            return None
+        
+        self.plan = MigrationPlan.compile(metadata['table_model'], metadata_hash,
+                                          self.build_table_ddl(metadata['table_model']))
+        metadata['plan'] = self.plan
+        if self.plan_cache and metadata_hash:
+            try:
+                plan_file = self.plan_cache.save(self.plan)
+                if self.verbose:
+                    print(f"📦 План миграции сохранен: {plan_file}")
+            except OSError as e:
+                if self.verbose:
+                    print(f"⚠️ Не удалось сохранить план: {e}")
+        return metadata
+    
+    def compile_plan(self) -> Optional[MigrationPlan]:
+        """Компиляция (или проверка актуальности) плана без переноса данных"""
+        return self.plan if self.get_table_metadata() else None
+    
+    def _load_table_metadata(self) -> Optional[Dict]:
+        """Загрузка метаданных таблицы из mcl через модель таблицы"""
         try:
-            from src.classes.table_model import TableModel
+            from src.code.migration.classes.table_model import TableModel
             
             # Получаем информацию о наличии вычисляемых колонок
             has_computed_columns = self._check_has_computed_columns()
@@ -294,7 +879,7 @@ class TableMigrator:
             table_model = TableModel.create_table_model(self.table_name, has_computed_columns)
             
             # Загружаем метаданные
-            if not table_model.load_metadata(self.config_loader):
+            if not table_model.load_metadata(self.config_loader, source_reader=self.source_reader):
                 return None
             
             if self.verbose:
@@ -351,6 +936,28 @@ class TableMigrator:
                 print(f"❌ Ошибка проверки вычисляемых колонок: {e}")
             return False
     
+    def build_table_ddl(self, table_model) -> str:
+        """DDL целевой таблицы по модели"""
+        columns_ddl = []
+        
+        for column in table_model.columns:
+            # Определяем nullable для identity колонок
+            nullable = "NULL" if column.is_nullable else "NOT NULL"
+            # Для identity колонок добавляем GENERATED ALWAYS AS IDENTITY
+            identity_clause = " GENERATED ALWAYS AS IDENTITY" if column.is_identity else ""
+            columns_ddl.append(f"    {column.name} {column.data_type}{identity_clause} {nullable}")
+        
+        table_ddl = f"""
+                CREATE TABLE {self.target_schema}.{self.table_name} (
+                    {','.join(columns_ddl)}
+                )
+            """
+        
+        # Секционированная таблица: PARTITION BY RANGE по спецификации mcl
+        if getattr(table_model, 'partitioning', None):
+            table_ddl = table_model.partitioning.parent_ddl(table_ddl)
+        return table_ddl
+    
     def create_target_table(self, metadata: Dict) -> bool:
         """Создание целевой таблицы"""
         try:
@@ -359,111 +966,370 @@ class TableMigrator:
             
             # Удаляем таблицу если force=True
             if self.force:
-                cursor.execute(f"DROP TABLE IF EXISTS ags.{self.table_name} CASCADE")
+                cursor.execute(f"DROP TABLE IF EXISTS {self.target_schema}.{self.table_name} CASCADE")
                 if self.verbose:
                     print(f"🗑️ Удалена существующая таблица: {self.table_name}")
             
-            # Создаем таблицу используя модель
-            table_model = metadata['table_model']
-            columns_ddl = []
+            # Создаем таблицу по DDL плана (или модели)
+            plan = metadata.get('plan')
+            create_sql = plan.data['table_ddl'] if plan else self.build_table_ddl(metadata['table_model'])
+            if self.write_mode == 'merge':
+                # Частично загруженная таблица сохраняется и дописывается слиянием
+                create_sql = create_sql.replace("CREATE TABLE ", "CREATE TABLE IF NOT EXISTS ", 1)
             
-            for column in table_model.columns:
-                # Определяем nullable для identity колонок
-                nullable = "NULL" if column.is_nullable else "NOT NULL"
-                # Для identity колонок добавляем GENERATED ALWAYS AS IDENTITY
-                identity_clause = " GENERATED ALWAYS AS IDENTITY" if column.is_identity else ""
-                columns_ddl.append(f"    {column.name} {column.data_type}{identity_clause} {nullable}")
+            cursor.execute(create_sql)
             
-            create_sql = f"""
-                CREATE TABLE ags.{self.table_name} (
-                    {','.join(columns_ddl)}
-                )
-            """
+            # Секции секционированной таблицы
+            partitioning = metadata['table_model'].partitioning
+            if partitioning:
+                for partition_sql in partitioning.partitions_ddl():
+                    cursor.execute(partition_sql)
             
-            cursor.execute(create_sql)
             conn.commit()
             cursor.close()
             
             if self.verbose:
-                print(f"✅ Создана таблица: ags.{self.table_name}")
+                print(f"✅ Создана таблица: {self.target_schema}.{self.table_name}")
+                if partitioning:
+                    print(f"🧩 Секций: {len(partitioning.partitions())} "
+                          f"({partitioning.partition_clause()}, шаг {partitioning.interval})")
             
             return True
             
         except Exception as e:
+            self.get_pg_connection().rollback()
             if self.verbose:
                 print(f"❌ Ошибка создания таблицы: {e}")
             return False
     
+    def source_key_columns(self, table_model) -> list:
+        """Колонки первичного ключа источника по индексу первичного ключа модели"""
+        source_names = {column.name: column.source_name for column in table_model.columns}
+        for index in table_model.indexes:
+            if index.is_primary_key:
+                return [source_names.get(column.column_name, column.column_name)
+                        for column in sorted(index.columns, key=lambda c: c.ordinal_position)]
+        return []
+    
+    def use_lob_transfer(self, metadata: Dict) -> bool:
+        """Нужен ли потоковый перенос LOB (migration.lob_streaming)"""
+        table_model = metadata['table_model']
+        if not self.config_loader.get_config_value('migration.lob_streaming.enabled', False):
+            return False
+        if self.write_mode == 'merge' or not isinstance(self.source_reader, PyodbcSourceReader):
+            return False
+        if not any(lob_kind(column) for column in table_model.columns):
+            return False
+        if not self.source_key_columns(table_model):
+            if self.verbose:
+                print(f"⚠️ Таблица {self.table_name} с LOB без первичного ключа: потоковый перенос недоступен")
+            return False
+        return True
+    
+    def migrate_lob_table_data(self, metadata: Dict) -> bool:
+        """Перенос таблицы с LOB колонками с ограничением памяти (COPY по частям)"""
+        try:
+            pg_conn = self.get_pg_connection()
+            table_model = metadata['table_model']
+            transfer = LobTransfer(
+                self.get_mssql_connection(), pg_conn, self.table_name,
+                table_model.columns, self.source_key_columns(table_model),
+                memory_budget_bytes=int(self.config_loader.get_config_value(
+                    'migration.lob_streaming.memory_budget_mb', 64) * 1024 * 1024),
+                chunk_size=int(self.config_loader.get_config_value(
+                    'migration.lob_streaming.chunk_kb', 1024) * 1024),
+                target_schema=self.target_schema,
+                governor=self.source_governor
+            )
+            
+            if self.verbose:
+                print(f"🧱 Потоковый перенос LOB: {len(transfer.lob_columns)} колонок, "
+                      f"страница {transfer.page_size} строк, часть {transfer.chunk_size} байт")
+            
+            with self.tracer.span('data.copy_lob') as span:
+                self.rows_migrated = transfer.transfer()
+                span.set_counts(rows=transfer.rows, bytes=transfer.bytes)
+                span.set_attribute('streamed_values', transfer.streamed_values)
+                span.set_attribute('max_value_bytes', transfer.max_value_bytes)
+            if self.source_governor:
+                self.tracer.record_span('source.throttle', int(transfer.throttle_wait * 1_000_000_000),
+                                        rows=transfer.rows)
+            
+            with self.tracer.span('data.commit'):
+                pg_conn.commit()
+            
+            if self.verbose:
+                print(f"✅ Перенесено строк: {transfer.rows} (частями: {transfer.streamed_values} значений, "
+                      f"максимум {transfer.max_value_bytes} байт)")
+            return True
+            
+        except Exception as e:
+            self.get_pg_connection().rollback()
+            if self.verbose:
+                print(f"❌ Ошибка потокового переноса LOB: {e}")
+            return False
+    
+    def use_partitioned_load(self, metadata: Dict) -> bool:
+        """
+        Параллельная загрузка по секциям (секционированная таблица, источник MS SQL, режим insert).
+        
+        Транзакция SNAPSHOT открыта только на основном подключении: потоки
+        секций открыли бы свои транзакции в разные моменты и прочитали бы
+        разные версии таблицы, не совпадающие с количеством строк для
+        валидации. Поэтому при чтении SNAPSHOT без снимка базы данных
+        таблица загружается последовательно; снимок базы (все подключения
+        читают один AS SNAPSHOT) параллельной загрузке не мешает.
+        """
+        if (metadata['table_model'].partitioning is None
+                or self.write_mode == 'merge'
+                or not isinstance(self.source_reader, PyodbcSourceReader)):
+            return False
+        if self.snapshot_read_active and self.source_snapshot is None:
+            if self.verbose:
+                print("ℹ️ Чтение SNAPSHOT без снимка базы: секции загружаются последовательно")
+            return False
+        return True
+    
+    def migrate_partitioned_data(self, metadata: Dict) -> bool:
+        """Перенос данных секционированной таблицы: COPY в секции параллельно"""
+        table_model = metadata['table_model']
+        settings = self.config_loader.get_config_value('migration.partitioning', {}) or {}
+        plan = metadata.get('plan')
+        
+        load = PartitionedLoad(
+            table_model.partitioning,
+            reader_factory=lambda: PyodbcSourceReader(connection_factory=self.connect_mssql),
+            connection_factory=self.connect_pg,
+            source_columns=metadata['source_columns'],
+            target_columns=metadata['target_columns'],
+            workers=settings.get('workers', 4),
+            batch_size=settings.get('batch_size', 10000),
+            row_converter=plan.row_converter() if plan else None,
+            identity_columns=[column.name for column in table_model.columns if column.is_identity],
+            governor=self.source_governor
+        )
+        
+        try:
+            with self.tracer.span('data.copy_partitions') as span:
+                summary = load.run()
+                span.set_counts(rows=summary['rows'], bytes=summary['bytes'])
+                span.set_attribute('partitions', len(summary['partitions']))
+                span.set_attribute('workers', load.workers)
+        except PartitionError as e:
+            self.errors.append(str(e))
+            if self.verbose:
+                print(f"❌ {e}")
+            return False
+        
+        self.rows_migrated = summary['rows']
+        self.identity_max = {(self.table_name, name): value for name, value in summary['identity_max'].items()}
+        if self.source_governor:
+            self.tracer.record_span('source.throttle', int(summary['throttle_wait'] * 1_000_000_000),
+                                    rows=summary['rows'])
+        
+        if self.verbose:
+            print(f"✅ Перенесено строк: {summary['rows']} в {len(summary['partitions'])} секций "
+                  f"({load.workers} потоков)")
+        return True
+    
     def migrate_table_data(self, metadata: Dict) -> bool:
         """Перенос данных таблицы"""
+        if self.use_lob_transfer(metadata):
+            return self.migrate_lob_table_data(metadata)
+        if self.use_partitioned_load(metadata):
+            return self.migrate_partitioned_data(metadata)
+        
+        reader_slot = ExitStack()
+        merge: Optional[StagingMerge] = None
         try:
-            mssql_conn = self.get_mssql_connection()
             pg_conn = self.get_pg_connection()
-            
-            # Получаем данные из MS SQL
-            mssql_cursor = mssql_conn.cursor()
             pg_cursor = pg_conn.cursor()
             
-            # Формируем SELECT запрос с ИСХОДНЫМИ именами колонок
-            source_column_names = metadata['source_columns']
-            select_sql = f"SELECT {', '.join(source_column_names)} FROM ags.{self.table_name}"
+            # Размер пакета: адаптивный (по ширине строки и измерениям) или постоянный
+            if self.config_loader.get_config_value('migration.adaptive_batch.enabled', False):
+                row_width = estimate_row_width(metadata['table_model'].columns)
+                batch_size = BatchSizeController.from_config(self.config_loader, row_width, self.table_name)
+                self.batch_sizer = batch_size
+                if self.verbose:
+                    print(f"📐 Ширина строки ~{row_width} байт, начальный пакет: {batch_size.size}")
+            else:
+                batch_size = self.config_loader.get_config_value('migration.batch_size', 1000)
             
-            mssql_cursor.execute(select_sql)
+            # Слот читателя источника: при нагрузке на источник число
+            # одновременно читающих таблиц уменьшается
+            governor = self.source_governor
+            if governor:
+                with self.tracer.span('source.reader_slot'):
+                    reader_slot.enter_context(governor.reader_slot())
+            
+            # Читаем ИСХОДНЫЕ колонки пакетами через источник данных
+            source_column_names = metadata['source_columns']
+            batches = self.source_reader.read_batches(
+                self.table_name, columns=source_column_names, batch_size=batch_size
+            )
             
             # Формируем INSERT запрос с ЦЕЛЕВЫМИ именами колонок
             target_column_names = metadata['target_columns']
-            insert_sql = f"INSERT INTO ags.{self.table_name} ({', '.join(target_column_names)}) OVERRIDING SYSTEM VALUE VALUES ({', '.join(['%s'] * len(target_column_names))})"
+            insert_sql = f"INSERT INTO {self.target_schema}.{self.table_name} ({', '.join(target_column_names)}) OVERRIDING SYSTEM VALUE VALUES ({', '.join(['%s'] * len(target_column_names))})"
+            
+            # Конвертеры значений из плана (только для источников без типов)
+            plan = metadata.get('plan')
+            row_converter = plan.row_converter() if plan else None
+            
+            # Максимумы identity колонок собираются при загрузке в новую
+            # таблицу: синхронизации последовательности не нужен max() по таблице
+            identity_positions = []
+            if self.write_mode != 'merge':
+                identity_positions = [(position, column.name)
+                                      for position, column in enumerate(metadata['table_model'].columns)
+                                      if column.is_identity]
+            identity_max: Dict[str, Optional[int]] = {name: None for _, name in identity_positions}
+            
+            # Режим слияния через промежуточную таблицу
+            if self.write_mode == 'merge':
+                key_columns = self.ensure_merge_key(metadata['table_model'])
+                if key_columns:
+                    merge = StagingMerge(pg_conn, self.table_name, target_column_names, key_columns,
+                                         target_schema=self.target_schema)
+                elif self.verbose:
+                    print(f"⚠️ Нет уникального ключа для слияния {self.table_name}, используется INSERT")
             
             # Переносим данные пакетами
-            batch_size = 1000
             total_rows = 0
+            throttle_wait = 0.0
+            metrics = BatchMetrics(self.table_name)
+            self.batch_metrics = metrics
             
-            while True:
-                rows = mssql_cursor.fetchmany(batch_size)
-                if not rows:
-                    break
+            with self.tracer.span('data.select'):
+                started = batch_started = metrics.clock()
+                batch = next(batches, None)
+                if batch is not None:
+                    metrics.observe('fetch', started)
+            
+            while batch is not None:
+                # Строки источника уже приведены к кортежам
+                started = metrics.clock()
+                rows = batch.rows
+                if row_converter:
+                    rows = [row_converter(row) for row in rows]
+                payload_bytes = estimate_payload_bytes(rows)
+                for position, name in identity_positions:
+                    batch_max = max((row[position] for row in rows if row[position] is not None), default=None)
+                    if batch_max is not None and (identity_max[name] is None or batch_max > identity_max[name]):
+                        identity_max[name] = batch_max
+                metrics.observe('transform', started)
                 
                 # Переносим данные
-                pg_cursor.executemany(insert_sql, rows)
+                started = metrics.clock()
+                if merge:
+                    merge.merge(rows)
+                else:
+                    pg_cursor.executemany(insert_sql, rows)
+                metrics.observe('write', started)
                 
+                metrics.add_batch(len(rows), payload_bytes)
                 total_rows += len(rows)
+                if self.batch_sizer:
+                    self.batch_sizer.observe(len(rows), metrics.clock() - batch_started, payload_bytes)
                 
                 if self.verbose and total_rows % 5000 == 0:
                     print(f"📊 Перенесено строк: {total_rows}")
+                
+                # Ожидание по лимитам источника до чтения следующего пакета
+                if governor:
+                    throttle_wait += governor.throttle(len(rows), payload_bytes)
+                
+                # Завершающее чтение без строк не учитывается в гистограмме fetch
+                started = batch_started = metrics.clock()
+                batch = next(batches, None)
+                if batch is not None:
+                    metrics.observe('fetch', started)
+            
+            if merge:
+                merge.close()
             
-            pg_conn.commit()
+            with self.tracer.span('data.commit'):
+                pg_conn.commit()
             self.rows_migrated = total_rows
+            self.identity_max = {(self.table_name, name): value for name, value in identity_max.items()}
+            
+            summary = metrics.summary()
+            for stage in metrics.STAGES:
+                stats = summary['stages'][stage]
+                self.tracer.record_span(
+                    f'data.{stage}', metrics.stage_total_ns(stage),
+                    rows=total_rows, bytes=metrics.total_bytes,
+                    batches=stats['count'],
+                    p50_ms=stats.get('p50_ms', 0.0),
+                    p95_ms=stats.get('p95_ms', 0.0),
+                    p99_ms=stats.get('p99_ms', 0.0)
+                )
             
-            mssql_cursor.close()
             pg_cursor.close()
             
+            if self.batch_sizer:
+                sizing = self.batch_sizer.summary()
+                self.tracer.record_span('data.batch_sizing', 0, rows=total_rows, **sizing)
+            
+            if governor:
+                throttle = governor.summary()
+                self.tracer.record_span(
+                    'source.throttle', int(throttle_wait * 1_000_000_000), rows=total_rows,
+                    factor=throttle['factor'], readers_limit=throttle['readers_limit'],
+                    adjustments=throttle['adjustments']
+                )
+            
             if self.verbose:
                 print(f"✅ Перенесено строк: {total_rows}")
+                print(metrics.format_summary())
+                if self.batch_sizer:
+                    print(f"📐 Размер пакета: {sizing['initial_size']} -> {sizing['final_size']} "
+                          f"(+{sizing['increases']}/-{sizing['decreases']})")
+                if governor and throttle_wait:
+                    print(f"🐢 Ожидание по лимитам источника: {throttle_wait:.1f} с "
+                          f"(коэффициент скорости {throttle['factor']})")
             
             return True
             
         except Exception as e:
+            # Прерванная транзакция: без отката трассировка не сохранится
+            self.get_pg_connection().rollback()
             if self.verbose:
                 print(f"❌ Ошибка переноса данных: {e}")
             return False
+        finally:
+            if merge is not None:
+                self.release_staging(merge)
+            reader_slot.close()
+    
+    def release_staging(self, merge: StagingMerge) -> None:
+        """Удаление промежуточной таблицы слияния (в том числе после ошибки переноса)"""
+        try:
+            merge.close()
+            self.get_pg_connection().commit()
+        except Exception as e:
+            self.get_pg_connection().rollback()
+            if self.verbose:
+                print(f"⚠️ Не удалось удалить промежуточную таблицу {merge.stage_table}: {e}")
     
     def validate_migration(self) -> bool:
         """Валидация миграции"""
         try:
-            mssql_conn = self.get_mssql_connection()
             pg_conn = self.get_pg_connection()
             
-            # Подсчитываем строки в исходной таблице
-            mssql_cursor = mssql_conn.cursor()
-            mssql_cursor.execute(f"SELECT COUNT(*) FROM ags.{self.table_name}")
-            source_count = mssql_cursor.fetchone()[0]
-            mssql_cursor.close()
+            # Подсчитываем строки в исходной таблице: при чтении SNAPSHOT -
+            # количество, посчитанное в транзакции загрузки
+            if self.snapshot_row_count is not None:
+                source_count = self.snapshot_row_count
+            else:
+                source_count = self.source_reader.count_rows(self.table_name)
             
             # Подсчитываем строки в целевой таблице
             pg_cursor = pg_conn.cursor()
-            pg_cursor.execute(f"SELECT COUNT(*) FROM ags.{self.table_name}")
+            pg_cursor.execute(f"SELECT COUNT(*) FROM {self.target_schema}.{self.table_name}")
             target_count = pg_cursor.fetchone()[0]
             pg_cursor.close()
+            self.target_row_count = target_count
             
             if self.verbose:
                 print(f"📊 Исходная таблица: {source_count} строк")
@@ -26,64 +26,56 @@ class TableModel(ABC):
         self.unique_constraints: List['UniqueConstraintModel'] = []
         self.check_constraints: List['CheckConstraintModel'] = []
         self.triggers: List['TriggerModel'] = []
+        
+        # Спецификация секционирования целевой таблицы (mcl.table_partitioning)
+        self.partitioning: Optional['PartitionSpec'] = None
     
-    def load_metadata(self, config_loader) -> bool:
-        """Загрузка всех метаданных таблицы"""
+    def load_metadata(self, config_loader, source_reader=None) -> bool:
+        """
+        Загрузка всех метаданных таблицы
+        
+        source_reader - читатель исходной БД (SourceReader); если не задан,
+        создается читатель MS SQL Server по конфигурации и закрывается после загрузки.
+        """
+        owns_reader = source_reader is None
+        if owns_reader:
+            source_reader = self._create_source_reader(config_loader)
         try:
             # Сначала проверяем существование исходной таблицы
-            if not self.check_source_exists(config_loader):
+            if not self.check_source_exists(source_reader):
                 self.log_error(f"Исходная таблица {self.source_table_name} не найдена в MS SQL Server")
                 return False
             
             # Загружаем количество строк из исходной таблицы
-            self.load_source_row_count(config_loader)
+            self.load_source_row_count(source_reader)
             
             # Загружаем метаданные из PostgreSQL
             self.load_target_table_names(config_loader)
             self.load_columns(config_loader)
             self.load_indexes(config_loader)
-            self.load_foreign_keys()
-            self.load_constraints()
+            self.load_foreign_keys(config_loader)
+            self.load_constraints(config_loader)
+            self.load_partitioning(config_loader)
             self.load_triggers()
             return True
         except Exception as e:
             self.log_error(f"Ошибка загрузки метаданных: {e}")
             return False
+        finally:
+            if owns_reader:
+                source_reader.close()
+    
+    @staticmethod
+    def _create_source_reader(config_loader):
+        """Читатель MS SQL Server по конфигурации database.mssql"""
+        from src.code.infrastructure.classes.source_reader import PyodbcSourceReader
+        
+        return PyodbcSourceReader.from_config(config_loader.get_database_config('mssql'))
     
-    def check_source_exists(self, config_loader) -> bool:
+    def check_source_exists(self, source_reader) -> bool:
         """Проверка существования в MS SQL"""
         try:
-            import pyodbc
-            
-            # Получаем конфигурацию MS SQL
-            mssql_config = config_loader.get_database_config('mssql')
-            
-            # Создаем подключение
-            connection_string = (
-                f"DRIVER={{{mssql_config['driver']}}};"
-                f"SERVER={mssql_config['server']},{mssql_config['port']};"
-                f"DATABASE={mssql_config['database']};"
-                f"UID={mssql_config['user']};"
-                f"PWD={mssql_config['password']};"
-                "TrustServerCertificate=yes;"
-            )
-            
-            conn = pyodbc.connect(connection_string)
-            cursor = conn.cursor()
-            
-            # Проверяем существование таблицы
-            cursor.execute("""
-                SELECT COUNT(*) 
-                FROM information_schema.tables 
-                WHERE table_name = ? AND table_schema = 'ags'
-            """, (self.source_table_name,))
-            
-            count = cursor.fetchone()[0]
-            
-            cursor.close()
-            conn.close()
-            
-            self.source_exists = count > 0
+            self.source_exists = source_reader.table_exists(self.source_table_name)
             return self.source_exists
             
         except Exception as e:
@@ -91,35 +83,10 @@ class TableModel(ABC):
             self.source_exists = False
             return False
     
-    def load_source_row_count(self, config_loader) -> None:
+    def load_source_row_count(self, source_reader) -> None:
         """Загрузка количества строк из исходной таблицы в MS SQL"""
         try:
-            import pyodbc
-            
-            # Получаем конфигурацию MS SQL
-            mssql_config = config_loader.get_database_config('mssql')
-            
-            # Создаем подключение
-            connection_string = (
-                f"DRIVER={{{mssql_config['driver']}}};"
-                f"SERVER={mssql_config['server']},{mssql_config['port']};"
-                f"DATABASE={mssql_config['database']};"
-                f"UID={mssql_config['user']};"
-                f"PWD={mssql_config['password']};"
-                "TrustServerCertificate=yes;"
-            )
-            
-            conn = pyodbc.connect(connection_string)
-            cursor = conn.cursor()
-            
-            # Получаем количество строк
-            cursor.execute(f"SELECT COUNT(*) FROM ags.{self.source_table_name}")
-            
-            count = cursor.fetchone()[0]
-            self.source_row_count = count
-            
-            cursor.close()
-            conn.close()
+            self.source_row_count = source_reader.count_rows(self.source_table_name)
             
         except Exception as e:
             self.log_error(f"Ошибка загрузки количества строк: {e}")
@@ -128,19 +95,7 @@ class TableModel(ABC):
     def load_target_table_names(self, config_loader) -> None:
         """Загрузка имен целевых таблиц из метаданных"""
         try:
-            import psycopg2
-            
-            # Получаем конфигурацию PostgreSQL
-            postgres_config = config_loader.get_database_config('postgres')
-            
-            # Создаем подключение
-            conn = psycopg2.connect(
-                host=postgres_config['host'],
-                port=postgres_config['port'],
-                dbname=postgres_config['database'],
-                user=postgres_config['user'],
-                password=postgres_config['password']
-            )
+            conn = self._connect_postgres(config_loader)
             cursor = conn.cursor()
             
             # Получаем имена целевых таблиц
@@ -207,21 +162,9 @@ class TableModel(ABC):
     def load_columns(self, config_loader):
         """Загрузка метаданных колонок"""
         try:
-            from src.classes.column_model import ColumnModel
-            import psycopg2
-            
-            # Получаем конфигурацию PostgreSQL
-            pg_config = config_loader.get_database_config('postgres')
-            pg_config_clean = {
-                'host': pg_config['host'],
-                'port': pg_config['port'], 
-                'database': pg_config['database'],
-                'user': pg_config['user'],
-                'password': pg_config['password']
-            }
+            from src.code.migration.classes.column_model import ColumnModel
             
-            # Подключаемся к PostgreSQL
-            conn = psycopg2.connect(**pg_config_clean)
+            conn = self._connect_postgres(config_loader)
             cursor = conn.cursor()
             
             # Получаем метаданные колонок
@@ -238,11 +181,16 @@ class TableModel(ABC):
                     pc.is_computed,
                     pc.target_type,
                     pc.computed_definition,
-                    pc.postgres_computed_definition
+                    pc.postgres_computed_definition,
+                    pdt.is_nullable,
+                    mbt.base_type_name as source_data_type,
+                    mdt.is_max_length as source_is_max_length
                 FROM mcl.postgres_columns pc
                 JOIN mcl.postgres_tables pt ON pc.table_id = pt.id
                 JOIN mcl.postgres_derived_types pdt ON pc.postgres_data_type_id = pdt.id
                 JOIN mcl.mssql_columns mc ON pc.source_column_id = mc.id
+                LEFT JOIN mcl.mssql_derived_types mdt ON mc.data_type_id = mdt.id
+                LEFT JOIN mcl.mssql_base_types mbt ON mdt.base_type_id = mbt.id
                 JOIN mcl.mssql_tables mt ON pt.source_table_id = mt.id
                 WHERE mt.object_name = %s
                 ORDER BY pc.ordinal_position
@@ -254,18 +202,21 @@ class TableModel(ABC):
             
             # Создаем экземпляры ColumnModel
             self.columns = []
-            for target_name, source_name, data_type, is_identity, ordinal, precision, scale, length, is_computed, target_type, computed_definition, postgres_computed_definition in columns_data:
+            for (target_name, source_name, data_type, is_identity, ordinal, precision, scale, length, is_computed,
+                 target_type, computed_definition, postgres_computed_definition, is_nullable,
+                 source_data_type, source_is_max_length) in columns_data:
                 column = ColumnModel(
                     name=target_name,
                     source_name=source_name,
-                    data_type=data_type
+                    data_type=data_type,
+                    data_type_precision=precision,
+                    data_type_scale=scale,
+                    data_type_max_length=length
                 )
                 column.is_identity = is_identity
                 column.ordinal_position = ordinal
-                column.data_type_precision = precision
-                column.data_type_scale = scale
-                column.data_type_max_length = length
-                column.is_nullable = not is_identity  # Identity колонки обычно NOT NULL
+                # Допустимость NULL - из производного типа (по колонке источника); identity всегда NOT NULL
+                column.is_nullable = not is_identity and is_nullable is not False
                 
                 # Добавляем атрибуты для вычисляемых колонок
                 column.is_computed = is_computed
@@ -273,6 +224,10 @@ class TableModel(ABC):
                 column.computed_definition = computed_definition
                 column.postgres_computed_definition = postgres_computed_definition
                 
+                # Тип источника: varbinary(max) и varbinary(n) оба переносятся в bytea
+                column.source_data_type = source_data_type
+                column.source_is_max_length = bool(source_is_max_length)
+                
                 self.columns.append(column)
             
             return True
@@ -284,21 +239,9 @@ class TableModel(ABC):
     def load_indexes(self, config_loader):
         """Загрузка метаданных индексов"""
         try:
-            from src.classes.index_model import IndexModel
-            import psycopg2
-            
-            # Получаем конфигурацию PostgreSQL
-            pg_config = config_loader.get_database_config('postgres')
-            pg_config_clean = {
-                'host': pg_config['host'],
-                'port': pg_config['port'], 
-                'database': pg_config['database'],
-                'user': pg_config['user'],
-                'password': pg_config['password']
-            }
+            from src.code.migration.classes.index_model import IndexModel
             
-            # Подключаемся к PostgreSQL
-            conn = psycopg2.connect(**pg_config_clean)
+            conn = self._connect_postgres(config_loader)
             cursor = conn.cursor()
             
             # Получаем метаданные индексов через связь с исходными индексами
@@ -389,15 +332,81 @@ class TableModel(ABC):
             self.log_error(f"Ошибка загрузки индексов: {e}")
             return False
     
-    def load_foreign_keys(self):
-        """Загрузка метаданных внешних ключей"""
-        # TODO: Реализовать загрузку внешних ключей из mcl.postgres_foreign_keys
-        pass
+    def _connect_postgres(self, config_loader):
+        """Подключение к PostgreSQL по конфигурации database.postgres"""
+        import psycopg2
+        
+        pg_config = config_loader.get_database_config('postgres')
+        return psycopg2.connect(
+            host=pg_config['host'],
+            port=pg_config['port'],
+            dbname=pg_config['database'],
+            user=pg_config['user'],
+            password=pg_config['password']
+        )
     
-    def load_constraints(self):
-        """Загрузка метаданных ограничений"""
-        # TODO: Реализовать загрузку ограничений из mcl.postgres_*_constraints
-        pass
+    def load_foreign_keys(self, config_loader):
+        """Загрузка метаданных внешних ключей из mcl.postgres_foreign_keys"""
+        try:
+            from src.code.migration.classes.constraint_stage import load_foreign_keys
+            
+            conn = self._connect_postgres(config_loader)
+            try:
+                cursor = conn.cursor()
+                self.foreign_keys = load_foreign_keys(
+                    cursor, table_name=self.source_table_name,
+                    statuses=['pending', 'in_progress', 'completed', 'failed']
+                )
+                cursor.close()
+            finally:
+                conn.close()
+            return True
+            
+        except Exception as e:
+            self.log_error(f"Ошибка загрузки внешних ключей: {e}")
+            return False
+    
+    def load_constraints(self, config_loader):
+        """Загрузка метаданных ограничений из mcl.postgres_check_constraints и mcl.postgres_unique_constraints"""
+        try:
+            from src.code.migration.classes.constraint_stage import (
+                load_check_constraints, load_unique_constraints
+            )
+            
+            statuses = ['pending', 'in_progress', 'completed', 'failed']
+            conn = self._connect_postgres(config_loader)
+            try:
+                cursor = conn.cursor()
+                self.check_constraints = load_check_constraints(
+                    cursor, table_name=self.source_table_name, statuses=statuses
+                )
+                self.unique_constraints = load_unique_constraints(
+                    cursor, table_name=self.source_table_name, statuses=statuses
+                )
+                cursor.close()
+            finally:
+                conn.close()
+            return True
+            
+        except Exception as e:
+            self.log_error(f"Ошибка загрузки ограничений: {e}")
+            return False
+    
+    def load_partitioning(self, config_loader):
+        """Загрузка спецификации секционирования из mcl.table_partitioning"""
+        from src.code.migration.classes.table_partitioning import PartitionSpec
+        
+        conn = self._connect_postgres(config_loader)
+        try:
+            cursor = conn.cursor()
+            spec = PartitionSpec.load(cursor, self.source_table_name)
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        # Ошибка спецификации (колонка, тип, NULL) прерывает загрузку метаданных
+        self.partitioning = spec.bind(self.columns) if spec else None
+        return True
     
     def load_triggers(self):
         """Загрузка метаданных триггеров"""
@@ -433,7 +442,8 @@ class TableModel(ABC):
             'foreign_keys_count': len(self.foreign_keys),
             'unique_constraints_count': len(self.unique_constraints),
             'check_constraints_count': len(self.check_constraints),
-            'triggers_count': len(self.triggers)
+            'triggers_count': len(self.triggers),
+            'partitioning': self.partitioning.to_dict() if self.partitioning else None
         }
     
     @staticmethod
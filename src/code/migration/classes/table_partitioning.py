@@ -0,0 +1,527 @@
+"""
+TablePartitioning - Декларативное секционирование целевых таблиц
+
+Спецификация секционирования таблицы хранится в mcl.table_partitioning
+(database/sql/migration_state/05_create_table_partitioning.sql):
+колонка секционирования (дата или целочисленный идентификатор), диапазон
+[range_start, range_end) и шаг секции ('1 month', '1 year', '7 days' для
+дат, число для идентификаторов). По спецификации:
+
+    1. целевая таблица создается как секционированная
+       (PARTITION BY RANGE), секции - CREATE TABLE ... PARTITION OF;
+       строки вне диапазона попадают в секцию DEFAULT;
+    2. данные читаются из источника диапазонами ключа секций и пишутся
+       COPY прямо в секции - каждая секция своим рабочим потоком со своими
+       подключениями к источнику и PostgreSQL; если не загружена хотя бы
+       одна секция, загруженные секции очищаются (TRUNCATE), чтобы
+       повторная загрузка не дублировала строки;
+    3. индексы создаются на родителе (ON ONLY), по секциям строятся
+       параллельно CREATE INDEX CONCURRENTLY и присоединяются
+       ALTER INDEX ... ATTACH PARTITION.
+
+Ограничения PostgreSQL: уникальные индексы (и первичный ключ) должны
+включать колонку секционирования, а строки с NULL в колонке
+секционирования попадают только в DEFAULT - поэтому колонка
+секционирования должна быть NOT NULL.
+"""
+
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.code.infrastructure.classes.migration_tracer import estimate_payload_bytes
+from src.code.migration.classes.staging_merge import copy_buffer
+
+
+logger = logging.getLogger(__name__)
+
+
+# Таблица спецификаций создается скриптом схемы mcl; без нее таблицы не
+# секционируются, а транзакция вызывающего не прерывается ошибкой
+PARTITIONING_EXISTS_QUERY = "SELECT to_regclass('mcl.table_partitioning') IS NOT NULL"
+
+PARTITIONING_QUERY = """
+    SELECT partition_column, strategy, range_start, range_end, partition_interval, include_default
+    FROM mcl.table_partitioning
+    WHERE table_name = %s AND task_id = %s AND is_enabled = true
+"""
+
+# Верхняя граница числа секций одной таблицы (защита от ошибки в шаге)
+MAX_PARTITIONS = 4096
+
+_DATE_TYPES = ('date', 'timestamp')
+_INTEGER_TYPES = ('smallint', 'integer', 'bigint', 'numeric')
+_INTERVAL_UNITS = {'day': 'days', 'week': 'weeks', 'month': 'months', 'year': 'years'}
+
+
+class PartitionError(Exception):
+    """Ошибка спецификации или построения секций"""
+    pass
+
+
+def parse_interval(text: str):
+    """Шаг секции даты: '1 month' -> (1, 'months')"""
+    match = re.fullmatch(r'\s*(\d+)\s+(day|week|month|year)s?\s*', text.lower())
+    if not match or int(match.group(1)) <= 0:
+        raise PartitionError(f"Некорректный шаг секции: {text!r}")
+    return int(match.group(1)), _INTERVAL_UNITS[match.group(2)]
+
+
+def add_interval(value: date, count: int, unit: str) -> date:
+    """Дата (или дата и время), сдвинутая на count единиц unit"""
+    if unit == 'days':
+        return value + timedelta(days=count)
+    if unit == 'weeks':
+        return value + timedelta(weeks=count)
+    months = count * (12 if unit == 'years' else 1)
+    year, month = divmod(value.month - 1 + months, 12)
+    return value.replace(year=value.year + year, month=month + 1)
+
+
+class PartitionBound:
+    """
+    Секция целевой таблицы.
+
+    Attributes:
+        name: Имя таблицы секции
+        lower: Нижняя граница (включительно), None - секция DEFAULT
+        upper: Верхняя граница (не включительно)
+    """
+
+    def __init__(self, name: str, lower: Any = None, upper: Any = None, is_default: bool = False):
+        self.name = name
+        self.lower = lower
+        self.upper = upper
+        self.is_default = is_default
+
+    @staticmethod
+    def literal(value: Any) -> str:
+        if isinstance(value, (date, datetime)):
+            return f"'{value.isoformat()}'"
+        return str(int(value))
+
+    def for_values_sql(self) -> str:
+        if self.is_default:
+            return "DEFAULT"
+        return f"FOR VALUES FROM ({self.literal(self.lower)}) TO ({self.literal(self.upper)})"
+
+    def __repr__(self) -> str:
+        return f"PartitionBound({self.name}, {self.for_values_sql()})"
+
+
+class PartitionSpec:
+    """
+    Спецификация секционирования таблицы по диапазонам.
+
+    Example:
+        >>> spec = PartitionSpec('accnt', 'created_at', '2020-01-01', '2025-01-01', '1 year')
+        >>> spec.bind(table_model.columns)
+        >>> spec.parent_ddl(table_ddl)                  # ... PARTITION BY RANGE (created_at)
+        >>> for sql in spec.partitions_ddl(): cursor.execute(sql)
+    """
+
+    def __init__(self, table_name: str, column_name: str, range_start: str, range_end: str,
+                 interval: str, include_default: bool = True, strategy: str = 'range',
+                 schema: str = 'ags'):
+        if strategy != 'range':
+            raise PartitionError(f"Стратегия секционирования {strategy!r} не поддерживается (только range)")
+        self.table_name = table_name
+        self.column_name = column_name
+        self.range_start = str(range_start)
+        self.range_end = str(range_end)
+        self.interval = str(interval)
+        self.include_default = include_default
+        self.strategy = strategy
+        self.schema = schema
+
+        # Заполняются bind(): колонка источника и вид ключа (date | id)
+        self.source_column: Optional[str] = None
+        self.kind: Optional[str] = None
+        self._partitions: Optional[List[PartitionBound]] = None
+
+    @classmethod
+    def load(cls, cursor, table_name: str, task_id: int = 2) -> Optional['PartitionSpec']:
+        """Спецификация таблицы из mcl.table_partitioning (None - таблица не секционируется)"""
+        cursor.execute(PARTITIONING_EXISTS_QUERY)
+        if not cursor.fetchone()[0]:
+            return None
+        cursor.execute(PARTITIONING_QUERY, (table_name, task_id))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        column_name, strategy, range_start, range_end, interval, include_default = row
+        return cls(table_name, column_name, range_start, range_end, interval,
+                   include_default=include_default, strategy=strategy)
+
+    @property
+    def target_table(self) -> str:
+        return f"{self.schema}.{self.table_name}"
+
+    def bind(self, columns: Sequence[Any]) -> 'PartitionSpec':
+        """
+        Привязка к колонкам модели: колонка источника и вид ключа.
+
+        Raises:
+            PartitionError: Колонка не найдена, допускает NULL или имеет неподходящий тип
+        """
+        column = next((c for c in columns if c.name == self.column_name), None)
+        if column is None:
+            raise PartitionError(f"Колонка секционирования {self.column_name} не найдена в {self.table_name}")
+        if column.is_nullable:
+            raise PartitionError(f"Колонка секционирования {self.table_name}.{self.column_name} "
+                                 f"должна быть NOT NULL")
+        data_type = (column.data_type or '').lower()
+        if data_type.startswith(_DATE_TYPES):
+            self.kind = 'date'
+        elif data_type.startswith(_INTEGER_TYPES):
+            self.kind = 'id'
+        else:
+            raise PartitionError(f"Тип {column.data_type} колонки {self.column_name} "
+                                 f"не поддерживается для секционирования")
+        self.source_column = column.source_name
+        self._partitions = None
+        return self
+
+    def _bound(self, text: str) -> Any:
+        if self.kind == 'date':
+            value = datetime.fromisoformat(text.strip())
+            return value.date() if len(text.strip()) <= 10 else value
+        return int(text)
+
+    def partitions(self) -> List[PartitionBound]:
+        """Секции по диапазону и шагу (последняя секция - DEFAULT, если включена)"""
+        if self._partitions is not None:
+            return self._partitions
+        if self.kind is None:
+            raise PartitionError(f"Спецификация {self.table_name} не привязана к колонкам (bind)")
+
+        start, end = self._bound(self.range_start), self._bound(self.range_end)
+        if start >= end:
+            raise PartitionError(f"Пустой диапазон секций {self.range_start} - {self.range_end}")
+
+        if self.kind == 'date':
+            count, unit = parse_interval(self.interval)
+            if unit in ('months', 'years') and start.day != 1:
+                raise PartitionError(f"Диапазон с шагом {self.interval!r} должен начинаться с первого числа")
+            step = lambda value: add_interval(value, count, unit)
+            suffix = lambda value: value.strftime('%Y%m%d')
+        else:
+            width = int(self.interval)
+            if width <= 0:
+                raise PartitionError(f"Некорректный шаг секции: {self.interval!r}")
+            step = lambda value: value + width
+            suffix = lambda value: str(value).replace('-', 'm')
+
+        partitions = []
+        lower = start
+        while lower < end:
+            if len(partitions) >= MAX_PARTITIONS:
+                raise PartitionError(f"Больше {MAX_PARTITIONS} секций для {self.table_name}: увеличьте шаг")
+            upper = min(step(lower), end)
+            partitions.append(PartitionBound(f"{self.table_name}_p{suffix(lower)}", lower, upper))
+            lower = upper
+        if self.include_default:
+            partitions.append(PartitionBound(f"{self.table_name}_default", is_default=True))
+        self._partitions = partitions
+        return partitions
+
+    def source_ranges(self, partition: PartitionBound) -> List[tuple]:
+        """Диапазоны ключа источника [low, high) для секции"""
+        if not partition.is_default:
+            return [(partition.lower, partition.upper)]
+        return [(None, self._bound(self.range_start)), (self._bound(self.range_end), None)]
+
+    def partition_clause(self) -> str:
+        return f"PARTITION BY RANGE ({self.column_name})"
+
+    def parent_ddl(self, table_ddl: str) -> str:
+        """DDL секционированного родителя по DDL обычной таблицы"""
+        return f"{table_ddl.rstrip()} {self.partition_clause()}"
+
+    def partitions_ddl(self) -> List[str]:
+        """CREATE TABLE для секций (повторное выполнение безопасно)"""
+        return [f"CREATE TABLE IF NOT EXISTS {self.schema}.{partition.name} "
+                f"PARTITION OF {self.target_table} {partition.for_values_sql()}"
+                for partition in self.partitions()]
+
+    def check_index(self, index) -> None:
+        """
+        Проверка индекса секционированной таблицы.
+
+        Raises:
+            PartitionError: Уникальный индекс не включает колонку секционирования
+        """
+        if index.is_unique and self.column_name not in [c.column_name for c in index.columns]:
+            raise PartitionError(f"Уникальный индекс {index.name} секционированной таблицы "
+                                 f"должен включать колонку {self.column_name}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'table_name': self.table_name,
+            'column_name': self.column_name,
+            'range_start': self.range_start,
+            'range_end': self.range_end,
+            'interval': self.interval,
+            'include_default': self.include_default,
+            'strategy': self.strategy,
+            'schema': self.schema,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> 'PartitionSpec':
+        return cls(**payload)
+
+
+class PartitionedLoad:
+    """
+    Параллельная загрузка секционированной таблицы: COPY прямо в секции.
+
+    Example:
+        >>> load = PartitionedLoad(spec, reader_factory, pg_connect, source_columns, target_columns)
+        >>> summary = load.run()
+    """
+
+    def __init__(self, spec: PartitionSpec, reader_factory: Callable[[], Any],
+                 connection_factory: Callable[[], Any], source_columns: Sequence[str],
+                 target_columns: Sequence[str], workers: int = 4, batch_size: Any = 10000,
+                 row_converter: Optional[Callable[[tuple], tuple]] = None,
+                 identity_columns: Sequence[str] = (), governor=None):
+        """
+        Инициализация PartitionedLoad.
+
+        Args:
+            spec: Привязанная спецификация секционирования
+            reader_factory: Создание читателя источника (SourceReader) для рабочего потока
+            connection_factory: Создание подключения psycopg2 для рабочего потока
+            source_columns: Колонки источника
+            target_columns: Колонки целевой таблицы в том же порядке
+            workers: Секций, загружаемых одновременно
+            batch_size: Размер пакета чтения и COPY
+            row_converter: Преобразование строки источника (из плана)
+            identity_columns: Колонки identity (максимумы собираются для setval)
+            governor: SourceGovernor - слот читателя и лимиты источника на секцию
+        """
+        self.spec = spec
+        self.reader_factory = reader_factory
+        self.connection_factory = connection_factory
+        self.source_columns = list(source_columns)
+        self.target_columns = list(target_columns)
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.row_converter = row_converter
+        self.identity_positions = [(self.target_columns.index(name), name) for name in identity_columns]
+        self.governor = governor
+
+    def load_partition(self, partition: PartitionBound) -> Dict[str, Any]:
+        """Загрузка одной секции в отдельной транзакции"""
+        started = time.perf_counter()
+        copy_sql = (f"COPY {self.spec.schema}.{partition.name} "
+                    f"({', '.join(self.target_columns)}) FROM STDIN")
+        rows_total, bytes_total, throttle_wait = 0, 0, 0.0
+        identity_max: Dict[str, Optional[int]] = {name: None for _, name in self.identity_positions}
+
+        with ExitStack() as stack:
+            if self.governor:
+                stack.enter_context(self.governor.reader_slot())
+            reader = self.reader_factory()
+            stack.callback(reader.close)
+            connection = self.connection_factory()
+            stack.callback(connection.close)
+
+            cursor = connection.cursor()
+            try:
+                for key_range in self.spec.source_ranges(partition):
+                    for batch in reader.read_batches(self.spec.table_name, columns=self.source_columns,
+                                                     batch_size=self.batch_size,
+                                                     key_column=self.spec.source_column,
+                                                     key_range=key_range):
+                        rows = batch.rows
+                        if self.row_converter:
+                            rows = [self.row_converter(row) for row in rows]
+                        for position, name in self.identity_positions:
+                            batch_max = max((row[position] for row in rows if row[position] is not None),
+                                            default=None)
+                            if batch_max is not None and (identity_max[name] is None
+                                                          or batch_max > identity_max[name]):
+                                identity_max[name] = batch_max
+                        payload_bytes = estimate_payload_bytes(rows)
+                        cursor.copy_expert(copy_sql, copy_buffer(rows))
+                        rows_total += len(rows)
+                        bytes_total += payload_bytes
+                        if self.governor:
+                            throttle_wait += self.governor.throttle(len(rows), payload_bytes)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        return {
+            'partition': partition.name,
+            'rows': rows_total,
+            'bytes': bytes_total,
+            'throttle_wait': throttle_wait,
+            'identity_max': identity_max,
+            'duration': time.perf_counter() - started,
+        }
+
+    def truncate(self, partition_names: Sequence[str]) -> None:
+        """Очистка загруженных секций после ошибки загрузки таблицы"""
+        if not partition_names:
+            return
+        connection = self.connection_factory()
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(f"TRUNCATE {', '.join(f'{self.spec.schema}.{name}' for name in partition_names)}")
+                connection.commit()
+            finally:
+                cursor.close()
+        except Exception as e:
+            connection.rollback()
+            logger.error(f"Не удалось очистить загруженные секции {self.spec.table_name}: {e}")
+        finally:
+            connection.close()
+
+    def run(self, partitions: Optional[Sequence[PartitionBound]] = None) -> Dict[str, Any]:
+        """
+        Загрузка секций параллельно.
+
+        Returns:
+            Dict[str, Any]: rows, bytes, partitions (по секциям), identity_max, throttle_wait
+
+        Каждая секция фиксируется своей транзакцией. При ошибке секции
+        еще не начатые секции отменяются, а уже загруженные очищаются
+        (TRUNCATE): таблица остается пустой, а не частично загруженной.
+
+        Raises:
+            PartitionError: Не загружена хотя бы одна секция
+        """
+        partitions = list(partitions if partitions is not None else self.spec.partitions())
+        results, failures = [], []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(partitions)) or 1) as executor:
+            futures = [(partition, executor.submit(self.load_partition, partition)) for partition in partitions]
+            for partition, future in futures:
+                if future.cancelled():
+                    continue
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error(f"Ошибка загрузки секции {partition.name}: {e}")
+                    failures.append(f"{partition.name}: {e}")
+                    for _, pending in futures:
+                        pending.cancel()
+        if failures:
+            self.truncate([result['partition'] for result in results])
+            raise PartitionError(f"Не загружены секции {self.spec.table_name}: {'; '.join(failures)}")
+
+        identity_max: Dict[str, Optional[int]] = {name: None for _, name in self.identity_positions}
+        for result in results:
+            for name, value in result['identity_max'].items():
+                if value is not None and (identity_max[name] is None or value > identity_max[name]):
+                    identity_max[name] = value
+        return {
+            'rows': sum(r['rows'] for r in results),
+            'bytes': sum(r['bytes'] for r in results),
+            'throttle_wait': sum(r['throttle_wait'] for r in results),
+            'partitions': {r['partition']: r['rows'] for r in results},
+            'identity_max': identity_max,
+        }
+
+
+class PartitionedIndexBuild:
+    """
+    Построение индексов секционированной таблицы по секциям.
+
+    Индекс создается на родителе ON ONLY (без построения, индекс
+    недействителен), индексы секций строятся параллельно
+    CREATE INDEX CONCURRENTLY и присоединяются к индексу родителя -
+    после присоединения всех секций индекс родителя становится
+    действительным.
+
+    Example:
+        >>> build = PartitionedIndexBuild(spec, pg_connect, workers=4)
+        >>> build.create(index)
+    """
+
+    def __init__(self, spec: PartitionSpec, connection_factory: Callable[[], Any], workers: int = 4):
+        self.spec = spec
+        self.connection_factory = connection_factory
+        self.workers = max(1, workers)
+
+    @staticmethod
+    def child_index_name(index_name: str, partition: PartitionBound) -> str:
+        """Имя индекса секции (не длиннее 63 символов)"""
+        suffix = partition.name[len(partition.name.rsplit('_', 1)[0]):]
+        return f"{index_name[:63 - len(suffix)]}{suffix}"
+
+    @staticmethod
+    def index_name(index) -> str:
+        return index.alternative_name if index.alternative_name else index.name
+
+    def parent_sql(self, index) -> str:
+        create_sql = index.generate_create_sql(if_not_exists=True)
+        return create_sql.replace(f" ON {self.spec.target_table}", f" ON ONLY {self.spec.target_table}", 1)
+
+    def child_sql(self, index, partition: PartitionBound) -> str:
+        create_sql = index.generate_create_sql()
+        create_sql = create_sql.replace(f"INDEX {self.index_name(index)} ON {self.spec.target_table}",
+                                        f"INDEX CONCURRENTLY IF NOT EXISTS "
+                                        f"{self.child_index_name(self.index_name(index), partition)} "
+                                        f"ON {self.spec.schema}.{partition.name}", 1)
+        return create_sql
+
+    def _build_partition(self, index, partition: PartitionBound) -> None:
+        """CREATE INDEX CONCURRENTLY на секции (вне транзакции) и ATTACH PARTITION"""
+        connection = self.connection_factory()
+        try:
+            connection.autocommit = True
+            cursor = connection.cursor()
+            try:
+                cursor.execute(self.child_sql(index, partition))
+                cursor.execute(f"ALTER INDEX {self.spec.schema}.{self.index_name(index)} ATTACH PARTITION "
+                               f"{self.spec.schema}.{self.child_index_name(self.index_name(index), partition)}")
+            finally:
+                cursor.close()
+        finally:
+            connection.close()
+
+    def create(self, index) -> int:
+        """
+        Индекс родителя и индексы всех секций.
+
+        Returns:
+            int: Количество построенных индексов секций
+
+        Raises:
+            PartitionError: Индекс не допускается или не построен на части секций
+        """
+        self.spec.check_index(index)
+        connection = self.connection_factory()
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(self.parent_sql(index))
+                connection.commit()
+            finally:
+                cursor.close()
+        finally:
+            connection.close()
+
+        partitions = self.spec.partitions()
+        failures = []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(partitions))) as executor:
+            futures = [(p, executor.submit(self._build_partition, index, p)) for p in partitions]
+            for partition, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    failures.append(f"{partition.name}: {e}")
+        if failures:
+            raise PartitionError(f"Индекс {self.index_name(index)} не построен на секциях: {'; '.join(failures)}")
+        return len(partitions)
@@ -0,0 +1,70 @@
+"""
+TypeDescriptor - Общая таблица описаний типов колонок
+
+Колонок в каталоге десятки тысяч, а различных сочетаний типа, точности,
+масштаба и длины - сотни. Модели колонок ссылаются на общий неизменяемый
+TypeDescriptor вместо хранения четырех полей в каждом экземпляре, а
+имена колонок, таблиц и индексов интернируются (sys.intern): одинаковые
+имена разных моделей - одна строка в памяти.
+"""
+
+import sys
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+class TypeDescriptor:
+    """Неизменяемое описание типа колонки (создается только через type_descriptor)"""
+
+    __slots__ = ('data_type', 'precision', 'scale', 'max_length')
+
+    def __init__(self, data_type: Optional[str], precision: Optional[int],
+                 scale: Optional[int], max_length: Optional[int]):
+        object.__setattr__(self, 'data_type', data_type)
+        object.__setattr__(self, 'precision', precision)
+        object.__setattr__(self, 'scale', scale)
+        object.__setattr__(self, 'max_length', max_length)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("TypeDescriptor неизменяем: используйте replace()")
+
+    def __reduce__(self):
+        # Восстановление из pickle возвращает экземпляр общей таблицы
+        return type_descriptor, self.key()
+
+    def key(self) -> Tuple[Optional[str], Optional[int], Optional[int], Optional[int]]:
+        return self.data_type, self.precision, self.scale, self.max_length
+
+    def replace(self, **changes) -> 'TypeDescriptor':
+        """Описание с измененными полями (из общей таблицы)"""
+        values = dict(zip(self.__slots__, self.key()))
+        values.update(changes)
+        return type_descriptor(**values)
+
+    def __repr__(self) -> str:
+        return f"TypeDescriptor{self.key()}"
+
+
+_TYPE_DESCRIPTORS: Dict[tuple, TypeDescriptor] = {}
+_type_descriptors_lock = threading.Lock()
+
+
+def intern_name(value: Any) -> Any:
+    """Интернированная строка (прочие значения - без изменений)"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def type_descriptor(data_type: Optional[str], precision: Optional[int] = None,
+                    scale: Optional[int] = None, max_length: Optional[int] = None) -> TypeDescriptor:
+    """Общий экземпляр описания типа"""
+    descriptor = _TYPE_DESCRIPTORS.get((data_type, precision, scale, max_length))
+    if descriptor is None:
+        key = (intern_name(data_type), precision, scale, max_length)
+        with _type_descriptors_lock:
+            descriptor = _TYPE_DESCRIPTORS.setdefault(key, TypeDescriptor(*key))
+    return descriptor
+
+
+def type_descriptor_count() -> int:
+    """Количество различных описаний типов в таблице"""
+    return len(_TYPE_DESCRIPTORS)
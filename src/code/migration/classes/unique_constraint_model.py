@@ -2,20 +2,55 @@
 UniqueConstraintModel - Модель уникального ограничения
 """
 
-from typing import List
+from typing import List, Optional
+
+from src.code.migration.classes.type_descriptor import intern_name
 
 
 class UniqueConstraintModel:
     """Модель уникального ограничения"""
     
+    # Вид ограничения и таблица статусов в mcl
+    constraint_kind = "unique"
+    status_table = "mcl.postgres_unique_constraints"
+    
+    __slots__ = (
+        'id', 'name', 'original_name', 'columns', 'migration_status', 'error_message',
+        'schema_name', 'table_name', 'source_table_name',
+    )
+    
     def __init__(self, name: str):
-        self.name = name
+        self.id: Optional[int] = None
+        self.name = intern_name(name)
+        self.original_name: Optional[str] = None
         self.columns: List[str] = []
+        self.migration_status = "pending"
+        self.error_message: Optional[str] = None
+        
+        # Целевая таблица (PostgreSQL) и исходное имя (MS SQL)
+        self.schema_name = "ags"
+        self.table_name = ""
+        self.source_table_name = ""
     
     def get_ddl_definition(self) -> str:
         """Генерация DDL определения уникального ограничения"""
         return f"ALTER TABLE ... ADD CONSTRAINT {self.name} UNIQUE ({', '.join(self.columns)})"
     
+    def generate_index_sql(self) -> str:
+        """
+        Генерация уникального индекса для ограничения.
+        
+        CONCURRENTLY: индекс строится без блокировки записи, выполняется
+        вне транзакции.
+        """
+        return (f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {self.name} "
+                f"ON {self.schema_name}.{self.table_name} ({', '.join(self.columns)})")
+    
+    def generate_create_sql(self, index_name: Optional[str] = None) -> str:
+        """Генерация ADD CONSTRAINT ... UNIQUE USING INDEX (индекс переименовывается в имя ограничения)"""
+        return (f"ALTER TABLE {self.schema_name}.{self.table_name} ADD CONSTRAINT {self.name} "
+                f"UNIQUE USING INDEX {index_name or self.name}")
+    
     def validate(self) -> bool:
         """Валидация уникального ограничения"""
         return bool(self.name) and len(self.columns) > 0
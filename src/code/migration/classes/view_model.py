@@ -2,9 +2,8 @@
 ViewModel - Модель представления для вычисляемых колонок
 """
 
-from typing import List
+from typing import List, Optional
 from .computed_column_model import ComputedColumnModel
-from .function_mapping_model import FunctionMappingModel
 
 
 class ViewModel:
@@ -18,6 +17,7 @@ class ViewModel:
         self.view_definition = ""
         # Добавляем ссылку на базовую таблицу для доступа к колонкам
         self.base_table_model = None
+        self.config_loader = None
     
     def set_base_table_model(self, base_table_model):
         """Установка ссылки на базовую таблицу"""
@@ -35,6 +35,8 @@ class ViewModel:
         # Создаем ComputedColumnModel для каждой вычисляемой колонки
         from .computed_column_model import ComputedColumnModel
         
+        self.config_loader = config_loader
+        column_map, column_types = self._get_column_context()
         self.computed_columns = []
         for col in computed_columns:
             computed_col = ComputedColumnModel(
@@ -45,7 +47,7 @@ class ViewModel:
             
             # Анализируем состояние функции с проверкой метаданных
             if config_loader:
-                function_state = computed_col.analyze_function_state(config_loader)
+                function_state = computed_col.analyze_function_state(config_loader, column_map, column_types)
                 # function_state автоматически проверит метаданные и создаст правильное состояние
             else:
                 # Без config_loader - устанавливаем базовые значения
@@ -54,6 +56,32 @@ class ViewModel:
             
             self.computed_columns.append(computed_col)
     
+    def _get_column_context(self):
+        """Имена и типы колонок базовой таблицы для перевода выражений"""
+        column_map, column_types = {}, {}
+        for col in self.base_table_model.columns:
+            source_name = (getattr(col, 'source_name', None) or col.name).lower()
+            column_map[source_name] = col.name
+            column_types[source_name] = col.data_type
+        return column_map, column_types
+    
+    def _translate_computed_column(self, col) -> Optional[str]:
+        """PostgreSQL выражение вычисляемой колонки или None"""
+        computed_col = next((c for c in self.computed_columns if c.name == col.name), None)
+        state = computed_col.function_mapping if computed_col else None
+        if state is not None and getattr(state, 'target_expression', None):
+            return state.target_expression
+        
+        source_expression = getattr(col, 'computed_definition', None)
+        if not source_expression:
+            return None
+        
+        from src.code.infrastructure.classes.tsql_expression_translator import get_tsql_translator
+        
+        column_map, column_types = self._get_column_context()
+        result = get_tsql_translator(self.config_loader).translate(source_expression, column_map, column_types)
+        return result.target_expression if result.success else None
+    
     def load_function_mappings(self, config_loader) -> None:
         """Загрузка маппингов функций для всех вычисляемых колонок"""
         # Маппинги уже загружены в load_computed_columns через analyze_function_state
@@ -81,6 +109,12 @@ class ViewModel:
         for col in computed_columns:
             if hasattr(col, 'postgres_computed_definition') and col.postgres_computed_definition:
                 select_parts.append(f'    {col.postgres_computed_definition} AS "{col.name}"')
+                continue
+            
+            # Переводим выражение MS SQL по дереву с правилами маппинга
+            target_expression = self._translate_computed_column(col)
+            if target_expression:
+                select_parts.append(f'    {target_expression} AS "{col.name}"')
             else:
                 # Если определение не замаппировано, используем NULL
                 select_parts.append(f'    NULL AS "{col.name}"')
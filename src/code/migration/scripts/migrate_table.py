@@ -13,45 +13,255 @@ from datetime import datetime
 # Добавляем путь к модулям
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
 
-from src.code.migration.classes.table_migrator import TableMigrator
-from src.code.infrastructure.config.config_loader import ConfigLoader
+# Классы миграции (psycopg2, pyodbc, yaml) импортируются в обработчиках режимов:
+# разбор аргументов и --help не загружают драйверы
 
 
-def main():
-    """Основная функция скрипта"""
+def manage_snapshot(args):
+    """Создание или удаление снимка базы источника на запуск"""
+    from src.code.infrastructure.config.config_loader import ConfigLoader
+    from src.code.migration.classes.table_migrator import TableMigrator
+    from src.code.migration.classes.source_snapshot import SourceSnapshot
+
+    try:
+        config_loader = ConfigLoader()
+        migrator = TableMigrator('', config_loader)
+        mssql_conn = migrator.get_mssql_connection()
+        pg_conn = migrator.get_pg_connection()
+        
+        if args.create_snapshot:
+            snapshot = SourceSnapshot.create(
+                mssql_conn, args.create_snapshot, migrator.mssql_config['database'],
+                config_loader.get_config_value('migration.consistent_read.snapshot_dir') or None
+            )
+            snapshot.save(pg_conn)
+            print(f"📸 Снимок {snapshot.snapshot_database} создан для запуска {snapshot.run_id}")
+            print(f"🔖 Водяные знаки: Change Tracking {snapshot.change_tracking_version}, "
+                  f"rowversion {snapshot.rowversion_watermark}")
+        else:
+            snapshot = SourceSnapshot.load(pg_conn, args.drop_snapshot)
+            if not snapshot:
+                print(f"❌ Снимок запуска {args.drop_snapshot} не найден")
+                sys.exit(1)
+            snapshot.drop(mssql_conn, pg_conn)
+            print(f"🗑️ Снимок {snapshot.snapshot_database} удален")
+    except Exception as e:
+        print(f"💥 Критическая ошибка: {e}")
+        sys.exit(1)
+
+
+def run_constraint_stage(args):
+    """Стадия ограничений после загрузки таблиц"""
+    from src.code.infrastructure.config.config_loader import ConfigLoader
+    from src.code.migration.classes.constraint_stage import ConstraintStage
+
+    try:
+        stage = ConstraintStage.from_config(ConfigLoader())
+        if not stage.enabled:
+            print("ℹ️ Стадия ограничений отключена (migration.constraints.enabled: false)")
+            return
+        summary = stage.run(args.table_name)
+        print(f"🔗 Добавлено ограничений: {summary['added']}, отложено: {summary['deferred']}")
+        print(f"✅ Проверено: {summary['validated']} (уровней зависимостей: {summary['levels']}), "
+              f"ошибок: {summary['failed']}")
+        if summary['failed']:
+            sys.exit(1)
+    except Exception as e:
+        print(f"💥 Критическая ошибка: {e}")
+        sys.exit(1)
+
+
+def run_sequence_resync(args):
+    """Синхронизация последовательностей после загрузки"""
+    from src.code.infrastructure.config.config_loader import ConfigLoader
+    from src.code.migration.classes.table_migrator import TableMigrator
+    from src.code.migration.classes.sequence_resync import SequenceResync
+
+    try:
+        config_loader = ConfigLoader()
+        migrator = TableMigrator(args.table_name or '', config_loader)
+        resync = SequenceResync(
+            migrator.get_pg_connection(),
+            chunk_size=config_loader.get_config_value('migration.sequence_resync.chunk_size', 500)
+        )
+        summary = resync.run([args.table_name] if args.table_name else None)
+        print(f"🔢 Последовательностей: {summary['sequences']}, переведено: {summary['updated']} "
+              f"за {summary['duration']:.2f} с")
+    except Exception as e:
+        print(f"💥 Критическая ошибка: {e}")
+        sys.exit(1)
+
+
+def print_maintenance_report(report):
+    """Итоги обслуживания таблиц"""
+    for entry in report['results']:
+        status = f"❌ {entry['error']}" if entry['error'] else "✅"
+        print(f"   🧹 {entry['operation']} {entry['table']} ({entry['size'] / 1024 / 1024:.1f} МБ): "
+              f"{entry['duration']:.2f} с, в очереди {entry['queued']:.2f} с {status}")
+    print(f"🧹 Обслужено таблиц: {report['tables']}, ошибок: {report['failed']}, "
+          f"самая долгая: {report['max_duration']:.2f} с")
+
+
+def run_maintenance(args):
+    """ANALYZE / VACUUM (FREEZE) таблицы или всех таблиц схемы"""
+    from src.code.infrastructure.config.config_loader import ConfigLoader
+    from src.code.migration.classes.table_migrator import TableMigrator
+    from src.code.migration.classes.table_maintenance import get_maintenance_scheduler, table_size
+
+    try:
+        config_loader = ConfigLoader()
+        migrator = TableMigrator(args.table_name or '', config_loader)
+        pg_conn = migrator.get_pg_connection()
+        scheduler = get_maintenance_scheduler(config_loader)
+        if args.table_name:
+            scheduler.submit(args.table_name, table_size(pg_conn, args.table_name))
+        else:
+            scheduler.submit_schema(pg_conn)
+        pg_conn.commit()
+        report = scheduler.close()
+        print_maintenance_report(report)
+        if report['failed']:
+            sys.exit(1)
+    except Exception as e:
+        print(f"💥 Критическая ошибка: {e}")
+        sys.exit(1)
+
+
+def main(argv=None):
+    """
+    Основная функция скрипта
+
+    Args:
+        argv: Аргументы командной строки (по умолчанию sys.argv[1:])
+    """
     
     # Парсинг аргументов командной строки
     parser = argparse.ArgumentParser(description='FEMCL - Миграция отдельной таблицы')
-    parser.add_argument('table_name', help='Имя таблицы для миграции')
+    parser.add_argument('table_name', nargs='?', help='Имя таблицы для миграции')
     parser.add_argument('--force', action='store_true', help='Принудительное пересоздание таблицы')
     parser.add_argument('--verbose', '-v', action='store_true', help='Подробный вывод')
+    parser.add_argument('--trace-export', metavar='DIR', help='Каталог для экспорта трассировки в OTLP JSON')
+    parser.add_argument('--profile', action='store_true', help='Профилирование миграции (pstats, flamegraph, пик RSS)')
+    parser.add_argument('--profile-dir', metavar='DIR', help='Каталог профилей (по умолчанию reports/profiles)')
+    parser.add_argument('--write-mode', choices=['insert', 'merge'],
+                        help='Режим записи: insert или merge (идемпотентная дозагрузка)')
+    parser.add_argument('--sync', action='store_true', help='Догоняющая синхронизация изменений после первичной загрузки')
+    parser.add_argument('--sync-rounds', type=int, metavar='N', help='Максимум раундов синхронизации')
+    parser.add_argument('--snapshot-run', metavar='RUN_ID', help='Читать источник из снимка базы запуска RUN_ID')
+    parser.add_argument('--create-snapshot', metavar='RUN_ID', help='Создать снимок базы источника для запуска RUN_ID')
+    parser.add_argument('--drop-snapshot', metavar='RUN_ID', help='Удалить снимок базы источника запуска RUN_ID')
+    parser.add_argument('--constraints', action='store_true',
+                        help='Стадия ограничений: добавить отложенные и проверить (VALIDATE) NOT VALID ограничения '
+                             '(без имени таблицы - все таблицы задачи)')
+    parser.add_argument('--resync-sequences', action='store_true',
+                        help='Перевести identity последовательности на максимум данных '
+                             '(без имени таблицы - вся схема ags)')
+    parser.add_argument('--maintenance', action='store_true',
+                        help='ANALYZE (или VACUUM (FREEZE, ANALYZE)) таблицы '
+                             '(без имени таблицы - все таблицы схемы ags по убыванию размера)')
+    parser.add_argument('--compile-plan', action='store_true', help='Только скомпилировать план миграции, без переноса данных')
+    
+    args = parser.parse_args(argv)
     
-    args = parser.parse_args()
+    if args.create_snapshot or args.drop_snapshot:
+        manage_snapshot(args)
+        return
+    if args.constraints:
+        run_constraint_stage(args)
+        return
+    if args.resync_sequences:
+        run_sequence_resync(args)
+        return
+    if args.maintenance:
+        run_maintenance(args)
+        return
+    if not args.table_name:
+        parser.error('требуется имя таблицы')
     
     print(f"🚀 FEMCL - Миграция таблицы: {args.table_name}")
     print(f"📅 Время запуска: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"🔧 Режим: {'Принудительный' if args.force else 'Обычный'}")
     print("-" * 60)
     
+    from src.code.infrastructure.config.config_loader import ConfigLoader
+    from src.code.infrastructure.classes.migration_profiler import MigrationProfiler
+    from src.code.migration.classes.table_migrator import TableMigrator
+    from src.code.migration.classes.table_maintenance import (
+        get_maintenance_scheduler, reset_maintenance_scheduler
+    )
+    from src.code.migration.classes.source_snapshot import SnapshotError, resolve_snapshot_run
+    
     try:
         # Загружаем конфигурацию
         config_loader = ConfigLoader()
         
+        # Снимок базы запуска определяется до начала миграции (режим database)
+        try:
+            snapshot_run = resolve_snapshot_run(config_loader, args.snapshot_run)
+        except SnapshotError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        
         # Создаем мигратор
         migrator = TableMigrator(
             table_name=args.table_name,
             config_loader=config_loader,
             force=args.force,
-            verbose=args.verbose
+            verbose=args.verbose,
+            trace_export_dir=args.trace_export,
+            write_mode=args.write_mode,
+            snapshot_run_id=snapshot_run
         )
         
+        if args.compile_plan:
+            plan = migrator.compile_plan()
+            if not plan:
+                print(f"❌ Не удалось скомпилировать план таблицы {args.table_name}")
+                sys.exit(1)
+            print(f"📦 План: {migrator.plan_cache.path(args.table_name) if migrator.plan_cache else 'кэш отключен'}")
+            print(f"🔑 Хэш метаданных: {plan.metadata_hash or 'N/A'}")
+            print(f"📋 Колонок: {len(plan.target_columns)}, вычисляемые: {'да' if plan.has_computed_columns else 'нет'}")
+            return
+        
+        if args.sync:
+            result = migrator.sync_changes(args.sync_rounds)
+            if not result['success']:
+                print(f"❌ Ошибка синхронизации таблицы {args.table_name}")
+                print(f"🔍 Детали: {result.get('error', 'Неизвестная ошибка')}")
+                sys.exit(1)
+            print(f"✅ Синхронизация таблицы {args.table_name} ({result['mode']}) завершена")
+            print(f"🔁 Раундов: {len(result['rounds'])}, водяной знак: {result['watermark']}")
+            print(f"📊 Обновлено строк: {result['rows_upserted']}, удалено: {result['rows_deleted']}")
+            if result['sequences'] is None:
+                # Без setval первая вставка приложения после переключения нарушит первичный ключ
+                print(f"❌ Последовательности identity не синхронизированы "
+                      f"(повторите: femcl migrate {args.table_name} --resync-sequences)")
+                sys.exit(1)
+            print(f"🔢 Последовательности: переведено {result['sequences']['updated']} "
+                  f"из {result['sequences']['sequences']}")
+            return
+        
         # Выполняем миграцию
-        result = migrator.migrate()
+        if args.profile:
+            with MigrationProfiler(args.table_name, migrator.tracer.run_id, args.profile_dir) as profiler:
+                result = migrator.migrate()
+            print(f"🔬 Профиль: {profiler.artifacts.get('summary', 'не сохранен')}")
+            print(f"🧠 Память: {profiler.describe_memory()}")
+        else:
+            result = migrator.migrate()
         
-        if result['success']:
+        if result.get('skipped'):
+            print(f"⏭️ Таблица {args.table_name} пропущена: источник не изменился (--force для переноса)")
+        elif result['success']:
             print(f"✅ Миграция таблицы {args.table_name} завершена успешно!")
             print(f"⏱️ Время выполнения: {result.get('duration', 'N/A')}")
             print(f"📊 Перенесено строк: {result.get('rows_migrated', 'N/A')}")
+            for phase, stats in result.get('phases', {}).items():
+                print(f"   ⏱️ {phase}: {stats['duration_ms']:.1f} мс")
+            if result.get('maintenance'):
+                # Обслуживание выполнялось в фоне - дожидаемся его до выхода
+                print_maintenance_report(get_maintenance_scheduler().close())
+                reset_maintenance_scheduler()
         else:
             print(f"❌ Ошибка при миграции таблицы {args.table_name}")
             print(f"🔍 Детали: {result.get('error', 'Неизвестная ошибка')}")
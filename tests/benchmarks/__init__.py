@@ -0,0 +1,2 @@
+"""Бенчмарки производительности FEMCL"""
+
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк конвейера переноса данных FEMCL
+
+Генерирует синтетические таблицы заданной ширины, типов и количества
+строк, отдает их через синтетический источник вместо pyodbc и измеряет
+пропускную способность стадий extract, convert, load, index и validate
+на локальном PostgreSQL. Данные переносит TableMigrator.migrate_table_data,
+поэтому бенчмарк измеряет код миграции, а не его копию. Результаты
+сохраняются в JSON для сравнения между коммитами.
+
+Использование:
+    python3 tests/benchmarks/bench_migration.py --pg-dsn "dbname=femcl_bench" --rows 100000 --width 20
+    python3 tests/benchmarks/bench_migration.py --source sqlite --types int,varchar,datetime --adaptive-batch
+    python3 tests/benchmarks/bench_migration.py --compare reports/benchmarks/<baseline>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# Добавляем путь к модулям проекта
+sys.path.insert(0, str(PROJECT_ROOT / "src" / "code"))
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import psycopg2
+
+from src.code.infrastructure.classes.source_reader import PyodbcSourceReader
+from src.code.migration.classes.column_model import ColumnModel
+from src.code.migration.classes.table_migrator import TableMigrator
+from tests.fixtures.synthetic_source import (
+    COLUMN_TYPES, SQLiteSyntheticSource, SyntheticSource, SyntheticTableSpec
+)
+
+
+DEFAULT_OUTPUT_DIR = PROJECT_ROOT / "reports" / "benchmarks"
+# Отдельная схема (migration.target_schema мигратора): таблицы бенчмарка
+# (bench_*) создаются и удаляются только в ней, целевая схема ags не затрагивается
+BENCH_SCHEMA = "bench"
+STAGES = ('extract', 'convert', 'load', 'index', 'validate')
+
+
+class BenchConfig:
+    """Конфигурация TableMigrator для бенчмарка: только параметры переноса, без баз mcl"""
+
+    def __init__(self, values: Dict[str, Any]):
+        self.values = values
+
+    def get_database_config(self, name: str) -> Dict[str, Any]:
+        return {}
+
+    def get_config_value(self, key: str, default: Any = None) -> Any:
+        return self.values.get(key, default)
+
+
+class BenchPlan:
+    """План миграции бенчмарка: приведение значений источника (SQLite хранит decimal/datetime как текст)"""
+
+    def __init__(self, spec: SyntheticTableSpec, source_kind: str):
+        self.converters = build_converters(spec, source_kind)
+
+    def row_converter(self) -> Optional[Callable[[tuple], tuple]]:
+        active = [(i, convert) for i, convert in enumerate(self.converters) if convert]
+        if not active:
+            return None
+
+        def convert_row(row: tuple) -> tuple:
+            values = list(row)
+            for i, convert in active:
+                values[i] = convert(values[i])
+            return tuple(values)
+
+        return convert_row
+
+
+def build_converters(spec: SyntheticTableSpec, source_kind: str) -> List[Optional[Callable[[Any], Any]]]:
+    """
+    Конвертеры значений источника в значения для PostgreSQL.
+
+    SQLite хранит decimal/datetime как текст, а bit как целое.
+    """
+    converters = []
+    for _, column_type in spec.columns:
+        if column_type == 'bit':
+            converters.append(lambda v: None if v is None else bool(v))
+        elif source_kind == 'sqlite' and column_type == 'decimal':
+            converters.append(lambda v: None if v is None else Decimal(v))
+        elif source_kind == 'sqlite' and column_type == 'datetime':
+            converters.append(lambda v: None if v is None else datetime.fromisoformat(v))
+        else:
+            converters.append(None)
+    return converters
+
+
+def get_git_commit() -> Optional[str]:
+    """Текущий коммит репозитория"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_table_benchmark(spec: SyntheticTableSpec, source, source_kind: str,
+                        pg_conn, batch_size: int, adaptive_batch: bool = False) -> Dict[str, Any]:
+    """
+    Бенчмарк одной синтетической таблицы.
+
+    Данные переносит TableMigrator.migrate_table_data: синтетический
+    источник подключается вместо pyodbc (PyodbcSourceReader), PostgreSQL -
+    подключением pg_conn. Измеряется тот же код, что выполняет миграция.
+
+    Returns:
+        Dict: Время и пропускная способность стадий
+    """
+    target_table = f"{BENCH_SCHEMA}.{spec.name}"
+    pg_cursor = pg_conn.cursor()
+    pg_cursor.execute(f"DROP TABLE IF EXISTS {target_table}")
+    pg_cursor.execute(spec.postgres_ddl(BENCH_SCHEMA))
+    pg_conn.commit()
+
+    config = BenchConfig({
+        'migration.target_schema': BENCH_SCHEMA,
+        'migration.batch_size': batch_size,
+        'migration.write_mode': 'insert',
+        'migration.adaptive_batch.enabled': adaptive_batch,
+    })
+    reader = PyodbcSourceReader(connection=source.connect())
+    migrator = TableMigrator(spec.name, config, source_reader=reader)
+    migrator.pg_conn = pg_conn
+    columns = [ColumnModel(name, name, COLUMN_TYPES[column_type][0]) for name, column_type in spec.columns]
+    metadata = {
+        'table_model': SimpleNamespace(columns=columns, partitioning=None),
+        'source_columns': spec.column_names,
+        'target_columns': spec.column_names,
+        'plan': BenchPlan(spec, source_kind),
+    }
+
+    if not migrator.migrate_table_data(metadata):
+        raise RuntimeError(f"Перенос таблицы {spec.name} не выполнен")
+    metrics = migrator.batch_metrics
+    commit_seconds = sum(span.duration_ns for span in migrator.tracer.spans if span.name == 'data.commit') / 1e9
+
+    started = time.perf_counter()
+    pg_cursor.execute(f"CREATE UNIQUE INDEX ix_{spec.name}_id ON {target_table} (id)")
+    pg_conn.commit()
+    index_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    source_count = reader.count_rows(spec.name)
+    pg_cursor.execute(f"SELECT COUNT(*) FROM {target_table}")
+    target_count = pg_cursor.fetchone()[0]
+    validate_seconds = time.perf_counter() - started
+
+    pg_cursor.execute(f"DROP TABLE {target_table}")
+    pg_conn.commit()
+    pg_cursor.close()
+
+    summary = metrics.summary()
+    seconds = {
+        'extract': metrics.stage_total_ns('fetch') / 1e9,
+        'convert': metrics.stage_total_ns('transform') / 1e9,
+        'load': metrics.stage_total_ns('write') / 1e9 + commit_seconds,
+        'index': index_seconds,
+        'validate': validate_seconds
+    }
+    stages = {}
+    for stage, value in seconds.items():
+        stages[stage] = {
+            'seconds': round(value, 4),
+            'rows_per_second': round(summary['rows'] / value, 1) if value > 0 else None,
+            'mb_per_second': round(summary['bytes'] / value / 1024 / 1024, 2)
+                             if value > 0 and stage in ('extract', 'convert', 'load') else None
+        }
+
+    result = {
+        'table': spec.to_dict(),
+        'rows': summary['rows'],
+        'bytes': summary['bytes'],
+        'valid': source_count == target_count,
+        'stages': stages,
+        'batch_metrics': summary
+    }
+    if migrator.batch_sizer:
+        result['batch_sizing'] = migrator.batch_sizer.summary()
+    return result
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Сравнение с базовым результатом.
+
+    Returns:
+        List[str]: Стадии с регрессией пропускной способности больше threshold
+    """
+    regressions = []
+    baseline_tables = {t['table']['name']: t for t in baseline.get('tables', [])}
+    for table in current['tables']:
+        base = baseline_tables.get(table['table']['name'])
+        if not base:
+            continue
+        for stage in STAGES:
+            now_rate = table['stages'][stage]['rows_per_second']
+            base_rate = base['stages'].get(stage, {}).get('rows_per_second')
+            if not now_rate or not base_rate:
+                continue
+            change = (now_rate - base_rate) / base_rate
+            marker = '❌' if change < -threshold else '✅'
+            print(f"   {marker} {table['table']['name']}.{stage}: {base_rate:.0f} → {now_rate:.0f} строк/с ({change:+.1%})")
+            if change < -threshold:
+                regressions.append(f"{table['table']['name']}.{stage}")
+    return regressions
+
+
+def main():
+    """Основная функция бенчмарка"""
+    parser = argparse.ArgumentParser(description='FEMCL - Бенчмарк конвейера переноса данных')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000], help='Количество строк (можно несколько)')
+    parser.add_argument('--width', type=int, nargs='+', default=[10], help='Количество колонок (можно несколько)')
+    parser.add_argument('--types', default='int,varchar,decimal,datetime,bit',
+                        help=f"Типы колонок через запятую: {', '.join(COLUMN_TYPES)}")
+    parser.add_argument('--source', choices=['memory', 'sqlite'], default='memory', help='Синтетический источник')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Размер пакета')
+    parser.add_argument('--adaptive-batch', action='store_true',
+                        help='Адаптивный размер пакета (migration.adaptive_batch)')
+    parser.add_argument('--seed', type=int, default=42, help='Зерно генератора данных')
+    parser.add_argument('--pg-dsn', default=os.environ.get('FEMCL_BENCH_PG_DSN'),
+                        help='DSN тестового PostgreSQL (или FEMCL_BENCH_PG_DSN); обязателен, '
+                             'рабочую базу миграции указывать не следует')
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT_DIR), help='Каталог результатов')
+    parser.add_argument('--compare', metavar='JSON', help='Базовый результат для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Допустимое падение пропускной способности')
+    args = parser.parse_args()
+    if not args.pg_dsn:
+        parser.error(f"укажите --pg-dsn или FEMCL_BENCH_PG_DSN (таблицы создаются в схеме {BENCH_SCHEMA})")
+
+    types = [t.strip() for t in args.types.split(',') if t.strip()]
+    specs = [
+        SyntheticTableSpec(f"bench_w{width}_r{rows}", width=width, row_count=rows,
+                           column_types=types, seed=args.seed)
+        for rows in args.rows for width in args.width
+    ]
+
+    print(f"🚀 FEMCL - Бенчмарк: {len(specs)} таблиц, источник {args.source}, "
+          f"пакет {'адаптивный' if args.adaptive_batch else args.batch_size}")
+
+    started = time.perf_counter()
+    source = SQLiteSyntheticSource(specs) if args.source == 'sqlite' else SyntheticSource(specs)
+    source_setup_seconds = time.perf_counter() - started
+
+    pg_conn = psycopg2.connect(args.pg_dsn)
+    pg_cursor = pg_conn.cursor()
+    pg_cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA}")
+    pg_conn.commit()
+    pg_cursor.close()
+
+    tables = []
+    try:
+        for spec in specs:
+            result = run_table_benchmark(spec, source, args.source, pg_conn, args.batch_size, args.adaptive_batch)
+            tables.append(result)
+            status = '✅' if result['valid'] else '❌'
+            print(f"{status} {spec.name}: {result['rows']} строк, {result['bytes'] / 1024 / 1024:.1f} МБ")
+            for stage in STAGES:
+                stats = result['stages'][stage]
+                rate = f"{stats['rows_per_second']:.0f} строк/с" if stats['rows_per_second'] else '-'
+                print(f"   {stage:<9} {stats['seconds']:>9.3f} с  {rate}")
+    finally:
+        pg_conn.rollback()
+        pg_cursor = pg_conn.cursor()
+        for spec in specs:
+            pg_cursor.execute(f"DROP TABLE IF EXISTS {BENCH_SCHEMA}.{spec.name}")
+        pg_conn.commit()
+        pg_conn.close()
+
+    report = {
+        'created_at': datetime.now().isoformat(),
+        'git_commit': get_git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'source': args.source,
+            'source_setup_seconds': round(source_setup_seconds, 3),
+            'batch_size': args.batch_size,
+            'adaptive_batch': args.adaptive_batch,
+            'types': types,
+            'seed': args.seed
+        },
+        'tables': tables
+    }
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_dir / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{report['git_commit'] or 'nogit'}.json"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    print(f"📄 Результаты: {output_file}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"📊 Сравнение с {args.compare} (коммит {baseline.get('git_commit')}):")
+        regressions = compare_results(report, baseline, args.threshold)
+        if regressions:
+            print(f"❌ Регрессии: {', '.join(regressions)}")
+            sys.exit(1)
+
+    if not all(table['valid'] for table in tables):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
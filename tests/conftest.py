@@ -2,6 +2,9 @@
 Pytest fixtures для тестов FEMCL
 
 Общие фикстуры для всех типов тестов.
+
+ConnectionManager (psycopg2, pyodbc) импортируется внутри фикстур
+подключений: юнит-тесты с fake_connection не требуют драйверов баз данных.
 """
 import pytest
 import sys
@@ -10,7 +13,7 @@ from pathlib import Path
 # Добавляем путь к модулям
 sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "code"))
 
-from infrastructure.classes import ConnectionManager, ConnectionDiagnostics
+from tests.fixtures.fake_db import FakeConnection
 
 
 @pytest.fixture(scope="session")
@@ -25,6 +28,8 @@ def connection_manager():
         def test_something(connection_manager):
             conn = connection_manager.get_postgres_connection()
     """
+    from infrastructure.classes import ConnectionManager
+
     manager = ConnectionManager(task_id=2)
     yield manager
     manager.close_all_connections()
@@ -43,6 +48,8 @@ def fresh_connection_manager():
             # Каждый тест получает новый менеджер
             conn = fresh_connection_manager.get_postgres_connection()
     """
+    from infrastructure.classes import ConnectionManager
+
     manager = ConnectionManager(task_id=2)
     yield manager
     manager.close_all_connections()
@@ -57,6 +64,8 @@ def connection_diagnostics(connection_manager):
         def test_health(connection_diagnostics):
             report = connection_diagnostics.check_postgres_health()
     """
+    from infrastructure.classes import ConnectionDiagnostics
+
     return ConnectionDiagnostics(connection_manager)
 
 
@@ -98,3 +107,16 @@ def mssql_connection(connection_manager):
 def task_id():
     """Fixture для task_id (по умолчанию 2)"""
     return 2
+
+
+@pytest.fixture
+def fake_connection():
+    """
+    Fixture для поддельного подключения DB-API (без базы данных).
+    
+    Example:
+        def test_query(fake_connection):
+            fake_connection.respond('FROM pg_class', [('accnt', 120)])
+            rows = fake_connection.cursor().execute("SELECT ... FROM pg_class").fetchall()
+    """
+    return FakeConnection()
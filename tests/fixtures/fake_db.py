@@ -0,0 +1,166 @@
+"""
+Поддельное подключение DB-API для юнит-тестов.
+
+Заменяет psycopg2 и pyodbc в тестах классов, которым нужен только
+курсор: запросы записываются, ответы задаются правилами.
+
+    respond(pattern, rows)  - строки результата запроса, содержащего pattern
+                              (columns - имена колонок для cursor.description)
+    fail(pattern, error)    - исключение при выполнении такого запроса
+
+pattern - подстрока SQL или функция (sql, params) -> bool; rows -
+список строк или функция (sql, params) -> строки. Правила проверяются
+в порядке добавления, запрос без подходящего правила возвращает пустой
+результат. Ошибка правила fail снимается после срабатывания (times) -
+так задаются повторяемые ошибки (lock_timeout).
+
+Example:
+    >>> connection = FakeConnection()
+    >>> connection.respond('FROM pg_class', [('accnt', 120)])
+    >>> connection.cursor().execute("SELECT relname, reltuples FROM pg_class").fetchall()
+    [('accnt', 120)]
+"""
+
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+Pattern = Union[str, Callable[[str, Any], bool]]
+
+
+class Statement(NamedTuple):
+    """Выполненный запрос и режим autocommit подключения в момент выполнения"""
+    sql: str
+    params: Any
+    autocommit: bool
+
+
+class FakeCursor:
+    """Курсор FakeConnection (подмножество API psycopg2 и pyodbc)"""
+
+    def __init__(self, connection: 'FakeConnection'):
+        self.connection = connection
+        self.description: Optional[Sequence[tuple]] = None
+        self.rowcount = -1
+        self._rows: List[tuple] = []
+
+    def execute(self, sql: str, params: Any = None) -> 'FakeCursor':
+        self.connection.record(sql, params)
+        self._rows, columns = self.connection.result(sql, params)
+        self.description = tuple((name, None) for name in columns) if columns else None
+        self.rowcount = len(self._rows)
+        return self
+
+    def executemany(self, sql: str, rows) -> None:
+        rows = list(rows)
+        self.connection.record(sql, rows)
+        self.connection.batches.append((sql, rows))
+        self.rowcount = len(rows)
+
+    def copy_expert(self, sql: str, file, size: int = 8192) -> None:
+        """COPY FROM STDIN: файл читается частями по size, как в psycopg2"""
+        chunks = []
+        while True:
+            chunk = file.read(size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        data = ''.join(chunks)
+        self.connection.record(sql, data)
+        self.connection.copied.append((sql, data))
+        self.rowcount = data.count('\n')
+
+    def fetchone(self) -> Optional[tuple]:
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size: int = 1) -> List[tuple]:
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self) -> List[tuple]:
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self) -> None:
+        self.connection.cursors_closed += 1
+
+
+class FakeConnection:
+    """
+    Подключение DB-API без базы данных.
+
+    Attributes:
+        executed: Выполненные запросы (Statement)
+        batches: Пакеты executemany (sql, строки)
+        copied: Данные COPY (sql, текст)
+    """
+
+    def __init__(self, autocommit: bool = False):
+        self.autocommit = autocommit
+        self.executed: List[Statement] = []
+        self.batches: List[tuple] = []
+        self.copied: List[tuple] = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.cursors_closed = 0
+        self.closed = False
+        self._rules: List[list] = []
+
+    @staticmethod
+    def _matches(pattern: Pattern, sql: str, params: Any) -> bool:
+        return pattern(sql, params) if callable(pattern) else pattern in sql
+
+    def respond(self, pattern: Pattern, rows: Union[Sequence[tuple], Callable[[str, Any], Any]],
+                columns: Optional[Sequence[str]] = None) -> 'FakeConnection':
+        """Строки результата запросов, подходящих под pattern"""
+        self._rules.append([pattern, rows, None, None, columns])
+        return self
+
+    def fail(self, pattern: Pattern, error: BaseException, times: Optional[int] = None) -> 'FakeConnection':
+        """Исключение при выполнении запросов, подходящих под pattern (times - число срабатываний)"""
+        self._rules.append([pattern, None, error, times, None])
+        return self
+
+    def record(self, sql: str, params: Any) -> None:
+        """Запись запроса; ошибка правила fail выбрасывается до записи"""
+        for rule in self._rules:
+            pattern, _, error, times, _ = rule
+            if error is not None and times != 0 and self._matches(pattern, sql, params):
+                if times is not None:
+                    rule[3] = times - 1
+                raise error
+        self.executed.append(Statement(sql, params, self.autocommit))
+
+    def result(self, sql: str, params: Any) -> Tuple[List[tuple], Optional[Sequence[str]]]:
+        """Строки и колонки результата по первому подходящему правилу respond"""
+        for pattern, rows, error, _, columns in self._rules:
+            if error is None and self._matches(pattern, sql, params):
+                return list(rows(sql, params) if callable(rows) else rows), columns
+        return [], None
+
+    @property
+    def statements(self) -> List[str]:
+        """SQL выполненных запросов"""
+        return [statement.sql for statement in self.executed]
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self)
+
+    def commit(self) -> None:
+        self.commits += 1
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeConnectionManager:
+    """ConnectionManager скриптов с поддельным подключением PostgreSQL"""
+
+    def __init__(self, connection: FakeConnection, task_id: int = 2):
+        self.connection = connection
+        self.task_id = task_id
+
+    def get_postgres_connection(self) -> FakeConnection:
+        return self.connection
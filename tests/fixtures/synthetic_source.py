@@ -0,0 +1,273 @@
+"""
+Синтетический источник данных вместо pyodbc.
+
+Генерирует детерминированные таблицы заданной ширины, набора типов и
+количества строк и отдает их через интерфейс, совместимый с pyodbc
+(connect() -> connection.cursor() -> execute/fetchone/fetchmany/fetchall).
+Позволяет запускать бенчмарки и тесты миграторов без MS SQL Server.
+
+Два режима:
+    SyntheticSource       - строки генерируются лениво в памяти
+    SQLiteSyntheticSource - строки материализуются в SQLite (схема ags)
+"""
+
+import random
+import re
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Поддерживаемые типы: MS SQL тип -> (PostgreSQL тип, SQLite тип)
+COLUMN_TYPES: Dict[str, Tuple[str, str]] = {
+    'int': ('integer', 'INTEGER'),
+    'bigint': ('bigint', 'INTEGER'),
+    'decimal': ('numeric(18,4)', 'TEXT'),
+    'float': ('double precision', 'REAL'),
+    'bit': ('boolean', 'INTEGER'),
+    'varchar': ('varchar(100)', 'TEXT'),
+    'nvarchar_max': ('text', 'TEXT'),
+    'datetime': ('timestamp', 'TEXT'),
+    'uniqueidentifier': ('uuid', 'TEXT'),
+    'varbinary': ('bytea', 'BLOB'),
+}
+
+_BASE_DATE = datetime(2020, 1, 1)
+
+
+def _value_generator(column_type: str, rnd: random.Random, nullable: bool) -> Callable[[int], Any]:
+    """Генератор значений колонки по номеру строки"""
+    if column_type == 'int':
+        make = lambda i: rnd.randint(-2_000_000_000, 2_000_000_000)
+    elif column_type == 'bigint':
+        make = lambda i: rnd.randint(-2 ** 62, 2 ** 62)
+    elif column_type == 'decimal':
+        make = lambda i: Decimal(rnd.randint(-10 ** 12, 10 ** 12)) / Decimal(10000)
+    elif column_type == 'float':
+        make = lambda i: rnd.uniform(-1e6, 1e6)
+    elif column_type == 'bit':
+        make = lambda i: rnd.random() < 0.5
+    elif column_type == 'varchar':
+        make = lambda i: ''.join(rnd.choices('abcdefghijklmnopqrstuvwxyz ', k=rnd.randint(5, 60)))
+    elif column_type == 'nvarchar_max':
+        make = lambda i: 'Текст ' * rnd.randint(10, 200)
+    elif column_type == 'datetime':
+        make = lambda i: _BASE_DATE + timedelta(seconds=rnd.randint(0, 5 * 365 * 86400))
+    elif column_type == 'uniqueidentifier':
+        make = lambda i: str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+    elif column_type == 'varbinary':
+        make = lambda i: rnd.randbytes(rnd.randint(16, 512))
+    else:
+        raise ValueError(f"Неподдерживаемый тип колонки: {column_type}")
+
+    if not nullable:
+        return make
+    return lambda i: None if rnd.random() < 0.05 else make(i)
+
+
+class SyntheticTableSpec:
+    """
+    Описание синтетической таблицы.
+
+    Первая колонка всегда 'id' (int, NOT NULL, возрастающий ключ),
+    остальные колонки циклически берут типы из column_types.
+
+    Example:
+        >>> spec = SyntheticTableSpec('bench', width=10, row_count=100_000,
+        ...                           column_types=['int', 'varchar', 'datetime'])
+    """
+
+    def __init__(self, name: str, width: int = 10, row_count: int = 10_000,
+                 column_types: Optional[Sequence[str]] = None, seed: int = 42):
+        """
+        Инициализация SyntheticTableSpec.
+
+        Args:
+            name: Имя таблицы
+            width: Количество колонок (включая id)
+            row_count: Количество строк
+            column_types: Набор типов колонок (ключи COLUMN_TYPES)
+            seed: Зерно генератора для воспроизводимости
+        """
+        column_types = list(column_types or ['int', 'varchar', 'decimal', 'datetime', 'bit'])
+        for column_type in column_types:
+            if column_type not in COLUMN_TYPES:
+                raise ValueError(f"Неподдерживаемый тип колонки: {column_type}")
+
+        self.name = name
+        self.row_count = row_count
+        self.seed = seed
+        self.columns: List[Tuple[str, str]] = [('id', 'int')]
+        for index in range(1, max(width, 1)):
+            column_type = column_types[(index - 1) % len(column_types)]
+            self.columns.append((f"c{index:03d}_{column_type}", column_type))
+
+    @property
+    def column_names(self) -> List[str]:
+        """Имена колонок"""
+        return [name for name, _ in self.columns]
+
+    def postgres_ddl(self, schema: str) -> str:
+        """DDL целевой таблицы PostgreSQL"""
+        columns_ddl = [
+            f"{name} {COLUMN_TYPES[column_type][0]}{' NOT NULL' if name == 'id' else ''}"
+            for name, column_type in self.columns
+        ]
+        return f"CREATE TABLE {schema}.{self.name} ({', '.join(columns_ddl)})"
+
+    def iter_rows(self) -> Iterator[tuple]:
+        """Детерминированная генерация строк"""
+        rnd = random.Random(self.seed)
+        generators = [_value_generator(column_type, rnd, nullable=True)
+                      for _, column_type in self.columns[1:]]
+        for row_number in range(1, self.row_count + 1):
+            yield (row_number, *[generate(row_number) for generate in generators])
+
+    def to_dict(self) -> dict:
+        """Преобразование в словарь для JSON"""
+        return {
+            'name': self.name,
+            'row_count': self.row_count,
+            'width': len(self.columns),
+            'seed': self.seed,
+            'columns': [{'name': name, 'type': column_type} for name, column_type in self.columns]
+        }
+
+
+_SELECT_RE = re.compile(r"^\s*SELECT\s+(?P<columns>.+?)\s+FROM\s+(?:\[?ags\]?\.)?\[?(?P<table>\w+)\]?\s*$",
+                        re.IGNORECASE | re.DOTALL)
+
+
+class SyntheticCursor:
+    """Курсор синтетического источника (подмножество API pyodbc.Cursor)"""
+
+    def __init__(self, tables: Dict[str, SyntheticTableSpec]):
+        self._tables = tables
+        self._rows: Iterator[tuple] = iter(())
+        self.description = None
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> 'SyntheticCursor':
+        """Выполнение SELECT <колонки>|COUNT(*) FROM ags.<таблица>"""
+        match = _SELECT_RE.match(sql)
+        if not match:
+            raise NotImplementedError(f"Синтетический источник не поддерживает запрос: {sql}")
+
+        spec = self._tables.get(match.group('table').lower())
+        if spec is None:
+            raise LookupError(f"Таблица {match.group('table')} не найдена в синтетическом источнике")
+
+        columns = match.group('columns').strip()
+        if columns.upper() == 'COUNT(*)':
+            self.description = (('count', int),)
+            self._rows = iter([(spec.row_count,)])
+            return self
+
+        if columns == '*':
+            indexes = list(range(len(spec.columns)))
+        else:
+            names = [name.strip().strip('[]"').lower() for name in columns.split(',')]
+            positions = {name.lower(): i for i, name in enumerate(spec.column_names)}
+            indexes = [positions[name] for name in names]
+
+        self.description = tuple((spec.column_names[i], None) for i in indexes)
+        if indexes == list(range(len(spec.columns))):
+            self._rows = spec.iter_rows()
+        else:
+            self._rows = (tuple(row[i] for i in indexes) for row in spec.iter_rows())
+        return self
+
+    def fetchone(self) -> Optional[tuple]:
+        return next(self._rows, None)
+
+    def fetchmany(self, size: int = 1) -> List[tuple]:
+        batch = []
+        for row in self._rows:
+            batch.append(row)
+            if len(batch) >= size:
+                break
+        return batch
+
+    def fetchall(self) -> List[tuple]:
+        return list(self._rows)
+
+    def close(self) -> None:
+        self._rows = iter(())
+
+
+class SyntheticSource:
+    """
+    Источник синтетических таблиц в памяти.
+
+    Строки генерируются лениво, поэтому объем памяти не зависит
+    от количества строк.
+
+    Example:
+        >>> source = SyntheticSource([SyntheticTableSpec('bench', row_count=1000)])
+        >>> cursor = source.connect().cursor()
+        >>> cursor.execute("SELECT id FROM ags.bench").fetchmany(10)
+    """
+
+    def __init__(self, specs: Sequence[SyntheticTableSpec]):
+        self.tables = {spec.name.lower(): spec for spec in specs}
+
+    def connect(self) -> 'SyntheticSource':
+        """Аналог pyodbc.connect(); источник сам играет роль подключения"""
+        return self
+
+    def cursor(self) -> SyntheticCursor:
+        return SyntheticCursor(self.tables)
+
+    def commit(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteSyntheticSource:
+    """
+    Источник синтетических таблиц на SQLite.
+
+    Таблицы материализуются в SQLite базе, подключенной как схема ags,
+    поэтому запросы вида SELECT ... FROM ags.<таблица> выполняются как есть.
+    Подключение sqlite3 поддерживает cursor()/execute/fetchmany как pyodbc.
+    """
+
+    def __init__(self, specs: Sequence[SyntheticTableSpec], database: str = ':memory:'):
+        """
+        Инициализация SQLiteSyntheticSource.
+
+        Args:
+            specs: Описания таблиц
+            database: Файл SQLite для схемы ags (по умолчанию в памяти)
+        """
+        self.specs = list(specs)
+        self.connection = sqlite3.connect(':memory:', detect_types=0)
+        self.connection.execute("ATTACH DATABASE ? AS ags", (database,))
+        for spec in self.specs:
+            self._materialize(spec)
+
+    def _materialize(self, spec: SyntheticTableSpec) -> None:
+        """Создание и заполнение таблицы в SQLite"""
+        columns_ddl = ', '.join(f"{name} {COLUMN_TYPES[column_type][1]}" for name, column_type in spec.columns)
+        self.connection.execute(f"DROP TABLE IF EXISTS ags.{spec.name}")
+        self.connection.execute(f"CREATE TABLE ags.{spec.name} ({columns_ddl})")
+        placeholders = ', '.join(['?'] * len(spec.columns))
+
+        def adapt(row):
+            return tuple(str(value) if isinstance(value, (Decimal, datetime)) else value for value in row)
+
+        self.connection.executemany(
+            f"INSERT INTO ags.{spec.name} VALUES ({placeholders})",
+            (adapt(row) for row in spec.iter_rows())
+        )
+        self.connection.commit()
+
+    def connect(self) -> sqlite3.Connection:
+        """Аналог pyodbc.connect()"""
+        return self.connection
+
+    def close(self) -> None:
+        self.connection.close()
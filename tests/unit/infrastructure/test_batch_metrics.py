@@ -0,0 +1,56 @@
+"""
+Юнит-тесты LatencyHistogram и BatchMetrics
+"""
+import pytest
+
+from infrastructure.classes.batch_metrics import BatchMetrics, LatencyHistogram
+
+
+@pytest.mark.unit
+def test_histogram_percentiles_are_ordered():
+    """Перцентили монотонны и лежат в пределах min/max"""
+    histogram = LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.record(value * 1_000_000)  # 1..1000 мс
+
+    p50, p95, p99 = (histogram.percentile(p) for p in (50, 95, 99))
+    assert histogram.min_ns <= p50 <= p95 <= p99 <= histogram.max_ns
+    # Точность корзин x1.5 - не хуже 50%
+    assert p50 == pytest.approx(500_000_000, rel=0.5)
+    assert p99 == pytest.approx(990_000_000, rel=0.5)
+
+
+@pytest.mark.unit
+def test_histogram_single_value_and_overflow():
+    """Одно значение и значение за последней границей"""
+    histogram = LatencyHistogram(bounds_ns=[10, 100])
+    histogram.record(5000)
+
+    assert histogram.counts[-1] == 1
+    assert histogram.percentile(50) == 5000
+    assert histogram.summary()['count'] == 1
+
+
+@pytest.mark.unit
+def test_empty_histogram_summary():
+    """Сводка пустой гистограммы"""
+    assert LatencyHistogram().summary() == {'count': 0, 'total_ms': 0.0}
+
+
+@pytest.mark.unit
+def test_batch_metrics_summary():
+    """Сводка метрик пакетов таблицы"""
+    metrics = BatchMetrics('accnt')
+    for rows in (1000, 1000, 500):
+        started = metrics.clock()
+        metrics.observe('fetch', started)
+        metrics.add_batch(rows, rows * 10)
+
+    summary = metrics.summary()
+    assert summary['batches'] == 3
+    assert summary['rows'] == 2500
+    assert summary['bytes'] == 25000
+    assert summary['min_batch_rows'] == 500
+    assert summary['max_batch_rows'] == 1000
+    assert summary['stages']['fetch']['count'] == 3
+    assert summary['stages']['write']['count'] == 0
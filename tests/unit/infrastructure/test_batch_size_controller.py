@@ -0,0 +1,68 @@
+"""
+Юнит-тесты BatchSizeController
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from infrastructure.classes.batch_size_controller import (
+    BatchSizeController, LOB_WIDTH_ESTIMATE, estimate_row_width
+)
+
+
+MS = 1_000_000
+
+
+@pytest.mark.unit
+def test_estimate_row_width():
+    """Ширина строки по типам колонок"""
+    narrow = [SimpleNamespace(data_type='integer'), SimpleNamespace(data_type='bigint')]
+    assert estimate_row_width(narrow) == 12
+
+    varchar = [SimpleNamespace(data_type='varchar(100)', data_type_max_length=None)]
+    assert estimate_row_width(varchar) == 50
+
+    lob = [SimpleNamespace(data_type='varchar', data_type_max_length=-1), SimpleNamespace(data_type='bytea')]
+    assert estimate_row_width(lob) == 2 * LOB_WIDTH_ESTIMATE
+
+
+@pytest.mark.unit
+def test_initial_size_depends_on_row_width():
+    """Узкие таблицы получают большие пакеты, таблицы с LOB - маленькие"""
+    narrow = BatchSizeController.for_row_width(12, max_batch_bytes=32 * 1024 * 1024)
+    wide = BatchSizeController.for_row_width(2 * LOB_WIDTH_ESTIMATE, max_batch_bytes=32 * 1024 * 1024)
+
+    assert narrow.size == narrow.max_size
+    # Четверть бюджета (8 МБ) на строку ~32 КБ
+    assert wide.size == 256
+    assert narrow() == narrow.size
+
+
+@pytest.mark.unit
+def test_additive_increase_multiplicative_decrease():
+    controller = BatchSizeController(1000, min_size=100, max_size=5000, target_latency_ms=100,
+                                     max_batch_bytes=10_000_000, increase_step=100)
+
+    assert controller.observe(1000, 50 * MS, 100_000) == 1100
+    assert controller.observe(1100, 50 * MS, 110_000) == 1200
+    # Превышена задержка - уменьшение вдвое
+    assert controller.observe(1200, 300 * MS, 120_000) == 600
+    # Превышен бюджет байт - не больше, чем в него помещается
+    assert controller.observe(600, 50 * MS, 30_000_000) == 200
+    # Неполный пакет не меняет размер
+    assert controller.observe(10, 1 * MS, 1000) == 200
+
+    summary = controller.summary()
+    assert (summary['initial_size'], summary['final_size']) == (1000, 200)
+    assert (summary['increases'], summary['decreases']) == (2, 2)
+    assert [d['reason'] for d in controller.decisions] == ['increase', 'increase', 'latency', 'bytes', 'hold']
+
+
+@pytest.mark.unit
+def test_size_stays_within_bounds():
+    controller = BatchSizeController(150, min_size=100, max_size=200, target_latency_ms=10, increase_step=100)
+
+    assert controller.observe(150, 1 * MS, 100) == 200
+    assert controller.observe(200, 1 * MS, 100) == 200
+    assert controller.observe(200, 100 * MS, 100) == 100
+    assert controller.observe(100, 100 * MS, 100) == 100
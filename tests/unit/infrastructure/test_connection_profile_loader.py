@@ -0,0 +1,93 @@
+"""
+Юнит-тесты общего кэша профилей подключений
+"""
+import json
+import os
+
+import pytest
+
+from infrastructure.classes.connection_profile_loader import (
+    ConnectionProfileLoader, ConnectionProfileStore
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def profile(profile_id, task_id):
+    endpoint = {'type': 'postgresql', 'host': 'localhost', 'database': 'fish_eye',
+                'user': 'postgres', 'password': 'secret', 'port': 5432}
+    return {'profile_id': profile_id, 'name': profile_id, 'task_id': task_id,
+            'source': dict(endpoint, type='mssql'), 'target': endpoint}
+
+
+def write_profiles(path, profiles, mtime_ns):
+    path.write_text(json.dumps({'default_profile': profiles[0]['profile_id'], 'profiles': profiles}),
+                    encoding='utf-8')
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def connections(tmp_path):
+    path = tmp_path / 'connections.json'
+    write_profiles(path, [profile('default', 2)], 1_000_000_000)
+    return path
+
+
+@pytest.mark.unit
+def test_store_shared_and_reloaded_on_mtime_change(connections):
+    clock = FakeClock()
+    store = ConnectionProfileStore(connections, clock=clock)
+    first = ConnectionProfileLoader(store=store)
+    second = ConnectionProfileLoader(store=store)
+
+    assert first.get_profile_by_task_id(2)['name'] == 'default'
+    assert second.load_profile('default')['target']['port'] == 5432
+    assert store.loads == 1
+
+    # Изменения профиля вызывающим кодом не попадают в кэш
+    first.load_profile('default')['target']['port'] = 6432
+    assert second.load_profile('default')['target']['port'] == 5432
+
+    write_profiles(connections, [profile('default', 2), profile('reporting', 3)], 2_000_000_000)
+    assert second.get_profile_by_task_id(3) is None          # до CHECK_INTERVAL файл не проверяется
+    clock.now += ConnectionProfileStore.CHECK_INTERVAL
+    assert second.get_profile_by_task_id(3)['profile_id'] == 'reporting'
+    clock.now += ConnectionProfileStore.CHECK_INTERVAL
+    second.list_profiles()
+    assert store.loads == 2
+
+
+@pytest.mark.unit
+def test_last_used_kept_in_memory_and_flushed_atomically(connections):
+    clock = FakeClock()
+    store = ConnectionProfileStore(connections, clock=clock)
+    loader = ConnectionProfileLoader(store=store)
+    original = connections.read_text(encoding='utf-8')
+
+    loader.load_profile('default')
+    assert connections.read_text(encoding='utf-8') == original
+    assert loader.list_profiles()[0]['last_used'] is not None
+
+    # Другой процесс добавил профиль: запись last_used его не затирает
+    write_profiles(connections, [profile('default', 2), profile('reporting', 3)], 3_000_000_000)
+    assert loader.flush()
+    saved = json.loads(connections.read_text(encoding='utf-8'))
+    assert [p['profile_id'] for p in saved['profiles']] == ['default', 'reporting']
+    assert saved['profiles'][0]['last_used'] == loader.list_profiles()[0]['last_used']
+    assert 'last_used' not in saved['profiles'][1]
+    assert sorted(os.listdir(connections.parent)) == ['connections.json']
+    assert not loader.flush()
+
+    # Запись из touch - не чаще FLUSH_INTERVAL
+    loader.load_profile('reporting')
+    assert store.flushes == 1
+    clock.now += ConnectionProfileStore.FLUSH_INTERVAL
+    loader.load_profile('reporting')
+    assert store.flushes == 2
+    assert store.loads == 2
@@ -0,0 +1,74 @@
+"""
+Юнит-тесты FunctionMappingRuleCache
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from infrastructure.classes.function_mapping_cache import FunctionMappingRuleCache
+
+
+def rules_database(connection, rows):
+    """Таблица правил на поддельном подключении: db.rows и db.updated_at меняются тестом"""
+    db = SimpleNamespace(rows=rows, updated_at=datetime(2025, 1, 1), connections=0)
+    connection.respond('max(updated_at)', lambda sql, params: [(db.updated_at, len(db.rows))])
+    connection.respond('', lambda sql, params: db.rows)
+
+    def connect():
+        db.connections += 1
+        return connection
+
+    db.connect = connect
+    return db
+
+
+RULES = [
+    (1, 'getdate', 'now', '', '', 'direct', True, datetime(2025, 1, 1)),
+    (2, 'isnull', 'coalesce', r'isnull\s*\(', 'coalesce(', 'regex', True, datetime(2025, 1, 1)),
+]
+
+
+@pytest.mark.unit
+def test_rules_loaded_once_and_patterns_precompiled(fake_connection):
+    """Одно подключение на все обращения в пределах интервала проверки"""
+    db = rules_database(fake_connection, RULES)
+    cache = FunctionMappingRuleCache(db.connect, check_interval=3600)
+
+    for _ in range(1000):
+        rule = cache.get_rule('ISNULL')
+
+    assert db.connections == 1
+    assert rule.compiled_pattern is not None
+    assert cache.get_rule('getdate').compiled_pattern is None
+    assert cache.get_rule('unknown') is None
+    assert cache.apply('ISNULL([a], 0)', rule) == 'coalesce([a], 0)'
+
+
+@pytest.mark.unit
+def test_translations_are_memoized():
+    cache = FunctionMappingRuleCache()
+    cache.load_rules(RULES)
+    rule = cache.get_rule('isnull')
+
+    first = cache.apply('isnull(x, 1)', rule)
+    rule.compiled_pattern = None
+    rule.mapping_pattern = 'never-matches'
+    assert cache.apply('isnull(x, 1)', rule) == first
+    assert cache.stats()['translations'] == 1
+
+
+@pytest.mark.unit
+def test_watermark_change_reloads_rules(fake_connection):
+    db = rules_database(fake_connection, RULES[:1])
+    cache = FunctionMappingRuleCache(db.connect, check_interval=0)
+    assert cache.get_rule('isnull') is None
+
+    db.rows = RULES
+    db.updated_at = datetime(2025, 2, 1)
+    assert cache.get_rule('isnull') is not None
+    assert cache.loads == 2
+
+    # Водяной знак не изменился - правила не перечитываются
+    cache.get_rule('isnull')
+    assert cache.loads == 2
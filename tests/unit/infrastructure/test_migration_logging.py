@@ -0,0 +1,130 @@
+"""
+Юнит-тесты журналирования через очередь
+"""
+import json
+import logging
+import queue
+import threading
+
+import pytest
+
+from infrastructure.classes.migration_logging import (
+    LoggingPipeline, NonBlockingQueueHandler, RateLimitFilter
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_record(name='femcl.test', level=logging.INFO, msg='step'):
+    return logging.LogRecord(name, level, __file__, 1, msg, (), None)
+
+
+@pytest.mark.unit
+def test_pipeline_writes_json_lines_from_worker_threads(tmp_path):
+    capture = ListHandler()
+    log_file = tmp_path / 'logs' / 'coordinator.jsonl'
+    pipeline = LoggingPipeline(log_file, console=False, rate=0, handlers=[capture])
+    logger = logging.getLogger('femcl.test.pipeline')
+    logger.propagate = False
+    pipeline.start(logger)
+
+    def worker(table_name):
+        logger.info("Таблица %s перенесена", table_name, extra={'table_name': table_name, 'rows': 10})
+
+    threads = [threading.Thread(target=worker, args=(f"t{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        raise ValueError("broken batch")
+    except ValueError:
+        logger.exception("Ошибка пакета")
+    pipeline.stop(logger)
+
+    lines = [json.loads(line) for line in log_file.read_text(encoding='utf-8').splitlines()]
+    assert len(lines) == 5 and len(capture.records) == 5
+    assert sorted(line['table_name'] for line in lines[:4]) == ['t0', 't1', 't2', 't3']
+    assert lines[0]['rows'] == 10 and lines[0]['logger'] == 'femcl.test.pipeline'
+    assert lines[0]['message'].startswith("Таблица t")
+    assert lines[-1]['level'] == 'ERROR' and 'ValueError: broken batch' in lines[-1]['exc_info']
+    assert not logger.handlers
+
+
+@pytest.mark.unit
+def test_rate_limit_per_module():
+    now = [0.0]
+    limiter = RateLimitFilter(rate=1, burst=2, module_rates={'femcl.fast': 0}, clock=lambda: now[0])
+
+    assert [limiter.filter(make_record()) for _ in range(4)] == [True, True, False, False]
+    assert limiter.filter(make_record(level=logging.WARNING))
+    assert all(limiter.filter(make_record('femcl.fast')) for _ in range(10))
+    assert limiter.filter(make_record('femcl.other'))
+
+    now[0] = 1.0
+    record = make_record()
+    assert limiter.filter(record) and record.suppressed == 2
+    assert limiter.suppressed == 2
+
+
+@pytest.mark.unit
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    for i in range(3):
+        handler.handle(make_record(msg=f"step {i}"))
+
+    assert handler.dropped == 2
+    assert handler.queue.get_nowait().getMessage() == "step 0"
+
+
+@pytest.mark.unit
+def test_full_queue_blocks_errors_until_consumed():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    handler.handle(make_record(msg="step"))
+    consumer = threading.Timer(0.05, handler.queue.get_nowait)
+    consumer.start()
+    handler.handle(make_record(level=logging.ERROR, msg="broken batch"))
+    consumer.join()
+
+    assert handler.dropped == 0
+    assert handler.queue.get_nowait().getMessage() == "broken batch"
+
+
+@pytest.mark.unit
+def test_stop_reports_dropped_records_with_full_queue():
+    """Очередь полна при остановке: отчет и метка конца ждут места, а не падают с queue.Full"""
+    release = threading.Event()
+
+    class SlowHandler(ListHandler):
+        def emit(self, record):
+            release.wait()
+            super().emit(record)
+
+    consumer = SlowHandler()
+    pipeline = LoggingPipeline(console=False, rate=0, queue_size=1, handlers=[consumer])
+    logger = logging.getLogger('femcl.test.dropped')
+    logger.propagate = False
+    pipeline.start(logger)
+    logger.info("step 0")
+    while not pipeline.queue.empty():
+        pass
+    for i in range(1, 4):
+        logger.info(f"step {i}")
+    assert pipeline.queue.full() and pipeline.handler.dropped == 2
+
+    threading.Timer(0.05, release.set).start()
+    pipeline.stop(logger)
+
+    report = consumer.records[-1]
+    assert [r.getMessage() for r in consumer.records[:-1]] == ["step 0", "step 1"]
+    assert report.levelno == logging.WARNING
+    assert report.getMessage() == ("Журнал: отброшено записей (очередь переполнена): 2, "
+                                   "подавлено ограничением частоты: 0")
+    assert (report.dropped, report.suppressed) == (2, 0)
@@ -0,0 +1,57 @@
+"""
+Юнит-тесты MigrationProfiler
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from infrastructure.classes.migration_profiler import MigrationProfiler, StackSampler, get_current_rss_kb
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+@pytest.mark.unit
+def test_profiler_saves_artifacts(tmp_path):
+    with MigrationProfiler('accnt', 'run1', str(tmp_path), sample_interval=0.001) as profiler:
+        busy_loop(0.05)
+
+    summary = json.loads((tmp_path / 'run1' / 'accnt.json').read_text(encoding='utf-8'))
+    assert set(profiler.artifacts) == {'pstats', 'collapsed', 'summary'}
+    assert summary['table_name'] == 'accnt' and summary['duration_seconds'] > 0
+    assert any('busy_loop' in entry['function'] for entry in summary['top_functions'])
+    assert 'busy_loop' in (tmp_path / 'run1' / 'accnt.collapsed').read_text(encoding='utf-8')
+    assert summary['process_peak_rss_kb'] > 0
+    if get_current_rss_kb() is not None:
+        assert summary['peak_rss_kb'] >= summary['rss_kb_before']
+        assert summary['peak_rss_growth_kb'] == summary['peak_rss_kb'] - summary['rss_kb_before']
+        assert profiler.describe_memory().startswith('пик RSS за таблицу')
+
+
+@pytest.mark.unit
+def test_sampler_profiles_only_target_thread():
+    """Стеки других потоков в профиль не попадают"""
+    worker = threading.Thread(target=busy_loop, args=(0.1,))
+    sampler = StackSampler(threading.get_ident(), interval=0.001)
+    sampler.start()
+    worker.start()
+    time.sleep(0.05)
+    worker.join()
+    sampler.stop()
+
+    assert sampler.samples > 0
+    assert not any('busy_loop' in stack for stack in sampler.stacks)
+    assert sampler.to_collapsed().endswith('\n')
+
+
+@pytest.mark.unit
+def test_memory_description_without_current_rss():
+    profiler = MigrationProfiler('accnt', 'run1')
+    profiler.process_peak_rss_kb = 2048
+    assert profiler.peak_rss_growth_kb is None
+    assert profiler.describe_memory() == 'пик процесса 2.0 МБ'
@@ -0,0 +1,71 @@
+"""
+Юнит-тесты MigrationTracer
+"""
+import json
+
+import pytest
+
+from infrastructure.classes.migration_tracer import MigrationTracer, estimate_payload_bytes
+
+
+@pytest.mark.unit
+def test_nested_spans_have_parent():
+    """Вложенные спаны ссылаются на родительский спан"""
+    tracer = MigrationTracer('accnt', run_id='run1')
+    with tracer.span('table.migrate') as root:
+        with tracer.span('data.migrate') as child:
+            child.set_counts(rows=10, bytes=100)
+
+    assert child.parent_span_id == root.span_id
+    assert root.parent_span_id is None
+    assert [span.name for span in tracer.spans] == ['data.migrate', 'table.migrate']
+
+
+@pytest.mark.unit
+def test_span_records_error_status():
+    """Исключение внутри спана помечает его как ошибочный"""
+    tracer = MigrationTracer('accnt')
+    with pytest.raises(RuntimeError):
+        with tracer.span('table.ddl'):
+            raise RuntimeError('boom')
+
+    assert tracer.spans[0].status == 'error'
+    assert tracer.spans[0].error_message == 'boom'
+
+
+@pytest.mark.unit
+def test_record_span_and_phase_summary():
+    """Агрегированные подфазы попадают в сводку по фазам"""
+    tracer = MigrationTracer('accnt')
+    with tracer.span('data.migrate'):
+        tracer.record_span('data.fetch', 2_000_000, rows=5, bytes=40)
+        tracer.record_span('data.fetch', 3_000_000, rows=5, bytes=40)
+
+    summary = tracer.get_phase_summary()
+    assert summary['data.fetch']['duration_ms'] == pytest.approx(5.0)
+    assert summary['data.fetch']['rows'] == 10
+    assert summary['data.fetch']['bytes'] == 80
+
+
+@pytest.mark.unit
+def test_export_otlp_json(tmp_path):
+    """Экспорт трассировки в OTLP JSON"""
+    tracer = MigrationTracer('accnt', run_id='run1')
+    with tracer.span('table.migrate'):
+        with tracer.span('validate'):
+            pass
+
+    file_path = tracer.export_otlp_json(str(tmp_path))
+    with open(file_path, encoding='utf-8') as f:
+        document = json.load(f)
+
+    spans = document['resourceSpans'][0]['scopeSpans'][0]['spans']
+    assert len(spans) == 2
+    assert all(len(span['traceId']) == 32 and len(span['spanId']) == 16 for span in spans)
+    assert spans[0]['parentSpanId'] == spans[1]['spanId']
+
+
+@pytest.mark.unit
+def test_estimate_payload_bytes():
+    """Оценка объема пакета строк"""
+    assert estimate_payload_bytes([('abc', None, 1), (b'xy', 2.5, None)]) == 3 + 8 + 2 + 8
@@ -0,0 +1,70 @@
+"""
+Юнит-тесты SourceReader: pyodbc-совместимый источник и файлы bcp
+"""
+import json
+
+import pytest
+
+from infrastructure.classes.source_reader import (
+    PyodbcSourceReader, SourceReader, create_source_reader
+)
+from tests.fixtures.synthetic_source import SQLiteSyntheticSource, SyntheticTableSpec
+
+
+@pytest.fixture
+def sqlite_reader():
+    spec = SyntheticTableSpec('bench', width=4, row_count=250, column_types=['int', 'varchar'])
+    source = SQLiteSyntheticSource([spec])
+    reader = PyodbcSourceReader(source.connect())
+    yield reader
+    source.close()
+
+
+@pytest.mark.unit
+def test_pyodbc_reader_projection_and_batches(sqlite_reader):
+    """Проекция колонок и разбиение на пакеты"""
+    batches = list(sqlite_reader.read_batches('bench', columns=['id', 'c001_int'], batch_size=100))
+
+    assert [len(batch) for batch in batches] == [100, 100, 50]
+    assert batches[0].columns == ['id', 'c001_int']
+    assert all(len(row) == 2 for batch in batches for row in batch)
+
+
+@pytest.mark.unit
+def test_pyodbc_reader_key_range_pushdown(sqlite_reader):
+    """Диапазон ключа [low, high) передается в WHERE"""
+    rows = [row for batch in sqlite_reader.read_batches(
+        'bench', columns=['id'], key_column='id', key_range=(10, 20)
+    ) for row in batch]
+
+    assert [row[0] for row in rows] == list(range(10, 20))
+    assert sqlite_reader.count_rows('bench') == 250
+    assert sqlite_reader.count_rows('bench', key_column='id', key_range=(None, 51)) == 50
+
+
+@pytest.mark.unit
+def test_bcp_reader_types_nulls_and_range(tmp_path):
+    """Файл bcp -c: типизация, NULL и фильтр по ключу"""
+    columns = [{'name': 'id', 'type': 'int'}, {'name': 'name', 'type': 'nvarchar'},
+               {'name': 'amount', 'type': 'decimal'}]
+    (tmp_path / 'ags.accnt.columns.json').write_text(json.dumps(columns), encoding='utf-8')
+    (tmp_path / 'ags.accnt.dat').write_text(
+        "1\tСчет\t10.50\n2\t\t\n3\tКасса\t7\n", encoding='utf-8'
+    )
+
+    reader = create_source_reader('bcp', directory=str(tmp_path))
+    assert isinstance(reader, SourceReader)
+    assert reader.table_exists('accnt')
+    assert not reader.table_exists('missing')
+    assert reader.count_rows('accnt') == 3
+
+    rows = [row for batch in reader.read_batches('accnt', columns=['amount', 'id'],
+                                                  key_column='id', key_range=(2, None)) for row in batch]
+    assert rows[0] == (None, 2)
+    assert str(rows[1][0]) == '7' and rows[1][1] == 3
+
+
+@pytest.mark.unit
+def test_create_source_reader_unknown_kind():
+    with pytest.raises(ValueError):
+        create_source_reader('oracle')
@@ -0,0 +1,127 @@
+"""
+Юнит-тесты SourceGovernor
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from infrastructure.classes.source_throttle import SourceGovernor, SourcePressureMonitor, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def pressure_source(connection):
+    """Ожидания и запросы источника на поддельном подключении: значения меняются тестом"""
+    stats = SimpleNamespace(wait_ms=0, active=0, blocked=0)
+    connection.respond('dm_os_wait_stats', lambda sql, params: [(stats.wait_ms,)])
+    connection.respond('', lambda sql, params: [(stats.active, stats.blocked)])
+    return stats
+
+
+@pytest.mark.unit
+def test_token_bucket_waits_for_deficit():
+    clock = FakeClock()
+    bucket = TokenBucket(100, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire(100) == 0.0
+    # Долг 50 единиц при 100/с - полсекунды
+    assert bucket.acquire(50) == pytest.approx(0.5)
+    clock.now += 1.0
+    assert bucket.acquire(100) == 0.0
+    assert bucket.waited == pytest.approx(0.5)
+
+    unlimited = TokenBucket(0, clock=clock, sleep=clock.sleep)
+    assert unlimited.acquire(10 ** 9) == 0.0
+
+
+@pytest.mark.unit
+def test_monitor_detects_wait_growth_and_blocking(fake_connection):
+    clock = FakeClock()
+    source = pressure_source(fake_connection)
+    monitor = SourcePressureMonitor(lambda: fake_connection, max_wait_ms_per_sec=1000, clock=clock)
+
+    source.wait_ms = 50_000
+    assert monitor.sample() is None  # первый снимок - только база
+
+    clock.now += 10
+    source.wait_ms = 55_000
+    assert monitor.sample() is False  # 500 мс/с
+
+    clock.now += 10
+    source.wait_ms = 80_000
+    assert monitor.sample() is True  # 2500 мс/с
+
+    clock.now += 10
+    source.blocked = 3
+    assert monitor.sample() is True
+    assert monitor.last_sample['blocked_requests'] == 3
+
+
+@pytest.mark.unit
+def test_monitor_disables_itself_without_permission(fake_connection):
+    fake_connection.fail('', RuntimeError('VIEW SERVER STATE permission was denied'))
+    monitor = SourcePressureMonitor(lambda: fake_connection)
+
+    assert monitor.sample() is None
+    assert not monitor.available and fake_connection.closed
+    assert monitor.sample() is None
+
+
+@pytest.mark.unit
+def test_governor_backs_off_and_recovers():
+    clock = FakeClock()
+    governor = SourceGovernor(rows_per_second=1000, bytes_per_second=0, max_readers=4,
+                              min_factor=0.1, clock=clock, sleep=clock.sleep)
+
+    governor.adjust(True)
+    assert (governor.factor, governor.readers_limit) == (0.5, 2)
+    assert governor.rows_bucket.rate == 500
+    governor.adjust(True)
+    governor.adjust(True)
+    governor.adjust(True)
+    assert governor.factor == 0.1 and governor.readers_limit == 1
+
+    for _ in range(20):
+        governor.adjust(False)
+    assert (governor.factor, governor.readers_limit) == (1.0, 4)
+    assert governor.rows_bucket.rate == 1000
+    assert governor.summary()['adjustments'] == 13
+
+
+@pytest.mark.unit
+def test_governor_samples_at_interval(fake_connection):
+    clock = FakeClock()
+    source = pressure_source(fake_connection)
+    monitor = SourcePressureMonitor(lambda: fake_connection, max_wait_ms_per_sec=100, clock=clock)
+    governor = SourceGovernor(rows_per_second=0, monitor=monitor, sample_interval=5,
+                              clock=clock, sleep=clock.sleep)
+
+    clock.now += 5
+    governor.throttle(100)  # база
+    source.wait_ms = 10_000
+    clock.now += 1
+    governor.throttle(100)  # до интервала - без опроса
+    assert governor.factor == 1.0
+    clock.now += 5
+    governor.throttle(100)
+    assert governor.factor == 0.5
+
+
+@pytest.mark.unit
+def test_reader_slot_limits_concurrency():
+    governor = SourceGovernor(max_readers=2)
+    with governor.reader_slot():
+        with governor.reader_slot():
+            assert governor.active_readers == 2
+    assert governor.active_readers == 0
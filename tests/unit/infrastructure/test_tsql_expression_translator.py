@@ -0,0 +1,100 @@
+"""
+Юнит-тесты TSqlExpressionTranslator
+"""
+import pytest
+
+from infrastructure.classes.function_mapping_cache import FunctionMappingRuleCache
+from infrastructure.classes.tsql_expression_translator import (
+    TSqlExpressionTranslator, collect_functions, parse_expression
+)
+
+
+RULES = [
+    (1, 'isnull', 'coalesce', r'isnull\s*\(', 'coalesce(', 'regex', True, None),
+    (2, 'getdate', 'CURRENT_TIMESTAMP', '', '', 'direct', True, None),
+    (3, 'len', 'length', '', '', 'direct', True, None),
+]
+
+
+@pytest.fixture
+def translator():
+    TSqlExpressionTranslator.clear_cache()
+    cache = FunctionMappingRuleCache()
+    cache.load_rules(RULES)
+    return TSqlExpressionTranslator(cache)
+
+
+@pytest.mark.unit
+def test_nested_calls_and_column_map(translator):
+    """Правила применяются к вложенным вызовам, колонки переименовываются"""
+    result = translator.translate("ISNULL(len([Name]), 0) * [Qty]",
+                                  column_map={'name': 'name', 'qty': 'quantity'})
+
+    assert result.success
+    assert result.target_expression == 'coalesce(length("name"), 0) * "quantity"'
+    assert result.functions == ['isnull', 'len']
+
+
+@pytest.mark.unit
+def test_case_convert_and_string_concat(translator):
+    result = translator.translate(
+        "CASE WHEN [Code] IS NULL THEN N'-' ELSE [Code] + '/' + CONVERT(varchar(10), [Num]) END",
+        column_types={'code': 'nvarchar'}
+    )
+
+    assert result.success
+    assert result.target_expression == (
+        "CASE WHEN code IS NULL THEN '-' ELSE (code || '/') || CAST(num AS varchar(10)) END"
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('expression, expected', [
+    ("[a] & [b] + 1", "(a & b) + 1"),
+    ("[a] + [b] & 1", "(a + b) & 1"),
+    ("[a] & [b] * 2", "a & (b * 2)"),
+    ("[a] * 2 | [b]", "(a * 2) | b"),
+    ("[a] ^ [b] - 1", "(a # b) - 1"),
+    ("[a] | [b] & 4", "a | b & 4"),
+])
+def test_bitwise_and_arithmetic_precedence(translator, expression, expected):
+    """&, |, ^ в T-SQL на уровне + и -, в PostgreSQL ниже: порядок фиксируется скобками"""
+    result = translator.translate(expression)
+
+    assert result.success
+    assert result.target_expression == expected
+
+
+@pytest.mark.unit
+def test_unmapped_function_is_reported(translator):
+    result = translator.translate("isnull(SOUNDEX([a]), getdate())")
+
+    assert not result.success
+    assert result.unmapped_functions == ['soundex']
+
+
+@pytest.mark.unit
+def test_parse_error_does_not_raise(translator):
+    result = translator.translate("[a] +")
+
+    assert result.target_expression is None
+    assert not result.success
+    assert result.notes
+
+
+@pytest.mark.unit
+def test_same_expression_translated_once(translator):
+    """Одинаковые выражения разных таблиц переводятся один раз"""
+    first = translator.translate("isnull([Amount],0)", column_map={'amount': 'amount'})
+    second = translator.translate("ISNULL( [amount] , 0 )", column_map={'amount': 'sum_amount'})
+
+    assert TSqlExpressionTranslator.cache_size() == 1
+    assert first.target_expression == 'coalesce("amount", 0)'
+    assert second.target_expression == 'coalesce("sum_amount", 0)'
+
+
+@pytest.mark.unit
+def test_collect_functions_includes_nested():
+    tree = parse_expression("dateadd(day, 1, CAST(isnull([d], getdate()) AS date))")
+
+    assert collect_functions(tree) == ['dateadd', 'cast', 'isnull', 'getdate']
@@ -0,0 +1,38 @@
+"""
+Юнит-тесты Analyzer
+"""
+from datetime import datetime
+
+import pytest
+
+from metadata.classes import analyzer as analyzer_module
+from metadata.classes.analyzer import Analyzer, detect_changes
+
+
+@pytest.mark.unit
+def test_detect_changes():
+    day1, day2 = datetime(2025, 1, 1), datetime(2025, 1, 2)
+    current = {('dbo', 'a'): (1, day1), ('dbo', 'b'): (2, day2), ('dbo', 'c'): (30, day1), ('dbo', 'new'): (4, day1)}
+    stored = {('dbo', 'a'): (1, day1), ('dbo', 'b'): (2, day1), ('dbo', 'c'): (3, day1), ('dbo', 'old'): (5, day1)}
+
+    changes = detect_changes(current, stored)
+
+    assert changes.new == [('dbo', 'new')]
+    assert changes.changed == [('dbo', 'b'), ('dbo', 'c')]
+    assert changes.dropped == [('dbo', 'old')]
+    assert changes.unchanged == 1
+    assert changes.harvest_object_ids() == [2, 4, 30]
+
+
+@pytest.mark.unit
+def test_scan_limited_to_changed_objects(monkeypatch, fake_connection):
+    """Только измененные таблицы, идентификаторы порциями"""
+    monkeypatch.setattr(analyzer_module, 'OBJECT_ID_CHUNK', 2)
+    conn = fake_connection.respond('', [('dbo', 't', 1)], columns=['schema_name', 'table_name', 'object_id'])
+
+    snapshot = Analyzer(lambda: conn).scan_database([3, 1, 2])
+
+    tables_queries = [q for q in conn.statements if 'sys.partitions' in q]
+    assert [q[q.rindex('IN ('):] for q in tables_queries] == ['IN (1, 2)', 'IN (3)']
+    assert len(snapshot.entities['tables']) == 2
+    assert Analyzer(lambda: conn).scan_database([]).counts()['tables'] == 0
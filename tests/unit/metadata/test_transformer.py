@@ -0,0 +1,116 @@
+"""
+Юнит-тесты Transformer
+"""
+from datetime import datetime
+
+import pytest
+
+from infrastructure.classes.function_mapping_cache import FunctionMappingRuleCache
+from infrastructure.classes.tsql_expression_translator import TSqlExpressionTranslator
+from metadata.classes.analyzer import CatalogSnapshot
+from metadata.classes.transformer import (
+    Transformer, map_column_type, normalize_foreign_key_name, normalize_index_name,
+    strip_outer_parentheses, to_snake_case
+)
+
+
+def column(name, type_name, position, max_length=4, precision=10, scale=0, **extra):
+    row = {
+        'schema_name': 'dbo', 'table_name': 'cnInvoice', 'column_name': name,
+        'ordinal_position': position, 'type_name': type_name, 'max_length': max_length,
+        'precision': precision, 'scale': scale, 'is_nullable': True, 'is_identity': False,
+        'identity_seed': None, 'identity_increment': None, 'is_computed': False,
+        'computed_definition': None, 'is_persisted': False, 'default_name': None,
+        'default_definition': None, 'default_is_system_named': False, 'collation_name': None,
+    }
+    row.update(extra)
+    return row
+
+
+@pytest.fixture
+def snapshot():
+    return CatalogSnapshot({
+        'tables': [{'schema_name': 'dbo', 'table_name': 'cnInvoice', 'object_id': 1,
+                    'create_date': datetime(2024, 1, 1), 'modify_date': datetime(2024, 1, 2),
+                    'row_count': 10, 'table_size': 8192}],
+        'columns': [
+            column('invID', 'int', 1, is_nullable=False, is_identity=True, identity_seed=1, identity_increment=1),
+            column('invName', 'nvarchar', 2, max_length=100, default_name='DF_inv_name',
+                   default_definition="(N'-')"),
+            column('invNote', 'nvarchar', 3, max_length=-1),
+            column('invTotal', 'decimal', 4, max_length=9, precision=18, scale=2, is_computed=True,
+                   computed_definition='(isnull([invID],(0)))'),
+        ],
+        'indexes': [{'schema_name': 'dbo', 'table_name': 'cnInvoice', 'index_name': 'PK_cnInvoice',
+                     'index_type': 'CLUSTERED', 'is_unique': True, 'is_primary_key': True,
+                     'is_unique_constraint': False, 'is_disabled': False, 'fill_factor': 0,
+                     'is_padded': False, 'allow_row_locks': True, 'allow_page_locks': True}],
+        'index_columns': [
+            {'schema_name': 'dbo', 'table_name': 'cnInvoice', 'index_name': 'PK_cnInvoice',
+             'column_name': 'invName', 'key_ordinal': 0, 'index_column_id': 2,
+             'is_descending': False, 'is_included_column': True},
+            {'schema_name': 'dbo', 'table_name': 'cnInvoice', 'index_name': 'PK_cnInvoice',
+             'column_name': 'invID', 'key_ordinal': 1, 'index_column_id': 1,
+             'is_descending': False, 'is_included_column': False},
+        ],
+        'foreign_keys': [{'schema_name': 'dbo', 'table_name': 'cnInvoice', 'constraint_name': 'FK_self',
+                          'referenced_schema': 'dbo', 'referenced_table': 'cnInvoice',
+                          'delete_action': 'NO_ACTION', 'update_action': 'NO_ACTION',
+                          'is_disabled': False, 'is_not_trusted': False}],
+        'foreign_key_columns': [{'schema_name': 'dbo', 'table_name': 'cnInvoice', 'constraint_name': 'FK_self',
+                                 'column_name': 'invID', 'referenced_column': 'invID',
+                                 'ordinal_position': 1}],
+    })
+
+
+@pytest.fixture
+def transformer():
+    TSqlExpressionTranslator.clear_cache()
+    cache = FunctionMappingRuleCache()
+    cache.load_rules([(1, 'isnull', 'coalesce', r'isnull\s*\(', 'coalesce(', 'regex', True, None)])
+    return Transformer('ags', TSqlExpressionTranslator(cache))
+
+
+@pytest.mark.unit
+def test_names_follow_mcl_normalize_functions():
+    assert to_snake_case('cnInvAccnt') == 'cn_inv_accnt'
+    assert normalize_foreign_key_name('FK_cn_inv_dbt_cnInvAccnt') == 'fk_cn_inv_dbt_cn_inv_accnt'
+    assert normalize_index_name('PK_cnInvoice', True, True) == 'pk_cn_invoice'
+    assert normalize_index_name('IX_cnInvoice_Date', False, False) == 'ix_cn_invoice_date'
+    assert len(to_snake_case('a' * 100)) == 63
+
+
+@pytest.mark.unit
+def test_column_types():
+    assert map_column_type('nvarchar', 100, 0, 0)['target_typname_with_params'] == 'varchar(50)'
+    assert map_column_type('nvarchar', -1, 0, 0)['target_typname_with_params'] == 'text'
+    assert map_column_type('decimal', 9, 18, 2)['target_typname_with_params'] == 'numeric(18,2)'
+    assert strip_outer_parentheses('((0))') == '0'
+    assert strip_outer_parentheses('(getdate())') == 'getdate()'
+
+
+@pytest.mark.unit
+def test_schema_transformed_in_memory(snapshot, transformer):
+    [schema] = transformer.transform_metadata(snapshot)
+    [table] = schema.entities['tables']
+    columns = {c['column_name']: c for c in schema.entities['columns']}
+
+    assert table['base_table_name'] == 'cn_invoice_bt'
+    assert table['view_name'] == 'cn_invoice'
+    assert table['primary_key_count'] == 1
+    assert columns['invTotal']['target_type'] == 'view'
+    assert columns['invTotal']['postgres_computed_definition'] == 'coalesce("inv_id", (0))'
+    assert columns['invName']['postgres_default_value'] == "'-'"
+    assert columns['invNote']['max_value'] == 'max'
+    assert schema.entities['indexes'][0]['target_fill_factor'] is None
+    assert [(c['column_name'], c['ordinal_position']) for c in schema.entities['index_columns']] == [
+        ('invID', 1), ('invName', 2)]
+
+
+@pytest.mark.unit
+def test_self_referencing_foreign_key_skipped(snapshot, transformer):
+    [schema] = transformer.transform_metadata(snapshot)
+
+    assert schema.entities['foreign_keys'] == []
+    assert schema.entities['foreign_key_columns'] == []
+    assert schema.warnings
@@ -0,0 +1,35 @@
+"""
+Юнит-тесты Writer
+"""
+from datetime import datetime
+
+import pytest
+
+from metadata.classes.transformer import TransformedSchema
+from metadata.classes.writer import Writer, copy_buffer
+
+
+@pytest.mark.unit
+def test_copy_buffer_escapes_values():
+    rows = [{'a': None, 'b': True, 'c': 'x\ty\\z', 'd': datetime(2024, 1, 2, 3, 4, 5)}]
+
+    assert copy_buffer(rows, ['a', 'b', 'c', 'd']).read() == '\\N\tt\tx\\ty\\\\z\t2024-01-02T03:04:05\n'
+
+
+@pytest.mark.unit
+def test_failed_schema_does_not_block_others(fake_connection):
+    """Каждая схема пишется в своей транзакции"""
+    schemas = [TransformedSchema('dbo'), TransformedSchema('sales')]
+    for schema in schemas:
+        schema.entities['tables'].append({'schema_name': schema.schema_name, 'table_name': 't'})
+    conn = fake_connection
+    conn.fail(lambda sql, data: sql.startswith('COPY') and data.startswith('sales'), RuntimeError('copy failed'))
+
+    stats = Writer(lambda: conn).write_metadata(schemas)
+
+    assert stats['dbo']['status'] == 'completed'
+    assert stats['sales']['status'] == 'failed'
+    copied = {sql.split()[1]: data for sql, data in conn.copied}
+    assert copied['femcl_stage_tables'].startswith('dbo\tt\t')
+    # Объекты dbo и внешние ключи dbo зафиксированы, sales откатана
+    assert (conn.commits, conn.rollbacks) == (2, 1)
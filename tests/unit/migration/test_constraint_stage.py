@@ -0,0 +1,145 @@
+"""
+Юнит-тесты ConstraintStage
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from migration.classes.constraint_stage import ConstraintStage, validation_levels
+from migration.classes.check_constraint_model import CheckConstraintModel
+from migration.classes.foreign_key_model import ForeignKeyModel
+from migration.classes.unique_constraint_model import UniqueConstraintModel
+
+
+class PgError(Exception):
+    def __init__(self, pgcode, message='error'):
+        super().__init__(message)
+        self.pgcode = pgcode
+
+
+def constraint_database(connection, existing=None, unique_index=None):
+    """Каталог PostgreSQL на поддельном подключении: existing - имя ограничения -> (convalidated,)"""
+    existing = existing if existing is not None else {}
+    connection.respond('FROM pg_index x', [unique_index] if unique_index else [])
+    connection.respond('FROM pg_constraint c', lambda sql, params: [existing[params[2]]] if params[2] in existing else [])
+    return connection
+
+
+def ddl(connection):
+    return [sql for sql in connection.statements if sql.startswith(('ALTER TABLE', 'CREATE'))]
+
+
+def statuses(connection):
+    """(id, статус) из UPDATE статусов mcl"""
+    return [(params[3], params[0]) for sql, params, _ in connection.executed if sql.lstrip().startswith('UPDATE')]
+
+
+def foreign_key(name, table, referenced, fk_id=1):
+    fk = ForeignKeyModel(name)
+    fk.id = fk_id
+    fk.table_name = fk.source_table_name = table
+    fk.referenced_table = fk.referenced_source_table = referenced
+    fk.columns, fk.referenced_columns = [f'{referenced}_id'], ['id']
+    return fk
+
+
+@pytest.mark.unit
+def test_model_sql():
+    fk = foreign_key('fk_accnt_cn', 'accnt', 'cn')
+    fk.delete_action = 'CASCADE'
+    assert fk.generate_create_sql() == (
+        'ALTER TABLE ags.accnt ADD CONSTRAINT fk_accnt_cn FOREIGN KEY (cn_id) REFERENCES ags.cn (id) '
+        'ON DELETE CASCADE ON UPDATE NO ACTION NOT VALID'
+    )
+    assert fk.generate_validate_sql() == 'ALTER TABLE ags.accnt VALIDATE CONSTRAINT fk_accnt_cn'
+
+    check = CheckConstraintModel('ck_accnt_sum', 'sum >= 0')
+    check.table_name = 'accnt'
+    assert check.generate_create_sql(not_valid=False) == 'ALTER TABLE ags.accnt ADD CONSTRAINT ck_accnt_sum CHECK (sum >= 0)'
+
+    unique = UniqueConstraintModel('uq_accnt_code')
+    unique.table_name, unique.columns = 'accnt', ['code']
+    assert unique.generate_index_sql() == 'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_accnt_code ON ags.accnt (code)'
+    assert unique.generate_create_sql('ix_code') == 'ALTER TABLE ags.accnt ADD CONSTRAINT uq_accnt_code UNIQUE USING INDEX ix_code'
+
+
+@pytest.mark.unit
+def test_validation_levels_follow_references():
+    fks = [foreign_key('fk_a_b', 'a', 'b'), foreign_key('fk_b_c', 'b', 'c'), foreign_key('fk_d_c', 'd', 'c'),
+           foreign_key('fk_x_y', 'x', 'y'), foreign_key('fk_y_x', 'y', 'x')]
+    assert validation_levels(['a', 'b', 'c', 'd'], fks) == [['c'], ['b', 'd'], ['a']]
+    # Цикл ссылок - последний уровень
+    assert validation_levels(['x', 'y', 'c'], fks) == [['c'], ['x', 'y']]
+
+
+@pytest.mark.unit
+def test_add_not_valid_defers_missing_reference_and_retries_lock(fake_connection):
+    connection = constraint_database(fake_connection)
+    stage = ConstraintStage(lambda: connection, lock_timeout_ms=100, retries=1, retry_delay=0)
+    ready = foreign_key('fk_a_b', 'a', 'b', fk_id=1)
+    deferred = foreign_key('fk_a_c', 'a', 'c', fk_id=2)
+    broken = CheckConstraintModel('ck_a', 'bad(')
+    broken.id, broken.table_name = 3, 'a'
+    connection.fail('ADD CONSTRAINT fk_a_b ', PgError('55P03'), times=1)    # занята: повтор
+    connection.fail('ADD CONSTRAINT fk_a_c ', PgError('42P01'))             # таблица c еще не загружена
+    connection.fail('ADD CONSTRAINT ck_a ', PgError('42601', 'syntax'))
+
+    counts = stage.add(connection, [ready, deferred, broken])
+
+    assert counts == {'added': 1, 'deferred': 1, 'failed': 1}
+    assert ddl(connection) == [ready.generate_create_sql()]
+    assert statuses(connection) == [(1, 'in_progress'), (3, 'failed')]
+    assert (ready.migration_status, deferred.migration_status, broken.migration_status) == (
+        'in_progress', 'pending', 'failed')
+    assert connection.statements[0] == 'SET lock_timeout = 100'
+    assert connection.autocommit is False
+
+
+@pytest.mark.unit
+def test_unique_uses_existing_index_and_validate_runs_per_table(fake_connection):
+    connection = constraint_database(fake_connection, unique_index=('ix_a_code',))
+    stage = ConstraintStage(lambda: connection, workers=2)
+    unique = UniqueConstraintModel('uq_a_code')
+    unique.id, unique.table_name, unique.columns = 7, 'a', ['code']
+
+    assert stage.add(connection, [unique])['added'] == 1
+    assert ddl(connection) == ['ALTER TABLE ags.a ADD CONSTRAINT uq_a_code UNIQUE USING INDEX ix_a_code']
+    assert unique.migration_status == 'completed'
+
+    fk = foreign_key('fk_a_b', 'a', 'b', fk_id=1)
+    fk.migration_status = 'in_progress'
+    counts = stage.validate([fk, unique])
+    assert counts == {'validated': 1, 'failed': 0, 'levels': 1}
+    assert ddl(connection)[-1] == 'ALTER TABLE ags.a VALIDATE CONSTRAINT fk_a_b'
+    assert fk.migration_status == 'completed' and connection.closed
+
+
+@pytest.mark.unit
+def test_add_readds_completed_constraint_missing_after_force(fake_connection):
+    # fk_a_b удален DROP TABLE ... CASCADE
+    connection = constraint_database(fake_connection, existing={'fk_a_c': (True,)})
+    stage = ConstraintStage(lambda: connection)
+    dropped = foreign_key('fk_a_b', 'a', 'b', fk_id=1)
+    present = foreign_key('fk_a_c', 'a', 'c', fk_id=2)
+    dropped.migration_status = present.migration_status = 'completed'
+
+    assert stage.add(connection, [dropped, present])['added'] == 1
+    assert ddl(connection) == [dropped.generate_create_sql()]
+    assert statuses(connection) == [(1, 'in_progress')]
+    assert (dropped.migration_status, present.migration_status) == ('in_progress', 'completed')
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('settings, enabled, add_after_load', [
+    ({}, True, True),
+    ({'defer': True}, True, False),
+    ({'enabled': False}, False, False),
+])
+def test_from_config_enable_and_defer(settings, enabled, add_after_load):
+    config = SimpleNamespace(
+        get_config_value=lambda key, default=None: settings if key == 'migration.constraints' else default,
+        get_database_config=lambda name: {}
+    )
+    stage = ConstraintStage.from_config(config)
+
+    assert (stage.enabled, stage.add_after_load) == (enabled, add_after_load)
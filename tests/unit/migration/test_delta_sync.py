@@ -0,0 +1,81 @@
+"""
+Юнит-тесты DeltaSync
+"""
+import pytest
+
+from migration.classes.delta_sync import DeltaSync, DeltaSyncError
+from tests.fixtures.fake_db import FakeConnection
+
+
+def source_database(change_tracking=1, version=10, min_valid=0, changes=()):
+    """База источника: режим отслеживания, версии и изменения с водяного знака"""
+    connection = FakeConnection()
+    connection.respond('change_tracking_tables', [(change_tracking, 'rv')])
+    connection.respond('is_primary_key', [('Id',)])
+    connection.respond('MIN_VALID_VERSION', [(min_valid,)])
+    connection.respond(lambda sql, params: 'CURRENT_VERSION' in sql or 'MIN_ACTIVE_ROWVERSION' in sql, [(version,)])
+    connection.respond('', list(changes))
+    return connection
+
+
+def target_database(state=None):
+    """Целевая база: state - строка mcl.table_sync_state"""
+    return FakeConnection().respond('', [state] if state else [])
+
+
+def make_sync(source, target, batch_size=5000):
+    return DeltaSync('accnt', source, target, ['Id', 'Name'], ['id', 'name'], batch_size=batch_size)
+
+
+@pytest.mark.unit
+def test_detect_mode():
+    assert make_sync(source_database(change_tracking=1), target_database()).detect() == 'change_tracking'
+    assert make_sync(source_database(change_tracking=0), target_database()).detect() == 'rowversion'
+
+
+@pytest.mark.unit
+def test_begin_stores_watermark():
+    target = target_database()
+    assert make_sync(source_database(version=42), target).begin() == 42
+    sql, params, _ = target.executed[-1]
+    assert 'ON CONFLICT (task_id, table_name)' in sql
+    assert params == (2, 'accnt', 'change_tracking', 42)
+    assert target.commits == 1
+
+
+@pytest.mark.unit
+def test_sync_once_applies_upserts_and_deletes():
+    changes = [('U', 1, 1, 'a'), ('D', 2, None, None), ('U', 3, 3, 'c')]
+    target = target_database(state=('change_tracking', 5, 0, 0, 0, None))
+    stats = make_sync(source_database(version=9, changes=changes), target, batch_size=1).sync_once()
+
+    assert (stats['upserted'], stats['deleted'], stats['watermark']) == (2, 1, 9)
+    upserts = [rows for sql, rows in target.batches if sql.startswith('INSERT')]
+    deletes = [rows for sql, rows in target.batches if sql.startswith('DELETE')]
+    assert upserts == [[(1, 'a')], [(3, 'c')]]
+    assert deletes == [[(2,)]]
+    assert 'ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name' in target.batches[0][0]
+    assert target.executed[-1][1][:3] == (9, 2, 1)
+    assert target.commits == 1
+
+
+@pytest.mark.unit
+def test_sync_once_without_changes_keeps_watermark():
+    target = target_database(state=('change_tracking', 9, 0, 0, 0, None))
+    stats = make_sync(source_database(version=9), target).sync_once()
+
+    assert (stats['upserted'], stats['deleted'], stats['watermark']) == (0, 0, 9)
+    assert target.batches == [] and target.commits == 0
+
+
+@pytest.mark.unit
+def test_sync_once_rejects_expired_watermark():
+    target = target_database(state=('change_tracking', 5, 0, 0, 0, None))
+    with pytest.raises(DeltaSyncError):
+        make_sync(source_database(version=9, min_valid=7), target).sync_once()
+
+
+@pytest.mark.unit
+def test_sync_once_requires_baseline():
+    with pytest.raises(DeltaSyncError):
+        make_sync(source_database(), target_database()).sync_once()
@@ -0,0 +1,160 @@
+"""
+Юнит-тесты LobTransfer
+"""
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from migration.classes.lob_transfer import CopyStream, LobTransfer, lob_kind
+from tests.fixtures.fake_db import FakeConnection
+
+
+def lob_source(connection, rows, threshold, page_size):
+    """Таблица источника с LOB на поддельном подключении pyodbc"""
+    def chunk(sql, params):
+        start, size, key = params
+        value = rows[key]['Data']
+        if isinstance(value, str):
+            # nvarchar: позиция и длина в кодовых единицах UTF-16
+            encoded = value.encode('utf-16-le')[(start - 1) * 2:(start - 1 + size) * 2]
+            return [(encoded.decode('utf-16-le'),)]
+        return [(value[start - 1:start - 1 + size],)]
+
+    def page(sql, params):
+        keys = sorted(k for k in rows if not params or k > params[0])
+        result = []
+        for key in keys[:page_size]:
+            data = rows[key]['Data']
+            length = None if data is None else len(data.encode('utf-16-le') if isinstance(data, str) else data)
+            result.append((key, rows[key]['Name'], data if length is not None and length <= threshold else None, length))
+        return result
+
+    connection.respond('SUBSTRING', chunk)
+    connection.respond('', page)
+    return connection
+
+
+def chunk_reads(connection):
+    return sum('SUBSTRING' in sql for sql in connection.statements)
+
+
+COLUMNS = [
+    SimpleNamespace(name='id', source_name='Id', data_type='integer'),
+    SimpleNamespace(name='name', source_name='Name', data_type='varchar(50)'),
+    SimpleNamespace(name='data', source_name='Data', data_type='bytea',
+                    source_data_type='varbinary', source_is_max_length=True),
+]
+
+
+@pytest.mark.unit
+def test_lob_kind():
+    def column(data_type, source_data_type, source_is_max_length=False):
+        return SimpleNamespace(data_type=data_type, source_data_type=source_data_type,
+                               source_is_max_length=source_is_max_length)
+
+    assert lob_kind(column('bytea', 'varbinary', True)) == 'binary'
+    assert lob_kind(column('bytea', 'image')) == 'binary'
+    assert lob_kind(column('text', 'nvarchar', True)) == 'text'
+    assert lob_kind(column('text', 'ntext')) == 'text'
+    assert lob_kind(column('xml', 'xml')) == 'text'
+    # varbinary(n), binary(n) и varchar(n) переносятся вместе со строкой
+    assert lob_kind(column('bytea', 'varbinary')) is None
+    assert lob_kind(column('bytea', 'binary')) is None
+    assert lob_kind(column('varchar(50)', 'varchar')) is None
+    assert lob_kind(column('integer', 'int')) is None
+    assert lob_kind(SimpleNamespace(data_type='bytea')) is None
+
+
+@pytest.mark.unit
+def test_copy_stream_respects_read_size():
+    stream = CopyStream(iter(['abc', 'defgh', '', 'ij']))
+    assert [stream.read(4), stream.read(4), stream.read(4), stream.read(4)] == ['abcd', 'efgh', 'ij', '']
+
+
+@pytest.mark.unit
+def test_transfer_streams_large_values_in_chunks():
+    big = bytes(range(256)) * 20  # 5120 байт, больше части
+    rows = {
+        1: {'Name': 'small', 'Data': b'\x01\x02'},
+        2: {'Name': 'tab\there', 'Data': None},
+        3: {'Name': 'big', 'Data': big},
+    }
+    target = FakeConnection()
+    transfer = LobTransfer(None, target, 'docs', COLUMNS, ['Id'],
+                           memory_budget_bytes=24 * 1024, chunk_size=2048)
+    source = lob_source(FakeConnection(), rows, transfer.chunk_size, transfer.page_size)
+    transfer.source_connection = source
+
+    assert transfer.transfer() == 3
+    sql, data = target.copied[-1]
+    assert sql == 'COPY ags.docs (id, name, data) FROM STDIN'
+    assert data.split('\n') == [
+        '1\tsmall\t\\\\x0102',
+        '2\ttab\\there\t\\N',
+        '3\tbig\t\\\\x' + big.hex(),
+        '',
+    ]
+    # 5120 байт частями по 2048: три чтения
+    assert chunk_reads(source) == 3
+    assert (transfer.streamed_values, transfer.max_value_bytes) == (1, 5120)
+    # Страницы по ключу: вторая страница начинается после последнего ключа
+    assert transfer.page_size == 2
+    pages = [q for q in source.statements if 'TOP (2)' in q]
+    assert len(pages) == 2 and 'WHERE ([Id] > ?)' in pages[1]
+
+
+@pytest.mark.unit
+def test_text_chunks_advance_by_utf16_code_units():
+    """Символы вне BMP: смещение SUBSTRING растет на две единицы за символ"""
+    text = '\U0001F600' * 600  # 1200 кодовых единиц UTF-16, 2400 байт
+    columns = COLUMNS[:2] + [SimpleNamespace(name='data', source_name='Data', data_type='text',
+                                             source_data_type='nvarchar', source_is_max_length=True)]
+    target = FakeConnection()
+    transfer = LobTransfer(None, target, 'docs', columns, ['Id'],
+                           memory_budget_bytes=24 * 1024, chunk_size=1024)
+    source = lob_source(FakeConnection(), {1: {'Name': 'emoji', 'Data': text}},
+                        transfer.chunk_size, transfer.page_size)
+    transfer.source_connection = source
+
+    assert transfer.transfer() == 1
+    assert target.copied[-1][1] == '1\temoji\t' + text + '\n'
+    # Части по 512 единиц: 512 + 512 + 176
+    assert chunk_reads(source) == 3
+
+
+class RecordingGovernor:
+    """SourceGovernor: слот читателя и учет прочитанного"""
+
+    def __init__(self):
+        self.active_readers = 0
+        self.calls = []
+
+    @contextmanager
+    def reader_slot(self):
+        self.active_readers += 1
+        try:
+            yield
+        finally:
+            self.active_readers -= 1
+
+    def throttle(self, rows, payload_bytes=0):
+        assert self.active_readers == 1
+        self.calls.append((rows, payload_bytes))
+        return 0.5
+
+
+@pytest.mark.unit
+def test_transfer_throttles_pages_and_chunks():
+    big = bytes(5000)
+    rows = {1: {'Name': 'small', 'Data': b'\x01\x02'}, 2: {'Name': 'big', 'Data': big}}
+    governor = RecordingGovernor()
+    transfer = LobTransfer(None, FakeConnection(), 'docs', COLUMNS, ['Id'],
+                           memory_budget_bytes=24 * 1024, chunk_size=2048, governor=governor)
+    transfer.source_connection = lob_source(FakeConnection(), rows, transfer.chunk_size, transfer.page_size)
+
+    assert transfer.transfer() == 2
+    # Страница: ключи, имена, короткое значение и длины; затем части большого значения
+    assert governor.calls == [(2, 8 + 5 + 2 + 8 + 8 + 3 + 8), (0, 2048), (0, 2048), (0, 904)]
+    assert transfer.throttle_wait == 2.0
+    assert governor.active_readers == 0
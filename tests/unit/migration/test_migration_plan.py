@@ -0,0 +1,106 @@
+"""
+Юнит-тесты MigrationPlan и MigrationPlanCache
+"""
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from migration.classes.migration_plan import PROJECT_ROOT, MigrationPlan, MigrationPlanCache, converter_for
+
+
+def make_plan(metadata_hash='abc123'):
+    columns = [
+        SimpleNamespace(name='id', source_name='Id', data_type='integer', is_nullable=False,
+                        is_identity=True, ordinal_position=1),
+        SimpleNamespace(name='active', source_name='Active', data_type='boolean', is_nullable=True,
+                        is_identity=False, ordinal_position=2),
+        SimpleNamespace(name='price', source_name='Price', data_type='numeric(10,2)', is_nullable=True,
+                        is_identity=False, ordinal_position=3),
+    ]
+    table_model = SimpleNamespace(source_table_name='orders', target_table_name='orders',
+                                  columns=columns, indexes=[], foreign_keys=[])
+    return MigrationPlan.compile(table_model, metadata_hash, 'CREATE TABLE ags.orders ()')
+
+
+@pytest.mark.unit
+def test_converter_for():
+    assert converter_for('numeric(10,2)') == 'decimal'
+    assert converter_for('BOOLEAN') == 'bool'
+    assert converter_for('integer') is None
+    assert converter_for(None) is None
+
+
+@pytest.mark.unit
+def test_plan_round_trip():
+    plan = make_plan()
+    restored = MigrationPlan.from_dict(plan.to_dict())
+
+    assert restored.table_name == 'orders'
+    assert restored.metadata_hash == 'abc123'
+    assert restored.source_columns == ['Id', 'Active', 'Price']
+    assert restored.target_columns == ['id', 'active', 'price']
+    assert restored.has_computed_columns is False
+
+
+@pytest.mark.unit
+def test_row_converter():
+    convert = make_plan().row_converter()
+
+    assert convert((1, '1', '9.50')) == (1, True, Decimal('9.50'))
+    assert convert((2, None, None)) == (2, None, None)
+
+
+@pytest.mark.unit
+def test_cache_save_and_load(tmp_path):
+    cache = MigrationPlanCache(str(tmp_path))
+    path = cache.save(make_plan())
+
+    assert path == tmp_path / 'orders.plan.json'
+    assert [p.name for p in tmp_path.iterdir()] == ['orders.plan.json']
+
+    # Новый экземпляр читает план с диска
+    cache = MigrationPlanCache(str(tmp_path))
+    assert cache.load('orders', 'abc123').target_columns == ['id', 'active', 'price']
+    assert cache.load('orders', 'changed') is None
+    assert cache.load('missing', 'abc123') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+@pytest.mark.unit
+def test_index_status_is_not_part_of_plan():
+    """Статус индекса берется из mcl при загрузке плана, а не из кэша"""
+    index = SimpleNamespace(name='pk_orders', table_name='orders', original_name='PK_Orders',
+                            index_type='btree', is_unique=True, is_primary_key=True,
+                            migration_status='completed', fill_factor=None, is_concurrent=False,
+                            alternative_name=None, postgres_definition=None, source_index_id=7,
+                            columns=[SimpleNamespace(column_name='id', ordinal_position=1, is_descending=False)],
+                            generate_create_sql=lambda: 'CREATE UNIQUE INDEX pk_orders ON ags.orders (id)')
+    plan = make_plan()
+    plan.data['indexes'] = MigrationPlan.compile(
+        SimpleNamespace(source_table_name='orders', target_table_name='orders', columns=[],
+                        indexes=[index], foreign_keys=[]), 'abc123', ''
+    ).data['indexes']
+
+    assert 'migration_status' not in plan.data['indexes'][0]
+    assert plan.to_metadata()['table_model'].indexes[0].migration_status == 'pending'
+    assert plan.to_metadata({7: 'completed'})['table_model'].indexes[0].migration_status == 'completed'
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('partitioning_exists', [True, False])
+def test_metadata_hash_without_partitioning_table(fake_connection, partitioning_exists):
+    fake_connection.respond('to_regclass', [(partitioning_exists,)]).respond('SELECT md5', [('f00d',)])
+
+    assert MigrationPlanCache.metadata_hash(fake_connection, 'orders') == 'f00d'
+    assert ('mcl.table_partitioning tp' in fake_connection.statements[-1]) is partitioning_exists
+
+
+@pytest.mark.unit
+def test_cache_dir_relative_to_project_root(tmp_path):
+    config = SimpleNamespace(get_config_value=lambda key, default=None: {
+        'migration.plan_cache_dir': 'cache/plans'}.get(key, default))
+    assert MigrationPlanCache.from_config(config).directory == PROJECT_ROOT / 'cache' / 'plans'
+
+    config = SimpleNamespace(get_config_value=lambda key, default=None: str(tmp_path))
+    assert MigrationPlanCache.from_config(config).directory == tmp_path
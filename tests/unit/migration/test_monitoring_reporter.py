@@ -0,0 +1,27 @@
+"""
+Юнит-тесты MigrationMonitor (scripts/migration/monitoring_reporter.py)
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+from tests.fixtures.fake_db import FakeConnection, FakeConnectionManager
+
+pytest.importorskip('pyodbc')
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / 'scripts' / 'migration'))
+from monitoring_reporter import MigrationMonitor  # noqa: E402
+
+
+@pytest.mark.unit
+def test_failed_query_rolls_back_transaction():
+    connection = FakeConnection()
+    monitor = MigrationMonitor(FakeConnectionManager(connection))
+    connection.fail('FROM mcl.migration_metrics', RuntimeError('relation is locked'), times=1)
+    connection.respond('FROM mcl.migration_metrics', [(42,)], columns=['total'])
+
+    with pytest.raises(RuntimeError):
+        monitor._execute_query("SELECT count(*) AS total FROM mcl.migration_metrics")
+    assert connection.rollbacks == 1
+    # Следующий запрос подключения выполняется в новой транзакции
+    assert monitor._execute_query("SELECT count(*) AS total FROM mcl.migration_metrics") == [{'total': 42}]
@@ -0,0 +1,64 @@
+"""
+Юнит-тесты SequenceResync
+"""
+import pytest
+
+from migration.classes.sequence_resync import SequenceResync
+
+
+def sequence_database(connection, sequences, maxima):
+    """Последовательности (pg_depend) и максимумы колонок таблиц на поддельном подключении"""
+    def extremes(sql, params):
+        # SELECT <позиция>, max(...) FROM ... UNION ALL ...
+        return [(position, maxima.get(part.rsplit('.', 1)[1].strip('"')))
+                for position, part in enumerate(sql.split('\nUNION ALL\n'))]
+
+    connection.respond('pg_depend', sequences)
+    connection.respond(lambda sql, params: not sql.startswith('SELECT setval'), extremes)
+    return connection
+
+
+def sequence_row(table, last_value=None, increment=1):
+    return (f'ags.{table}_id_seq', table, 'id', 1, increment, 1, 2 ** 63 - 1, False, last_value)
+
+
+@pytest.mark.unit
+def test_resync_batches_max_queries_and_setval(fake_connection):
+    connection = sequence_database(
+        fake_connection,
+        [sequence_row('a'), sequence_row('b'), sequence_row('c', last_value=500), sequence_row('d')],
+        {'a': 10, 'b': None, 'c': 100, 'd': 7}
+    )
+    summary = SequenceResync(connection, chunk_size=2).run()
+
+    assert (summary['sequences'], summary['queried'], summary['updated']) == (4, 4, 2)
+    max_queries = [sql for sql in connection.statements if 'UNION ALL' in sql]
+    assert len(max_queries) == 2
+    assert 'SELECT 0, max("id")::bigint FROM "ags"."a"' in max_queries[0]
+
+    setval = [(sql, params) for sql, params, _ in connection.executed if sql.startswith('SELECT setval')]
+    # Пустая таблица b пропускается, c уже впереди данных
+    assert setval == [('SELECT setval(%s::regclass, %s, true), setval(%s::regclass, %s, true)',
+                       ['ags.a_id_seq', 10, 'ags.d_id_seq', 7])]
+    assert connection.commits == 1
+
+
+@pytest.mark.unit
+def test_observed_values_skip_table_scan(fake_connection):
+    connection = sequence_database(fake_connection, [sequence_row('accnt', last_value=3)], {'accnt': 999})
+    summary = SequenceResync(connection).run(['accnt'], observed={('accnt', 'id'): 1500})
+
+    assert (summary['queried'], summary['updated']) == (0, 1)
+    assert not any('UNION ALL' in sql or 'max(' in sql for sql in connection.statements)
+    assert connection.executed[-1].params == ['ags.accnt_id_seq', 1500]
+    assert connection.executed[0].params == {'schema': 'ags', 'tables': ['accnt']}
+
+
+@pytest.mark.unit
+def test_descending_sequence_uses_min(fake_connection):
+    resync = SequenceResync(sequence_database(fake_connection, [sequence_row('neg', increment=-1)], {}))
+    sequences = resync.load_sequences()
+    assert 'min("id")' in resync._extreme_sql(sequences)
+    assert sequences[0].resync_value(-50) == -50
+    sequences[0].last_value, sequences[0].is_called = -100, True
+    assert sequences[0].resync_value(-50) is None
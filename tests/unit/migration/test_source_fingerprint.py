@@ -0,0 +1,68 @@
+"""
+Юнит-тесты SourceFingerprint и FingerprintStore
+"""
+from datetime import datetime
+
+import pytest
+
+from migration.classes.source_fingerprint import SourceFingerprint, FingerprintStore
+from tests.fixtures.fake_db import FakeConnection
+
+
+@pytest.mark.unit
+def test_compute_uses_rowversion_when_available(fake_connection):
+    connection = fake_connection.respond('sys.columns', [('rv',)]).respond('', [(10, 12345, None)])
+    fingerprint = SourceFingerprint.compute(connection, 'accnt')
+
+    assert fingerprint == SourceFingerprint(10, 12345)
+    assert 'MAX([rv])' in connection.statements[-1]
+
+
+@pytest.mark.unit
+def test_compute_falls_back_to_checksum(fake_connection):
+    connection = fake_connection.respond('sys.columns', []).respond('', [(10, None, -42)])
+    fingerprint = SourceFingerprint.compute(connection, 'accnt')
+
+    assert fingerprint == SourceFingerprint(10, checksum_agg=-42)
+    assert 'CHECKSUM_AGG(BINARY_CHECKSUM(*))' in connection.statements[-1]
+
+
+def make_store(stored, target_count, table_status='completed'):
+    connection = FakeConnection()
+    connection.respond('FROM mcl.table_fingerprints', [stored] if stored else [])
+    connection.respond('to_regclass', [('ags.accnt',) if target_count is not None else (None,)])
+    connection.respond('COUNT(*)', [(target_count,)])
+    connection.respond('FROM mcl.postgres_tables', [(table_status,)])
+    return FingerprintStore(connection)
+
+
+@pytest.mark.unit
+def test_is_unchanged():
+    verified = datetime(2025, 1, 1)
+    fingerprint = SourceFingerprint(10, 12345, metadata_hash='abc')
+
+    assert make_store((10, 12345, None, 'abc', 10, verified), 10).is_unchanged('accnt', fingerprint)
+    # Источник изменился
+    assert not make_store((10, 12344, None, 'abc', 10, verified), 10).is_unchanged('accnt', fingerprint)
+    # Метаданные mcl изменились или таблица помечена stale
+    assert not make_store((10, 12345, None, 'old', 10, verified), 10).is_unchanged('accnt', fingerprint)
+    assert not make_store((10, 12345, None, 'abc', 10, verified), 10, 'stale').is_unchanged('accnt', fingerprint)
+    # Целевая таблица удалена или изменена
+    assert not make_store((10, 12345, None, 'abc', 10, verified), None).is_unchanged('accnt', fingerprint)
+    assert not make_store((10, 12345, None, 'abc', 10, verified), 9).is_unchanged('accnt', fingerprint)
+    # Нет сохраненного отпечатка
+    assert not make_store(None, 10).is_unchanged('accnt', fingerprint)
+
+
+@pytest.mark.unit
+def test_clear_stale_after_verified_migration(fake_connection):
+    connection = fake_connection.respond("SET migration_status = 'completed'", [(1,)])
+    store = FingerprintStore(connection)
+
+    assert store.clear_stale('accnt')
+    statement = connection.executed[-1]
+    assert "pt.migration_status = 'stale'" in statement.sql
+    assert statement.params == (2, 'accnt')
+    assert connection.commits == 1
+    # Таблица не была помечена stale
+    assert not FingerprintStore(FakeConnection()).clear_stale('accnt')
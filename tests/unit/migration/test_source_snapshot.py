@@ -0,0 +1,85 @@
+"""
+Юнит-тесты SourceSnapshot
+"""
+import pytest
+
+from migration.classes.source_snapshot import (
+    SnapshotError, SourceSnapshot, begin_snapshot_read, end_snapshot_read, resolve_snapshot_run
+)
+from tests.fixtures.fake_db import FakeConnection
+
+
+def source_database(connection, snapshot_isolation_state=1):
+    """База источника на поддельном подключении"""
+    connection.respond('snapshot_isolation_state', [(snapshot_isolation_state,)])
+    connection.respond('CHANGE_TRACKING_CURRENT_VERSION', [(120, 9000)])
+    connection.respond('sys.database_files', [('FishEye', 'D:\\Data\\FishEye.mdf'),
+                                              ('FishEye_2', 'D:\\Data\\FishEye_2.ndf')])
+    return connection
+
+
+def statements(connection):
+    return [sql.strip() for sql in connection.statements]
+
+
+@pytest.mark.unit
+def test_snapshot_read_requires_allow_snapshot_isolation(fake_connection):
+    connection = source_database(fake_connection)
+    begin_snapshot_read(connection)
+    assert statements(connection)[-1] == 'SET TRANSACTION ISOLATION LEVEL SNAPSHOT'
+    end_snapshot_read(connection)
+    assert statements(connection)[-1] == 'SET TRANSACTION ISOLATION LEVEL READ COMMITTED'
+
+    disabled = source_database(FakeConnection(), snapshot_isolation_state=0)
+    with pytest.raises(SnapshotError):
+        begin_snapshot_read(disabled)
+    assert not any('SNAPSHOT' == sql.split()[-1] for sql in statements(disabled))
+
+
+@pytest.mark.unit
+def test_create_records_watermarks_before_snapshot(fake_connection):
+    connection = source_database(fake_connection)
+    snapshot = SourceSnapshot.create(connection, '20261019_101500', 'FishEye')
+
+    assert snapshot.snapshot_database == 'FishEye_femcl_20261019_101500'
+    assert (snapshot.change_tracking_version, snapshot.rowversion_watermark) == (120, 9000)
+    assert snapshot.watermark('change_tracking') == 120
+    assert snapshot.watermark('rowversion') == 9000
+
+    executed = statements(connection)
+    create = executed[-1]
+    # Водяные знаки фиксируются до создания снимка
+    assert 'CHANGE_TRACKING_CURRENT_VERSION' in executed[0]
+    assert create.startswith('CREATE DATABASE [FishEye_femcl_20261019_101500] ON ')
+    assert "(NAME = [FishEye], FILENAME = 'D:\\Data\\FishEye_femcl_20261019_101500_FishEye.ss')" in create
+    assert create.endswith('AS SNAPSHOT OF [FishEye]')
+    # CREATE DATABASE вне транзакции, режим подключения восстанавливается
+    assert connection.executed[-1].autocommit is True
+    assert connection.autocommit is False
+
+
+@pytest.mark.unit
+def test_sparse_file_directory():
+    assert SourceSnapshot.sparse_file('/var/opt/mssql/data/db.mdf', 'snap', 'db') == '/var/opt/mssql/data/snap_db.ss'
+    assert SourceSnapshot.sparse_file('D:\\Data\\db.mdf', 'snap', 'db', 'E:\\Snap\\') == 'E:\\Snap\\snap_db.ss'
+
+
+@pytest.mark.unit
+def test_resolve_snapshot_run():
+    """Снимок запуска: аргумент, затем конфигурация; в режиме database без снимка - ошибка"""
+    class Config:
+        def __init__(self, **values):
+            self.values = values
+
+        def get_config_value(self, key, default=None):
+            return self.values.get(key, default)
+
+    database = Config(**{'migration.consistent_read.mode': 'database'})
+    configured = Config(**{'migration.consistent_read.mode': 'database',
+                           'migration.consistent_read.snapshot_run': '20261019_101500'})
+
+    assert resolve_snapshot_run(configured) == '20261019_101500'
+    assert resolve_snapshot_run(configured, 'manual') == 'manual'
+    assert resolve_snapshot_run(Config(**{'migration.consistent_read.mode': 'snapshot'})) is None
+    with pytest.raises(SnapshotError):
+        resolve_snapshot_run(database)
@@ -0,0 +1,48 @@
+"""
+Юнит-тесты StagingMerge
+"""
+from datetime import datetime
+
+import pytest
+
+from migration.classes.staging_merge import StagingMerge, copy_value
+
+
+@pytest.mark.unit
+def test_copy_value():
+    assert copy_value(None) == '\\N'
+    assert copy_value(True) == 't'
+    assert copy_value(b'\x01\xff') == '\\\\x01ff'
+    assert copy_value('a\tb\nc\\') == 'a\\tb\\nc\\\\'
+    assert copy_value(datetime(2025, 1, 2, 3, 4, 5)) == '2025-01-02T03:04:05'
+
+
+@pytest.mark.unit
+def test_merge_recycles_stage_table(fake_connection):
+    connection = fake_connection
+    # INSERT ... ON CONFLICT затрагивает все строки последнего COPY (rowcount)
+    connection.respond('INSERT INTO', lambda sql, params: [()] * connection.copied[-1][1].count('\n'))
+    merge = StagingMerge(connection, 'accnt', ['account_key', 'name'], ['account_key'])
+
+    assert merge.merge([(1, 'a'), (2, None)]) == 2
+    assert merge.merge([(3, 'c')]) == 1
+    merge.close()
+
+    statements = [sql.split(' (')[0].split(' AS ')[0] for sql in connection.statements]
+    assert statements == [
+        'CREATE TEMP TABLE IF NOT EXISTS femcl_stage_accnt',
+        'COPY femcl_stage_accnt',
+        'INSERT INTO ags.accnt',
+        'TRUNCATE femcl_stage_accnt',
+        'COPY femcl_stage_accnt',
+        'INSERT INTO ags.accnt',
+        'DROP TABLE IF EXISTS femcl_stage_accnt',
+    ]
+    assert connection.copied[0][1] == '1\ta\n2\t\\N\n'
+    assert merge.merge_sql.endswith('ON CONFLICT (account_key) DO UPDATE SET name = EXCLUDED.name')
+
+
+@pytest.mark.unit
+def test_merge_requires_key(fake_connection):
+    with pytest.raises(ValueError):
+        StagingMerge(fake_connection, 'accnt', ['name'], [])
@@ -0,0 +1,27 @@
+"""
+Юнит-тесты выбора таблиц для миграции (scripts/migration/table_list_manager.py)
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+from migration.classes.source_fingerprint import STALE_TABLES_QUERY
+from tests.fixtures.fake_db import FakeConnection, FakeConnectionManager
+
+pytest.importorskip('pyodbc')
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / 'scripts' / 'migration'))
+from table_list_manager import TableListManager  # noqa: E402
+
+
+@pytest.mark.unit
+def test_incomplete_tables_include_stale_completed_tables():
+    connection = FakeConnection()
+    connection.respond('FROM mcl.migration_status', [('accnt',), ('orders',)], columns=['table_name'])
+    manager = TableListManager(FakeConnectionManager(connection))
+
+    assert manager.get_incomplete_tables() == ['accnt', 'orders']
+    statement = connection.executed[-1]
+    assert STALE_TABLES_QUERY in statement.sql
+    assert "current_status = 'completed' AND table_name IN" in statement.sql
+    assert statement.params == (2,)
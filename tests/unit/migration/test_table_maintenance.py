@@ -0,0 +1,78 @@
+"""
+Юнит-тесты MaintenanceScheduler
+"""
+import threading
+
+import pytest
+
+from migration.classes.table_maintenance import MaintenanceScheduler
+from tests.fixtures.fake_db import FakeConnection
+
+
+class FakeServer:
+    """Подключения рабочих потоков: ANALYZE/VACUUM ждут gate, таблицы failing - ошибка"""
+
+    def __init__(self, tables=(), failing=()):
+        self.tables = list(tables)
+        self.failing = set(failing)
+        self.connections = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def connect(self):
+        connection = FakeConnection()
+        connection.fail(self.maintenance_fails, RuntimeError("relation does not exist"))
+        connection.respond('pg_class', self.tables)
+        self.connections.append(connection)
+        return connection
+
+    def maintenance_fails(self, sql, params):
+        if not sql.startswith(('ANALYZE', 'VACUUM')):
+            return False
+        # Первая задача ждет, пока в очередь поставят остальные
+        self.started.set()
+        self.gate.wait(5)
+        return sql.rsplit('.', 1)[1] in self.failing
+
+    @property
+    def statements(self):
+        return [sql for connection in self.connections for sql in connection.statements]
+
+
+@pytest.mark.unit
+def test_largest_tables_first_on_single_worker():
+    server = FakeServer()
+    scheduler = MaintenanceScheduler(server.connect, workers=1, maintenance_work_mem_mb=512)
+    scheduler.submit('first', 1)
+    assert server.started.wait(5)
+    scheduler.submit('small', 10)
+    scheduler.submit('large', 1000)
+    assert not scheduler.submit('large', 1000)
+    server.gate.set()
+    report = scheduler.close()
+
+    analyzed = [s for s in server.statements if s.startswith('ANALYZE')]
+    assert analyzed == ['ANALYZE ags.first', 'ANALYZE ags.large', 'ANALYZE ags.small']
+    assert "SET maintenance_work_mem = '512MB'" in server.statements
+    assert report['tables'] == 3 and report['failed'] == 0 and report['pending'] == 0
+    assert all(c.autocommit and c.closed for c in server.connections)
+
+
+@pytest.mark.unit
+def test_freeze_errors_and_schema_submit():
+    server = FakeServer(tables=[('accnt', 2048), ('broken', 1024)], failing={'broken'})
+    server.gate.set()
+    scheduler = MaintenanceScheduler(server.connect, workers=2, freeze=True)
+    assert scheduler.submit_schema(server.connect()) == 2
+    report = scheduler.wait()
+
+    assert 'VACUUM (FREEZE, ANALYZE) ags.accnt' in server.statements
+    assert report['tables'] == 2 and report['failed'] == 1
+    failed = [r for r in report['results'] if r['error']]
+    assert failed[0]['table'] == 'broken' and failed[0]['operation'] == 'vacuum_freeze'
+
+    # После ошибки рабочий поток открывает новое подключение
+    scheduler.submit('accnt', 2048)
+    assert scheduler.close()['tables'] == 3
+    with pytest.raises(RuntimeError):
+        scheduler.submit('accnt')
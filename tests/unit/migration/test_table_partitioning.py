@@ -0,0 +1,227 @@
+"""
+Юнит-тесты секционирования целевых таблиц
+"""
+import threading
+from datetime import date
+
+import pytest
+
+from migration.classes.column_model import ColumnModel
+from migration.classes.index_model import IndexModel
+from migration.classes.regular_table_model import RegularTableModel
+from migration.classes.table_partitioning import (
+    PartitionError, PartitionSpec, PartitionedIndexBuild, PartitionedLoad
+)
+from infrastructure.classes.source_reader import SourceBatch
+from tests.fixtures.fake_db import FakeConnection
+
+
+def make_columns(created_nullable=False):
+    account_key = ColumnModel('account_key', 'account_key', 'bigint')
+    account_key.is_nullable, account_key.is_identity = False, True
+    created_at = ColumnModel('created_at', 'CreatedAt', 'date')
+    created_at.is_nullable = created_nullable
+    return [account_key, created_at]
+
+
+def date_spec(**kwargs):
+    return PartitionSpec('accnt', 'created_at', '2024-01-01', '2024-04-01', '1 month', **kwargs).bind(make_columns())
+
+
+class FakeReader:
+    def __init__(self, rows):
+        self.rows = rows
+        self.ranges = []
+        self.closed = False
+
+    def read_batches(self, table_name, columns=None, batch_size=1000, schema='ags',
+                     key_column=None, key_range=None):
+        self.ranges.append((key_column, key_range))
+        low, high = key_range
+        rows = [row for row in self.rows
+                if (low is None or row[1] >= low) and (high is None or row[1] < high)]
+        for start in range(0, len(rows), batch_size):
+            yield SourceBatch(columns, rows[start:start + batch_size])
+
+    def close(self):
+        self.closed = True
+
+
+class TargetServer:
+    """Целевая база: подключения, открываемые рабочими потоками"""
+
+    def __init__(self):
+        self.connections = []
+        self._lock = threading.Lock()
+
+    def connect(self):
+        connection = FakeConnection()
+        with self._lock:
+            self.connections.append(connection)
+        return connection
+
+    @property
+    def statements(self):
+        return [sql for connection in self.connections for sql in connection.statements]
+
+    @property
+    def copied(self):
+        return [copy for connection in self.connections for copy in connection.copied]
+
+
+@pytest.mark.unit
+def test_monthly_partitions_and_ddl():
+    spec = date_spec()
+    partitions = spec.partitions()
+    assert [p.name for p in partitions] == ['accnt_p20240101', 'accnt_p20240201', 'accnt_p20240301', 'accnt_default']
+    assert spec.source_column == 'CreatedAt' and spec.kind == 'date'
+
+    ddl = spec.partitions_ddl()
+    assert ddl[0] == ("CREATE TABLE IF NOT EXISTS ags.accnt_p20240101 PARTITION OF ags.accnt "
+                      "FOR VALUES FROM ('2024-01-01') TO ('2024-02-01')")
+    assert ddl[-1].endswith("PARTITION OF ags.accnt DEFAULT")
+    assert spec.parent_ddl("CREATE TABLE ags.accnt (\n)\n   ").endswith(") PARTITION BY RANGE (created_at)")
+    assert spec.source_ranges(partitions[-1]) == [(None, date(2024, 1, 1)), (date(2024, 4, 1), None)]
+
+
+@pytest.mark.unit
+def test_id_partitions_last_bound_clamped():
+    spec = PartitionSpec('accnt', 'account_key', '0', '25000', '10000', include_default=False).bind(make_columns())
+    assert [(p.lower, p.upper) for p in spec.partitions()] == [(0, 10000), (10000, 20000), (20000, 25000)]
+    assert spec.partitions()[1].for_values_sql() == "FOR VALUES FROM (10000) TO (20000)"
+
+
+@pytest.mark.unit
+def test_invalid_specs_rejected():
+    with pytest.raises(PartitionError):
+        PartitionSpec('accnt', 'created_at', '2024-01-01', '2025-01-01', '1 month').bind(make_columns(True))
+    with pytest.raises(PartitionError):
+        PartitionSpec('accnt', 'created_at', '2024-01-15', '2025-01-01', '1 month').bind(make_columns()).partitions()
+    with pytest.raises(PartitionError):
+        PartitionSpec('accnt', 'created_at', '2024-01-01', '2025-01-01', 'monthly').bind(make_columns()).partitions()
+    with pytest.raises(PartitionError):
+        PartitionSpec('accnt', 'created_at', '2024', '2025', '1 year', strategy='list')
+
+
+@pytest.mark.unit
+def test_partitioned_load_copies_each_partition():
+    rows = [(i, date(2024, 1 + i % 3, 10)) for i in range(1, 10)] + [(100, date(2023, 12, 31))]
+    target, readers = TargetServer(), []
+    lock = threading.Lock()
+
+    def reader_factory():
+        reader = FakeReader(rows)
+        with lock:
+            readers.append(reader)
+        return reader
+
+    load = PartitionedLoad(date_spec(), reader_factory, target.connect,
+                           ['account_key', 'CreatedAt'], ['account_key', 'created_at'],
+                           workers=3, batch_size=2, identity_columns=['account_key'])
+    summary = load.run()
+
+    assert summary['rows'] == 10
+    assert summary['partitions'] == {'accnt_p20240101': 3, 'accnt_p20240201': 3,
+                                     'accnt_p20240301': 3, 'accnt_default': 1}
+    assert summary['identity_max'] == {'account_key': 100}
+    assert all(reader.closed for reader in readers) and len(readers) == 4
+    assert any(sql.startswith("COPY ags.accnt_default (account_key, created_at)") for sql, _ in target.copied)
+
+
+@pytest.mark.unit
+def test_partitioned_load_reports_failed_partitions():
+    class BrokenReader(FakeReader):
+        def read_batches(self, *args, **kwargs):
+            raise RuntimeError("timeout")
+
+    load = PartitionedLoad(date_spec(include_default=False), lambda: BrokenReader([]),
+                           TargetServer().connect, ['account_key'], ['account_key'])
+    with pytest.raises(PartitionError, match='accnt_p20240201'):
+        load.run()
+
+
+@pytest.mark.unit
+def test_partitioned_load_truncates_loaded_partitions_on_failure():
+    class FailingReader(FakeReader):
+        def read_batches(self, table_name, key_range=None, **kwargs):
+            if key_range[0] == date(2024, 2, 1):
+                raise RuntimeError("timeout")
+            yield from super().read_batches(table_name, key_range=key_range, **kwargs)
+
+    rows = [(1, date(2024, 1, 10)), (2, date(2024, 2, 10)), (3, date(2024, 3, 10))]
+    target = TargetServer()
+    load = PartitionedLoad(date_spec(include_default=False), lambda: FailingReader(rows),
+                           target.connect, ['account_key', 'CreatedAt'],
+                           ['account_key', 'created_at'], workers=1)
+    with pytest.raises(PartitionError, match='accnt_p20240201'):
+        load.run()
+
+    # Загруженные секции очищаются, секция с ошибкой откатана
+    assert target.statements[-1].startswith("TRUNCATE ags.accnt_p20240101")
+    assert 'accnt_p20240201' not in target.statements[-1]
+
+
+@pytest.mark.unit
+def test_spec_load_without_partitioning_table():
+    def spec_database(exists):
+        return (FakeConnection()
+                .respond('to_regclass', [(exists,)])
+                .respond('table_partitioning', [('created_at', 'range', '2024-01-01', '2024-04-01', '1 month', True)]))
+
+    missing = spec_database(False)
+    assert PartitionSpec.load(missing.cursor(), 'accnt') is None and len(missing.executed) == 1
+    spec = PartitionSpec.load(spec_database(True).cursor(), 'accnt')
+    assert (spec.column_name, spec.interval) == ('created_at', '1 month')
+
+
+@pytest.mark.unit
+def test_load_metadata_binds_partitioning_to_not_null_source_column(monkeypatch):
+    def metadata_database(config_loader):
+        return (FakeConnection()
+                .respond('pt.base_table_name', [('accnt', None)])
+                .respond('FROM mcl.postgres_columns', [
+                    ('account_key', 'account_key', 'bigint', True, 1, None, None, None, False, None, None, None, False,
+                     'bigint', False),
+                    ('created_at', 'CreatedAt', 'date', False, 2, None, None, None, False, None, None, None, False,
+                     'date', False),
+                    ('note', 'Note', 'text', False, 3, None, None, None, False, None, None, None, True,
+                     'nvarchar', True),
+                ])
+                .respond('to_regclass', [(True,)])
+                .respond('mcl.table_partitioning',
+                         [('created_at', 'range', '2024-01-01', '2024-04-01', '1 month', True)]))
+
+    class Source:
+        def table_exists(self, table_name):
+            return True
+
+        def count_rows(self, table_name):
+            return 3
+
+    model = RegularTableModel('accnt')
+    monkeypatch.setattr(model, '_connect_postgres', metadata_database)
+
+    assert model.load_metadata(config_loader=None, source_reader=Source()), model.errors
+    assert [c.is_nullable for c in model.columns] == [False, False, True]
+    assert model.partitioning.kind == 'date' and model.partitioning.source_column == 'CreatedAt'
+
+
+@pytest.mark.unit
+def test_partitioned_index_build():
+    target = TargetServer()
+    index = IndexModel('ix_accnt_created', 'accnt')
+    index.add_column('created_at', 1, False)
+    built = PartitionedIndexBuild(date_spec(), target.connect, workers=2).create(index)
+
+    assert built == 4
+    statements = target.statements
+    assert statements[0] == "CREATE INDEX IF NOT EXISTS ix_accnt_created ON ONLY ags.accnt (created_at ASC)"
+    assert ("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accnt_created_p20240201 "
+            "ON ags.accnt_p20240201 (created_at ASC)") in statements
+    assert ("ALTER INDEX ags.ix_accnt_created ATTACH PARTITION ags.ix_accnt_created_default") in statements
+
+    unique = IndexModel('pk_accnt', 'accnt')
+    unique.is_unique = True
+    unique.add_column('account_key', 1, False)
+    with pytest.raises(PartitionError):
+        PartitionedIndexBuild(date_spec(), TargetServer().connect).create(unique)
@@ -0,0 +1,53 @@
+"""
+Юнит-тесты компактных моделей метаданных
+"""
+import pickle
+
+import pytest
+
+from migration.classes.column_model import ColumnModel
+from migration.classes.foreign_key_model import ForeignKeyModel
+from migration.classes.index_model import IndexModel
+
+
+@pytest.mark.unit
+def test_columns_share_type_descriptors():
+    first = ColumnModel('amount', 'Amount', 'numeric', 18, 2)
+    second = ColumnModel(''.join(['amo', 'unt']), 'Amount', 'numeric', 18, 2)
+
+    assert first.type_descriptor is second.type_descriptor
+    assert first.name is second.name
+    assert (second.data_type, second.data_type_precision, second.data_type_scale) == ('numeric', 18, 2)
+
+    second.data_type_scale = 4
+    assert second.type_descriptor is ColumnModel('rate', 'Rate', 'numeric', 18, 4).type_descriptor
+    assert first.data_type_scale == 2
+    with pytest.raises(AttributeError):
+        first.type_descriptor.scale = 4
+
+
+@pytest.mark.unit
+def test_models_have_no_instance_dict():
+    column = ColumnModel('id', 'ID', 'bigint')
+    index = IndexModel('pk_accnt', 'accnt')
+    index.add_column('id', 1)
+    fk = ForeignKeyModel('fk_accnt_owner')
+
+    for model in (column, index, index.columns[0], fk):
+        assert not hasattr(model, '__dict__')
+    with pytest.raises(AttributeError):
+        column.unknown_attribute = 1
+
+    # Атрибуты вычисляемых колонок не заданы до загрузки: действуют значения getattr по умолчанию
+    assert getattr(column, 'target_type', 'both') == 'both'
+    assert column.to_dict()['data_type'] == 'bigint'
+
+
+@pytest.mark.unit
+def test_column_pickle_keeps_shared_descriptor():
+    column = ColumnModel('name', 'Name', 'varchar', data_type_max_length=255)
+    column.is_nullable = False
+    restored = pickle.loads(pickle.dumps(column))
+
+    assert restored.type_descriptor is column.type_descriptor
+    assert restored.get_ddl_definition() == column.get_ddl_definition() == "name varchar(255) NOT NULL"
@@ -0,0 +1,63 @@
+"""
+Юнит-тесты единой точки входа femcl
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+HEAVY_MODULES = ('psycopg2', 'pyodbc', 'rich', 'yaml', 'pandas', 'pyarrow')
+
+
+def loaded_heavy_modules(code):
+    script = code + f"\nprint('loaded:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', script], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.rsplit('loaded:', 1)[1].strip()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('argv', [['--help'], ['migrate', '--help'], ['plan', '--help'], ['status', '--help']])
+def test_help_does_not_import_drivers(argv):
+    code = ("import sys\nfrom src.code import cli\n"
+            f"try:\n    cli.main({argv!r})\nexcept SystemExit:\n    pass")
+    assert loaded_heavy_modules(code) == ''
+
+
+@pytest.mark.unit
+def test_infrastructure_package_loads_classes_on_demand():
+    code = ("import sys\nimport src.code.infrastructure.classes as classes\n"
+            "assert classes.MigrationTracer.__name__ == 'MigrationTracer'\n"
+            "assert 'src.code.infrastructure.classes.connection_manager' not in sys.modules")
+    assert loaded_heavy_modules(code) == ''
+
+
+@pytest.mark.unit
+def test_status_does_not_import_migration_manager():
+    code = ("import sys\nfrom src.code import cli\n"
+            "assert cli.main(['status', '--task-id', '999999']) == 1\n"
+            "assert 'scripts.migration_manager' not in sys.modules")
+    assert loaded_heavy_modules(code) == ''
+
+
+@pytest.mark.unit
+def test_commands_forward_arguments(monkeypatch):
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from src.code import cli
+
+    calls = []
+    monkeypatch.setattr(cli, 'run_script', lambda module, argv: calls.append((module, list(argv))))
+
+    assert cli.main(['migrate', 'accnt', '--force']) == 0
+    assert cli.main(['plan', 'accnt']) == 0
+    assert cli.main(['validate', 'accnt', '--task-id', '3']) == 0
+    assert cli.main(['monitor', '--once']) == 0
+    assert calls == [
+        ('src.code.migration.scripts.migrate_table', ['accnt', '--force']),
+        ('src.code.migration.scripts.migrate_table', ['accnt', '--compile-plan']),
+        ('scripts.migration_manager', ['validate', '--table', 'accnt', '--task-id', '3']),
+        ('scripts.migration.monitoring_reporter', ['--task-id', '2', '--once']),
+    ]
+    assert cli.main([]) == 2